@@ -0,0 +1,91 @@
+"""
+# Benchmark of the validation modes for retrieving context entities
+
+Every entity that the ContextBrokerClient returns is validated by default.
+For large read-only workloads the validation may take longer than the
+request itself. This example compares the available validation modes on a
+synthetic response, hence it does not require a running context broker.
+"""
+# ## Import packages
+import logging
+import random
+import timeit
+from typing import List
+
+from pydantic import parse_obj_as
+from filip.models.ngsi_v2.base import ValidationMode
+from filip.models.ngsi_v2.context import \
+    ContextEntity, \
+    LazyContextEntity
+
+# ## Parameters
+#
+# Number of entities per simulated response and number of attributes per
+# entity
+NUMBER_OF_ENTITIES = 1000
+NUMBER_OF_ATTRIBUTES = 10
+# Number of repetitions of each benchmark
+REPETITIONS = 5
+
+# Setting up logging
+logging.basicConfig(
+    level='INFO',
+    format='%(asctime)s %(name)s %(levelname)s: %(message)s')
+
+logger = logging.getLogger(__name__)
+
+
+def build_response():
+    """
+    Creates a response of the context broker in normalized format
+    """
+    return [{'id': f'urn:ngsi-ld:Sensor:{i:05d}',
+             'type': 'Sensor',
+             **{f'attr_{j}': {'type': 'Number',
+                              'value': random.random(),
+                              'metadata': {'accuracy': {'type': 'Number',
+                                                        'value': 0.1}}}
+                for j in range(NUMBER_OF_ATTRIBUTES)}}
+            for i in range(NUMBER_OF_ENTITIES)]
+
+
+if __name__ == "__main__":
+    # ## 1 Setup
+    #
+    # The client uses the same conversions as below when 'validate' is set
+    # on get_entity_list, query, iter_entities, iter_query or
+    # get_entities_by_ids, e.g.:
+    #
+    #     client.get_entity_list(entity_types=['Sensor'], validate=False)
+    #
+    items = build_response()
+
+    modes = {
+        ValidationMode.STRICT:
+            lambda: parse_obj_as(List[ContextEntity], items),
+        ValidationMode.CONSTRUCT:
+            lambda: [ContextEntity.construct_trusted(item) for item in items],
+        ValidationMode.LAZY:
+            lambda: [LazyContextEntity(item) for item in items]
+    }
+
+    # ## 2 Run benchmarks
+    #
+    # The lazy mode only wraps the data. Validation happens on demand via
+    # LazyContextEntity.validate()
+    results = {mode: min(timeit.repeat(func, number=1, repeat=REPETITIONS))
+               for mode, func in modes.items()}
+
+    baseline = results[ValidationMode.STRICT]
+    for mode, duration in results.items():
+        logger.info("%-10s %8.2f ms for %s entities (speedup x%.1f)",
+                    mode.value, duration * 1000, NUMBER_OF_ENTITIES,
+                    baseline / duration)
+
+    # ## 3 Check results
+    #
+    # All modes lead to the same entities
+    strict = modes[ValidationMode.STRICT]()
+    assert strict == modes[ValidationMode.CONSTRUCT]()
+    assert strict == [entity.validate()
+                      for entity in modes[ValidationMode.LAZY]()]
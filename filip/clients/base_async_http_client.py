@@ -0,0 +1,350 @@
+"""
+Base asynchronous http client module
+"""
+import logging
+from pydantic import AnyHttpUrl
+from typing import Dict, ByteString, List, IO, Tuple, Union
+import httpx
+
+from filip.models.base import FiwareHeader
+from filip.utils import validate_http_url
+
+
+class BaseAsyncHttpClient:
+    """
+    Base client for all derived asynchronous api-clients. It mirrors
+    :class:`filip.clients.base_http_client.BaseHttpClient` but is built on a
+    pooled ``httpx.AsyncClient``. Hence, all request methods return
+    coroutines and many requests can share a single event loop.
+
+    Args:
+        session: async client object. This is required for reusing
+            the same connection pool across several clients
+        fiware_header: Fiware header object required for multi tenancy
+        limits: Connection pool limits of the internally created async
+            client. Omitted if a session is provided.
+        **kwargs: Optional arguments that ``httpx`` request methods take.
+
+    """
+    def __init__(self,
+                 url: Union[AnyHttpUrl, str] = None,
+                 *,
+                 session: httpx.AsyncClient = None,
+                 fiware_header: Union[Dict, FiwareHeader] = None,
+                 limits: httpx.Limits = None,
+                 **kwargs):
+
+        self.logger = logging.getLogger(
+            name=f"{self.__class__.__module__}."
+                 f"{self.__class__.__name__}")
+        self.logger.addHandler(logging.NullHandler())
+        self.logger.debug("Creating %s", self.__class__.__name__)
+
+        if url:
+            self.logger.debug("Checking url style...")
+            self.base_url = validate_http_url(url)
+
+        if session:
+            self.session = session
+            self._external_session = True
+        else:
+            self.session = httpx.AsyncClient(
+                limits=limits or httpx.Limits(max_connections=100,
+                                              max_keepalive_connections=20))
+            self._external_session = False
+
+        if not fiware_header:
+            self.fiware_headers = FiwareHeader()
+        else:
+            self.fiware_headers = fiware_header
+
+        self.headers.update(kwargs.pop('headers', {}))
+        self.kwargs: Dict = kwargs
+
+    # Asynchronous Context Manager Protocol
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def fiware_headers(self) -> FiwareHeader:
+        """
+        Get fiware header
+
+        Returns:
+            FiwareHeader
+        """
+        return self._fiware_headers
+
+    @fiware_headers.setter
+    def fiware_headers(self, headers: Union[Dict, FiwareHeader]) -> None:
+        """
+        Sets new fiware header
+
+        Args:
+            headers (Dict, FiwareHeader): New headers either as FiwareHeader
+                object or as dict.
+
+        Returns:
+            None
+        """
+        if isinstance(headers, FiwareHeader):
+            self._fiware_headers = headers
+        elif isinstance(headers, dict):
+            self._fiware_headers = FiwareHeader.parse_obj(headers)
+        elif isinstance(headers, str):
+            self._fiware_headers = FiwareHeader.parse_raw(headers)
+        else:
+            raise TypeError(f'Invalid headers! {type(headers)}')
+        self.headers.update(self.fiware_headers.dict(by_alias=True))
+
+    @property
+    def fiware_service(self) -> str:
+        """
+        Get current fiware service
+        Returns:
+            str
+        """
+        return self.fiware_headers.service
+
+    @fiware_service.setter
+    def fiware_service(self, service: str) -> None:
+        """
+        Set new fiware service
+        Args:
+            service:
+
+        Returns:
+            None
+        """
+        self._fiware_headers.service = service
+        self.headers.update(self.fiware_headers.dict(by_alias=True))
+
+    @property
+    def fiware_service_path(self) -> str:
+        """
+        Get current fiware service path
+        Returns:
+            str
+        """
+        return self.fiware_headers.service_path
+
+    @fiware_service_path.setter
+    def fiware_service_path(self, service_path: str) -> None:
+        """
+        Set new fiware service path
+        Args:
+            service_path (str): New fiware service path. Must start with '/'
+
+        Returns:
+            None
+        """
+        self._fiware_headers.service_path = service_path
+        self.headers.update(self.fiware_headers.dict(by_alias=True))
+
+    @property
+    def headers(self):
+        """
+        Return current session headers
+        Returns:
+            dict with headers
+        """
+        return self.session.headers
+
+    def _update_kwargs(self, kwargs: Dict) -> Dict:
+        """
+        Merges the client wide request arguments into the arguments of a
+        single request. Arguments of the single request take precedence.
+        """
+        kwargs.update({k: v for k, v in self.kwargs.items()
+                       if k not in kwargs.keys()})
+        return kwargs
+
+    async def get(self,
+                  url: str,
+                  params: Union[Dict, List[Tuple], ByteString] = None,
+                  **kwargs) -> httpx.Response:
+        """
+        Sends a GET request using the pooled async session.
+
+        Args:
+            url (str): URL for the request.
+            params (optional): Dictionary, list of tuples or bytes
+                to send in the query string for the request.
+            **kwargs: Optional arguments that ``httpx`` takes.
+
+        Returns:
+            httpx.Response
+        """
+        return await self.session.get(url=url, params=params,
+                                      **self._update_kwargs(kwargs))
+
+    async def options(self, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends an OPTIONS request using the pooled async session.
+
+        Args:
+            url (str):
+            **kwargs: Optional arguments that ``httpx`` takes.
+
+        Returns:
+            httpx.Response
+        """
+        return await self.session.options(url=url,
+                                          **self._update_kwargs(kwargs))
+
+    async def head(self, url: str,
+                   params: Union[Dict, List[Tuple], ByteString] = None,
+                   **kwargs) -> httpx.Response:
+        """
+        Sends a HEAD request using the pooled async session.
+
+        Args:
+            url (str): URL for the request.
+            params (optional): Dictionary, list of tuples or bytes
+                to send in the query string for the request.
+            **kwargs: Optional arguments that ``httpx`` takes.
+
+        Returns:
+            httpx.Response
+        """
+        return await self.session.head(url=url, params=params,
+                                       **self._update_kwargs(kwargs))
+
+    async def post(self,
+                   url: str,
+                   data: Union[Dict, ByteString, List[Tuple], IO, str] = None,
+                   json: Dict = None,
+                   **kwargs) -> httpx.Response:
+        """
+        Sends a POST request using the pooled async session.
+
+        Args:
+            url: URL for the request.
+            data: Dictionary, bytes or string to send in the body of the
+                request.
+            json: A JSON serializable Python object to send in the
+                body of the request.
+            **kwargs: Optional arguments that ``httpx`` takes.
+
+        Returns:
+            httpx.Response
+        """
+        return await self.session.request(method='POST', url=url,
+                                          **self.__body(data, json),
+                                          **self._update_kwargs(kwargs))
+
+    async def put(self,
+                  url: str,
+                  data: Union[Dict, ByteString, List[Tuple], IO, str] = None,
+                  json: Dict = None,
+                  **kwargs) -> httpx.Response:
+        """
+        Sends a PUT request using the pooled async session.
+
+        Args:
+            url: URL for the request.
+            data: Dictionary, bytes or string to send in the body of the
+                request.
+            json: A JSON serializable Python object to send in the
+                body of the request.
+            **kwargs: Optional arguments that ``httpx`` takes.
+
+        Returns:
+            httpx.Response
+        """
+        return await self.session.request(method='PUT', url=url,
+                                          **self.__body(data, json),
+                                          **self._update_kwargs(kwargs))
+
+    async def patch(self,
+                    url: str,
+                    data: Union[Dict, ByteString, List[Tuple], IO, str] = None,
+                    json: Dict = None,
+                    **kwargs) -> httpx.Response:
+        """
+        Sends a PATCH request using the pooled async session.
+
+        Args:
+            url: URL for the request.
+            data: Dictionary, bytes or string to send in the body of the
+                request.
+            json: A JSON serializable Python object to send in the
+                body of the request.
+            **kwargs: Optional arguments that ``httpx`` takes.
+
+        Returns:
+            httpx.Response
+        """
+        return await self.session.request(method='PATCH', url=url,
+                                          **self.__body(data, json),
+                                          **self._update_kwargs(kwargs))
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        """
+        Sends a DELETE request using the pooled async session.
+
+        Args:
+            url (str): URL for the request.
+            **kwargs: Optional arguments that ``httpx`` takes.
+
+        Returns:
+            httpx.Response
+        """
+        return await self.session.request(method='DELETE', url=url,
+                                          **self._update_kwargs(kwargs))
+
+    @staticmethod
+    def __body(data: Union[Dict, ByteString, List[Tuple], IO, str] = None,
+               json: Dict = None) -> Dict:
+        """
+        Maps the ``requests`` like body arguments to the ones of ``httpx``,
+        which distinguishes between form data and raw content.
+        """
+        if json is not None:
+            return {'json': json}
+        if isinstance(data, (str, bytes)):
+            return {'content': data}
+        if data is not None:
+            return {'data': data}
+        return {}
+
+    def log_error(self,
+                  err: httpx.HTTPError,
+                  msg: str = None) -> None:
+        """
+        Outputs the error messages from the client request function. If
+        additional information is available in the server response this will
+        be forwarded to the logging output.
+
+        Note:
+            The user is responsible to setup the logging system
+
+        Args:
+            err: Request Error
+            msg: error message from calling function
+
+        Returns:
+            None
+        """
+        response = getattr(err, 'response', None)
+        if response is not None:
+            if response.text and msg:
+                self.logger.error("%s \n Reason: %s", msg, response.text)
+            elif response.text and not msg:
+                self.logger.error("%s", response.text)
+        elif msg:
+            self.logger.error("%s \n Reason: %s", msg, err)
+        else:
+            self.logger.error(err)
+
+    async def close(self) -> None:
+        """
+        Close http session
+        Returns:
+            None
+        """
+        if self.session and not self._external_session:
+            await self.session.aclose()
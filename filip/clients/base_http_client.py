@@ -2,23 +2,59 @@
 Base http client module
 """
 import logging
-from pydantic import AnyHttpUrl
+from pydantic import AnyHttpUrl, BaseModel, Field, NonNegativeInt, PositiveInt
 from typing import Dict, ByteString, List, IO, Tuple, Union
 import requests
+from requests.adapters import HTTPAdapter
 
 from filip.models.base import FiwareHeader
 from filip.utils import validate_http_url
 
 
+class ConnectionPoolConfig(BaseModel):
+    """
+    Configuration of the connection pool that a client owns if no session
+    is provided. The settings are passed to the ``HTTPAdapter`` of
+    ``requests``.
+    """
+    pool_connections: PositiveInt = Field(
+        default=10,
+        description="Number of hosts for which connection pools are cached"
+    )
+    pool_maxsize: PositiveInt = Field(
+        default=10,
+        description="Maximum number of connections kept per host. Should be "
+                    "at least the number of threads sharing the client"
+    )
+    pool_block: bool = Field(
+        default=False,
+        description="Whether to block and wait for a free connection if the "
+                    "pool of a host is exhausted instead of opening an "
+                    "additional one"
+    )
+    max_retries: NonNegativeInt = Field(
+        default=0,
+        description="Number of retries for failed connection attempts"
+    )
+    keep_alive: bool = Field(
+        default=True,
+        description="Keep connections open for reuse. If `False` every "
+                    "request asks the server to close the connection"
+    )
+
+
 class BaseHttpClient:
     """
-    Base client for all derived api-clients.
+    Base client for all derived api-clients. If no session is provided the
+    client owns a pooled session for its whole lifetime. Thus, connections
+    are reused across requests until :meth:`close` is called.
 
     Args:
         session: request session object. This is required for reusing
             the same connection
-        reuse_session (bool):
         fiware_header: Fiware header object required for multi tenancy
+        pool_config: Configuration of the connection pool of the internally
+            created session. Omitted if a session is provided.
         **kwargs: Optional arguments that ``request`` takes.
 
     """
@@ -27,6 +63,7 @@ class BaseHttpClient:
                  *,
                  session: requests.Session = None,
                  fiware_header: Union[Dict, FiwareHeader] = None,
+                 pool_config: Union[ConnectionPoolConfig, Dict] = None,
                  **kwargs):
 
         self.logger = logging.getLogger(
@@ -43,8 +80,8 @@ class BaseHttpClient:
             self.session = session
             self._external_session = True
         else:
-            self.session = None
-            self._headers = {}
+            self.session = self.__create_session(pool_config=pool_config)
+            self._external_session = False
 
         if not fiware_header:
             self.fiware_headers = FiwareHeader()
@@ -54,12 +91,36 @@ class BaseHttpClient:
         self.headers.update(kwargs.pop('headers', {}))
         self.kwargs: Dict = kwargs
 
+    @staticmethod
+    def __create_session(pool_config: Union[ConnectionPoolConfig, Dict] = None
+                         ) -> requests.Session:
+        """
+        Creates a session with a connection pool according to the given
+        configuration.
+
+        Args:
+            pool_config: Configuration of the connection pool
+
+        Returns:
+            requests.Session
+        """
+        if pool_config is None:
+            pool_config = ConnectionPoolConfig()
+        elif isinstance(pool_config, dict):
+            pool_config = ConnectionPoolConfig.parse_obj(pool_config)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_config.pool_connections,
+                              pool_maxsize=pool_config.pool_maxsize,
+                              pool_block=pool_config.pool_block,
+                              max_retries=pool_config.max_retries)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not pool_config.keep_alive:
+            session.headers.update({'Connection': 'close'})
+        return session
+
     # Context Manager Protocol
     def __enter__(self):
-        if not self.session:
-            self.session = requests.Session()
-            self.headers.update(self.fiware_headers.dict(by_alias=True))
-            self._external_session = False
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -152,9 +213,7 @@ class BaseHttpClient:
         Returns:
             dict with headers
         """
-        if self.session:
-            return self.session.headers
-        return self._headers
+        return self.session.headers
 
     # modification to requests api
     def get(self,
@@ -162,8 +221,7 @@ class BaseHttpClient:
             params: Union[Dict, List[Tuple], ByteString] = None,
             **kwargs) -> requests.Response:
         """
-        Sends a GET request either using the provided session or the single
-        session.
+        Sends a GET request using the session of the client.
 
         Args:
             url (str): URL for the new :class:`Request` object.
@@ -178,14 +236,11 @@ class BaseHttpClient:
         kwargs.update({k: v for k, v in self.kwargs.items()
                        if k not in kwargs.keys()})
 
-        if self.session:
-            return self.session.get(url=url, params=params, **kwargs)
-        return requests.get(url=url, params=params, **kwargs)
+        return self.session.get(url=url, params=params, **kwargs)
 
     def options(self, url: str, **kwargs) -> requests.Response:
         """
-        Sends an OPTIONS request either using the provided session or the
-        single session.
+        Sends an OPTIONS request using the session of the client.
 
         Args:
             url (str):
@@ -197,16 +252,13 @@ class BaseHttpClient:
         kwargs.update({k: v for k, v in self.kwargs.items()
                        if k not in kwargs.keys()})
 
-        if self.session:
-            return self.session.options(url=url, **kwargs)
-        return requests.options(url=url, **kwargs)
+        return self.session.options(url=url, **kwargs)
 
     def head(self, url: str,
              params: Union[Dict, List[Tuple], ByteString] = None,
              **kwargs) -> requests.Response:
         """
-        Sends a HEAD request either using the provided session or the
-        single session.
+        Sends a HEAD request using the session of the client.
 
         Args:
             url (str): URL for the new :class:`Request` object.
@@ -220,9 +272,7 @@ class BaseHttpClient:
         kwargs.update({k: v for k, v in self.kwargs.items()
                        if k not in kwargs.keys()})
 
-        if self.session:
-            return self.session.head(url=url, params=params, **kwargs)
-        return requests.head(url=url, params=params, **kwargs)
+        return self.session.head(url=url, params=params, **kwargs)
 
     def post(self,
              url: str,
@@ -230,8 +280,7 @@ class BaseHttpClient:
              json: Dict = None,
              **kwargs) -> requests.Response:
         """
-        Sends a POST request either using the provided session or the
-        single session.
+        Sends a POST request using the session of the client.
 
         Args:
             url: URL for the new :class:`Request` object.
@@ -247,9 +296,7 @@ class BaseHttpClient:
         kwargs.update({k: v for k, v in self.kwargs.items()
                        if k not in kwargs.keys()})
 
-        if self.session:
-            return self.session.post(url=url, data=data, json=json, **kwargs)
-        return requests.post(url=url, data=data, json=json, **kwargs)
+        return self.session.post(url=url, data=data, json=json, **kwargs)
 
     def put(self,
             url: str,
@@ -257,8 +304,7 @@ class BaseHttpClient:
             json: Dict = None,
             **kwargs) -> requests.Response:
         """
-        Sends a PUT request either using the provided session or the
-        single session.
+        Sends a PUT request using the session of the client.
 
         Args:
             url: URL for the new :class:`Request` object.
@@ -275,9 +321,7 @@ class BaseHttpClient:
         kwargs.update({k: v for k, v in self.kwargs.items()
                        if k not in kwargs.keys()})
 
-        if self.session:
-            return self.session.put(url=url, data=data, json=json, **kwargs)
-        return requests.put(url=url, data=data, json=json, **kwargs)
+        return self.session.put(url=url, data=data, json=json, **kwargs)
 
     def patch(self,
               url: str,
@@ -285,8 +329,7 @@ class BaseHttpClient:
               json: Dict = None,
               **kwargs) -> requests.Response:
         """
-        Sends a PATCH request either using the provided session or the
-        single session.
+        Sends a PATCH request using the session of the client.
 
         Args:
             url: URL for the new :class:`Request` object.
@@ -303,14 +346,11 @@ class BaseHttpClient:
         kwargs.update({k: v for k, v in self.kwargs.items()
                        if k not in kwargs.keys()})
 
-        if self.session:
-            return self.session.patch(url=url, data=data, json=json, **kwargs)
-        return requests.patch(url=url, data=data, json=json, **kwargs)
+        return self.session.patch(url=url, data=data, json=json, **kwargs)
 
     def delete(self, url: str, **kwargs) -> requests.Response:
         """
-        Sends a DELETE request either using the provided session or the
-        single session.
+        Sends a DELETE request using the session of the client.
 
         Args:
             url (str): URL for the new :class:`Request` object.
@@ -322,9 +362,7 @@ class BaseHttpClient:
         kwargs.update({k: v for k, v in self.kwargs.items()
                        if k not in kwargs.keys()})
 
-        if self.session:
-            return self.session.delete(url=url, **kwargs)
-        return requests.delete(url=url, **kwargs)
+        return self.session.delete(url=url, **kwargs)
 
     def log_error(self,
                   err: requests.RequestException,
@@ -356,7 +394,9 @@ class BaseHttpClient:
 
     def close(self) -> None:
         """
-        Close http session
+        Close http session. This releases all pooled connections of an owned
+        session. Provided sessions are left untouched.
+
         Returns:
             None
         """
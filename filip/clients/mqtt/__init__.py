@@ -1,4 +1,5 @@
 """
 MQTT client for streaming data via FIWARE's IoT-Agent
 """
-from .client import IoTAMQTTClient
\ No newline at end of file
+from .client import IoTAMQTTClient
+from .stream import NotificationStream
\ No newline at end of file
@@ -0,0 +1,257 @@
+"""
+Stream of context broker notifications that are delivered via MQTT
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Union
+from urllib.parse import urlparse
+
+import paho.mqtt.client as mqtt
+
+from filip.clients.mqtt.client import IoTAMQTTClient
+from filip.clients.ngsi_v2.receiver import parse_message
+from filip.models.ngsi_v2.base import AttrsFormat, ValidationMode
+from filip.models.ngsi_v2.subscriptions import Message, Mqtt, Subscription
+
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationStream:
+    """
+    Consumes the notifications that the context broker publishes for
+    subscriptions with an `mqtt` endpoint. Messages are provided either as
+    asynchronous iterator or to registered callbacks in batches that are
+    limited by `max_batch_size` and `max_delay`.
+
+    Example::
+
+        >>> async with NotificationStream(subscription) as stream:
+        >>>     async for message in stream:
+        >>>         print(message.data)
+
+        >>> stream = NotificationStream(subscription)
+        >>> stream.add_callback(lambda messages: print(len(messages)))
+        >>> with stream:
+        >>>     time.sleep(3600)
+
+    Note:
+        `mqttCustom` notifications are only supported if their payload is
+        the default notification message.
+
+    Args:
+        endpoint: Subscription with an `mqtt` or `mqttCustom` notification
+            or the endpoint itself
+        client: Connected MQTT client, e.g. an
+            :class:`~filip.clients.mqtt.IoTAMQTTClient` that is already used
+            for devices. Its network loop is managed by the caller. If
+            omitted, a new client is created from the endpoint.
+        attrs_format: Attribute format of the notifications. Taken from the
+            subscription, if given.
+        max_batch_size: Maximum number of messages per callback
+        max_delay: Maximum time in seconds a message waits for its batch
+        max_queue_size: Maximum number of buffered messages. Further
+            messages are dropped until there is capacity again.
+        validate: How normalized entities are built, see
+            :class:`filip.models.ngsi_v2.base.ValidationMode`
+    """
+    def __init__(self,
+                 endpoint: Union[Subscription, Mqtt],
+                 *,
+                 client: mqtt.Client = None,
+                 attrs_format: AttrsFormat = None,
+                 max_batch_size: int = 100,
+                 max_delay: float = 0.1,
+                 max_queue_size: int = 10000,
+                 validate: Union[bool, ValidationMode, str] = True):
+        if isinstance(endpoint, Subscription):
+            notification = endpoint.notification
+            if attrs_format is None:
+                attrs_format = notification.attrsFormat
+            endpoint = notification.mqtt or notification.mqttCustom
+        if not isinstance(endpoint, Mqtt):
+            raise ValueError("Subscription has no mqtt notification!")
+        if isinstance(validate, bool):
+            validate = ValidationMode.STRICT if validate \
+                else ValidationMode.CONSTRUCT
+
+        self.endpoint = endpoint
+        self.attrs_format = attrs_format
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.max_queue_size = max_queue_size
+        self.validate = ValidationMode(validate)
+        self.received = 0
+        self.dropped = 0
+
+        self._own_client = client is None
+        self.client = client or IoTAMQTTClient()
+        self._callbacks: List[Callable[[List[Message]], None]] = []
+        self._batches: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._batch_thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._messages: Optional[asyncio.Queue] = None
+        self._running = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    async def __aenter__(self):
+        self._loop = asyncio.get_event_loop()
+        self._messages = asyncio.Queue(maxsize=self.max_queue_size)
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        self._loop = None
+        self._messages = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Message:
+        if self._messages is None:
+            raise RuntimeError("Stream must be used as async context "
+                               "manager!")
+        return await self._messages.get()
+
+    async def batches(self):
+        """
+        Asynchronous generator of message batches limited by
+        `max_batch_size` and `max_delay`
+
+        Yields:
+            List of messages
+        """
+        async for message in self:
+            batch = [message]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(
+                        self._messages.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+            yield batch
+
+    def add_callback(self, callback: Callable[[List[Message]], None]) -> None:
+        """
+        Registers a callback that is called with batches of messages from a
+        background thread. Callbacks can also be added to a running stream.
+
+        Args:
+            callback: Callable that takes a list of messages
+        """
+        self._callbacks.append(callback)
+        if self._running and self._batch_thread is None:
+            self.__start_batch_thread()
+
+    def start(self) -> None:
+        """
+        Subscribes the notification topic and starts the processing. If the
+        stream owns its client, the client is connected first.
+        """
+        self._running = True
+        if self._callbacks:
+            self.__start_batch_thread()
+        self.client.message_callback_add(self.endpoint.topic,
+                                         self.__on_message)
+        if self._own_client:
+            url = urlparse(str(self.endpoint.url))
+            if self.endpoint.user:
+                self.client.username_pw_set(username=self.endpoint.user,
+                                            password=self.endpoint.passwd)
+            self.client.connect(host=url.hostname, port=url.port or 1883)
+            self.client.loop_start()
+        self.client.subscribe(topic=self.endpoint.topic,
+                              qos=self.endpoint.qos)
+
+    def stop(self) -> None:
+        """
+        Unsubscribes the notification topic and delivers all buffered
+        messages to the callbacks
+        """
+        if not self._running:
+            return
+        self.client.unsubscribe(self.endpoint.topic)
+        self.client.message_callback_remove(self.endpoint.topic)
+        if self._own_client:
+            self.client.loop_stop()
+            self.client.disconnect()
+        self._running = False
+        if self._batch_thread is not None:
+            self._batch_thread.join()
+            self._batch_thread = None
+
+    def __start_batch_thread(self) -> None:
+        """
+        Starts the thread that passes batches to the callbacks
+        """
+        self._batch_thread = threading.Thread(target=self.__run_callbacks,
+                                              name=self.__class__.__name__,
+                                              daemon=True)
+        self._batch_thread.start()
+
+    def __on_message(self, client, userdata, msg: mqtt.MQTTMessage) -> None:
+        """
+        Parses a notification and passes it to the consumers
+        """
+        try:
+            message = parse_message(body=msg.payload,
+                                    attrs_format=self.attrs_format,
+                                    validate=self.validate)
+        except Exception as err:
+            logger.error("Invalid notification on '%s': %s", msg.topic, err)
+            return
+        self.received += 1
+        if self._callbacks:
+            try:
+                self._batches.put_nowait(message)
+            except queue.Full:
+                self.dropped += 1
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self.__put_message, message)
+
+    def __put_message(self, message: Message) -> None:
+        """
+        Adds a message to the queue of the async iterator
+        """
+        try:
+            self._messages.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def __run_callbacks(self) -> None:
+        """
+        Collects batches and passes them to all callbacks
+        """
+        while self._running or not self._batches.empty():
+            try:
+                batch = [self._batches.get(timeout=self.max_delay)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._batches.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            for callback in self._callbacks:
+                try:
+                    callback(batch)
+                except Exception as err:
+                    logger.error("Notification callback failed: %s", err)
@@ -5,3 +5,12 @@ from .cb import ContextBrokerClient
 from .iota import IoTAClient
 from .quantumleap import QuantumLeapClient
 from .client import HttpClient, HttpClientConfig
+from .async_cb import AsyncContextBrokerClient
+from .async_iota import AsyncIoTAClient
+from .async_quantumleap import AsyncQuantumLeapClient
+from .async_client import AsyncHttpClient
+from .write_buffer import WriteBuffer
+from .cache import EntityCache
+from .receiver import NotificationReceiver
+from .sync import ContextBrokerSync
+from .timeseries_cache import TimeSeriesCache
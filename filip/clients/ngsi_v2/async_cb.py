@@ -0,0 +1,1589 @@
+"""
+Asynchronous Context Broker Module for API Client
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+import warnings
+from math import inf
+from typing import Any, Dict, List, Optional, TYPE_CHECKING, Union
+from urllib.parse import urljoin
+
+import httpx
+from pkg_resources import parse_version
+from pydantic import \
+    parse_obj_as, \
+    PositiveInt, \
+    PositiveFloat, \
+    AnyHttpUrl
+from filip.clients.base_async_http_client import BaseAsyncHttpClient
+from filip.config import settings
+from filip.models.base import FiwareHeader, PaginationMethod
+from filip.utils.simple_ql import QueryString
+from filip.utils.subscription_index import SubscriptionIndex
+from filip.models.ngsi_v2.context import \
+    ActionType, \
+    Command, \
+    ContextEntity, \
+    ContextEntityKeyValues, \
+    ContextAttribute, \
+    NamedCommand, \
+    NamedContextAttribute, \
+    Query, \
+    Update, \
+    PropertyFormat
+from filip.models.ngsi_v2.base import AttrsFormat
+from filip.models.ngsi_v2.subscriptions import Subscription, Message
+from filip.models.ngsi_v2.registrations import Registration
+
+if TYPE_CHECKING:
+    from filip.clients.ngsi_v2.async_iota import AsyncIoTAClient
+
+
+class AsyncContextBrokerClient(BaseAsyncHttpClient):
+    """
+    Asynchronous implementation of the NGSI Context Broker functionalities.
+    The client offers the same methods and signatures as
+    :class:`filip.clients.ngsi_v2.cb.ContextBrokerClient`, but every method
+    returns a coroutine. All requests share the connection pool of the
+    underlying ``httpx.AsyncClient``.
+
+    Example::
+
+        >>> async with AsyncContextBrokerClient(url=url) as client:
+        >>>     entities = await asyncio.gather(
+        >>>         *[client.get_entity(entity_id=i) for i in ids])
+
+    Note:
+        We use the reference implementation for development. Therefore, some
+        other brokers may show slightly different behavior!
+    """
+    def __init__(self,
+                 url: str = None,
+                 *,
+                 session: httpx.AsyncClient = None,
+                 fiware_header: FiwareHeader = None,
+                 **kwargs):
+        """
+
+        Args:
+            url: Url of context broker server
+            session (httpx.AsyncClient):
+            fiware_header (FiwareHeader): fiware service and fiware service path
+            **kwargs (Optional): Optional arguments that ``httpx`` takes.
+        """
+        # set service url
+        url = url or settings.CB_URL
+        super().__init__(url=url,
+                         session=session,
+                         fiware_header=fiware_header,
+                         **kwargs)
+
+    async def __pagination(self,
+                           *,
+                           method: PaginationMethod = PaginationMethod.GET,
+                           url: str,
+                           headers: Dict,
+                           limit: Union[PositiveInt, PositiveFloat] = None,
+                           params: Dict = None,
+                           data: str = None,
+                           max_workers: PositiveInt = 10) -> List[Dict]:
+        """
+        Asynchronous version of the NGSIv2 pagination mechanism. The first
+        page is used to read the total count of items. The remaining pages
+        are requested concurrently, at most `max_workers` at a time, and
+        reassembled in order.
+
+        https://fiware-orion.readthedocs.io/en/master/user/pagination/index.html
+
+        Args:
+            url: Information about the url, obtained from the original function
+            headers: The headers from the original function
+            params:
+            limit:
+            max_workers: Maximum number of concurrent page requests, which
+                must not exhaust the connection pool of the session
+
+        Returns:
+            object:
+
+        """
+        if limit is None:
+            limit = inf
+        if limit > 1000:
+            params['limit'] = 1000  # maximum items per request
+        else:
+            params['limit'] = limit
+
+        res = await self.session.request(method=method,
+                                         url=url,
+                                         params=params,
+                                         headers=headers,
+                                         content=data)
+        if not res.is_success:
+            res.raise_for_status()
+        items = res.json()
+        count = min(int(res.headers['Fiware-Total-Count']), limit)
+
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def fetch_page(offset: int) -> List[Dict]:
+            page_params = params.copy()
+            page_params['offset'] = offset
+            page_params['limit'] = min(1000, count - offset)
+            async with semaphore:
+                page = await self.session.request(method=method,
+                                                  url=url,
+                                                  params=page_params,
+                                                  headers=headers,
+                                                  content=data)
+            if not page.is_success:
+                page.raise_for_status()
+            return page.json()
+
+        pages = await asyncio.gather(
+            *[fetch_page(offset) for offset in range(len(items), count, 1000)])
+        for page in pages:
+            items.extend(page)
+        self.logger.debug('Received: %s', items)
+        return items
+
+    # MANAGEMENT API
+    async def get_version(self) -> Dict:
+        """
+        Gets version of the context broker
+        Returns:
+            Dictionary with response
+        """
+        url = urljoin(self.base_url, '/version')
+        try:
+            res = await self.get(url=url, headers=self.headers)
+            if res.is_success:
+                return res.json()
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            self.logger.error(err)
+            raise
+
+    async def get_resources(self) -> Dict:
+        """
+        Gets resources
+
+        Returns:
+            Dict
+        """
+        url = urljoin(self.base_url, '/v2')
+        try:
+            res = await self.get(url=url, headers=self.headers)
+            if res.is_success:
+                return res.json()
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            self.logger.error(err)
+            raise
+
+    # STATISTICS API
+    async def get_statistics(self) -> Dict:
+        """
+        Gets statistics of context broker
+        Returns:
+            Dictionary with response
+        """
+        url = urljoin(self.base_url, 'statistics')
+        try:
+            res = await self.get(url=url, headers=self.headers)
+            if res.is_success:
+                return res.json()
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            self.logger.error(err)
+            raise
+
+    # CONTEXT MANAGEMENT API ENDPOINTS
+    # Entity Operations
+    async def post_entity(self,
+                          entity: ContextEntity,
+                          update: bool = False,
+                          patch: bool = False,
+                          override_attr_metadata: bool = True
+                          ):
+        """
+        Registers an entity with the context broker. See
+        :meth:`ContextBrokerClient.post_entity` for details.
+
+        Args:
+            entity (ContextEntity):
+                Context Entity Object
+            update (bool):
+                If the response.status_code is 422, whether the override and
+                existing entity
+            patch (bool):
+                If the response.status_code is 422, whether the manipulate the
+                existing entity. Omitted if update `True`.
+            override_attr_metadata:
+                Only applies for patch equal to `True`.
+                Whether to override or append the attributes metadata.
+                `True` for overwrite or `False` for update/append
+        """
+        url = urljoin(self.base_url, 'v2/entities')
+        headers = self.headers.copy()
+        try:
+            res = await self.post(
+                url=url,
+                headers=headers,
+                json=entity.dict(exclude_unset=True,
+                                 exclude_defaults=True,
+                                 exclude_none=True))
+            if res.is_success:
+                self.logger.info("Entity successfully posted!")
+                return res.headers.get('Location')
+            res.raise_for_status()
+        except httpx.HTTPStatusError as err:
+            if update and err.response.status_code == 422:
+                return await self.update_entity(entity=entity)
+            if patch and err.response.status_code == 422:
+                return await self.patch_entity(
+                    entity=entity,
+                    override_attr_metadata=override_attr_metadata)
+            msg = f"Could not post entity {entity.id}"
+            self.log_error(err=err, msg=msg)
+            raise
+        except httpx.HTTPError as err:
+            msg = f"Could not post entity {entity.id}"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def get_entity_list(self,
+                              *,
+                              entity_ids: List[str] = None,
+                              entity_types: List[str] = None,
+                              id_pattern: str = None,
+                              type_pattern: str = None,
+                              q: Union[str, QueryString] = None,
+                              mq: Union[str, QueryString] = None,
+                              georel: str = None,
+                              geometry: str = None,
+                              coords: str = None,
+                              limit: PositiveInt = inf,
+                              attrs: List[str] = None,
+                              metadata: str = None,
+                              order_by: str = None,
+                              response_format: Union[AttrsFormat, str] =
+                              AttrsFormat.NORMALIZED,
+                              max_workers: PositiveInt = 10
+                              ) -> List[Union[ContextEntity,
+                                              ContextEntityKeyValues,
+                                              Dict[str, Any]]]:
+        """
+        Retrieves a list of context entities that match different criteria.
+        See :meth:`ContextBrokerClient.get_entity_list` for a description of
+        all arguments. Pages beyond the first one are fetched concurrently,
+        at most `max_workers` at a time.
+
+        Returns:
+            List of entities
+        """
+        url = urljoin(self.base_url, 'v2/entities/')
+        headers = self.headers.copy()
+        params = {}
+
+        if entity_ids and id_pattern:
+            raise ValueError
+        if entity_types and type_pattern:
+            raise ValueError
+        if entity_ids:
+            if not isinstance(entity_ids, list):
+                entity_ids = [entity_ids]
+            params.update({'id': ','.join(entity_ids)})
+        if id_pattern:
+            try:
+                re.compile(id_pattern)
+            except re.error as err:
+                raise ValueError(f'Invalid Pattern: {err}') from err
+            params.update({'idPattern': id_pattern})
+        if entity_types:
+            if not isinstance(entity_types, list):
+                entity_types = [entity_types]
+            params.update({'type': ','.join(entity_types)})
+        if type_pattern:
+            try:
+                re.compile(type_pattern)
+            except re.error as err:
+                raise ValueError(f'Invalid Pattern: {err.msg}') from err
+            params.update({'typePattern': type_pattern})
+        if attrs:
+            params.update({'attrs': ','.join(attrs)})
+        if metadata:
+            params.update({'metadata': ','.join(metadata)})
+        if q:
+            if isinstance(q, str):
+                q = QueryString.parse_str(q)
+            params.update({'q': str(q)})
+        if mq:
+            params.update({'mq': str(mq)})
+        if geometry:
+            params.update({'geometry': geometry})
+        if georel:
+            params.update({'georel': georel})
+        if coords:
+            params.update({'coords': coords})
+        if order_by:
+            params.update({'orderBy': order_by})
+        if response_format not in list(AttrsFormat):
+            raise ValueError(f'Value must be in {list(AttrsFormat)}')
+        response_format = ','.join(['count', response_format])
+        params.update({'options': response_format})
+        try:
+            items = await self.__pagination(method=PaginationMethod.GET,
+                                            limit=limit,
+                                            url=url,
+                                            params=params,
+                                            headers=headers,
+                                            max_workers=max_workers)
+            if AttrsFormat.NORMALIZED in response_format:
+                return parse_obj_as(List[ContextEntity], items)
+            if AttrsFormat.KEY_VALUES in response_format:
+                return parse_obj_as(List[ContextEntityKeyValues], items)
+            return items
+
+        except httpx.HTTPError as err:
+            msg = "Could not load entities"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def get_entity(self,
+                         entity_id: str,
+                         entity_type: str = None,
+                         attrs: List[str] = None,
+                         metadata: List[str] = None,
+                         response_format: Union[AttrsFormat, str] =
+                         AttrsFormat.NORMALIZED) \
+            -> Union[ContextEntity, ContextEntityKeyValues, Dict[str, Any]]:
+        """
+        Retrieves a single entity. See :meth:`ContextBrokerClient.get_entity`.
+
+        Args:
+            entity_id (String): Id of the entity to be retrieved
+            entity_type (String): Entity type, to avoid ambiguity in case
+                there are several entities with the same entity id.
+            attrs (List of Strings): List of attribute names whose data must be
+                included in the response.
+            metadata (List of Strings): A list of metadata names to include in
+                the response.
+            response_format (AttrsFormat, str): Representation format of
+                response
+        Returns:
+            ContextEntity
+        """
+        url = urljoin(self.base_url, f'v2/entities/{entity_id}')
+        headers = self.headers.copy()
+        params = {}
+        if entity_type:
+            params.update({'type': entity_type})
+        if attrs:
+            params.update({'attrs': ','.join(attrs)})
+        if metadata:
+            params.update({'metadata': ','.join(metadata)})
+        if response_format not in list(AttrsFormat):
+            raise ValueError(f'Value must be in {list(AttrsFormat)}')
+        params.update({'options': response_format})
+
+        try:
+            res = await self.get(url=url, params=params, headers=headers)
+            if res.is_success:
+                self.logger.info("Entity successfully retrieved!")
+                self.logger.debug("Received: %s", res.json())
+                if response_format == AttrsFormat.NORMALIZED:
+                    return ContextEntity(**res.json())
+                if response_format == AttrsFormat.KEY_VALUES:
+                    return ContextEntityKeyValues(**res.json())
+                return res.json()
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not load entity {entity_id}"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def get_entity_attributes(self,
+                                    entity_id: str,
+                                    entity_type: str = None,
+                                    attrs: List[str] = None,
+                                    metadata: List[str] = None,
+                                    response_format: Union[AttrsFormat, str] =
+                                    AttrsFormat.NORMALIZED) -> \
+            Dict[str, ContextAttribute]:
+        """
+        Retrieves the attributes of a single entity. See
+        :meth:`ContextBrokerClient.get_entity_attributes`.
+
+        Args:
+            entity_id (String): Id of the entity to be retrieved
+            entity_type (String): Entity type, to avoid ambiguity in case
+                there are several entities with the same entity id.
+            attrs (List of Strings): List of attribute names whose data must be
+                included in the response.
+            metadata (List of Strings): A list of metadata names to include in
+                the response.
+            response_format (AttrsFormat, str): Representation format of
+                response
+        Returns:
+            Dict
+        """
+        url = urljoin(self.base_url, f'v2/entities/{entity_id}/attrs')
+        headers = self.headers.copy()
+        params = {}
+        if entity_type:
+            params.update({'type': entity_type})
+        if attrs:
+            params.update({'attrs': ','.join(attrs)})
+        if metadata:
+            params.update({'metadata': ','.join(metadata)})
+        if response_format not in list(AttrsFormat):
+            raise ValueError(f'Value must be in {list(AttrsFormat)}')
+        params.update({'options': response_format})
+        try:
+            res = await self.get(url=url, params=params, headers=headers)
+            if res.is_success:
+                if response_format == AttrsFormat.NORMALIZED:
+                    return {key: ContextAttribute(**values)
+                            for key, values in res.json().items()}
+                return res.json()
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not load attributes from entity {entity_id} !"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def update_entity(self,
+                            entity: ContextEntity,
+                            append_strict: bool = False
+                            ):
+        """
+        Updates or appends the properties of an entity. See
+        :meth:`ContextBrokerClient.update_entity`.
+
+        Args:
+            entity (ContextEntity):
+            append_strict: If `True` a strict append procedure is used.
+
+        Returns:
+            None
+        """
+        await self.update_or_append_entity_attributes(
+            entity_id=entity.id,
+            entity_type=entity.type,
+            attrs=entity.get_properties(),
+            append_strict=append_strict)
+
+    async def delete_entity(self,
+                            entity_id: str,
+                            entity_type: str,
+                            delete_devices: bool = False,
+                            iota_client: AsyncIoTAClient = None,
+                            iota_url: AnyHttpUrl = settings.IOTA_URL) -> None:
+        """
+        Remove a entity from the context broker. See
+        :meth:`ContextBrokerClient.delete_entity`.
+
+        Args:
+            entity_id:
+                Id of the entity to be deleted
+            entity_type:
+                several entities with the same entity id.
+            delete_devices:
+                If True, also delete all devices that reference this
+                entity (entity_id as entity_name)
+            iota_client:
+                Corresponding AsyncIoTAClient used to access IoTA-Agent
+            iota_url:
+                URL of the corresponding IoT-Agent. This will autogenerate
+                an AsyncIoTAClient sharing the session of this client.
+
+        Returns:
+            None
+        """
+        url = urljoin(self.base_url, f'v2/entities/{entity_id}')
+        headers = self.headers.copy()
+        params = {'type': entity_type}
+
+        try:
+            res = await self.delete(url=url, params=params, headers=headers)
+            if res.is_success:
+                self.logger.info("Entity '%s' successfully deleted!", entity_id)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not delete entity {entity_id} !"
+            self.log_error(err=err, msg=msg)
+            raise
+
+        if delete_devices:
+            from filip.clients.ngsi_v2.async_iota import AsyncIoTAClient
+            if iota_client:
+                iota_client_local = iota_client
+            else:
+                warnings.warn("No IoTA-Client object provided! "
+                              "Will try to generate one. "
+                              "This usage is not recommended.")
+
+                iota_client_local = AsyncIoTAClient(
+                    url=iota_url,
+                    session=self.session,
+                    fiware_header=self.fiware_headers)
+
+            for device in await iota_client_local.get_device_list(
+                    entity_names=[entity_id]):
+                if device.entity_type == entity_type:
+                    await iota_client_local.delete_device(
+                        device_id=device.device_id)
+
+    async def delete_entities(self, entities: List[ContextEntity]) -> None:
+        """
+        Remove a list of entities from the context broker. See
+        :meth:`ContextBrokerClient.delete_entities`.
+
+        Args:
+            entities: List[ContextEntity]: List of entities to be deleted
+
+        Returns:
+            None
+        """
+        entities_with_attributes: List[ContextEntity] = []
+        for entity in entities:
+            attribute_names = [key for key in entity.dict() if key not in
+                               ContextEntity.__fields__]
+            if len(attribute_names) > 0:
+                entities_with_attributes.append(
+                    ContextEntity(id=entity.id, type=entity.type))
+
+        if len(entities) > 0:
+            await self.update(entities=entities, action_type="delete")
+        if len(entities_with_attributes) > 0:
+            await self.update(entities=entities_with_attributes,
+                              action_type="delete")
+
+    async def update_or_append_entity_attributes(
+            self,
+            entity_id: str,
+            entity_type: str,
+            attrs: List[Union[NamedContextAttribute,
+                              Dict[str, ContextAttribute]]],
+            append_strict: bool = False):
+        """
+        Updates or appends the attributes of an entity. See
+        :meth:`ContextBrokerClient.update_or_append_entity_attributes`.
+
+        Args:
+            entity_id: Entity id to be updated
+            entity_type: Entity type, to avoid ambiguity in case there are
+                several entities with the same entity id.
+            attrs: List of attributes to update or to append
+            append_strict: If `True` a strict append procedure is used.
+
+        Returns:
+            None
+
+        """
+        url = urljoin(self.base_url, f'v2/entities/{entity_id}/attrs')
+        headers = self.headers.copy()
+        params = {}
+        if entity_type:
+            params.update({'type': entity_type})
+        if append_strict:
+            params.update({'options': 'append'})
+
+        entity = ContextEntity(id=entity_id,
+                               type=entity_type)
+        entity.add_attributes(attrs)
+        # exclude commands from the send data,
+        # as they live in the IoTA-agent
+        excluded_keys = {'id', 'type'}
+        excluded_keys.update(
+            entity.get_commands(response_format=PropertyFormat.DICT).keys())
+        try:
+            res = await self.post(url=url,
+                                  headers=headers,
+                                  json=entity.dict(exclude=excluded_keys,
+                                                   exclude_unset=True,
+                                                   exclude_none=True),
+                                  params=params)
+            if res.is_success:
+                self.logger.info("Entity '%s' successfully "
+                                 "updated!", entity.id)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not update or append attributes of entity" \
+                  f" {entity.id} !"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def update_existing_entity_attributes(
+            self,
+            entity_id: str,
+            entity_type: str,
+            attrs: List[Union[NamedContextAttribute,
+                              Dict[str, ContextAttribute]]]):
+        """
+        Updates existing attributes of an entity. See
+        :meth:`ContextBrokerClient.update_existing_entity_attributes`.
+
+        Args:
+            entity_id: Entity id to be updated
+            entity_type: Entity type, to avoid ambiguity in case there are
+                several entities with the same entity id.
+            attrs: List of attributes to update or to append
+
+        Returns:
+            None
+
+        """
+        url = urljoin(self.base_url, f'v2/entities/{entity_id}/attrs')
+        headers = self.headers.copy()
+        params = {"type": entity_type}
+
+        entity = ContextEntity(id=entity_id,
+                               type=entity_type)
+        entity.add_attributes(attrs)
+
+        try:
+            res = await self.patch(url=url,
+                                   headers=headers,
+                                   json=entity.dict(exclude={'id', 'type'},
+                                                    exclude_unset=True,
+                                                    exclude_none=True),
+                                   params=params)
+            if res.is_success:
+                self.logger.info("Entity '%s' successfully "
+                                 "updated!", entity.id)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not update attributes of entity" \
+                  f" {entity.id} !"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def replace_entity_attributes(
+            self,
+            entity_id: str,
+            entity_type: str,
+            attrs: List[Union[NamedContextAttribute,
+                              Dict[str, ContextAttribute]]]):
+        """
+        Replaces all attributes of an entity. See
+        :meth:`ContextBrokerClient.replace_entity_attributes`.
+
+        Args:
+            entity_id: Entity id to be updated
+            entity_type: Entity type, to avoid ambiguity in case there are
+                several entities with the same entity id.
+            attrs: List of attributes to add to the entity
+        Returns:
+            None
+        """
+        url = urljoin(self.base_url, f'v2/entities/{entity_id}/attrs')
+        headers = self.headers.copy()
+        params = {}
+        if entity_type:
+            params.update({'type': entity_type})
+
+        entity = ContextEntity(id=entity_id,
+                               type=entity_type)
+        entity.add_attributes(attrs)
+
+        try:
+            res = await self.put(url=url,
+                                 headers=headers,
+                                 json=entity.dict(exclude={'id', 'type'},
+                                                  exclude_unset=True,
+                                                  exclude_none=True),
+                                 params=params)
+            if res.is_success:
+                self.logger.info("Entity '%s' successfully "
+                                 "updated!", entity.id)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not replace attribute of entity {entity.id} !"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    # Attribute operations
+    async def get_attribute(self,
+                            entity_id: str,
+                            attr_name: str,
+                            entity_type: str = None,
+                            metadata: str = None,
+                            response_format='') -> ContextAttribute:
+        """
+        Retrieves a specified attribute from an entity.
+
+        Args:
+            entity_id: Id of the entity. Example: Bcn_Welt
+            attr_name: Name of the attribute to be retrieved.
+            entity_type (Optional): Type of the entity to retrieve
+            metadata (Optional): A list of metadata names to include in the
+                response.
+
+        Returns:
+            The content of the retrieved attribute as ContextAttribute
+        """
+        url = urljoin(self.base_url,
+                      f'v2/entities/{entity_id}/attrs/{attr_name}')
+        headers = self.headers.copy()
+        params = {}
+        if entity_type:
+            params.update({'type': entity_type})
+        if metadata:
+            params.update({'metadata': ','.join(metadata)})
+        try:
+            res = await self.get(url=url, params=params, headers=headers)
+            if res.is_success:
+                self.logger.debug('Received: %s', res.json())
+                return ContextAttribute(**res.json())
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not load attribute '{attr_name}' from entity" \
+                  f"'{entity_id}' "
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def update_entity_attribute(self,
+                                      entity_id: str,
+                                      attr: Union[ContextAttribute,
+                                                  NamedContextAttribute],
+                                      *,
+                                      entity_type: str = None,
+                                      attr_name: str = None,
+                                      override_metadata: bool = True):
+        """
+        Updates a specified attribute from an entity. See
+        :meth:`ContextBrokerClient.update_entity_attribute`.
+
+        Args:
+            attr:
+                context attribute to update
+            entity_id:
+                Id of the entity. Example: Bcn_Welt
+            entity_type:
+                Entity type, to avoid ambiguity in case there are
+                several entities with the same entity id.
+            attr_name:
+                Name of the attribute if attr is of type ContextAttribute
+            override_metadata:
+                Bool, if set to `True` (default) the metadata will be
+                overwritten.
+        """
+        headers = self.headers.copy()
+        if not isinstance(attr, NamedContextAttribute):
+            assert attr_name is not None, "Missing name for attribute. " \
+                                          "attr_name must be present if" \
+                                          "attr is of type ContextAttribute"
+        else:
+            assert attr_name is None, "Invalid argument attr_name. Do not set " \
+                                      "attr_name if attr is of type " \
+                                      "NamedContextAttribute"
+            attr_name = attr.name
+
+        url = urljoin(self.base_url,
+                      f'v2/entities/{entity_id}/attrs/{attr_name}')
+        params = {}
+        if entity_type:
+            params.update({'type': entity_type})
+        # set overrideMetadata option (we assure backwards compatibility here)
+        if override_metadata:
+            params.update({'options': 'overrideMetadata'})
+        try:
+            res = await self.put(url=url,
+                                 headers=headers,
+                                 params=params,
+                                 json=attr.dict(exclude={'name'},
+                                                exclude_unset=True,
+                                                exclude_none=True))
+            if res.is_success:
+                self.logger.info("Attribute '%s' of '%s' "
+                                 "successfully updated!", attr_name, entity_id)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not update attribute '{attr_name}' of entity" \
+                  f"'{entity_id}' "
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def delete_entity_attribute(self,
+                                      entity_id: str,
+                                      attr_name: str,
+                                      entity_type: str = None) -> None:
+        """
+        Removes a specified attribute from an entity.
+
+        Args:
+            entity_id: Id of the entity.
+            attr_name: Name of the attribute to be retrieved.
+            entity_type: Entity type, to avoid ambiguity in case there are
+            several entities with the same entity id.
+        """
+        url = urljoin(self.base_url,
+                      f'v2/entities/{entity_id}/attrs/{attr_name}')
+        headers = self.headers.copy()
+        params = {}
+        if entity_type:
+            params.update({'type': entity_type})
+        try:
+            res = await self.delete(url=url, params=params, headers=headers)
+            if res.is_success:
+                self.logger.info("Attribute '%s' of '%s' "
+                                 "successfully deleted!", attr_name, entity_id)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not delete attribute '{attr_name}' of entity" \
+                  f"'{entity_id}' "
+            self.log_error(err=err, msg=msg)
+            raise
+
+    # Attribute value operations
+    async def get_attribute_value(self,
+                                  entity_id: str,
+                                  attr_name: str,
+                                  entity_type: str = None) -> Any:
+        """
+        This operation returns the value property with the value of the
+        attribute.
+
+        Args:
+            entity_id: Id of the entity. Example: Bcn_Welt
+            attr_name: Name of the attribute to be retrieved.
+                Example: temperature.
+            entity_type: Entity type, to avoid ambiguity in case there are
+                several entities with the same entity id.
+
+        Returns:
+            Value of the attribute
+        """
+        url = urljoin(self.base_url,
+                      f'v2/entities/{entity_id}/attrs/{attr_name}/value')
+        headers = self.headers.copy()
+        params = {}
+        if entity_type:
+            params.update({'type': entity_type})
+        try:
+            res = await self.get(url=url, params=params, headers=headers)
+            if res.is_success:
+                self.logger.debug('Received: %s', res.json())
+                return res.json()
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not load value of attribute '{attr_name}' from " \
+                  f"entity'{entity_id}' "
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def update_attribute_value(self, *,
+                                     entity_id: str,
+                                     attr_name: str,
+                                     value: Any,
+                                     entity_type: str = None):
+        """
+        Updates the value of a specified attribute of an entity
+
+        Args:
+            value: update value
+            entity_id: Id of the entity. Example: Bcn_Welt
+            attr_name: Name of the attribute to be retrieved.
+                Example: temperature.
+            entity_type: Entity type, to avoid ambiguity in case there are
+                several entities with the same entity id.
+        """
+        url = urljoin(self.base_url,
+                      f'v2/entities/{entity_id}/attrs/{attr_name}/value')
+        headers = self.headers.copy()
+        params = {}
+        if entity_type:
+            params.update({'type': entity_type})
+        if not isinstance(value, (dict, list)):
+            headers.update({'Content-Type': 'text/plain'})
+            if isinstance(value, str):
+                value = f'{value}'
+        try:
+            res = await self.put(url=url,
+                                 headers=headers,
+                                 json=value,
+                                 params=params)
+            if res.is_success:
+                self.logger.info("Attribute '%s' of '%s' "
+                                 "successfully updated!", attr_name, entity_id)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not update value of attribute '{attr_name}' from " \
+                  f"entity '{entity_id}' "
+            self.log_error(err=err, msg=msg)
+            raise
+
+    # Types Operations
+    async def get_entity_types(self,
+                               *,
+                               limit: int = None,
+                               offset: int = None,
+                               options: str = None) -> List[Dict[str, Any]]:
+        """
+
+        Args:
+            limit: Limit the number of types to be retrieved.
+            offset: Skip a number of records.
+            options: Options dictionary. Allowed: count, values
+
+        Returns:
+            List of entity types
+        """
+        url = urljoin(self.base_url, 'v2/types')
+        headers = self.headers.copy()
+        params = {}
+        if limit:
+            params.update({'limit': limit})
+        if offset:
+            params.update({'offset': offset})
+        if options:
+            params.update({'options': options})
+        try:
+            res = await self.get(url=url, params=params, headers=headers)
+            if res.is_success:
+                self.logger.debug('Received: %s', res.json())
+                return res.json()
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = "Could not load entity types!"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def get_entity_type(self, entity_type: str) -> Dict[str, Any]:
+        """
+
+        Args:
+            entity_type: Entity Type. Example: Room
+
+        Returns:
+            Description of the entity type
+        """
+        url = urljoin(self.base_url, f'v2/types/{entity_type}')
+        headers = self.headers.copy()
+        params = {}
+        try:
+            res = await self.get(url=url, params=params, headers=headers)
+            if res.is_success:
+                self.logger.debug('Received: %s', res.json())
+                return res.json()
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not load entities of type" \
+                  f"'{entity_type}' "
+            self.log_error(err=err, msg=msg)
+            raise
+
+    # SUBSCRIPTION API ENDPOINTS
+    async def get_subscription_list(self,
+                                    limit: PositiveInt = inf) \
+            -> List[Subscription]:
+        """
+        Returns a list of all the subscriptions present in the system.
+        Args:
+            limit: Limit the number of subscriptions to be retrieved
+        Returns:
+            list of subscriptions
+        """
+        url = urljoin(self.base_url, 'v2/subscriptions/')
+        headers = self.headers.copy()
+        params = {}
+
+        # We always use the 'count' option to check weather pagination is
+        # required
+        params.update({'options': 'count'})
+        try:
+            items = await self.__pagination(limit=limit,
+                                            url=url,
+                                            params=params,
+                                            headers=headers)
+            return parse_obj_as(List[Subscription], items)
+        except httpx.HTTPError as err:
+            msg = "Could not load subscriptions!"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def post_subscription(self,
+                                subscription: Subscription,
+                                update: bool = False,
+                                skip_initial_notification: bool = False,
+                                index: SubscriptionIndex = None) -> str:
+        """
+        Creates a new subscription. See
+        :meth:`ContextBrokerClient.post_subscription`.
+
+        Args:
+            subscription: Subscription
+            update: True - If the subscription already exists, update it
+                    False- If the subscription already exists, throw warning
+            skip_initial_notification: True - Initial Notifications will be
+                send to recipient containing the whole data. This is
+                deprecated and removed from version 3.0 of the context broker.
+                False - skip the initial notification
+            index: Index of the existing subscriptions that is used for the
+                duplicate detection instead of downloading all subscriptions
+        Returns:
+            str: Id of the (created) subscription
+
+        """
+        if index is None:
+            index = SubscriptionIndex(await self.get_subscription_list())
+
+        ex_sub = index.find_duplicate(subscription)
+        if ex_sub is not None:
+            self.logger.info("Subscription already exists")
+            if update:
+                self.logger.info("Updated subscription")
+                subscription.id = ex_sub.id
+                await self.update_subscription(subscription)
+            else:
+                warnings.warn(f"Subscription existed already with the id"
+                              f" {ex_sub.id}")
+            return ex_sub.id
+
+        params = {}
+        if skip_initial_notification:
+            version = (await self.get_version())['orion']['version']
+            if parse_version(version) <= parse_version('3.1'):
+                params.update({'options': "skipInitialNotification"})
+            warnings.warn(f"Skip initial notifications is a deprecated "
+                          f"feature of older versions <=3.1 of the context "
+                          f"broker. The Context Broker that you requesting has "
+                          f"version: {version}. For newer versions we "
+                          f"automatically skip this option. Consider "
+                          f"refactoring and updating your services",
+                          DeprecationWarning)
+
+        url = urljoin(self.base_url, 'v2/subscriptions')
+        headers = self.headers.copy()
+        headers.update({'Content-Type': 'application/json'})
+        try:
+            res = await self.post(
+                url=url,
+                headers=headers,
+                data=subscription.json(exclude={'id'},
+                                       exclude_unset=True,
+                                       exclude_defaults=True,
+                                       exclude_none=True),
+                params=params)
+            if res.is_success:
+                self.logger.info("Subscription successfully created!")
+                sub_id = res.headers['Location'].split('/')[-1]
+                index.add(subscription.copy(update={'id': sub_id}))
+                return sub_id
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = "Could not send subscription!"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def get_subscription(self, subscription_id: str) -> Subscription:
+        """
+        Retrieves a subscription from
+        Args:
+            subscription_id: id of the subscription
+
+        Returns:
+            Subscription
+        """
+        url = urljoin(self.base_url, f'v2/subscriptions/{subscription_id}')
+        headers = self.headers.copy()
+        try:
+            res = await self.get(url=url, headers=headers)
+            if res.is_success:
+                self.logger.debug('Received: %s', res.json())
+                return Subscription(**res.json())
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not load subscription {subscription_id}"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def update_subscription(self,
+                                  subscription: Subscription,
+                                  skip_initial_notification: bool = False):
+        """
+        Only the fields included in the request are updated in the subscription.
+
+        Args:
+            subscription: Subscription to update
+            skip_initial_notification: True - Initial Notifications will be
+                send to recipient containing the whole data. This is
+                deprecated and removed from version 3.0 of the context broker.
+                False - skip the initial notification
+
+        Returns:
+            None
+        """
+        params = {}
+        if skip_initial_notification:
+            version = (await self.get_version())['orion']['version']
+            if parse_version(version) <= parse_version('3.1'):
+                params.update({'options': "skipInitialNotification"})
+            warnings.warn(f"Skip initial notifications is a deprecated "
+                          f"feature of older versions <3.1 of the context "
+                          f"broker. The Context Broker that you requesting has "
+                          f"version: {version}. For newer versions we "
+                          f"automatically skip this option. Consider "
+                          f"refactoring and updating your services",
+                          DeprecationWarning)
+
+        url = urljoin(self.base_url, f'v2/subscriptions/{subscription.id}')
+        headers = self.headers.copy()
+        headers.update({'Content-Type': 'application/json'})
+        try:
+            res = await self.patch(
+                url=url,
+                headers=headers,
+                data=subscription.json(exclude={'id'},
+                                       exclude_unset=True,
+                                       exclude_defaults=False,
+                                       exclude_none=True))
+            if res.is_success:
+                self.logger.info("Subscription successfully updated!")
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not update subscription {subscription.id}"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def delete_subscription(self, subscription_id: str) -> None:
+        """
+        Deletes a subscription from a Context Broker
+        Args:
+            subscription_id: id of the subscription
+        """
+        url = urljoin(self.base_url,
+                      f'v2/subscriptions/{subscription_id}')
+        headers = self.headers.copy()
+        try:
+            res = await self.delete(url=url, headers=headers)
+            if res.is_success:
+                self.logger.info("Subscription '%s' "
+                                 "successfully deleted!", subscription_id)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not delete subscription {subscription_id}"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    # Registration API
+    async def get_registration_list(self,
+                                    *,
+                                    limit: PositiveInt = None) \
+            -> List[Registration]:
+        """
+        Lists all the context provider registrations present in the system.
+
+        Args:
+            limit: Limit the number of registrations to be retrieved
+        Returns:
+            List of registrations
+        """
+        url = urljoin(self.base_url, 'v2/registrations/')
+        headers = self.headers.copy()
+        params = {}
+
+        # We always use the 'count' option to check weather pagination is
+        # required
+        params.update({'options': 'count'})
+        try:
+            items = await self.__pagination(limit=limit,
+                                            url=url,
+                                            params=params,
+                                            headers=headers)
+
+            return parse_obj_as(List[Registration], items)
+        except httpx.HTTPError as err:
+            msg = "Could not load registrations!"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def post_registration(self, registration: Registration):
+        """
+        Creates a new context provider registration.
+
+        Args:
+            registration (Registration):
+
+        Returns:
+            Id of the created registration
+        """
+        url = urljoin(self.base_url, 'v2/registrations')
+        headers = self.headers.copy()
+        headers.update({'Content-Type': 'application/json'})
+        try:
+            res = await self.post(
+                url=url,
+                headers=headers,
+                data=registration.json(exclude={'id'},
+                                       exclude_unset=True,
+                                       exclude_defaults=True,
+                                       exclude_none=True))
+            if res.is_success:
+                self.logger.info("Registration successfully created!")
+                return res.headers['Location'].split('/')[-1]
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not send registration {registration.id} !"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def get_registration(self, registration_id: str) -> Registration:
+        """
+        Retrieves a registration from context broker by id
+
+        Args:
+            registration_id: id of the registration
+
+        Returns:
+            Registration
+        """
+        url = urljoin(self.base_url, f'v2/registrations/{registration_id}')
+        headers = self.headers.copy()
+        try:
+            res = await self.get(url=url, headers=headers)
+            if res.is_success:
+                self.logger.debug('Received: %s', res.json())
+                return Registration(**res.json())
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not load registration {registration_id} !"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def update_registration(self, registration: Registration):
+        """
+        Only the fields included in the request are updated in the registration.
+
+        Args:
+            registration: Registration to update
+        """
+        url = urljoin(self.base_url, f'v2/registrations/{registration.id}')
+        headers = self.headers.copy()
+        headers.update({'Content-Type': 'application/json'})
+        try:
+            res = await self.patch(
+                url=url,
+                headers=headers,
+                data=registration.json(exclude={'id'},
+                                       exclude_unset=True,
+                                       exclude_defaults=True,
+                                       exclude_none=True))
+            if res.is_success:
+                self.logger.info("Registration successfully updated!")
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not update registration {registration.id} !"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def delete_registration(self, registration_id: str) -> None:
+        """
+        Deletes a registration from a Context Broker
+        Args:
+            registration_id: id of the registration
+        """
+        url = urljoin(self.base_url,
+                      f'v2/registrations/{registration_id}')
+        headers = self.headers.copy()
+        try:
+            res = await self.delete(url=url, headers=headers)
+            if res.is_success:
+                self.logger.info("Registration '%s' "
+                                 "successfully deleted!", registration_id)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not delete registration {registration_id} !"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    # Batch operation API
+    async def update(self,
+                     *,
+                     entities: List[ContextEntity],
+                     action_type: Union[ActionType, str],
+                     update_format: str = None) -> None:
+        """
+        This operation allows to create, update and/or delete several entities
+        in a single batch operation. See :meth:`ContextBrokerClient.update`.
+
+        Args:
+            entities: "an array of entities, each entity specified using the "
+                      "JSON entity representation format "
+            action_type (Update): "actionType, to specify the kind of update
+                    action to do: either append, appendStrict, update, delete,
+                    or replace. "
+            update_format (str): Optional 'keyValues'
+
+        Returns:
+            None
+        """
+        url = urljoin(self.base_url, 'v2/op/update')
+        headers = self.headers.copy()
+        headers.update({'Content-Type': 'application/json'})
+        params = {}
+        if update_format:
+            assert update_format == 'keyValues', \
+                "Only 'keyValues' is allowed as update format"
+            params.update({'options': 'keyValues'})
+        update = Update(actionType=action_type, entities=entities)
+        try:
+            res = await self.post(
+                url=url,
+                headers=headers,
+                params=params,
+                data=update.json(by_alias=True))
+            if res.is_success:
+                self.logger.info("Update operation '%s' succeeded!",
+                                 action_type)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Update operation '{action_type}' failed!"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def query(self,
+                    *,
+                    query: Query,
+                    limit: PositiveInt = None,
+                    order_by: str = None,
+                    response_format: Union[AttrsFormat, str] =
+                    AttrsFormat.NORMALIZED,
+                    max_workers: PositiveInt = 10) -> List[Any]:
+        """
+        Generate api query
+        Args:
+            query (Query):
+            limit (PositiveInt):
+            order_by (str):
+            response_format (AttrsFormat, str):
+            max_workers: Maximum number of concurrent page requests
+        Returns:
+            The response payload is an Array containing one object per matching
+            entity, or an empty array [] if no entities are found.
+        """
+        url = urljoin(self.base_url, 'v2/op/query')
+        headers = self.headers.copy()
+        headers.update({'Content-Type': 'application/json'})
+        params = {'options': 'count'}
+
+        if response_format:
+            if response_format not in list(AttrsFormat):
+                raise ValueError(f'Value must be in {list(AttrsFormat)}')
+            params['options'] = ','.join([response_format, 'count'])
+        try:
+            items = await self.__pagination(
+                method=PaginationMethod.POST,
+                url=url,
+                headers=headers,
+                params=params,
+                data=query.json(exclude_unset=True,
+                                exclude_none=True),
+                limit=limit,
+                max_workers=max_workers)
+            if response_format == AttrsFormat.NORMALIZED:
+                return parse_obj_as(List[ContextEntity], items)
+            if response_format == AttrsFormat.KEY_VALUES:
+                return parse_obj_as(List[ContextEntityKeyValues], items)
+            return items
+        except httpx.HTTPError as err:
+            msg = "Query operation failed!"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def notify(self, message: Message) -> None:
+        """
+        This operation is intended to consume a notification payload so that
+        all the entity data included by such notification is persisted,
+        overwriting if necessary.
+
+        Args:
+            message: Notification message
+
+        Returns:
+            None
+        """
+        url = urljoin(self.base_url, 'v2/op/notify')
+        headers = self.headers.copy()
+        headers.update({'Content-Type': 'application/json'})
+        params = {}
+        try:
+            res = await self.post(
+                url=url,
+                headers=headers,
+                params=params,
+                data=message.json(by_alias=True))
+            if res.is_success:
+                self.logger.info("Notification message sent!")
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Sending notifcation message failed! \n " \
+                  f"{message.json(indent=2)}"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def post_command(self,
+                           *,
+                           entity_id: str,
+                           entity_type: str,
+                           command: Union[Command, NamedCommand, Dict],
+                           command_name: str = None) -> None:
+        """
+        Post a command to a context entity this corresponds to 'PATCH' of the
+        specified command attribute.
+
+        Args:
+            entity_id: Entity identifier
+            command: Command
+            entity_type: Entity type
+            command_name: Name of the command in the entity
+
+        Returns:
+            None
+        """
+        if command_name:
+            assert isinstance(command, (Command, dict))
+            if isinstance(command, dict):
+                command = Command(**command)
+            command = {command_name: command.dict()}
+        else:
+            assert isinstance(command, (NamedCommand, dict))
+            if isinstance(command, dict):
+                command = NamedCommand(**command)
+
+        await self.update_existing_entity_attributes(entity_id=entity_id,
+                                                     entity_type=entity_type,
+                                                     attrs=[command])
+
+    async def does_entity_exist(self,
+                                entity_id: str,
+                                entity_type: str) -> bool:
+        """
+        Test if an entity with given id and type is present in the CB
+
+        Args:
+            entity_id: Entity id
+            entity_type: Entity type
+
+        Returns:
+            bool; True if entity exists
+
+        Raises:
+            httpx.HTTPError, if any error occurs (e.g: No Connection),
+            except that the entity is not found
+        """
+        url = urljoin(self.base_url, f'v2/entities/{entity_id}')
+        headers = self.headers.copy()
+        params = {'type': entity_type}
+
+        try:
+            res = await self.get(url=url, params=params, headers=headers)
+            if res.is_success:
+                return True
+            res.raise_for_status()
+        except httpx.HTTPStatusError as err:
+            if not err.response.status_code == 404:
+                raise
+            return False
+
+    async def patch_entity(self,
+                           entity: ContextEntity,
+                           old_entity: Optional[ContextEntity] = None,
+                           override_attr_metadata: bool = True) -> None:
+        """
+        Takes a given entity and updates the state in the CB to match it.
+        See :meth:`ContextBrokerClient.patch_entity`.
+
+        Args:
+            entity: Entity to update
+            old_entity: OPTIONAL, if given only the differences between the
+                       old_entity and entity are updated in the CB.
+            override_attr_metadata:
+                Whether to override or append the attributes metadata.
+                `True` for overwrite or `False` for update/append
+
+        Returns:
+           None
+        """
+        new_entity = entity
+
+        if old_entity is None:
+            if await self.does_entity_exist(entity_id=new_entity.id,
+                                            entity_type=new_entity.type):
+                old_entity = await self.get_entity(entity_id=new_entity.id,
+                                                   entity_type=new_entity.type)
+            else:
+                await self.post_entity(new_entity, update=False)
+                return
+        else:
+            if not await self.does_entity_exist(entity_id=old_entity.id,
+                                                entity_type=old_entity.type):
+                await self.patch_entity(
+                    new_entity,
+                    override_attr_metadata=override_attr_metadata)
+                return
+
+            if old_entity.id != new_entity.id or \
+                    old_entity.type != new_entity.type:
+                await self.delete_entity(entity_id=old_entity.id,
+                                         entity_type=old_entity.type)
+
+                if not await self.does_entity_exist(
+                        entity_id=new_entity.id,
+                        entity_type=new_entity.type):
+                    await self.post_entity(entity=new_entity, update=False)
+                    return
+
+        old_attributes = {attr.name: attr for attr in
+                          old_entity.get_attributes()}
+        new_attributes = {attr.name: attr for attr in
+                          new_entity.get_attributes()}
+
+        requests_ = []
+        for name, old_attr in old_attributes.items():
+            if name not in new_attributes:
+                requests_.append(self.delete_entity_attribute(
+                    entity_id=new_entity.id,
+                    entity_type=new_entity.type,
+                    attr_name=name))
+            elif old_attr != new_attributes[name]:
+                requests_.append(self.update_entity_attribute(
+                    entity_id=new_entity.id,
+                    entity_type=new_entity.type,
+                    attr=new_attributes[name],
+                    override_metadata=override_attr_metadata))
+
+        for result in await asyncio.gather(*requests_,
+                                           return_exceptions=True):
+            # if the attribute is provided by a registration the
+            # operation will fail
+            if isinstance(result, httpx.HTTPStatusError):
+                if not result.response.status_code == 404:
+                    raise result
+            elif isinstance(result, Exception):
+                raise result
+
+        update_entity = ContextEntity(id=entity.id, type=entity.type)
+        new_names = [name for name in new_attributes
+                     if name not in old_attributes]
+        if new_names:
+            update_entity.add_attributes([new_attributes[name]
+                                          for name in new_names])
+            await self.update_entity(update_entity)
@@ -0,0 +1,123 @@
+"""
+Module for asynchronous FIWARE api client
+"""
+import logging
+import json
+import errno
+from typing import Union, Dict
+from pathlib import Path
+import httpx
+from filip.clients.base_async_http_client import BaseAsyncHttpClient
+from filip.models.base import FiwareHeader
+from filip.clients.ngsi_v2.client import HttpClientConfig
+from filip.clients.ngsi_v2.async_cb import AsyncContextBrokerClient
+from filip.clients.ngsi_v2.async_iota import AsyncIoTAClient
+from filip.clients.ngsi_v2.async_quantumleap import AsyncQuantumLeapClient
+
+
+logger = logging.getLogger('client')
+
+
+class AsyncHttpClient(BaseAsyncHttpClient):
+    """
+    Asynchronous master client. It mirrors
+    :class:`filip.clients.ngsi_v2.client.HttpClient`, i.e. it contains all
+    asynchronous sub clients, which share a general config and a single
+    connection pool.
+
+    Example::
+
+        >>> async with AsyncHttpClient(fiware_header=header) as client:
+        >>>     entities, devices = await asyncio.gather(
+        >>>         client.cb.get_entity_list(),
+        >>>         client.iota.get_device_list())
+    """
+    def __init__(self,
+                 config: Union[str, Path, HttpClientConfig, Dict] = None,
+                 session: httpx.AsyncClient = None,
+                 fiware_header: FiwareHeader = None,
+                 **kwargs):
+        """
+        Constructor for asynchronous master client
+        Args:
+            config (Union[str, Path, Dict]): Configuration object
+            session (httpx.AsyncClient): Session object
+            fiware_header (FiwareHeader): Fiware header
+            **kwargs: Optional arguments that ``httpx`` takes.
+        """
+        if config:
+            self.config = config
+        else:
+            self.config = HttpClientConfig()
+
+        super().__init__(session=session,
+                         fiware_header=fiware_header,
+                         **kwargs)
+
+        if self.config.auth:
+            auth_types = {'basicauth': httpx.BasicAuth,
+                          'digestauth': httpx.DigestAuth}
+            assert self.config.auth['type'].lower() in auth_types.keys()
+            secrets = self.__get_secrets_file(path=self.config.auth['secret'])
+            try:
+                self.session.auth = auth_types[
+                    self.config.auth['type'].lower()](secrets['username'],
+                                                      secrets['password'])
+            except KeyError:
+                pass
+
+        # initialize sub clients
+        self.cb = AsyncContextBrokerClient(url=self.config.cb_url,
+                                           session=self.session,
+                                           fiware_header=self.fiware_headers,
+                                           **self.kwargs)
+
+        self.iota = AsyncIoTAClient(url=self.config.iota_url,
+                                    session=self.session,
+                                    fiware_header=self.fiware_headers,
+                                    **self.kwargs)
+
+        self.timeseries = AsyncQuantumLeapClient(
+            url=self.config.ql_url,
+            session=self.session,
+            fiware_header=self.fiware_headers,
+            **self.kwargs)
+
+    @property
+    def config(self):
+        """Return current config"""
+        return self._config
+
+    @config.setter
+    def config(self, config: HttpClientConfig):
+        """Set a new config"""
+        if isinstance(config, HttpClientConfig):
+            self._config = config
+        elif isinstance(config, (str, Path)):
+            self._config = HttpClientConfig.parse_file(config)
+        else:
+            self._config = HttpClientConfig.parse_obj(config)
+
+    @staticmethod
+    def __get_secrets_file(path=None) -> Dict:
+        """
+        Reads credentials form secret file the path variable is pointing to.
+
+        Args:
+            path: location of secrets-file
+        Returns:
+             Dict with secrets
+        """
+        try:
+            with open(path, 'r') as filename:
+                logger.info("Reading credentials from: %s", path)
+                return json.load(filename)
+
+        except IOError as err:
+            if err.errno == errno.ENOENT:
+                logger.error("%s - does not exist", path)
+            elif err.errno == errno.EACCES:
+                logger.error("%s - cannot be read", path)
+            else:
+                logger.error("%s - some other error", path)
+        return {}
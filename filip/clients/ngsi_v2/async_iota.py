@@ -0,0 +1,680 @@
+"""
+Asynchronous IoT-Agent Module for API Client
+"""
+from __future__ import annotations
+
+import asyncio
+import warnings
+from typing import List, Dict, Set, TYPE_CHECKING, Union
+from urllib.parse import urljoin
+import httpx
+from pydantic import parse_obj_as, AnyHttpUrl
+from filip.config import settings
+from filip.clients.base_async_http_client import BaseAsyncHttpClient
+from filip.models.base import FiwareHeader
+from filip.models.ngsi_v2.iot import Device, ServiceGroup
+
+from filip.utils.filter import filter_device_list, filter_group_list
+
+if TYPE_CHECKING:
+    from filip.clients.ngsi_v2.async_cb import AsyncContextBrokerClient
+
+
+class AsyncIoTAClient(BaseAsyncHttpClient):
+    """
+    Asynchronous client for FIWARE IoT-Agents. It offers the same methods as
+    :class:`filip.clients.ngsi_v2.iota.IoTAClient`, but every method returns
+    a coroutine. Bulk operations on single items are executed concurrently.
+
+    Args:
+        url: Url of IoT-Agent
+        session (httpx.AsyncClient):
+        fiware_header (FiwareHeader): fiware service and fiware service path
+        **kwargs (Optional): Optional arguments that ``httpx`` takes.
+    """
+
+    def __init__(self,
+                 url: str = None,
+                 *,
+                 session: httpx.AsyncClient = None,
+                 fiware_header: FiwareHeader = None,
+                 **kwargs):
+        # set service url
+        url = url or settings.IOTA_URL
+        super().__init__(url=url,
+                         session=session,
+                         fiware_header=fiware_header,
+                         **kwargs)
+
+    # ABOUT API
+    async def get_version(self) -> Dict:
+        """
+        Gets version of IoT Agent
+
+        Returns:
+            Dictionary with response
+        """
+        url = urljoin(self.base_url, 'iot/about')
+        try:
+            res = await self.get(url=url, headers=self.headers)
+            if res.is_success:
+                return res.json()
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            self.logger.error(err)
+            raise
+
+    # SERVICE GROUP API
+    async def post_groups(self,
+                          service_groups: Union[ServiceGroup,
+                                                List[ServiceGroup]],
+                          update: bool = False):
+        """
+        Creates a set of service groups for the given service and service_path.
+        See :meth:`IoTAClient.post_groups`.
+
+        Args:
+            service_groups (list of ServiceGroup): Service groups that will be
+            posted to the agent's API
+            update (bool): If service group already exists try to update its
+
+        Returns:
+            None
+        """
+        if not isinstance(service_groups, list):
+            service_groups = [service_groups]
+        for group in service_groups:
+            if group.service:
+                assert group.service == self.headers['fiware-service'], \
+                    "Service group service does not math fiware service"
+            if group.subservice:
+                assert group.subservice == self.headers['fiware-servicepath'], \
+                    "Service group subservice does not math fiware service path"
+
+        url = urljoin(self.base_url, 'iot/services')
+        headers = self.headers
+        data = {'services': [group.dict(exclude={'service', 'subservice'},
+                                        exclude_none=True,
+                                        exclude_unset=True) for
+                             group in service_groups]}
+        try:
+            res = await self.post(url=url, headers=headers, json=data)
+            if res.is_success:
+                self.logger.info("Services successfully posted")
+            elif res.status_code == 409:
+                self.logger.warning(res.text)
+                if len(service_groups) > 1:
+                    self.logger.info("Trying to split bulk operation into "
+                                     "single operations")
+                    await asyncio.gather(
+                        *[self.post_group(service_group=group, update=update)
+                          for group in service_groups])
+                elif update is True:
+                    await self.update_group(service_group=service_groups[0],
+                                            fields=None)
+                else:
+                    res.raise_for_status()
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            self.log_error(err=err, msg=None)
+            raise
+
+    async def post_group(self,
+                         service_group: ServiceGroup,
+                         update: bool = False):
+        """
+        Single service registration but using the bulk operation in background
+
+        Args:
+            service_group (ServiceGroup): Service that will be posted to the
+            agent's API
+            update (bool):
+
+        Returns:
+            None
+        """
+        return await self.post_groups(service_groups=[service_group],
+                                      update=update)
+
+    async def get_group_list(self) -> List[ServiceGroup]:
+        """
+        Retrieves service_group groups from the database.
+
+        Returns:
+            List of service groups
+        """
+        url = urljoin(self.base_url, 'iot/services')
+        headers = self.headers
+        try:
+            res = await self.get(url=url, headers=headers)
+            if res.is_success:
+                return parse_obj_as(List[ServiceGroup], res.json()['services'])
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            self.log_error(err=err, msg=None)
+            raise
+
+    async def get_group(self, *, resource: str, apikey: str) -> ServiceGroup:
+        """
+        Retrieves service_group groups from the database based on resource and
+        apikey
+        Args:
+            resource:
+            apikey:
+        Returns:
+            ServiceGroup
+        """
+        groups = await self.get_group_list()
+        groups = filter_group_list(group_list=groups,
+                                   resources=resource,
+                                   apikeys=apikey)
+        if len(groups) == 1:
+            return groups[0]
+        elif len(groups) == 0:
+            raise KeyError(f"Service group with resource={resource} and "
+                           f"apikey={apikey} was not found")
+        else:
+            raise NotImplementedError("There is a wierd error, try "
+                                      "get_group_list() for debugging")
+
+    async def update_groups(self, *,
+                            service_groups: Union[ServiceGroup,
+                                                  List[ServiceGroup]],
+                            add: False,
+                            fields: Union[Set[str], List[str]] = None) -> None:
+        """
+        Bulk operation for service group update. The single updates are
+        executed concurrently.
+        Args:
+            fields:
+            service_groups:
+            add:
+
+        Returns:
+            None
+        """
+        if not isinstance(service_groups, list):
+            service_groups = [service_groups]
+        await asyncio.gather(
+            *[self.update_group(service_group=group, fields=fields, add=add)
+              for group in service_groups])
+
+    async def update_group(self, *, service_group: ServiceGroup,
+                           fields: Union[Set[str], List[str]] = None,
+                           add: bool = True):
+        """
+        Modifies the information for a service group configuration. See
+        :meth:`IoTAClient.update_group`.
+
+        Args:
+            service_group (ServiceGroup): Service to update.
+            fields: Fields of the service_group to update. If 'None' all allowed
+            fields will be updated
+            add:
+        Returns:
+            None
+        """
+        if fields:
+            if isinstance(fields, list):
+                fields = set(fields)
+        else:
+            fields = None
+        url = urljoin(self.base_url, 'iot/services')
+        headers = self.headers
+        params = service_group.dict(include={'resource', 'apikey'})
+        try:
+            res = await self.put(url=url,
+                                 headers=headers,
+                                 params=params,
+                                 json=service_group.dict(
+                                     include=fields,
+                                     exclude={'service', 'subservice'},
+                                     exclude_unset=True))
+            if res.is_success:
+                self.logger.info("ServiceGroup updated!")
+            elif (res.status_code == 404) & (add is True):
+                await self.post_group(service_group=service_group)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            self.log_error(err=err, msg=None)
+            raise
+
+    async def delete_group(self, *, resource: str, apikey: str):
+        """
+        Deletes a service group in in the IoT-Agent
+
+        Args:
+            resource:
+            apikey:
+
+        Returns:
+            None
+        """
+        url = urljoin(self.base_url, 'iot/services')
+        headers = self.headers
+        params = {'resource': resource,
+                  'apikey': apikey}
+        try:
+            res = await self.delete(url=url, headers=headers, params=params)
+            if res.is_success:
+                self.logger.info("ServiceGroup with resource: '%s' and "
+                                 "apikey: '%s' successfully deleted!",
+                                 resource, apikey)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not delete ServiceGroup with resource " \
+                  f"'{resource}' and apikey '{apikey}'!"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    # DEVICE API
+    async def post_devices(self, *, devices: Union[Device, List[Device]],
+                           update: bool = False) -> None:
+        """
+        Post a device from the device registry. No payload is required
+        or received.
+        If a device already exists in can be updated with update = True
+        Args:
+            devices (list of Devices):
+            update (bool):  Whether if the device is already existent it
+            should be updated
+        Returns:
+            None
+        """
+        if not isinstance(devices, list):
+            devices = [devices]
+        url = urljoin(self.base_url, 'iot/devices')
+        headers = self.headers
+        data = {"devices": [device.dict(exclude_none=True) for device in
+                            devices]}
+        try:
+            res = await self.post(url=url, headers=headers, json=data)
+            if res.is_success:
+                self.logger.info("Devices successfully posted!")
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            if update:
+                return await self.update_devices(devices=devices, add=False)
+            msg = "Could not update devices"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def post_device(self, *,
+                          device: Device,
+                          update: bool = False) -> None:
+        """
+        Post a device configuration to the IoT-Agent
+
+        Args:
+            device: IoT device configuration to send
+            update: update device if configuration already exists
+
+        Returns:
+            None
+        """
+        return await self.post_devices(devices=[device], update=update)
+
+    async def get_device_list(self, *,
+                              limit: int = None,
+                              offset: int = None,
+                              device_ids: Union[str, List[str]] = None,
+                              entity_names: Union[str, List[str]] = None,
+                              entity_types: Union[str, List[str]] = None) \
+            -> List[Device]:
+        """
+        Returns a list of all the devices in the device registry with all
+        its data. See :meth:`IoTAClient.get_device_list`.
+
+        Args:
+            limit:
+                if present, limits the number of devices returned in the
+                list. Must be a number between 1 and 1000.
+            offset:
+                if present, skip that number of devices from the original
+                query.
+            device_ids:
+                List of device_ids. If given, only devices with matching ids
+                will be returned
+            entity_names:
+                The entity_ids of the devices. If given, only the devices
+                with the specified entity_id will be returned
+            entity_types:
+                The entity_type of the device. If given, only the devices
+                with the specified entity_type will be returned
+
+        Returns:
+            List of matching devices
+        """
+        if limit:
+            if not 1 < limit < 1000:
+                self.logger.error("'limit' must be an integer between 1 and "
+                                  "1000!")
+                raise ValueError
+        url = urljoin(self.base_url, 'iot/devices')
+        headers = self.headers
+        params = {key: value for key, value in
+                  {'limit': limit, 'offset': offset}.items()
+                  if value is not None}
+        try:
+            res = await self.get(url=url, headers=headers, params=params)
+            if res.is_success:
+                devices = parse_obj_as(List[Device], res.json()['devices'])
+                # filter by device_ids, entity_names or entity_types
+                devices = filter_device_list(devices,
+                                             device_ids,
+                                             entity_names,
+                                             entity_types)
+                return devices
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            self.log_error(err=err, msg=None)
+            raise
+
+    async def get_device(self, *, device_id: str) -> Device:
+        """
+        Returns all the information about a particular device.
+
+        Args:
+            device_id:
+        Raises:
+            httpx.HTTPError, if device does not exist
+        Returns:
+            Device
+
+        """
+        url = urljoin(self.base_url, f'iot/devices/{device_id}')
+        headers = self.headers
+        try:
+            res = await self.get(url=url, headers=headers)
+            if res.is_success:
+                return Device.parse_obj(res.json())
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Device {device_id} was not found"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def update_device(self, *, device: Device, add: bool = True) -> None:
+        """
+        Updates a device from the device registry. See
+        :meth:`IoTAClient.update_device`.
+
+        Args:
+            device:
+            add (bool): If device not found add it
+        Returns:
+            None
+        """
+        url = urljoin(self.base_url, f'iot/devices/{device.device_id}')
+        headers = self.headers
+        try:
+            res = await self.put(url=url, headers=headers, json=device.dict(
+                include={'attributes', 'lazy', 'commands', 'static_attributes'},
+                exclude_none=True))
+            if res.is_success:
+                self.logger.info("Device '%s' successfully updated!",
+                                 device.device_id)
+            elif (res.status_code == 404) & (add is True):
+                await self.post_device(device=device, update=False)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not update device '{device.device_id}'"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def update_devices(self, *, devices: Union[Device, List[Device]],
+                             add: False) -> None:
+        """
+        Bulk operation for device update. The single updates are executed
+        concurrently.
+        Args:
+            devices:
+            add:
+
+        Returns:
+            None
+        """
+        if not isinstance(devices, list):
+            devices = [devices]
+        await asyncio.gather(*[self.update_device(device=device, add=add)
+                               for device in devices])
+
+    async def delete_device(self, *, device_id: str,
+                            cb_url: AnyHttpUrl = settings.CB_URL,
+                            delete_entity: bool = False,
+                            force_entity_deletion: bool = False,
+                            cb_client: AsyncContextBrokerClient = None,
+                            ) -> None:
+        """
+        Remove a device from the device registry. See
+        :meth:`IoTAClient.delete_device`.
+
+        Args:
+            device_id: str, ID of Device
+            delete_entity: If `True` also delete the automatically created
+                and linked context-entity
+            force_entity_deletion:
+                bool, if delete_entity is true and multiple devices are linked
+                to the linked entity, delete it and do not raise an error
+            cb_client (AsyncContextBrokerClient):
+                Corresponding client object for entity manipulation
+            cb_url (AnyHttpUrl):
+                Url of the ContextBroker where the entity is found.
+                This will autogenerate a client that shares the session of
+                this client (not recommended!)
+
+        Returns:
+            None
+        """
+        url = urljoin(self.base_url, f'iot/devices/{device_id}', )
+        headers = self.headers
+
+        device = await self.get_device(device_id=device_id)
+
+        try:
+            res = await self.delete(url=url, headers=headers)
+            if res.is_success:
+                self.logger.info("Device '%s' successfully deleted!", device_id)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not delete device {device_id}!"
+            self.log_error(err=err, msg=msg)
+            raise
+
+        if delete_entity:
+            # An entity can technically belong to multiple devices
+            devices = await self.get_device_list(
+                entity_names=[device.entity_name])
+
+            # Zero because we count the remaining devices
+            if len(devices) > 0 and not force_entity_deletion:
+                raise Exception(f"The corresponding entity to the device "
+                                f"{device_id} was not deleted because it is "
+                                f"linked to multiple devices. ")
+            cb_client_local = self.__cb_client(cb_client=cb_client,
+                                               cb_url=cb_url)
+            try:
+                await cb_client_local.delete_entity(
+                    entity_id=device.entity_name,
+                    entity_type=device.entity_type)
+            except httpx.HTTPError:
+                # Do not throw an error
+                # It is only important that the entity does not exist after
+                # this methode, not if this methode actively deleted it
+                pass
+
+    async def patch_device(self,
+                           device: Device,
+                           patch_entity: bool = True,
+                           cb_client: AsyncContextBrokerClient = None,
+                           cb_url: AnyHttpUrl = settings.CB_URL) -> None:
+        """
+        Updates a device state in Fiware, if the device does not exists it
+        is created, else its values are updated. See
+        :meth:`IoTAClient.patch_device`.
+
+        Args:
+            device (Device): Device to be posted to /updated in Fiware
+            patch_entity (bool): If true the corresponding entity is
+                completely synced
+            cb_client (AsyncContextBrokerClient):
+                Corresponding client object for entity manipulation
+            cb_url (AnyHttpUrl):
+                Url of the ContextBroker where the entity is found.
+
+        Returns:
+            None
+        """
+        try:
+            live_device = await self.get_device(device_id=device.device_id)
+        except httpx.HTTPError:
+            # device does not exist yet, post it
+            await self.post_device(device=device)
+            return
+
+        # if the device settings were changed we need to delete the device
+        # and repost it
+        settings_dict = {"device_id", "service", "service_path",
+                         "entity_name", "entity_type",
+                         "timestamp", "apikey", "endpoint",
+                         "protocol", "transport",
+                         "expressionLanguage"}
+
+        live_settings = live_device.dict(include=settings_dict)
+        new_settings = device.dict(include=settings_dict)
+
+        if not live_settings == new_settings:
+            await self.delete_device(device_id=device.device_id,
+                                     delete_entity=True,
+                                     force_entity_deletion=True,
+                                     cb_client=cb_client,
+                                     cb_url=cb_url)
+            await self.post_device(device=device)
+            return
+
+        # update device
+        await self.update_device(device=device)
+
+        if patch_entity:
+            from filip.models.base import DataType
+            from filip.models.ngsi_v2.context import \
+                ContextEntity, NamedContextAttribute
+
+            entity = ContextEntity(id=device.entity_name,
+                                   type=device.entity_type)
+            for command in device.commands:
+                entity.add_attributes([
+                    # Command attribute will be registered by the device_update
+                    NamedContextAttribute(
+                        name=f"{command.name}_info",
+                        type=DataType.COMMAND_RESULT
+                    ),
+                    NamedContextAttribute(
+                        name=f"{command.name}_status",
+                        type=DataType.COMMAND_STATUS
+                    )
+                ])
+            for attribute in device.attributes:
+                entity.add_attributes([
+                    NamedContextAttribute(
+                        name=attribute.name,
+                        type=DataType.STRUCTUREDVALUE,
+                        metadata=attribute.metadata
+                    )
+                ])
+            for static_attribute in device.static_attributes:
+                entity.add_attributes([
+                    NamedContextAttribute(
+                        name=static_attribute.name,
+                        type=static_attribute.type,
+                        value=static_attribute.value,
+                        metadata=static_attribute.metadata
+                    )
+                ])
+
+            cb_client_local = self.__cb_client(cb_client=cb_client,
+                                               cb_url=cb_url)
+            await cb_client_local.patch_entity(entity=entity)
+
+    def __cb_client(self,
+                    cb_client: AsyncContextBrokerClient = None,
+                    cb_url: AnyHttpUrl = settings.CB_URL) \
+            -> AsyncContextBrokerClient:
+        """
+        Returns the given context broker client or generates one that shares
+        the session of this client.
+        """
+        if cb_client:
+            return cb_client
+        from filip.clients.ngsi_v2.async_cb import AsyncContextBrokerClient
+        warnings.warn("No `AsyncContextBrokerClient` object provided! "
+                      "Will try to generate one. "
+                      "This usage is not recommended.")
+        return AsyncContextBrokerClient(url=cb_url,
+                                        session=self.session,
+                                        fiware_header=self.fiware_headers)
+
+    async def does_device_exists(self, device_id: str) -> bool:
+        """
+        Test if a device with the given id exists in Fiware
+        Args:
+            device_id (str)
+        Returns:
+            bool
+        """
+        try:
+            await self.get_device(device_id=device_id)
+            return True
+        except httpx.HTTPStatusError as err:
+            if not err.response.status_code == 404:
+                raise
+            return False
+
+    # LOG API
+    async def get_loglevel_of_agent(self):
+        """
+        Get current loglevel of agent
+        Returns:
+            str
+        """
+        url = urljoin(self.base_url, 'admin/log')
+        try:
+            res = await self.get(url=url)
+            if res.is_success:
+                return res.json()['level']
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            self.log_error(err=err)
+            raise
+
+    async def change_loglevel_of_agent(self, level: str):
+        """
+        Change current loglevel of agent
+
+        Args:
+            level:
+
+        Returns:
+            None
+        """
+        level = level.upper()
+        if level not in ['INFO', 'ERROR', 'FATAL', 'DEBUG', 'WARNING']:
+            raise KeyError("Given log level is not supported")
+
+        url = urljoin(self.base_url, 'admin/log')
+        try:
+            res = await self.put(url=url, params={'level': level})
+            if res.is_success:
+                self.logger.info("Loglevel of agent at %s "
+                                 "changed to '%s'", self.base_url, level)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            self.log_error(err=err)
+            raise
@@ -0,0 +1,848 @@
+"""
+Asynchronous TimeSeries Module for QuantumLeap API Client
+"""
+import asyncio
+import logging
+from math import inf
+from collections import deque
+from itertools import count
+from typing import Dict, List, Union, Deque, Optional
+from urllib.parse import urljoin
+import httpx
+from pydantic import parse_obj_as, AnyHttpUrl
+from filip import settings
+from filip.clients.base_async_http_client import BaseAsyncHttpClient
+from filip.models.base import FiwareHeader
+from filip.models.ngsi_v2.subscriptions import Message
+from filip.models.ngsi_v2.timeseries import \
+    AggrPeriod, \
+    AggrMethod, \
+    AggrScope, \
+    AttributeValues, \
+    TimeSeries, \
+    TimeSeriesHeader
+from filip.utils.validators import validate_http_url
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncQuantumLeapClient(BaseAsyncHttpClient):
+    """
+    Asynchronous client for FIWARE's QuantumLeap. It offers the same methods
+    as :class:`filip.clients.ngsi_v2.quantumleap.QuantumLeapClient`, but
+    every method returns a coroutine. Hence, the histories of many entities
+    can be retrieved concurrently via ``asyncio.gather``.
+
+    Args:
+        url: url of the quantumleap service
+        session (httpx.AsyncClient, Optional):
+        fiware_header:
+        **kwargs:
+    """
+
+    def __init__(self,
+                 url: str = None,
+                 *,
+                 session: httpx.AsyncClient = None,
+                 fiware_header: FiwareHeader = None,
+                 **kwargs):
+        # set service url
+        url = url or settings.QL_URL
+        super().__init__(url=url,
+                         session=session,
+                         fiware_header=fiware_header,
+                         **kwargs)
+
+    # META API ENDPOINTS
+    async def get_version(self) -> Dict:
+        """
+        Gets version of QuantumLeap-Service.
+
+        Returns:
+            Dictionary with response
+        """
+        url = urljoin(self.base_url, '/version')
+        try:
+            res = await self.get(url=url)
+            if res.is_success:
+                return res.json()
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            self.logger.error(err)
+            raise
+
+    async def get_health(self) -> Dict:
+        """
+        Gets the health status of the QuantumLeap-Service. See
+        :meth:`QuantumLeapClient.get_health`.
+
+        Returns:
+            Dictionary with response
+        """
+        url = urljoin(self.base_url, '/health')
+        try:
+            res = await self.get(url=url)
+            if res.is_success:
+                return res.json()
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            self.logger.error(err)
+            raise
+
+    # INPUT API ENDPOINTS
+    async def post_notification(self, notification: Message):
+        """
+        Notify QuantumLeap the arrival of a new NGSI notification.
+
+        Args:
+            notification: Notification Message Object
+        """
+        url = urljoin(self.base_url, '/v2/notify')
+        headers = self.headers.copy()
+        data = []
+        for entity in notification.data:
+            data.append(entity.dict(exclude_unset=True,
+                                    exclude_defaults=True,
+                                    exclude_none=True))
+        data_set = {
+            "data": data,
+            "subscriptionId": notification.subscriptionId
+        }
+
+        try:
+            res = await self.post(
+                url=url,
+                headers=headers,
+                json=data_set)
+            if res.is_success:
+                self.logger.debug(res.text)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not post notification for subscription id " \
+                  f"{notification.subscriptionId}"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def post_subscription(self,
+                                cb_url: Union[AnyHttpUrl, str],
+                                ql_url: Union[AnyHttpUrl, str],
+                                entity_type: str = None,
+                                entity_id: str = None,
+                                id_pattern: str = None,
+                                attributes: str = None,
+                                observed_attributes: str = None,
+                                notified_attributes: str = None,
+                                throttling: int = None,
+                                time_index_attribute: str = None):
+        """
+        Subscribe QL to process Orion notifications of certain type. See
+        :meth:`QuantumLeapClient.post_subscription` for a description of all
+        arguments.
+        """
+        headers = self.headers.copy()
+        params = {}
+        url = urljoin(self.base_url, '/v2/subscribe')
+        validate_http_url(cb_url)
+        cb_url = urljoin(cb_url, '/v2')
+        params.update({'orionUrl': cb_url})
+
+        validate_http_url(ql_url)
+        ql_url = urljoin(ql_url, '/v2')
+        params.update({'quantumleapUrl': ql_url})
+
+        if entity_type:
+            params.update({'entityType': entity_type})
+        if entity_id:
+            params.update({'entityId': entity_id})
+        if id_pattern:
+            params.update({'idPattern': id_pattern})
+        if attributes:
+            params.update({'attributes': attributes})
+        if observed_attributes:
+            params.update({'observedAttributes': observed_attributes})
+        if notified_attributes:
+            params.update({'notifiedAttributes': notified_attributes})
+        if throttling or throttling == 0:
+            if throttling >= 0 and type(throttling) == int:
+                params.update({'throttling': throttling})
+            else:
+                raise TypeError("Throttling must be a positive integer or zero")
+        if time_index_attribute:
+            params.update({'timeIndexAttribute': time_index_attribute})
+
+        try:
+            res = await self.post(url=url, headers=headers, params=params)
+            if res.is_success:
+                msg = "Subscription created successfully!"
+                self.logger.info(msg)
+            else:
+                res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = "Could not create subscription."
+            self.log_error(err=err, msg=msg)
+            raise
+
+    async def delete_entity(self, entity_id: str,
+                            entity_type: Optional[str] = None) -> str:
+        """
+        Given an entity (with type and id), delete all its historical records.
+        See :meth:`QuantumLeapClient.delete_entity`.
+
+        Args:
+            entity_id (String): Entity id is required.
+            entity_type (Optional[String]): Entity type if entity_id alone
+                can not uniquely define the entity.
+
+        Raises:
+            httpx.HTTPError, if entity was not found
+            Exception, if deleting was not successful
+
+        Returns:
+            The entity_id of entity that is deleted.
+        """
+        url = urljoin(self.base_url, f'/v2/entities/{entity_id}')
+        headers = self.headers.copy()
+        if entity_type is not None:
+            params = {'type': entity_type}
+        else:
+            params = {}
+
+        # The deletion does not always resolves in a success even if an ok is
+        # returned.
+        # Try to delete multiple times with incrementing waits.
+        counter = 0
+        while counter < 10:
+            await self.delete(url=url, headers=headers, params=params)
+            try:
+                await self.get_entity_by_id(entity_id=entity_id,
+                                            entity_type=entity_type)
+            except httpx.HTTPError:
+                self.logger.info("Entity id '%s' successfully deleted!",
+                                 entity_id)
+                return entity_id
+            await asyncio.sleep(counter * 5)
+            counter += 1
+
+        msg = f"Could not delete QL entity of id {entity_id}"
+        logger.error(msg=msg)
+        raise Exception(msg)
+
+    async def delete_entity_type(self, entity_type: str) -> str:
+        """
+        Given an entity type, delete all the historical records of all
+        entities of such type.
+        Args:
+            entity_type (String): Type of entities data to be deleted.
+        Returns:
+            Entity type of the entities deleted.
+        """
+        url = urljoin(self.base_url, f'/v2/types/{entity_type}')
+        headers = self.headers.copy()
+        try:
+            res = await self.delete(url=url, headers=headers)
+            if res.is_success:
+                self.logger.info("Entities of type '%s' successfully deleted!",
+                                 entity_type)
+                return entity_type
+            res.raise_for_status()
+        except httpx.HTTPError as err:
+            msg = f"Could not delete entities of type {entity_type}"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    # QUERY API ENDPOINTS
+    async def __query_builder(self,
+                              url,
+                              *,
+                              entity_id: str = None,
+                              options: str = None,
+                              entity_type: str = None,
+                              aggr_method: Union[str, AggrMethod] = None,
+                              aggr_period: Union[str, AggrPeriod] = None,
+                              from_date: str = None,
+                              to_date: str = None,
+                              last_n: int = None,
+                              limit: int = 10000,
+                              offset: int = 0,
+                              georel: str = None,
+                              geometry: str = None,
+                              coords: str = None,
+                              attrs: str = None,
+                              aggr_scope: Union[str, AggrScope] = None
+                              ) -> Deque[Dict]:
+        """
+        Private Function to call respective API endpoints, chops large
+        requests into multiple single requests and merges the
+        responses. See :meth:`QuantumLeapClient.__query_builder`.
+
+        Returns:
+            Deque of response chunks
+        """
+        params = {}
+        headers = self.headers.copy()
+        max_records_per_request = 10000
+        # create a double ending queue
+        res_q: Deque[Dict] = deque([])
+
+        if options:
+            params.update({'options': options})
+        if entity_type:
+            params.update({'type': entity_type})
+        if aggr_method:
+            aggr_method = AggrMethod(aggr_method)
+            params.update({'aggrMethod': aggr_method.value})
+        if aggr_period:
+            aggr_period = AggrPeriod(aggr_period)
+            params.update({'aggrPeriod': aggr_period.value})
+        if from_date:
+            params.update({'fromDate': from_date})
+        if to_date:
+            params.update({'toDate': to_date})
+        # These values are required for the integrated pagination mechanism
+        # maximum items per request
+        if limit is None:
+            limit = inf
+        if offset is None:
+            offset = 0
+        if georel:
+            params.update({'georel': georel})
+        if coords:
+            params.update({'coords': coords})
+        if geometry:
+            params.update({'geometry': geometry})
+        if attrs:
+            params.update({'attrs': attrs})
+        if aggr_scope:
+            aggr_scope = AggrScope(aggr_scope)
+            params.update({'aggr_scope': aggr_scope.value})
+        if entity_id:
+            params.update({'id': entity_id})
+
+        # This loop will chop large requests into smaller junks.
+        # The individual functions will then merge the final response models
+        for i in count(0, max_records_per_request):
+            try:
+                params['offset'] = offset + i
+
+                params['limit'] = min(limit - i, max_records_per_request)
+                if params['limit'] <= 0:
+                    break
+
+                if last_n:
+                    params['lastN'] = min(last_n - i, max_records_per_request)
+                    if params['lastN'] <= 0:
+                        break
+
+                res = await self.get(url=url, params=params, headers=headers)
+
+                if res.is_success:
+                    self.logger.debug('Received: %s', res.json())
+
+                    # revert append direction when using last_n
+                    if last_n:
+                        res_q.appendleft(res.json())
+                    else:
+                        res_q.append(res.json())
+                res.raise_for_status()
+
+            except httpx.HTTPStatusError as err:
+                if err.response.status_code == 404 and \
+                        err.response.json().get('error') == 'Not Found' and \
+                        len(res_q) > 0:
+                    break
+                else:
+                    msg = "Could not load entity data"
+                    self.log_error(err=err, msg=msg)
+                    raise
+            except httpx.HTTPError as err:
+                msg = "Could not load entity data"
+                self.log_error(err=err, msg=msg)
+                raise
+
+        self.logger.info("Successfully retrieved entity data")
+        return res_q
+
+    # v2/entities
+    async def get_entities(self, *,
+                           entity_type: str = None,
+                           from_date: str = None,
+                           to_date: str = None,
+                           limit: int = 10000,
+                           offset: int = None
+                           ) -> List[TimeSeriesHeader]:
+        """
+        Get list of all available entities and their context information
+        about EntityType and last update date. See
+        :meth:`QuantumLeapClient.get_entities`.
+
+        Returns:
+            List of TimeSeriesHeader
+        """
+        url = urljoin(self.base_url, 'v2/entities')
+        res = await self.__query_builder(url=url,
+                                         entity_type=entity_type,
+                                         from_date=from_date,
+                                         to_date=to_date,
+                                         limit=limit,
+                                         offset=offset)
+        return parse_obj_as(List[TimeSeriesHeader], res[0])
+
+    # /entities/{entityId}
+    async def get_entity_by_id(self,
+                               entity_id: str,
+                               *,
+                               attrs: str = None,
+                               entity_type: str = None,
+                               aggr_method: Union[str, AggrMethod] = None,
+                               aggr_period: Union[str, AggrPeriod] = None,
+                               from_date: str = None,
+                               to_date: str = None,
+                               last_n: int = None,
+                               limit: int = 10000,
+                               offset: int = None,
+                               georel: str = None,
+                               geometry: str = None,
+                               coords: str = None,
+                               options: str = None
+                               ) -> TimeSeries:
+        """
+        History of N attributes of a given entity instance. See
+        :meth:`QuantumLeapClient.get_entity_by_id`.
+
+        Returns:
+            TimeSeries
+        """
+        url = urljoin(self.base_url, f'/v2/entities/{entity_id}')
+        res_q = await self.__query_builder(url=url,
+                                           attrs=attrs,
+                                           options=options,
+                                           entity_type=entity_type,
+                                           aggr_method=aggr_method,
+                                           aggr_period=aggr_period,
+                                           from_date=from_date,
+                                           to_date=to_date,
+                                           last_n=last_n,
+                                           limit=limit,
+                                           offset=offset,
+                                           georel=georel,
+                                           geometry=geometry,
+                                           coords=coords)
+        # merge response chunks
+        res = TimeSeries.parse_obj(res_q.popleft())
+        for item in res_q:
+            res.extend(TimeSeries.parse_obj(item))
+
+        return res
+
+    # /entities/{entityId}/value
+    async def get_entity_values_by_id(self,
+                                      entity_id: str,
+                                      *,
+                                      attrs: str = None,
+                                      entity_type: str = None,
+                                      aggr_method: Union[str, AggrMethod] = None,
+                                      aggr_period: Union[str, AggrPeriod] = None,
+                                      from_date: str = None,
+                                      to_date: str = None,
+                                      last_n: int = None,
+                                      limit: int = 10000,
+                                      offset: int = None,
+                                      georel: str = None,
+                                      geometry: str = None,
+                                      coords: str = None,
+                                      options: str = None
+                                      ) -> TimeSeries:
+        """
+        History of N attributes (values only) of a given entity instance. See
+        :meth:`QuantumLeapClient.get_entity_values_by_id`.
+
+        Returns:
+            TimeSeries
+        """
+        url = urljoin(self.base_url, f'/v2/entities/{entity_id}/value')
+        res_q = await self.__query_builder(url=url,
+                                           attrs=attrs,
+                                           options=options,
+                                           entity_type=entity_type,
+                                           aggr_method=aggr_method,
+                                           aggr_period=aggr_period,
+                                           from_date=from_date,
+                                           to_date=to_date,
+                                           last_n=last_n,
+                                           limit=limit,
+                                           offset=offset,
+                                           georel=georel,
+                                           geometry=geometry,
+                                           coords=coords)
+
+        # merge response chunks
+        res = TimeSeries(entityId=entity_id, **res_q.popleft())
+        for item in res_q:
+            res.extend(TimeSeries(entityId=entity_id, **item))
+
+        return res
+
+    # /entities/{entityId}/attrs/{attrName}
+    async def get_entity_attr_by_id(self,
+                                    entity_id: str,
+                                    attr_name: str,
+                                    *,
+                                    entity_type: str = None,
+                                    aggr_method: Union[str, AggrMethod] = None,
+                                    aggr_period: Union[str, AggrPeriod] = None,
+                                    from_date: str = None,
+                                    to_date: str = None,
+                                    last_n: int = None,
+                                    limit: int = 10000,
+                                    offset: int = None,
+                                    georel: str = None,
+                                    geometry: str = None,
+                                    coords: str = None,
+                                    options: str = None
+                                    ) -> TimeSeries:
+        """
+        History of an attribute of a given entity instance. See
+        :meth:`QuantumLeapClient.get_entity_attr_by_id`.
+
+        Returns:
+            TimeSeries
+        """
+        url = urljoin(self.base_url, f'/v2/entities/{entity_id}/attrs'
+                                     f'/{attr_name}')
+        req_q = await self.__query_builder(url=url,
+                                           entity_id=entity_id,
+                                           options=options,
+                                           entity_type=entity_type,
+                                           aggr_method=aggr_method,
+                                           aggr_period=aggr_period,
+                                           from_date=from_date,
+                                           to_date=to_date,
+                                           last_n=last_n,
+                                           limit=limit,
+                                           offset=offset,
+                                           georel=georel,
+                                           geometry=geometry,
+                                           coords=coords)
+
+        # merge response chunks
+        first = req_q.popleft()
+        res = TimeSeries(entityId=entity_id,
+                         index=first.get('index'),
+                         attributes=[AttributeValues(**first)])
+        for item in req_q:
+            res.extend(TimeSeries(entityId=entity_id,
+                                  index=item.get('index'),
+                                  attributes=[AttributeValues(**item)]))
+
+        return res
+
+    # /entities/{entityId}/attrs/{attrName}/value
+    async def get_entity_attr_values_by_id(self,
+                                           entity_id: str,
+                                           attr_name: str,
+                                           *,
+                                           entity_type: str = None,
+                                           aggr_method: Union[
+                                               str, AggrMethod] = None,
+                                           aggr_period: Union[
+                                               str, AggrPeriod] = None,
+                                           from_date: str = None,
+                                           to_date: str = None,
+                                           last_n: int = None,
+                                           limit: int = 10000,
+                                           offset: int = None,
+                                           georel: str = None,
+                                           geometry: str = None,
+                                           coords: str = None,
+                                           options: str = None
+                                           ) -> TimeSeries:
+        """
+        History of an attribute (values only) of a given entity instance. See
+        :meth:`QuantumLeapClient.get_entity_attr_values_by_id`.
+
+        Returns:
+            TimeSeries
+        """
+        url = urljoin(self.base_url, f'v2/entities/{entity_id}/attrs'
+                                     f'/{attr_name}/value')
+        res_q = await self.__query_builder(url=url,
+                                           options=options,
+                                           entity_type=entity_type,
+                                           aggr_method=aggr_method,
+                                           aggr_period=aggr_period,
+                                           from_date=from_date,
+                                           to_date=to_date,
+                                           last_n=last_n,
+                                           limit=limit,
+                                           offset=offset,
+                                           georel=georel,
+                                           geometry=geometry,
+                                           coords=coords)
+        # merge response chunks
+        first = res_q.popleft()
+        res = TimeSeries(
+            entityId=entity_id,
+            index=first.get('index'),
+            attributes=[AttributeValues(attrName=attr_name,
+                                        values=first.get('values'))])
+        for item in res_q:
+            res.extend(
+                TimeSeries(
+                    entityId=entity_id,
+                    index=item.get('index'),
+                    attributes=[AttributeValues(attrName=attr_name,
+                                                values=item.get('values'))]))
+
+        return res
+
+    # /types/{entityType}
+    async def get_entity_by_type(self,
+                                 entity_type: str,
+                                 *,
+                                 attrs: str = None,
+                                 entity_id: str = None,
+                                 aggr_method: Union[str, AggrMethod] = None,
+                                 aggr_period: Union[str, AggrPeriod] = None,
+                                 from_date: str = None,
+                                 to_date: str = None,
+                                 last_n: int = None,
+                                 limit: int = 10000,
+                                 offset: int = None,
+                                 georel: str = None,
+                                 geometry: str = None,
+                                 coords: str = None,
+                                 options: str = None,
+                                 aggr_scope: Union[str, AggrScope] = None
+                                 ) -> List[TimeSeries]:
+        """
+        History of N attributes of N entities of the same type. See
+        :meth:`QuantumLeapClient.get_entity_by_type`.
+
+        Returns:
+            List of TimeSeries
+        """
+        url = urljoin(self.base_url, f'/v2/types/{entity_type}')
+        res_q = await self.__query_builder(url=url,
+                                           entity_id=entity_id,
+                                           attrs=attrs,
+                                           options=options,
+                                           aggr_method=aggr_method,
+                                           aggr_period=aggr_period,
+                                           from_date=from_date,
+                                           to_date=to_date,
+                                           last_n=last_n,
+                                           limit=limit,
+                                           offset=offset,
+                                           georel=georel,
+                                           geometry=geometry,
+                                           coords=coords,
+                                           aggr_scope=aggr_scope)
+
+        # merge chunks of response
+        res = [TimeSeries(entityType=entity_type, **item)
+               for item in res_q.popleft().get('entities')]
+
+        for chunk in res_q:
+            chunk = [TimeSeries(entityType=entity_type, **item)
+                     for item in chunk.get('entities')]
+            for new, old in zip(chunk, res):
+                old.extend(new)
+
+        return res
+
+    # /types/{entityType}/value
+    async def get_entity_values_by_type(self,
+                                        entity_type: str,
+                                        *,
+                                        attrs: str = None,
+                                        entity_id: str = None,
+                                        aggr_method: Union[
+                                            str, AggrMethod] = None,
+                                        aggr_period: Union[
+                                            str, AggrPeriod] = None,
+                                        from_date: str = None,
+                                        to_date: str = None,
+                                        last_n: int = None,
+                                        limit: int = 10000,
+                                        offset: int = None,
+                                        georel: str = None,
+                                        geometry: str = None,
+                                        coords: str = None,
+                                        options: str = None,
+                                        aggr_scope: Union[str, AggrScope] = None
+                                        ) -> List[TimeSeries]:
+        """
+        History of N attributes (values only) of N entities of the same type.
+        See :meth:`QuantumLeapClient.get_entity_values_by_type`.
+
+        Returns:
+            List of TimeSeries
+        """
+        url = urljoin(self.base_url, f'/v2/types/{entity_type}/value')
+        res_q = await self.__query_builder(url=url,
+                                           entity_id=entity_id,
+                                           attrs=attrs,
+                                           options=options,
+                                           entity_type=entity_type,
+                                           aggr_method=aggr_method,
+                                           aggr_period=aggr_period,
+                                           from_date=from_date,
+                                           to_date=to_date,
+                                           last_n=last_n,
+                                           limit=limit,
+                                           offset=offset,
+                                           georel=georel,
+                                           geometry=geometry,
+                                           coords=coords,
+                                           aggr_scope=aggr_scope)
+        # merge chunks of response
+        res = [TimeSeries(entityType=entity_type, **item)
+               for item in res_q.popleft().get('values')]
+
+        for chunk in res_q:
+            chunk = [TimeSeries(entityType=entity_type, **item)
+                     for item in chunk.get('values')]
+            for new, old in zip(chunk, res):
+                old.extend(new)
+
+        return res
+
+    # /types/{entityType}/attrs/{attrName}
+    async def get_entity_attr_by_type(self,
+                                      entity_type: str,
+                                      attr_name: str,
+                                      *,
+                                      entity_id: str = None,
+                                      aggr_method: Union[str, AggrMethod] = None,
+                                      aggr_period: Union[str, AggrPeriod] = None,
+                                      from_date: str = None,
+                                      to_date: str = None,
+                                      last_n: int = None,
+                                      limit: int = 10000,
+                                      offset: int = None,
+                                      georel: str = None,
+                                      geometry: str = None,
+                                      coords: str = None,
+                                      options: str = None,
+                                      aggr_scope: Union[str, AggrScope] = None
+                                      ) -> List[TimeSeries]:
+        """
+        History of an attribute of N entities of the same type. See
+        :meth:`QuantumLeapClient.get_entity_attr_by_type`.
+
+        Returns:
+            List of TimeSeries
+        """
+        url = urljoin(self.base_url, f'/v2/types/{entity_type}/attrs'
+                                     f'/{attr_name}')
+        res_q = await self.__query_builder(url=url,
+                                           entity_id=entity_id,
+                                           options=options,
+                                           entity_type=entity_type,
+                                           aggr_method=aggr_method,
+                                           aggr_period=aggr_period,
+                                           from_date=from_date,
+                                           to_date=to_date,
+                                           last_n=last_n,
+                                           limit=limit,
+                                           offset=offset,
+                                           georel=georel,
+                                           geometry=geometry,
+                                           coords=coords,
+                                           aggr_scope=aggr_scope)
+
+        # merge chunks of response
+        first = res_q.popleft()
+        res = [TimeSeries(index=item.get('index'),
+                          entityType=entity_type,
+                          entityId=item.get('entityId'),
+                          attributes=[
+                              AttributeValues(
+                                  attrName=first.get('attrName'),
+                                  values=item.get('values'))])
+               for item in first.get('entities')]
+
+        for chunk in res_q:
+            chunk = [TimeSeries(index=item.get('index'),
+                                entityType=entity_type,
+                                entityId=item.get('entityId'),
+                                attributes=[
+                                    AttributeValues(
+                                        attrName=chunk.get('attrName'),
+                                        values=item.get('values'))])
+                     for item in chunk.get('entities')]
+            for new, old in zip(chunk, res):
+                old.extend(new)
+
+        return res
+
+    # /types/{entityType}/attrs/{attrName}/value
+    async def get_entity_attr_values_by_type(self,
+                                             entity_type: str,
+                                             attr_name: str,
+                                             *,
+                                             entity_id: str = None,
+                                             aggr_method: Union[
+                                                 str, AggrMethod] = None,
+                                             aggr_period: Union[
+                                                 str, AggrPeriod] = None,
+                                             from_date: str = None,
+                                             to_date: str = None,
+                                             last_n: int = None,
+                                             limit: int = 10000,
+                                             offset: int = None,
+                                             georel: str = None,
+                                             geometry: str = None,
+                                             coords: str = None,
+                                             options: str = None,
+                                             aggr_scope: Union[
+                                                 str, AggrScope] = None
+                                             ) -> List[TimeSeries]:
+        """
+        History of an attribute (values only) of N entities of the same type.
+        See :meth:`QuantumLeapClient.get_entity_attr_values_by_type`.
+
+        Returns:
+            List of TimeSeries
+        """
+        url = urljoin(self.base_url, f'/v2/types/{entity_type}/attrs/'
+                                     f'{attr_name}/value')
+        res_q = await self.__query_builder(url=url,
+                                           entity_id=entity_id,
+                                           options=options,
+                                           entity_type=entity_type,
+                                           aggr_method=aggr_method,
+                                           aggr_period=aggr_period,
+                                           from_date=from_date,
+                                           to_date=to_date,
+                                           last_n=last_n,
+                                           limit=limit,
+                                           offset=offset,
+                                           georel=georel,
+                                           geometry=geometry,
+                                           coords=coords,
+                                           aggr_scope=aggr_scope)
+
+        # merge chunks of response
+        res = [TimeSeries(index=item.get('index'),
+                          entityType=entity_type,
+                          entityId=item.get('entityId'),
+                          attributes=[
+                              AttributeValues(attrName=attr_name,
+                                              values=item.get('values'))])
+               for item in res_q.popleft().get('values')]
+
+        for chunk in res_q:
+            chunk = [TimeSeries(index=item.get('index'),
+                                entityType=entity_type,
+                                entityId=item.get('entityId'),
+                                attributes=[
+                                    AttributeValues(attrName=attr_name,
+                                                    values=item.get('values'))])
+                     for item in chunk.get('values')]
+
+            for new, old in zip(chunk, res):
+                old.extend(new)
+
+        return res
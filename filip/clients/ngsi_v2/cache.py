@@ -0,0 +1,324 @@
+"""
+Read-through entity cache for the context broker that is kept consistent via
+subscription notifications
+"""
+from __future__ import annotations
+
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from pydantic import PositiveInt, PositiveFloat
+from filip.clients.ngsi_v2.receiver import NotificationReceiver
+from filip.models.ngsi_v2.base import EntityPattern, Http
+from filip.models.ngsi_v2.context import ContextEntity
+from filip.models.ngsi_v2.subscriptions import \
+    Message, \
+    Notification, \
+    Subject, \
+    Subscription
+
+if TYPE_CHECKING:
+    from filip.clients.ngsi_v2.cb import ContextBrokerClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class EntityCache:
+    """
+    Read-through cache for context entities with size and TTL eviction.
+    Entities are loaded from the context broker on the first read. A
+    subscription with `onlyChangedAttrs` pushes all further changes to a
+    local HTTP receiver, so that subsequent reads are served from memory
+    without polling the context broker.
+
+    Instances are usually created via
+    :meth:`filip.clients.ngsi_v2.cb.ContextBrokerClient.entity_cache`.
+
+    Example::
+
+        >>> with client.entity_cache(entity_types=['Room'],
+        >>>                          notification_url='http://host:8080') \
+        >>>         as cache:
+        >>>     while True:
+        >>>         value = cache.get_attribute_value(entity_id='Room1',
+        >>>                                           entity_type='Room',
+        >>>                                           attr_name='temperature')
+
+    Note:
+        Orion does not notify about deleted attributes or entities. These
+        changes are only picked up after the TTL expired.
+
+    Args:
+        client: Context broker client used for loading entities and for the
+            subscription
+        max_size: Maximum number of cached entities. The least recently used
+            entity is evicted first.
+        ttl: Time in seconds after which a cached entity is reloaded. Each
+            notification for an entity resets its TTL.
+        entity_types: Entity types of the subscription. If `None`, all
+            entities are subscribed.
+        host: Interface the notification receiver binds to
+        port: Port of the notification receiver. `0` selects a free port.
+        notification_url: Url under which the context broker reaches the
+            receiver. Defaults to the host name of this machine and the
+            receiver's port.
+        subscribe: If `False`, neither receiver nor subscription are
+            created and the cache only relies on the TTL.
+    """
+    def __init__(self,
+                 client: ContextBrokerClient,
+                 *,
+                 max_size: PositiveInt = 1000,
+                 ttl: Optional[PositiveFloat] = 60.0,
+                 entity_types: List[str] = None,
+                 host: str = '0.0.0.0',
+                 port: int = 0,
+                 notification_url: str = None,
+                 subscribe: bool = True):
+        self.client = client
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.subscription_id: Optional[str] = None
+
+        self._entities: OrderedDict[Tuple[str, str],
+                                    Tuple[ContextEntity, float]] = \
+            OrderedDict()
+        self._types: Dict[str, Set[str]] = {}
+        # notifications received while entities are loaded, per entity id
+        self._loading: Dict[str, List[List[ContextEntity]]] = {}
+        self._lock = threading.RLock()
+        self._receiver: Optional[NotificationReceiver] = None
+
+        if subscribe:
+            self.__start_receiver(host=host, port=port)
+            if notification_url is None:
+                notification_url = f"http://{socket.gethostname()}:" \
+                                   f"{self._receiver.port}"
+            self.__subscribe(entity_types=entity_types,
+                             notification_url=notification_url)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        """
+        Number of cached entities
+        """
+        return len(self._entities)
+
+    @property
+    def port(self) -> Optional[int]:
+        """
+        Port of the local notification receiver
+        """
+        return self._receiver.port if self._receiver else None
+
+    def __start_receiver(self, host: str, port: int) -> None:
+        """
+        Starts the receiver in a background thread
+        """
+        # A single worker keeps the notifications of an entity in order
+        self._receiver = NotificationReceiver(host=host, port=port, workers=1)
+        self._receiver.add_handler(self.__handle_messages)
+        self._receiver.start_in_thread()
+
+    def __handle_messages(self, messages: List[Message]) -> None:
+        """
+        Passes a batch of received messages to the cache
+        """
+        for message in messages:
+            self.handle_notification(message)
+
+    def __subscribe(self,
+                    entity_types: Optional[List[str]],
+                    notification_url: str) -> None:
+        """
+        Creates the subscription that pushes all changes to the receiver.
+        Initial notifications of older brokers only contain the current
+        state, hence they are merged like any other notification.
+        """
+        if entity_types:
+            patterns = [EntityPattern(idPattern='.*', type=entity_type)
+                        for entity_type in entity_types]
+        else:
+            patterns = [EntityPattern(idPattern='.*')]
+        subscription = Subscription(
+            description=f"Entity cache of FiLiP ({notification_url})",
+            subject=Subject(entities=patterns),
+            notification=Notification(http=Http(url=notification_url),
+                                      onlyChangedAttrs=True),
+            throttling=0)
+        self.subscription_id = self.client.post_subscription(
+            subscription=subscription)
+
+    def __key(self,
+              entity_id: str,
+              entity_type: Optional[str]) -> Optional[Tuple[str, str]]:
+        """
+        Resolves the cache key. Without type the key can only be resolved if
+        a single entity with the given id is cached.
+        """
+        if entity_type is not None:
+            return entity_id, entity_type
+        types = self._types.get(entity_id, set())
+        if len(types) == 1:
+            return entity_id, next(iter(types))
+        return None
+
+    def __store(self, entity: ContextEntity) -> None:
+        """
+        Adds or replaces an entity and evicts the least recently used ones
+        """
+        key = (entity.id, entity.type)
+        expires = time.monotonic() + self.ttl if self.ttl else float('inf')
+        self._entities[key] = (entity, expires)
+        self._entities.move_to_end(key)
+        self._types.setdefault(entity.id, set()).add(entity.type)
+        while len(self._entities) > self.max_size:
+            self.__remove(next(iter(self._entities)))
+
+    def __remove(self, key: Tuple[str, str]) -> None:
+        """
+        Removes an entity from the cache
+        """
+        if self._entities.pop(key, None) is not None:
+            types = self._types.get(key[0], set())
+            types.discard(key[1])
+            if not types:
+                self._types.pop(key[0], None)
+
+    def get_entity(self,
+                   entity_id: str,
+                   entity_type: str = None) -> ContextEntity:
+        """
+        Returns the entity from the cache or loads it from the context
+        broker. The returned entity is a copy, hence it can be modified
+        without affecting the cache.
+
+        Args:
+            entity_id: Id of the entity
+            entity_type: Type of the entity
+
+        Returns:
+            ContextEntity
+        """
+        with self._lock:
+            key = self.__key(entity_id, entity_type)
+            cached = self._entities.get(key) if key else None
+            if cached is not None and cached[1] > time.monotonic():
+                self.hits += 1
+                self._entities.move_to_end(key)
+                return cached[0].copy(deep=True)
+            self.misses += 1
+            received: List[ContextEntity] = []
+            self._loading.setdefault(entity_id, []).append(received)
+        try:
+            entity = self.client.get_entity(entity_id=entity_id,
+                                            entity_type=entity_type)
+        finally:
+            with self._lock:
+                loading = self._loading[entity_id]
+                loading.remove(received)
+                if not loading:
+                    del self._loading[entity_id]
+        with self._lock:
+            # apply the changes that were notified during the request in
+            # order, because they may not be part of the loaded state yet
+            for notified in received:
+                if notified.type == entity.type:
+                    entity.add_attributes(notified.get_attributes(
+                        strict_data_type=False))
+            self.__store(entity)
+        return entity.copy(deep=True)
+
+    def get_attribute_value(self,
+                            entity_id: str,
+                            attr_name: str,
+                            entity_type: str = None) -> Any:
+        """
+        Returns the value of an attribute from the cache, see
+        :meth:`get_entity`.
+
+        Args:
+            entity_id: Id of the entity
+            attr_name: Name of the attribute
+            entity_type: Type of the entity
+
+        Raises:
+            KeyError, if the entity has no attribute with the given name
+
+        Returns:
+            Value of the attribute
+        """
+        entity = self.get_entity(entity_id=entity_id, entity_type=entity_type)
+        return entity.get_attribute(attr_name).value
+
+    def handle_notification(self, message: Message) -> None:
+        """
+        Merges the attributes of a notification into the cached entities.
+        Entities that are currently loaded receive the attributes once they
+        are loaded, all other entities that are not cached are ignored.
+
+        Args:
+            message: Notification message of the context broker
+        """
+        with self._lock:
+            for entity in message.data:
+                for received in self._loading.get(entity.id, []):
+                    received.append(entity)
+                key = (entity.id, entity.type)
+                cached = self._entities.get(key)
+                if cached is None:
+                    continue
+                cached_entity = cached[0]
+                cached_entity.add_attributes(entity.get_attributes(
+                    strict_data_type=False))
+                self.__store(cached_entity)
+
+    def invalidate(self, entity_id: str, entity_type: str = None) -> None:
+        """
+        Removes an entity from the cache. Without type, all entities with the
+        given id are removed.
+
+        Args:
+            entity_id: Id of the entity
+            entity_type: Type of the entity
+        """
+        with self._lock:
+            if entity_type is not None:
+                self.__remove((entity_id, entity_type))
+            else:
+                for type_ in list(self._types.get(entity_id, set())):
+                    self.__remove((entity_id, type_))
+
+    def clear(self) -> None:
+        """
+        Removes all entities from the cache
+        """
+        with self._lock:
+            self._entities.clear()
+            self._types.clear()
+
+    def close(self) -> None:
+        """
+        Deletes the subscription and stops the notification receiver
+        """
+        if self.subscription_id is not None:
+            try:
+                self.client.delete_subscription(self.subscription_id)
+            finally:
+                self.subscription_id = None
+        if self._receiver is not None:
+            self._receiver.stop_thread()
+            self._receiver = None
+        self.clear()
@@ -3,37 +3,59 @@ Context Broker Module for API Client
 """
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
+from datetime import datetime
 from math import inf
+from pathlib import Path
 from pkg_resources import parse_version
 from pydantic import \
     parse_obj_as, \
     PositiveInt, \
     PositiveFloat, \
     AnyHttpUrl
-from typing import Any, Dict, List , Optional, TYPE_CHECKING, Union
+from typing import Any, Dict, Iterator, List , Optional, Set, Tuple, \
+    TYPE_CHECKING, Union
+import json
 import re
+import pandas as pd
 import requests
 from urllib.parse import urljoin
 import warnings
 from filip.clients.base_http_client import BaseHttpClient
 from filip.config import settings
-from filip.models.base import FiwareHeader, PaginationMethod
+from filip.models.base import \
+    DataType, \
+    FiwareHeader, \
+    PaginationMethod, \
+    PaginationStrategy
+from filip.utils.datetime import \
+    convert_datetime_to_iso_8601_with_z_suffix
 from filip.utils.simple_ql import QueryString
+from filip.utils.subscription_index import SubscriptionIndex
 from filip.models.ngsi_v2.context import \
     ActionType, \
+    BatchChunkResult, \
+    BatchUpdateReport, \
     Command, \
     ContextEntity, \
     ContextEntityKeyValues, \
     ContextAttribute, \
+    LazyContextEntity, \
     NamedCommand, \
     NamedContextAttribute, \
     Query, \
     Update, \
     PropertyFormat
-from filip.models.ngsi_v2.base import AttrsFormat
+from filip.models.ngsi_v2.base import \
+    AttrsFormat, \
+    EntityPattern, \
+    ValidationMode
 from filip.models.ngsi_v2.subscriptions import Subscription, Message
 from filip.models.ngsi_v2.registrations import Registration
+from filip.clients.ngsi_v2.cache import EntityCache
+from filip.clients.ngsi_v2.sync import ContextBrokerSync
+from filip.clients.ngsi_v2.write_buffer import WriteBuffer
 
 if TYPE_CHECKING:
     from filip.clients.ngsi_v2.iota import IoTAClient
@@ -81,7 +103,8 @@ class ContextBrokerClient(BaseHttpClient):
                      headers: Dict,
                      limit: Union[PositiveInt, PositiveFloat] = None,
                      params: Dict = None,
-                     data: str = None) -> List[Dict]:
+                     data: str = None,
+                     max_workers: PositiveInt = None) -> List[Dict]:
         """
         NGSIv2 implements a pagination mechanism in order to help clients to
         retrieve large sets of resources. This mechanism works for all listing
@@ -96,6 +119,10 @@ class ContextBrokerClient(BaseHttpClient):
             headers: The headers from the original function
             params:
             limit:
+            max_workers: If greater than one, all pages following the first
+                one are requested concurrently by this number of threads and
+                reassembled in order. Otherwise, pages are requested
+                sequentially.
 
         Returns:
             object:
@@ -108,37 +135,306 @@ class ContextBrokerClient(BaseHttpClient):
         else:
             params['limit'] = limit
 
-        if self.session:
-            session = self.session
+        session = self.session
+        res = session.request(method=method,
+                              url=url,
+                              params=params,
+                              headers=headers,
+                              data=data)
+        if res.ok:
+            items = res.json()
+            # do pagination
+            count = int(res.headers['Fiware-Total-Count'])
+
+            if max_workers and max_workers > 1:
+                total = min(count, limit)
+
+                def fetch_page(offset: int) -> List[Dict]:
+                    page_params = params.copy()
+                    page_params['offset'] = offset
+                    page_params['limit'] = min(1000, total - offset)
+                    page = session.request(method=method,
+                                           url=url,
+                                           params=page_params,
+                                           headers=headers,
+                                           data=data)
+                    page.raise_for_status()
+                    return page.json()
+
+                with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                    # map preserves the order of the offsets
+                    for page in pool.map(fetch_page,
+                                         range(len(items), total, 1000)):
+                        items.extend(page)
+
+            while len(items) < limit and len(items) < count:
+                # Establishing the offset from where entities are retrieved
+                params['offset'] = len(items)
+                params['limit'] = min(1000, (limit - len(items)))
+                res = session.request(method=method,
+                                      url=url,
+                                      params=params,
+                                      headers=headers,
+                                      data=data)
+                if res.ok:
+                    items.extend(res.json())
+                else:
+                    res.raise_for_status()
+            self.logger.debug('Received: %s', items)
+            return items
+        res.raise_for_status()
+
+    def __iter_pages(self,
+                     *,
+                     method: PaginationMethod = PaginationMethod.GET,
+                     url: str,
+                     headers: Dict,
+                     limit: Union[PositiveInt, PositiveFloat] = None,
+                     params: Dict = None,
+                     data: str = None,
+                     page_size: PositiveInt = 1000) -> Iterator[List[Dict]]:
+        """
+        Generator version of the NGSIv2 pagination mechanism. Instead of
+        collecting all items, the raw pages are yielded one after another.
+        While the caller processes a page, the next one is already requested
+        in a background thread. Hence, at most two pages are held in memory.
+
+        Args:
+            url: Information about the url, obtained from the original function
+            headers: The headers from the original function
+            params:
+            limit:
+            page_size: Number of items per request. Orion allows at most 1000.
+
+        Yields:
+            List of raw items per page
+        """
+        if limit is None:
+            limit = inf
+        page_size = min(page_size, 1000)
+
+        def fetch_page(offset: int, size: int):
+            page_params = params.copy()
+            page_params['offset'] = offset
+            page_params['limit'] = size
+            res = self.session.request(method=method,
+                                       url=url,
+                                       params=page_params,
+                                       headers=headers,
+                                       data=data)
+            if not res.ok:
+                res.raise_for_status()
+            return res.json(), int(res.headers['Fiware-Total-Count'])
+
+        page, count = fetch_page(offset=0, size=min(page_size, limit))
+        count = min(count, limit)
+        offset = len(page)
+        with ThreadPoolExecutor(max_workers=1) as prefetcher:
+            while True:
+                future = None
+                if page and offset < count:
+                    future = prefetcher.submit(
+                        fetch_page, offset, min(page_size, count - offset))
+                self.logger.debug('Received page: %s', page)
+                yield page
+                if future is None:
+                    break
+                page, _ = future.result()
+                offset += len(page)
+
+    def __iter_keyset_pages(self,
+                            *,
+                            method: PaginationMethod = PaginationMethod.GET,
+                            url: str,
+                            headers: Dict,
+                            limit: Union[PositiveInt, PositiveFloat] = None,
+                            params: Dict = None,
+                            data: Dict = None,
+                            page_size: PositiveInt = 1000,
+                            key: str = 'dateCreated') \
+            -> Iterator[List[Dict]]:
+        """
+        Keyset variant of the NGSIv2 pagination mechanism. Entities are
+        ordered by a builtin date attribute and 'id' and each page continues
+        from the date of the last seen entity via a `q` filter. Entities of
+        this date that were already yielded are dropped by their id, hence
+        the cost per page does not grow with the depth of the scan and
+        entities that are created, modified or deleted during the scan do
+        not shift the pages. An offset is only used if more entities share
+        a single date than fit into a page.
+
+        Args:
+            url: Information about the url, obtained from the original function
+            headers: The headers from the original function
+            params: Query parameters. The 'q' filter of GET requests is
+                extended by the cursor.
+            data: Payload of POST requests as dictionary. The 'q' filter of
+                its expression is extended by the cursor.
+            limit:
+            page_size: Number of items per request. Orion allows at most 1000.
+            key: Builtin attribute the entities are ordered by, i.e.,
+                'dateCreated' or 'dateModified'
+
+        Yields:
+            List of raw items per page
+        """
+        if limit is None:
+            limit = inf
+        page_size = min(page_size, 1000)
+        if 'values' in params.get('options', '').split(','):
+            raise ValueError("Keyset pagination requires entity "
+                             f"representations with 'id' and '{key}'!")
+        if 'orderBy' in params:
+            raise ValueError("Keyset pagination cannot be combined with a "
+                             "custom order!")
+        params = params.copy()
+        params['orderBy'] = f'{key},id'
+        data = deepcopy(data) if data is not None else None
+
+        # builtin attributes are only returned if explicitly requested
+        attrs = data.get('attrs') if data is not None \
+            else params.get('attrs', '').split(',') if params.get('attrs') \
+            else None
+        strip_date = not attrs or key not in attrs
+        attrs = (attrs or ['*']) + ([key] if strip_date else [])
+        if data is not None:
+            data['attrs'] = attrs
+            expression = data.setdefault('expression', {})
+            base_q = expression.get('q')
         else:
-            session = requests.Session()
-        with session:
-            res = session.request(method=method,
-                                  url=url,
-                                  params=params,
-                                  headers=headers,
-                                  data=data)
-            if res.ok:
-                items = res.json()
-                # do pagination
-                count = int(res.headers['Fiware-Total-Count'])
-
-                while len(items) < limit and len(items) < count:
-                    # Establishing the offset from where entities are retrieved
-                    params['offset'] = len(items)
-                    params['limit'] = min(1000, (limit - len(items)))
-                    res = session.request(method=method,
-                                          url=url,
-                                          params=params,
-                                          headers=headers,
-                                          data=data)
-                    if res.ok:
-                        items.extend(res.json())
-                    else:
-                        res.raise_for_status()
-                self.logger.debug('Received: %s', items)
-                return items
-            res.raise_for_status()
+            params['attrs'] = ','.join(attrs)
+            base_q = params.get('q')
+
+        # ids of the yielded entities that share the date of the cursor.
+        # Pages continue at this date and drop these entities, so that
+        # deleted or modified entities cannot shift the following ones.
+        cursor, seen, shift, received = None, set(), 0, 0
+        while received < limit:
+            size = min(page_size, limit - received)
+            skip = 0
+            if cursor is not None:
+                q = ';'.join(filter(None, [base_q, f'{key}>={cursor}']))
+                if data is not None:
+                    expression['q'] = q
+                else:
+                    params['q'] = q
+                size = page_size
+                # an offset is only used if the entities at the cursor do
+                # not fit into a single page. It keeps half a page of them
+                # in the response to tolerate deletions.
+                if len(seen) >= size:
+                    skip = len(seen) - size // 2
+            params['offset'] = skip + shift
+            params['limit'] = size
+            res = self.session.request(
+                method=method,
+                url=url,
+                params=params,
+                headers=headers,
+                data=json.dumps(data) if data is not None else None)
+            if not res.ok:
+                res.raise_for_status()
+            items = res.json()
+            dates = [item[key].get('value') if isinstance(item[key], dict)
+                     else item[key] for item in items]
+            fresh = [(item, date) for item, date in zip(items, dates)
+                     if date != cursor or item['id'] not in seen]
+            if received + len(fresh) > limit:
+                fresh = fresh[:int(limit - received)]
+            if not fresh:
+                if len(items) < size:
+                    break
+                # more deletions at the cursor than tolerated by the offset
+                shift += len(items)
+                continue
+            shift = 0
+            page = [item for item, _ in fresh]
+            received += len(page)
+
+            if fresh[-1][1] != cursor:
+                cursor, seen = fresh[-1][1], set()
+            seen.update(item['id'] for item, date in fresh if date == cursor)
+            if strip_date:
+                for item in page:
+                    item.pop(key, None)
+            self.logger.debug('Received page: %s', page)
+            yield page
+            if len(items) < size:
+                break
+
+    def __entity_list_params(self,
+                             *,
+                             entity_ids: List[str] = None,
+                             entity_types: List[str] = None,
+                             id_pattern: str = None,
+                             type_pattern: str = None,
+                             q: Union[str, QueryString] = None,
+                             mq: Union[str, QueryString] = None,
+                             georel: str = None,
+                             geometry: str = None,
+                             coords: str = None,
+                             attrs: List[str] = None,
+                             metadata: str = None,
+                             order_by: str = None,
+                             response_format: Union[AttrsFormat, str] =
+                             AttrsFormat.NORMALIZED) -> Dict:
+        """
+        Builds the query parameters for listing entities. See
+        :meth:`get_entity_list` for a description of the arguments. The
+        'count' option is always set, as it is required for the pagination.
+
+        Returns:
+            Dictionary of query parameters
+        """
+        params = {}
+
+        if entity_ids and id_pattern:
+            raise ValueError
+        if entity_types and type_pattern:
+            raise ValueError
+        if entity_ids:
+            if not isinstance(entity_ids, list):
+                entity_ids = [entity_ids]
+            params.update({'id': ','.join(entity_ids)})
+        if id_pattern:
+            try:
+                re.compile(id_pattern)
+            except re.error as err:
+                raise ValueError(f'Invalid Pattern: {err}') from err
+            params.update({'idPattern': id_pattern})
+        if entity_types:
+            if not isinstance(entity_types, list):
+                entity_types = [entity_types]
+            params.update({'type': ','.join(entity_types)})
+        if type_pattern:
+            try:
+                re.compile(type_pattern)
+            except re.error as err:
+                raise ValueError(f'Invalid Pattern: {err.msg}') from err
+            params.update({'typePattern': type_pattern})
+        if attrs:
+            params.update({'attrs': ','.join(attrs)})
+        if metadata:
+            params.update({'metadata': ','.join(metadata)})
+        if q:
+            if isinstance(q, str):
+                q = QueryString.parse_str(q)
+            params.update({'q': str(q)})
+        if mq:
+            params.update({'mq': str(mq)})
+        if geometry:
+            params.update({'geometry': geometry})
+        if georel:
+            params.update({'georel': georel})
+        if coords:
+            params.update({'coords': coords})
+        if order_by:
+            params.update({'orderBy': order_by})
+        if response_format not in list(AttrsFormat):
+            raise ValueError(f'Value must be in {list(AttrsFormat)}')
+        response_format = ','.join(['count', response_format])
+        params.update({'options': response_format})
+        return params
 
     # MANAGEMENT API
     def get_version(self) -> Dict:
@@ -267,9 +563,14 @@ class ContextBrokerClient(BaseHttpClient):
                         metadata: str = None,
                         order_by: str = None,
                         response_format: Union[AttrsFormat, str] =
-                        AttrsFormat.NORMALIZED
+                        AttrsFormat.NORMALIZED,
+                        max_workers: PositiveInt = None,
+                        validate: Union[bool, ValidationMode, str] = True,
+                        pagination: Union[PaginationStrategy, str] =
+                        PaginationStrategy.OFFSET
                         ) -> List[Union[ContextEntity,
                                         ContextEntityKeyValues,
+                                        LazyContextEntity,
                                         Dict[str, Any]]]:
         r"""
         Retrieves a list of context entities that match different criteria by
@@ -325,83 +626,354 @@ class ContextBrokerClient(BaseHttpClient):
                 'keyValues' or 'values' are used the response model will
                 change to List[ContextEntityKeyValues] and to List[Dict[str,
                 Any]], respectively.
+            max_workers: Number of threads used to request the pages of
+                large result sets concurrently. By default, pages are
+                requested one after another.
+            validate: How the entities are built, see
+                :class:`filip.models.ngsi_v2.base.ValidationMode`. `True`
+                validates all entities, `False` constructs them without
+                validation, which is considerably faster for trusted data.
+            pagination: How pages following the first one are requested,
+                see :class:`filip.models.base.PaginationStrategy`. The keyset
+                strategy is recommended for scans of large tenants. It cannot
+                be combined with `order_by`, `max_workers` or the 'values'
+                response format.
         Returns:
 
         """
         url = urljoin(self.base_url, 'v2/entities/')
         headers = self.headers.copy()
-        params = {}
+        params = self.__entity_list_params(entity_ids=entity_ids,
+                                           entity_types=entity_types,
+                                           id_pattern=id_pattern,
+                                           type_pattern=type_pattern,
+                                           q=q,
+                                           mq=mq,
+                                           georel=georel,
+                                           geometry=geometry,
+                                           coords=coords,
+                                           attrs=attrs,
+                                           metadata=metadata,
+                                           order_by=order_by,
+                                           response_format=response_format)
+        response_format = params['options']
+        try:
+            if PaginationStrategy(pagination) == PaginationStrategy.KEYSET:
+                if max_workers and max_workers > 1:
+                    raise ValueError("Keyset pagination is sequential and "
+                                     "does not support 'max_workers'!")
+                items = [item for page in self.__iter_keyset_pages(
+                    method=PaginationMethod.GET,
+                    limit=limit,
+                    url=url,
+                    params=params,
+                    headers=headers) for item in page]
+            else:
+                items = self.__pagination(method=PaginationMethod.GET,
+                                          limit=limit,
+                                          url=url,
+                                          params=params,
+                                          headers=headers,
+                                          max_workers=max_workers)
+            return self.__parse_entities(items,
+                                         response_format=response_format,
+                                         validate=validate)
+        except requests.RequestException as err:
+            msg = "Could not load entities"
+            self.log_error(err=err, msg=msg)
+            raise
 
-        if entity_ids and id_pattern:
-            raise ValueError
-        if entity_types and type_pattern:
-            raise ValueError
-        if entity_ids:
-            if not isinstance(entity_ids, list):
-                entity_ids = [entity_ids]
-            params.update({'id': ','.join(entity_ids)})
-        if id_pattern:
-            try:
-                re.compile(id_pattern)
-            except re.error as err:
-                raise ValueError(f'Invalid Pattern: {err}') from err
-            params.update({'idPattern': id_pattern})
-        if entity_types:
-            if not isinstance(entity_types, list):
-                entity_types = [entity_types]
-            params.update({'type': ','.join(entity_types)})
-        if type_pattern:
-            try:
-                re.compile(type_pattern)
-            except re.error as err:
-                raise ValueError(f'Invalid Pattern: {err.msg}') from err
-            params.update({'typePattern': type_pattern})
-        if attrs:
-            params.update({'attrs': ','.join(attrs)})
-        if metadata:
-            params.update({'metadata': ','.join(metadata)})
-        if q:
-            if isinstance(q, str):
-                q = QueryString.parse_str(q)
-            params.update({'q': str(q)})
-        if mq:
-            params.update({'mq': str(mq)})
-        if geometry:
-            params.update({'geometry': geometry})
-        if georel:
-            params.update({'georel': georel})
-        if coords:
-            params.update({'coords': coords})
-        if order_by:
-            params.update({'orderBy': order_by})
-        if response_format not in list(AttrsFormat):
-            raise ValueError(f'Value must be in {list(AttrsFormat)}')
-        response_format = ','.join(['count', response_format])
-        params.update({'options': response_format})
+    def iter_entities(self,
+                      *,
+                      entity_ids: List[str] = None,
+                      entity_types: List[str] = None,
+                      id_pattern: str = None,
+                      type_pattern: str = None,
+                      q: Union[str, QueryString] = None,
+                      mq: Union[str, QueryString] = None,
+                      georel: str = None,
+                      geometry: str = None,
+                      coords: str = None,
+                      limit: PositiveInt = inf,
+                      attrs: List[str] = None,
+                      metadata: str = None,
+                      order_by: str = None,
+                      response_format: Union[AttrsFormat, str] =
+                      AttrsFormat.NORMALIZED,
+                      page_size: PositiveInt = 1000,
+                      parse: bool = True,
+                      validate: Union[bool, ValidationMode, str] = True,
+                      pagination: Union[PaginationStrategy, str] =
+                      PaginationStrategy.OFFSET
+                      ) -> Iterator[Union[ContextEntity,
+                                          ContextEntityKeyValues,
+                                          LazyContextEntity,
+                                          Dict[str, Any]]]:
+        """
+        Streaming variant of :meth:`get_entity_list`. Entities are
+        retrieved page by page and yielded one at a time, while the next
+        page is prefetched in the background. Thus, the memory consumption
+        is independent of the number of matching entities.
+
+        Example::
+
+            >>> for entity in client.iter_entities(entity_types=['Room']):
+            >>>     process(entity)
+
+        Args:
+            page_size: Number of entities per request (at most 1000).
+            parse: If `False`, the raw dictionaries are yielded without
+                validation.
+            validate: How the entities are built, see
+                :class:`filip.models.ngsi_v2.base.ValidationMode`.
+            pagination: How the pages are requested, see
+                :class:`filip.models.base.PaginationStrategy`.
+            **: See :meth:`get_entity_list` for all other arguments.
+
+        Yields:
+            Entities in the requested response format
+        """
+        url = urljoin(self.base_url, 'v2/entities/')
+        headers = self.headers.copy()
+        params = self.__entity_list_params(entity_ids=entity_ids,
+                                           entity_types=entity_types,
+                                           id_pattern=id_pattern,
+                                           type_pattern=type_pattern,
+                                           q=q,
+                                           mq=mq,
+                                           georel=georel,
+                                           geometry=geometry,
+                                           coords=coords,
+                                           attrs=attrs,
+                                           metadata=metadata,
+                                           order_by=order_by,
+                                           response_format=response_format)
+        if PaginationStrategy(pagination) == PaginationStrategy.KEYSET:
+            iter_pages = self.__iter_keyset_pages
+        else:
+            iter_pages = self.__iter_pages
         try:
-            items = self.__pagination(method=PaginationMethod.GET,
-                                      limit=limit,
-                                      url=url,
-                                      params=params,
-                                      headers=headers)
-            if AttrsFormat.NORMALIZED in response_format:
-                return parse_obj_as(List[ContextEntity], items)
-            if AttrsFormat.KEY_VALUES in response_format:
-                return parse_obj_as(List[ContextEntityKeyValues], items)
+            for page in iter_pages(method=PaginationMethod.GET,
+                                   limit=limit,
+                                   url=url,
+                                   params=params,
+                                   headers=headers,
+                                   page_size=page_size):
+                yield from self.__parse_entities(
+                    page, response_format=response_format, parse=parse,
+                    validate=validate)
+        except requests.RequestException as err:
+            msg = "Could not load entities"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    def iter_entity_changes(self,
+                            *,
+                            since: Union[datetime, str] = None,
+                            entity_types: List[str] = None,
+                            id_pattern: str = None,
+                            type_pattern: str = None,
+                            q: Union[str, QueryString] = None,
+                            response_format: Union[AttrsFormat, str] =
+                            AttrsFormat.NORMALIZED,
+                            page_size: PositiveInt = 1000) \
+            -> Iterator[List[Dict[str, Any]]]:
+        """
+        Streams the entities that were modified at or after a point in time
+        in the order of their modification. Pages continue from the
+        modification date of the last seen entity, hence entities that are
+        modified during the scan move to its end instead of being missed.
+
+        Args:
+            since: Point in time as datetime or as ISO8601 string in the
+                format Orion uses, e.g., '2023-01-01T00:00:00.000Z'. If
+                `None`, all entities are returned.
+            page_size: Number of entities per request (at most 1000).
+            **: See :meth:`get_entity_list` for all other arguments.
+
+        Yields:
+            Pages of raw entities including their 'dateModified' attribute
+        """
+        url = urljoin(self.base_url, 'v2/entities/')
+        headers = self.headers.copy()
+        params = self.__entity_list_params(entity_types=entity_types,
+                                           id_pattern=id_pattern,
+                                           type_pattern=type_pattern,
+                                           q=q,
+                                           attrs=['*', 'dateModified'],
+                                           response_format=response_format)
+        if isinstance(since, datetime):
+            since = convert_datetime_to_iso_8601_with_z_suffix(since)
+        if since is not None:
+            params['q'] = ';'.join(filter(None, [params.get('q'),
+                                                 f'dateModified>={since}']))
+        try:
+            yield from self.__iter_keyset_pages(method=PaginationMethod.GET,
+                                                url=url,
+                                                params=params,
+                                                headers=headers,
+                                                page_size=page_size,
+                                                key='dateModified')
+        except requests.RequestException as err:
+            msg = "Could not load modified entities"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    @staticmethod
+    def __parse_entities(items: List[Dict],
+                         response_format: Union[AttrsFormat, str],
+                         parse: bool = True,
+                         validate: Union[bool, ValidationMode, str] = True) \
+            -> List[Union[ContextEntity,
+                          ContextEntityKeyValues,
+                          LazyContextEntity,
+                          Dict[str, Any]]]:
+        """
+        Parses a page of raw entities into the model that belongs to the
+        response format.
+
+        Args:
+            items: Raw entities
+            response_format: Response format or options the entities were
+                requested with
+            parse: If `False`, the raw dictionaries are returned
+            validate: `True` or 'strict' for full validation, `False` or
+                'construct' for models without validation and 'lazy' for
+                dictionaries that are validated on request.
+        """
+        if not parse or not response_format:
             return items
+        if isinstance(validate, bool):
+            validate = ValidationMode.STRICT if validate \
+                else ValidationMode.CONSTRUCT
+        validate = ValidationMode(validate)
+        if AttrsFormat.NORMALIZED in response_format:
+            model = ContextEntity
+        elif AttrsFormat.KEY_VALUES in response_format:
+            model = ContextEntityKeyValues
+        else:
+            return items
+
+        if validate == ValidationMode.LAZY:
+            return [LazyContextEntity(item, model=model) for item in items]
+        if validate == ValidationMode.CONSTRUCT:
+            if model is ContextEntity:
+                return [ContextEntity.construct_trusted(item)
+                        for item in items]
+            return [model.construct(**item) for item in items]
+        return parse_obj_as(List[model], items)
+
+    def get_entity_frame(self,
+                         *,
+                         entity_ids: List[str] = None,
+                         entity_types: List[str] = None,
+                         id_pattern: str = None,
+                         type_pattern: str = None,
+                         q: Union[str, QueryString] = None,
+                         mq: Union[str, QueryString] = None,
+                         georel: str = None,
+                         geometry: str = None,
+                         coords: str = None,
+                         limit: PositiveInt = inf,
+                         attrs: List[str] = None,
+                         order_by: str = None,
+                         metadata_columns: bool = False,
+                         page_size: PositiveInt = 1000) -> pd.DataFrame:
+        """
+        Retrieves context entities as a columnar DataFrame. The raw pages are
+        converted while they stream in, without building any entity models.
+
+        The frame contains one row per entity with the columns 'id', 'type'
+        and one column per attribute value. If `metadata_columns` is set,
+        the metadata values are added as columns '<attribute>.<metadata>'.
+
+        Example::
+
+            >>> df = client.get_entity_frame(entity_types=['Room'])
+            >>> df.groupby('type')['temperature'].mean()
 
+        Args:
+            metadata_columns: Whether to add columns for metadata values
+            page_size: Number of entities per request (at most 1000).
+            **: See :meth:`get_entity_list` for all other arguments.
+
+        Returns:
+            pandas.DataFrame
+        """
+        url = urljoin(self.base_url, 'v2/entities/')
+        headers = self.headers.copy()
+        response_format = AttrsFormat.NORMALIZED if metadata_columns \
+            else AttrsFormat.KEY_VALUES
+        params = self.__entity_list_params(entity_ids=entity_ids,
+                                           entity_types=entity_types,
+                                           id_pattern=id_pattern,
+                                           type_pattern=type_pattern,
+                                           q=q,
+                                           mq=mq,
+                                           georel=georel,
+                                           geometry=geometry,
+                                           coords=coords,
+                                           attrs=attrs,
+                                           order_by=order_by,
+                                           response_format=response_format)
+        try:
+            return self.__pages_to_frame(
+                self.__iter_pages(method=PaginationMethod.GET,
+                                  limit=limit,
+                                  url=url,
+                                  params=params,
+                                  headers=headers,
+                                  page_size=page_size),
+                normalized=metadata_columns)
         except requests.RequestException as err:
             msg = "Could not load entities"
             self.log_error(err=err, msg=msg)
             raise
 
+    @staticmethod
+    def __pages_to_frame(pages: Iterator[List[Dict]],
+                         normalized: bool = False) -> pd.DataFrame:
+        """
+        Converts raw pages of entities into a single DataFrame.
+
+        Args:
+            pages: Pages of entities in 'keyValues' or 'normalized' format
+            normalized: If `True`, the entities are in normalized format and
+                the metadata values are added as columns.
+
+        Returns:
+            pandas.DataFrame
+        """
+        frames = []
+        for page in pages:
+            # the iterators yield an empty page for empty results
+            if not page:
+                continue
+            if normalized:
+                page = [{'id': entity['id'],
+                         'type': entity['type'],
+                         **{name: attr.get('value')
+                            for name, attr in entity.items()
+                            if name not in ('id', 'type')},
+                         **{f'{name}.{meta_name}': meta.get('value')
+                            for name, attr in entity.items()
+                            if name not in ('id', 'type')
+                            for meta_name, meta in
+                            (attr.get('metadata') or {}).items()}}
+                        for entity in page]
+            frames.append(pd.DataFrame.from_records(page))
+        if not frames:
+            return pd.DataFrame(columns=['id', 'type'])
+        return pd.concat(frames, ignore_index=True, sort=False)
+
     def get_entity(self,
                    entity_id: str,
                    entity_type: str = None,
                    attrs: List[str] = None,
                    metadata: List[str] = None,
                    response_format: Union[AttrsFormat, str] =
-                   AttrsFormat.NORMALIZED) \
+                   AttrsFormat.NORMALIZED,
+                   track_changes: bool = False) \
             -> Union[ContextEntity, ContextEntityKeyValues, Dict[str, Any]]:
         """
         This operation must return one entity element only, but there may be
@@ -426,6 +998,9 @@ class ContextBrokerClient(BaseHttpClient):
                 section for more detail. Example: accuracy.
             response_format (AttrsFormat, str): Representation format of
                 response
+            track_changes (bool): If `True`, changes of the returned entity
+                are tracked and can be sent via :meth:`save_changes`. Only
+                applies to the normalized format.
         Returns:
             ContextEntity
         """
@@ -448,7 +1023,10 @@ class ContextBrokerClient(BaseHttpClient):
                 self.logger.info("Entity successfully retrieved!")
                 self.logger.debug("Received: %s", res.json())
                 if response_format == AttrsFormat.NORMALIZED:
-                    return ContextEntity(**res.json())
+                    entity = ContextEntity(**res.json())
+                    if track_changes:
+                        entity.track_changes()
+                    return entity
                 if response_format == AttrsFormat.KEY_VALUES:
                     return ContextEntityKeyValues(**res.json())
                 return res.json()
@@ -1136,7 +1714,8 @@ class ContextBrokerClient(BaseHttpClient):
     def post_subscription(self,
                           subscription: Subscription,
                           update: bool = False,
-                          skip_initial_notification: bool = False) -> str:
+                          skip_initial_notification: bool = False,
+                          index: SubscriptionIndex = None) -> str:
         """
         Creates a new subscription. The subscription is represented by a
         Subscription object defined in filip.cb.models.
@@ -1156,24 +1735,28 @@ class ContextBrokerClient(BaseHttpClient):
                 send to recipient containing the whole data. This is
                 deprecated and removed from version 3.0 of the context broker.
                 False - skip the initial notification
+            index: Index of the existing subscriptions that is used for the
+                duplicate detection instead of downloading all subscriptions.
+                The created subscription is added to it, so that the same
+                index can be reused for posting many subscriptions.
         Returns:
             str: Id of the (created) subscription
 
         """
-        existing_subscriptions = self.get_subscription_list()
+        if index is None:
+            index = SubscriptionIndex(self.get_subscription_list())
 
-        sub_hash = subscription.json(include={'subject', 'notification'})
-        for ex_sub in existing_subscriptions:
-            if sub_hash == ex_sub.json(include={'subject', 'notification'}):
-                self.logger.info("Subscription already exists")
-                if update:
-                    self.logger.info("Updated subscription")
-                    subscription.id = ex_sub.id
-                    self.update_subscription(subscription)
-                else:
-                    warnings.warn(f"Subscription existed already with the id"
-                                  f" {ex_sub.id}")
-                return ex_sub.id
+        ex_sub = index.find_duplicate(subscription)
+        if ex_sub is not None:
+            self.logger.info("Subscription already exists")
+            if update:
+                self.logger.info("Updated subscription")
+                subscription.id = ex_sub.id
+                self.update_subscription(subscription)
+            else:
+                warnings.warn(f"Subscription existed already with the id"
+                              f" {ex_sub.id}")
+            return ex_sub.id
 
         params = {}
         if skip_initial_notification:
@@ -1204,7 +1787,9 @@ class ContextBrokerClient(BaseHttpClient):
                 params=params)
             if res.ok:
                 self.logger.info("Subscription successfully created!")
-                return res.headers['Location'].split('/')[-1]
+                sub_id = res.headers['Location'].split('/')[-1]
+                index.add(subscription.copy(update={'id': sub_id}))
+                return sub_id
             res.raise_for_status()
         except requests.RequestException as err:
             msg = "Could not send subscription!"
@@ -1445,7 +2030,12 @@ class ContextBrokerClient(BaseHttpClient):
                *,
                entities: List[ContextEntity],
                action_type: Union[ActionType, str],
-               update_format: str = None) -> None:
+               update_format: str = None,
+               override_metadata: bool = False,
+               chunk_size: PositiveInt = None,
+               max_payload_size: PositiveInt = 1048576,
+               max_workers: PositiveInt = None,
+               raise_on_error: bool = True) -> BatchUpdateReport:
         """
         This operation allows to create, update and/or delete several entities
         in a single batch operation.
@@ -1470,6 +2060,20 @@ class ContextBrokerClient(BaseHttpClient):
 
         replace: maps to PUT /v2/entities/<id>/attrs.
 
+        Large lists of entities are split into chunks by number of entities
+        and by the size of the serialized request body. Chunks can be sent
+        concurrently. The returned report contains the result of every
+        chunk, so that failed chunks can be retried on their own.
+
+        Example::
+
+            >>> report = client.update(entities=entities,
+            >>>                        action_type=ActionType.APPEND,
+            >>>                        chunk_size=500,
+            >>>                        max_workers=4,
+            >>>                        raise_on_error=False)
+            >>> retry = [entities[i] for i in report.failed_indices]
+
         Args:
             entities: "an array of entities, each entity specified using the "
                       "JSON entity representation format "
@@ -1477,35 +2081,402 @@ class ContextBrokerClient(BaseHttpClient):
                     action to do: either append, appendStrict, update, delete,
                     or replace. "
             update_format (str): Optional 'keyValues'
+            override_metadata (bool): If `True` the metadata of updated
+                attributes is replaced instead of merged.
+            chunk_size: Maximum number of entities per request. By default,
+                the number of entities is not limited.
+            max_payload_size: Maximum size of a request body in bytes. The
+                default corresponds to the default limit of Orion. A single
+                entity that exceeds the limit is sent on its own.
+            max_workers: Number of threads used to send chunks concurrently.
+                By default, chunks are sent one after another.
+            raise_on_error: If `True` the error of the first failed chunk is
+                raised after all chunks were dispatched. Otherwise, failures
+                are only contained in the returned report.
 
         Returns:
-
+            BatchUpdateReport
         """
-
-        url = urljoin(self.base_url, 'v2/op/update')
-        headers = self.headers.copy()
-        headers.update({'Content-Type': 'application/json'})
         params = {}
+        options = []
         if update_format:
             assert update_format == 'keyValues', \
                 "Only 'keyValues' is allowed as update format"
-            params.update({'options': 'keyValues'})
+            options.append('keyValues')
+        if override_metadata:
+            options.append('overrideMetadata')
+        if options:
+            params.update({'options': ','.join(options)})
         update = Update(actionType=action_type, entities=entities)
-        try:
-            res = self.post(
-                url=url,
-                headers=headers,
-                params=params,
-                data=update.json(by_alias=True))
-            if res.ok:
-                self.logger.info("Update operation '%s' succeeded!",
-                                 action_type)
-            else:
-                res.raise_for_status()
-        except requests.RequestException as err:
-            msg = f"Update operation '{action_type}' failed!"
-            self.log_error(err=err, msg=msg)
-            raise
+        # serialize every entity only once, the chunks are built from strings
+        encoder = update.__json_encoder__
+        serialized = [json.dumps(entity, default=encoder)
+                      for entity in update.dict(by_alias=True)['entities']]
+        return self._dispatch_batches(serialized=serialized,
+                                      action_type=update.action_type,
+                                      params=params,
+                                      chunk_size=chunk_size,
+                                      max_payload_size=max_payload_size,
+                                      max_workers=max_workers,
+                                      raise_on_error=raise_on_error)
+
+    def _dispatch_batches(self,
+                          *,
+                          serialized: List[str],
+                          action_type: ActionType,
+                          params: Dict = None,
+                          chunk_size: PositiveInt = None,
+                          max_payload_size: PositiveInt = None,
+                          max_workers: PositiveInt = None,
+                          raise_on_error: bool = True) -> BatchUpdateReport:
+        """
+        Splits already serialized entities into chunks and posts them to
+        /v2/op/update. Also used by
+        :class:`~filip.clients.ngsi_v2.write_buffer.WriteBuffer`.
+
+        Args:
+            serialized: JSON representations of the entities
+            action_type: actionType of the batch operation
+            params: Query parameters of every request
+            chunk_size: Maximum number of entities per request
+            max_payload_size: Maximum size of a request body in bytes
+            max_workers: Number of threads used to send chunks concurrently
+            raise_on_error: Raise the error of the first failed chunk
+
+        Returns:
+            BatchUpdateReport
+        """
+        url = urljoin(self.base_url, 'v2/op/update')
+        headers = self.headers.copy()
+        headers.update({'Content-Type': 'application/json'})
+        action_type = ActionType(action_type)
+        prefix = f'{{"actionType": "{action_type.value}", "entities": ['
+        suffix = ']}'
+        envelope_size = len(prefix) + len(suffix)
+
+        # build chunks of entity positions
+        chunks: List[List[int]] = []
+        current: List[int] = []
+        size = envelope_size
+        for index, item in enumerate(serialized):
+            # account for the separating comma
+            item_size = len(item.encode('utf-8')) + 1
+            if current and \
+                    ((chunk_size and len(current) >= chunk_size) or
+                     (max_payload_size and size + item_size > max_payload_size)):
+                chunks.append(current)
+                current = []
+                size = envelope_size
+            current.append(index)
+            size += item_size
+        if current or not chunks:
+            chunks.append(current)
+
+        def send_chunk(chunk: int) -> Tuple[BatchChunkResult,
+                                            Optional[Exception]]:
+            indices = chunks[chunk]
+            payload = prefix + ','.join(serialized[i] for i in indices) + \
+                suffix
+            result = BatchChunkResult(chunk=chunk,
+                                      indices=indices,
+                                      payload_size=len(payload.encode('utf-8')))
+            try:
+                res = self.post(url=url,
+                                headers=headers,
+                                params=params,
+                                data=payload.encode('utf-8'))
+                result.status_code = res.status_code
+                if res.ok:
+                    self.logger.info("Update operation '%s' succeeded for "
+                                     "chunk %s!", action_type, chunk)
+                else:
+                    res.raise_for_status()
+            except requests.RequestException as err:
+                msg = f"Update operation '{action_type}' failed for chunk " \
+                      f"{chunk}!"
+                self.log_error(err=err, msg=msg)
+                result.error = err.response.text \
+                    if err.response is not None and err.response.text \
+                    else str(err)
+                return result, err
+            return result, None
+
+        if max_workers and max_workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                results = list(pool.map(send_chunk, range(len(chunks))))
+        else:
+            results = [send_chunk(chunk) for chunk in range(len(chunks))]
+
+        report = BatchUpdateReport(action_type=action_type,
+                                   chunks=[result for result, _ in results])
+        if raise_on_error:
+            for _, err in results:
+                if err is not None:
+                    raise err
+        return report
+
+    def upsert_frame(self,
+                     df: pd.DataFrame,
+                     *,
+                     id_col: str = 'id',
+                     type_col: str = 'type',
+                     attr_types: Dict[str, Union[DataType, str]] = None,
+                     override_metadata: bool = False,
+                     chunk_size: PositiveInt = None,
+                     max_payload_size: PositiveInt = 1048576,
+                     max_workers: PositiveInt = None,
+                     raise_on_error: bool = True) -> BatchUpdateReport:
+        """
+        Creates or updates one entity per row of a DataFrame. Every other
+        column becomes an attribute. The rows are serialized column by column
+        without building entity models and sent as chunked 'append' batch
+        operations, see :meth:`update`. Missing values (NaN, None) are
+        skipped, hence they do not overwrite existing attribute values.
+
+        Note:
+            The values are not validated. Make sure that they are
+            FIWARE-safe.
+
+        Example::
+
+            >>> df = pd.DataFrame({'id': ['Room1', 'Room2'],
+            >>>                    'type': 'Room',
+            >>>                    'temperature': [21.5, 22.0]})
+            >>> client.upsert_frame(df, max_workers=4)
+
+        Args:
+            df: Data with one entity per row
+            id_col: Name of the column containing the entity ids
+            type_col: Name of the column containing the entity types
+            attr_types: Attribute types per column. By default, the type is
+                derived from the column's dtype (Boolean, Number, DateTime,
+                StructuredValue or Text).
+            override_metadata: If `True` the metadata of updated attributes is
+                replaced instead of merged.
+            chunk_size: Maximum number of entities per request.
+            max_payload_size: Maximum size of a request body in bytes.
+            max_workers: Number of threads used to send chunks concurrently.
+            raise_on_error: If `True` the error of the first failed chunk is
+                raised after all chunks were dispatched.
+
+        Returns:
+            BatchUpdateReport, the indices refer to the positions of the rows
+        """
+        attr_types = attr_types or {}
+        params = {'options': 'overrideMetadata'} if override_metadata else {}
+        if df.empty:
+            return BatchUpdateReport(action_type=ActionType.APPEND)
+
+        serialized = '{"id":' + \
+            df[id_col].astype(str).map(json.dumps).reset_index(drop=True) + \
+            ',"type":' + \
+            df[type_col].astype(str).map(json.dumps).reset_index(drop=True)
+        for column in df.columns:
+            if column in (id_col, type_col):
+                continue
+            serialized = serialized + self.__serialize_column(
+                series=df[column].reset_index(drop=True),
+                name=str(column),
+                attr_type=attr_types.get(column))
+        serialized = serialized + '}'
+
+        return self._dispatch_batches(serialized=serialized.tolist(),
+                                      action_type=ActionType.APPEND,
+                                      params=params,
+                                      chunk_size=chunk_size,
+                                      max_payload_size=max_payload_size,
+                                      max_workers=max_workers,
+                                      raise_on_error=raise_on_error)
+
+    @staticmethod
+    def __serialize_column(series: pd.Series,
+                           name: str,
+                           attr_type: Union[DataType, str] = None) \
+            -> pd.Series:
+        """
+        Serializes a column into JSON fragments of NGSI attributes. Each
+        fragment starts with a comma, missing values become empty strings.
+
+        Args:
+            series: Column of a DataFrame
+            name: Name of the attribute
+            attr_type: Type of the attribute, derived from the dtype if not
+                given
+
+        Returns:
+            pandas.Series of strings
+        """
+        missing = series.isna()
+        if pd.api.types.is_bool_dtype(series):
+            values = series.map({True: 'true', False: 'false'})
+            attr_type = attr_type or DataType.BOOLEAN
+        elif pd.api.types.is_numeric_dtype(series):
+            # JSON does not support infinite values
+            missing |= series.isin([float('inf'), float('-inf')])
+            values = series.astype(str)
+            attr_type = attr_type or DataType.NUMBER
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            if series.dt.tz is not None:
+                series = series.dt.tz_convert('UTC')
+            # milliseconds like convert_datetime_to_iso_8601_with_z_suffix
+            values = '"' + series.dt.strftime('%Y-%m-%dT%H:%M:%S.%f')\
+                .str[:-3] + 'Z"'
+            attr_type = attr_type or DataType.DATETIME
+        else:
+            values = series.map(json.dumps, na_action='ignore')
+            if attr_type is None:
+                first = series[~missing].head(1).tolist()
+                attr_type = DataType.STRUCTUREDVALUE \
+                    if first and isinstance(first[0], (dict, list)) \
+                    else DataType.TEXT
+        if isinstance(attr_type, DataType):
+            attr_type = attr_type.value
+        prefix = f',{json.dumps(name)}:' \
+                 f'{{"type":{json.dumps(attr_type)},"value":'
+        return (prefix + values.astype(str) + '}').where(~missing, '')
+
+    def upsert_csv(self,
+                   filepath_or_buffer: Any,
+                   *,
+                   id_col: str = 'id',
+                   type_col: str = 'type',
+                   attr_types: Dict[str, Union[DataType, str]] = None,
+                   rows_per_read: PositiveInt = 10000,
+                   read_csv_kwargs: Dict[str, Any] = None,
+                   **kwargs) -> BatchUpdateReport:
+        """
+        Creates or updates the entities of a CSV file. The file is read in
+        blocks of `rows_per_read` rows, each of which is sent via
+        :meth:`upsert_frame`. Thus, the file does not have to fit into
+        memory.
+
+        Note:
+            Ids and types are always read as strings. The dtypes of all
+            other columns are inferred per block, e.g., integers become
+            floats in blocks with missing values. Pass `dtype` via
+            `read_csv_kwargs` for consistent values, e.g.,
+            ``{'dtype': {'count': 'Int64'}}``.
+
+        Args:
+            filepath_or_buffer: Path or buffer of the CSV file
+            id_col: Name of the column containing the entity ids
+            type_col: Name of the column containing the entity types
+            attr_types: Attribute types per column
+            rows_per_read: Number of rows that are read at once
+            read_csv_kwargs: Further arguments of `pandas.read_csv`, e.g.,
+                `sep` or `dtype`
+            **kwargs: Further arguments of :meth:`upsert_frame`, e.g.
+                `max_workers`
+
+        Returns:
+            BatchUpdateReport, the indices refer to the rows of the file
+        """
+        read_csv_kwargs = dict(read_csv_kwargs or {})
+        dtype = read_csv_kwargs.pop('dtype', {})
+        if isinstance(dtype, dict):
+            dtype = {id_col: str, type_col: str, **dtype}
+        report = BatchUpdateReport(action_type=ActionType.APPEND)
+        offset = 0
+        for block in pd.read_csv(filepath_or_buffer,
+                                 chunksize=rows_per_read,
+                                 dtype=dtype,
+                                 **read_csv_kwargs):
+            block_report = self.upsert_frame(block,
+                                             id_col=id_col,
+                                             type_col=type_col,
+                                             attr_types=attr_types,
+                                             **kwargs)
+            for chunk in block_report.chunks:
+                chunk.chunk += len(report.chunks)
+                chunk.indices = [index + offset for index in chunk.indices]
+            report.chunks.extend(block_report.chunks)
+            offset += len(block)
+        return report
+
+    def entity_cache(self,
+                     *,
+                     max_size: PositiveInt = 1000,
+                     ttl: Optional[PositiveFloat] = 60.0,
+                     entity_types: List[str] = None,
+                     host: str = '0.0.0.0',
+                     port: int = 0,
+                     notification_url: str = None,
+                     subscribe: bool = True) -> EntityCache:
+        """
+        Creates a read-through cache for entities. The cache subscribes to
+        all changes of the cached entities, hence repeated reads are served
+        from memory. See :class:`filip.clients.ngsi_v2.cache.EntityCache` for
+        a description of the arguments.
+
+        Returns:
+            EntityCache, which should be closed or used as context manager
+        """
+        return EntityCache(self,
+                           max_size=max_size,
+                           ttl=ttl,
+                           entity_types=entity_types,
+                           host=host,
+                           port=port,
+                           notification_url=notification_url,
+                           subscribe=subscribe)
+
+    def write_buffer(self,
+                     *,
+                     max_size: PositiveInt = 1000,
+                     flush_interval: Optional[PositiveFloat] = 1.0,
+                     max_pending: PositiveInt = 10000,
+                     chunk_size: PositiveInt = None,
+                     max_workers: PositiveInt = None) -> WriteBuffer:
+        """
+        Creates a write-behind buffer for high-rate attribute updates. The
+        buffer merges repeated writes to the same attribute and sends them
+        as 'append' batch operations via :meth:`update`.
+
+        Args:
+            max_size: Number of pending attributes that triggers a flush
+            flush_interval: Maximum time in seconds between two flushes
+            max_pending: Number of pending attributes at which writes block
+            chunk_size: Maximum number of entities per batch request
+            max_workers: Number of threads sending the chunks of a flush
+
+        Returns:
+            WriteBuffer, which should be closed or used as context manager
+        """
+        return WriteBuffer(self,
+                           max_size=max_size,
+                           flush_interval=flush_interval,
+                           max_pending=max_pending,
+                           chunk_size=chunk_size,
+                           max_workers=max_workers)
+
+    def sync_to(self,
+                target: ContextBrokerClient,
+                *,
+                entity_types: List[str] = None,
+                id_pattern: str = None,
+                checkpoint: Union[str, Path] = None,
+                deletion_interval: Optional[float] = 3600,
+                page_size: PositiveInt = 1000,
+                chunk_size: PositiveInt = None,
+                max_workers: PositiveInt = None) -> ContextBrokerSync:
+        """
+        Creates an engine that keeps the entities of another context broker
+        in sync with this one. See
+        :class:`filip.clients.ngsi_v2.sync.ContextBrokerSync` for a
+        description of the arguments.
+
+        Returns:
+            ContextBrokerSync
+        """
+        return ContextBrokerSync(self,
+                                 target,
+                                 entity_types=entity_types,
+                                 id_pattern=id_pattern,
+                                 checkpoint=checkpoint,
+                                 deletion_interval=deletion_interval,
+                                 page_size=page_size,
+                                 chunk_size=chunk_size,
+                                 max_workers=max_workers)
 
     def query(self,
               *,
@@ -1513,7 +2484,11 @@ class ContextBrokerClient(BaseHttpClient):
               limit: PositiveInt = None,
               order_by: str = None,
               response_format: Union[AttrsFormat, str] =
-              AttrsFormat.NORMALIZED) -> List[Any]:
+              AttrsFormat.NORMALIZED,
+              max_workers: PositiveInt = None,
+              validate: Union[bool, ValidationMode, str] = True,
+              pagination: Union[PaginationStrategy, str] =
+              PaginationStrategy.OFFSET) -> List[Any]:
         """
         Generate api query
         Args:
@@ -1521,6 +2496,13 @@ class ContextBrokerClient(BaseHttpClient):
             limit (PositiveInt):
             order_by (str):
             response_format (AttrsFormat, str):
+            max_workers (PositiveInt): Number of threads used to request the
+                pages of large result sets concurrently.
+            validate (bool, ValidationMode, str): How the entities are built,
+                see :class:`filip.models.ngsi_v2.base.ValidationMode`.
+            pagination (PaginationStrategy, str): How pages following the
+                first one are requested, see
+                :class:`filip.models.base.PaginationStrategy`.
         Returns:
             The response payload is an Array containing one object per matching
             entity, or an empty array [] if no entities are found. The entities
@@ -1536,19 +2518,142 @@ class ContextBrokerClient(BaseHttpClient):
             if response_format not in list(AttrsFormat):
                 raise ValueError(f'Value must be in {list(AttrsFormat)}')
             params['options'] = ','.join([response_format, 'count'])
+        data = query.json(exclude_unset=True, exclude_none=True)
         try:
-            items = self.__pagination(method=PaginationMethod.POST,
-                                      url=url,
-                                      headers=headers,
-                                      params=params,
-                                      data=query.json(exclude_unset=True,
-                                                      exclude_none=True),
-                                      limit=limit)
-            if response_format == AttrsFormat.NORMALIZED:
-                return parse_obj_as(List[ContextEntity], items)
-            if response_format == AttrsFormat.KEY_VALUES:
-                return parse_obj_as(List[ContextEntityKeyValues], items)
-            return items
+            if PaginationStrategy(pagination) == PaginationStrategy.KEYSET:
+                if max_workers and max_workers > 1:
+                    raise ValueError("Keyset pagination is sequential and "
+                                     "does not support 'max_workers'!")
+                items = [item for page in self.__iter_keyset_pages(
+                    method=PaginationMethod.POST,
+                    url=url,
+                    headers=headers,
+                    params=params,
+                    data=json.loads(data),
+                    limit=limit) for item in page]
+            else:
+                items = self.__pagination(method=PaginationMethod.POST,
+                                          url=url,
+                                          headers=headers,
+                                          params=params,
+                                          data=data,
+                                          limit=limit,
+                                          max_workers=max_workers)
+            return self.__parse_entities(items,
+                                         response_format=response_format,
+                                         validate=validate)
+        except requests.RequestException as err:
+            msg = "Query operation failed!"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    def iter_query(self,
+                   *,
+                   query: Query,
+                   limit: PositiveInt = None,
+                   order_by: str = None,
+                   response_format: Union[AttrsFormat, str] =
+                   AttrsFormat.NORMALIZED,
+                   page_size: PositiveInt = 1000,
+                   parse: bool = True,
+                   validate: Union[bool, ValidationMode, str] = True,
+                   pagination: Union[PaginationStrategy, str] =
+                   PaginationStrategy.OFFSET) -> Iterator[Any]:
+        """
+        Streaming variant of :meth:`query`. Matching entities are retrieved
+        page by page and yielded one at a time, while the next page is
+        prefetched in the background.
+
+        Args:
+            query (Query):
+            limit (PositiveInt):
+            order_by (str):
+            response_format (AttrsFormat, str):
+            page_size (PositiveInt): Number of entities per request (at most
+                1000).
+            parse (bool): If `False`, the raw dictionaries are yielded without
+                validation.
+            validate (bool, ValidationMode, str): How the entities are built,
+                see :class:`filip.models.ngsi_v2.base.ValidationMode`.
+            pagination (PaginationStrategy, str): How the pages are
+                requested, see :class:`filip.models.base.PaginationStrategy`.
+        Yields:
+            Entities in the requested response format
+        """
+        url = urljoin(self.base_url, 'v2/op/query')
+        headers = self.headers.copy()
+        headers.update({'Content-Type': 'application/json'})
+        params = {'options': 'count'}
+
+        if response_format:
+            if response_format not in list(AttrsFormat):
+                raise ValueError(f'Value must be in {list(AttrsFormat)}')
+            params['options'] = ','.join([response_format, 'count'])
+        if order_by:
+            params['orderBy'] = order_by
+        data = query.json(exclude_unset=True, exclude_none=True)
+        if PaginationStrategy(pagination) == PaginationStrategy.KEYSET:
+            iter_pages = self.__iter_keyset_pages
+            data = json.loads(data)
+        else:
+            iter_pages = self.__iter_pages
+        try:
+            for page in iter_pages(method=PaginationMethod.POST,
+                                   url=url,
+                                   headers=headers,
+                                   params=params,
+                                   data=data,
+                                   limit=limit,
+                                   page_size=page_size):
+                yield from self.__parse_entities(
+                    page, response_format=response_format, parse=parse,
+                    validate=validate)
+        except requests.RequestException as err:
+            msg = "Query operation failed!"
+            self.log_error(err=err, msg=msg)
+            raise
+
+    def query_frame(self,
+                    *,
+                    query: Query,
+                    limit: PositiveInt = None,
+                    order_by: str = None,
+                    metadata_columns: bool = False,
+                    page_size: PositiveInt = 1000) -> pd.DataFrame:
+        """
+        Columnar variant of :meth:`query`. See :meth:`get_entity_frame` for
+        the layout of the returned DataFrame.
+
+        Args:
+            query (Query):
+            limit (PositiveInt):
+            order_by (str):
+            metadata_columns (bool): Whether to add columns for metadata
+                values
+            page_size (PositiveInt): Number of entities per request (at most
+                1000).
+        Returns:
+            pandas.DataFrame
+        """
+        url = urljoin(self.base_url, 'v2/op/query')
+        headers = self.headers.copy()
+        headers.update({'Content-Type': 'application/json'})
+        response_format = AttrsFormat.NORMALIZED if metadata_columns \
+            else AttrsFormat.KEY_VALUES
+        params = {'options': ','.join([response_format, 'count'])}
+        if order_by:
+            params['orderBy'] = order_by
+        try:
+            return self.__pages_to_frame(
+                self.__iter_pages(method=PaginationMethod.POST,
+                                  url=url,
+                                  headers=headers,
+                                  params=params,
+                                  data=query.json(exclude_unset=True,
+                                                  exclude_none=True),
+                                  limit=limit,
+                                  page_size=page_size),
+                normalized=metadata_columns)
         except requests.RequestException as err:
             msg = "Query operation failed!"
             self.log_error(err=err, msg=msg)
@@ -1654,6 +2759,95 @@ class ContextBrokerClient(BaseHttpClient):
                 raise
             return False
 
+    def get_entities_by_ids(self,
+                            entity_ids: List[str],
+                            entity_types: Union[str, List[str]] = None,
+                            attrs: List[str] = None,
+                            response_format: Union[AttrsFormat, str] =
+                            AttrsFormat.NORMALIZED,
+                            max_workers: PositiveInt = None,
+                            validate: Union[bool, ValidationMode, str] = True) \
+            -> Dict[Tuple[str, str], Any]:
+        """
+        Retrieves several entities by their ids with a single
+        `/v2/op/query` request instead of one request per entity.
+
+        Args:
+            entity_ids: Ids of the entities to retrieve
+            entity_types: Either a single entity type for all ids or a list
+                of types with the same length as `entity_ids`. If `None`,
+                entities of any type are returned.
+            attrs: List of attribute names whose data must be included in the
+                response. If `None`, all attributes are included.
+            response_format: Representation format of the entities
+            max_workers: Number of threads used to request the pages of
+                large result sets concurrently.
+            validate: How the entities are built, see
+                :class:`filip.models.ngsi_v2.base.ValidationMode`.
+
+        Returns:
+            Dict of the found entities keyed by (entity id, entity type).
+            Missing entities are not contained.
+        """
+        if not isinstance(entity_types, list):
+            entity_types = [entity_types] * len(entity_ids)
+        if len(entity_types) != len(entity_ids):
+            raise ValueError("'entity_types' must have the same length as "
+                             "'entity_ids'")
+        patterns = list({(entity_id, entity_type): EntityPattern(
+            id=entity_id, type=entity_type)
+            for entity_id, entity_type in zip(entity_ids, entity_types)
+        }.values())
+        if not patterns:
+            return {}
+        query = Query(entities=patterns, attrs=attrs)
+        entities = self.query(query=query,
+                              response_format=response_format,
+                              max_workers=max_workers,
+                              validate=validate)
+        return {(entity['id'], entity['type']) if isinstance(entity, dict)
+                else (entity.id, entity.type): entity
+                for entity in entities}
+
+    def entities_exist(self,
+                       entity_ids: List[str],
+                       entity_types: Union[str, List[str]] = None,
+                       max_workers: PositiveInt = None) \
+            -> Dict[Tuple[str, Optional[str]], bool]:
+        """
+        Bulk version of :meth:`does_entity_exist`. All identifiers are
+        resolved with a single `/v2/op/query` request that does not return
+        any attributes.
+
+        Args:
+            entity_ids: Ids of the entities to check
+            entity_types: Either a single entity type for all ids or a list
+                of types with the same length as `entity_ids`. If `None`, an
+                entity of any type matches.
+            max_workers: Number of threads used to request the pages of
+                large result sets concurrently.
+
+        Returns:
+            Dict keyed by the requested (entity id, entity type) pairs. The
+            value is `True` if the entity exists.
+        """
+        if not isinstance(entity_types, list):
+            entity_types = [entity_types] * len(entity_ids)
+        found = self.get_entities_by_ids(entity_ids=entity_ids,
+                                         entity_types=entity_types,
+                                         attrs=['__NONE'],
+                                         response_format=AttrsFormat.KEY_VALUES,
+                                         max_workers=max_workers,
+                                         validate=False)
+        found_ids = {entity_id for entity_id, _ in found}
+        result = {}
+        for entity_id, entity_type in zip(entity_ids, entity_types):
+            if entity_type is None:
+                result[(entity_id, entity_type)] = entity_id in found_ids
+            else:
+                result[(entity_id, entity_type)] = \
+                    (entity_id, entity_type) in found
+        return result
 
     def patch_entity(self,
                      entity: ContextEntity,
@@ -1678,241 +2872,245 @@ class ContextBrokerClient(BaseHttpClient):
         Returns:
            None
         """
+        self.patch_entities(
+            entities=[entity],
+            old_entities=None if old_entity is None else [old_entity],
+            override_attr_metadata=override_attr_metadata)
 
-        new_entity = entity
+    def patch_entities(self,
+                       entities: List[ContextEntity],
+                       old_entities: Optional[List[Optional[ContextEntity]]]
+                       = None,
+                       override_attr_metadata: bool = True,
+                       max_workers: PositiveInt = None) -> None:
+        """
+        Bulk version of :meth:`patch_entity`. The current state of all
+        entities is retrieved with a single query. Afterwards, the complete
+        change set is computed and applied with one 'delete' batch operation
+        for removed entities and attributes and one 'append' batch operation
+        for new and changed attributes.
 
-        if old_entity is None:
-            # If no old entity_was provided we use the current state to compare
-            # the entity to
-            if self.does_entity_exist(entity_id=new_entity.id,
-                                      entity_type=new_entity.type):
-                old_entity = self.get_entity(entity_id=new_entity.id,
-                                             entity_type=new_entity.type)
-            else:
-                # the entity is new, post and finish
-                self.post_entity(new_entity, update=False)
-                return
+        Note:
+            Commands are only registrations to the corresponding device and
+            are therefore excluded from the comparison.
 
-        else:
-            # An old_entity was provided
-            # check if the old_entity (still) exists else recall methode
-            # and discard old_entity
-            if not self.does_entity_exist(entity_id=old_entity.id,
-                                          entity_type=old_entity.type):
-                self.patch_entity(new_entity,
-                                  override_attr_metadata=override_attr_metadata)
-                return
-
-            # if type or id was changed, the old_entity needs to be deleted
-            # and the new_entity created
-            # In this case we will lose the current state of the entity
-            if old_entity.id != new_entity.id or \
-                    old_entity.type != new_entity.type:
-                self.delete_entity(entity_id=old_entity.id,
-                                   entity_type=old_entity.type)
-
-                if not self.does_entity_exist(entity_id=new_entity.id,
-                                              entity_type=new_entity.type):
-                    self.post_entity(entity=new_entity, update=False)
-                    return
-
-        # At this point we know that we need to patch only the attributes of
-        # the entity
-        # Check the differences between the attributes of old and new entity
-        # Delete the removed attributes, create the new ones,
-        # and update the existing if necessary
-        old_attributes = old_entity.get_attributes()
-        new_attributes = new_entity.get_attributes()
-
-        # Manage attributes that existed before
-        for old_attr in old_attributes:
-            # commands do not exist in the ContextEntity and are only
-            # registrations to the corresponding device. Operations as
-            # delete will fail as it does not technically exists
-            corresponding_new_attr = None
-            for new_attr in new_attributes:
-                if new_attr.name == old_attr.name:
-                    corresponding_new_attr = new_attr
-
-            if corresponding_new_attr is None:
-                # Attribute no longer exists, delete it
-                try:
-                    self.delete_entity_attribute(entity_id=new_entity.id,
-                                                 entity_type=new_entity.type,
-                                                 attr_name=old_attr.name)
-                except requests.RequestException as err:
-                    # if the attribute is provided by a registration the
-                    # deletion will fail
-                    if not err.response.status_code == 404:
-                        raise
-            else:
-                # Check if attributed changed in any way, if yes update
-                # else do nothing and keep current state
-                if old_attr != corresponding_new_attr:
+        Args:
+            entities: Entities to update
+            old_entities: OPTIONAL, list of the same length as `entities`.
+                For each entry that is not `None` only the differences between
+                the old entity and the entity are updated in the CB.
+            override_attr_metadata:
+                Whether to override or append the attributes metadata.
+                `True` for overwrite or `False` for update/append
+            max_workers: Number of threads used for the batch operations
+
+        Returns:
+           None
+        """
+        if old_entities is None:
+            old_entities = [None] * len(entities)
+        if len(old_entities) != len(entities):
+            raise ValueError("'old_entities' must have the same length as "
+                             "'entities'")
+        if not entities:
+            return
+
+        keys = [(entity.id, entity.type) for entity in entities]
+        keys.extend((entity.id, entity.type) for entity in old_entities
+                    if entity is not None)
+        entity_ids, entity_types = map(list, zip(*keys))
+        current = self.get_entities_by_ids(entity_ids=entity_ids,
+                                           entity_types=entity_types,
+                                           max_workers=max_workers)
+
+        # entities and the names of their attributes that already exist
+        upserts: List[Tuple[ContextEntity, Set[str]]] = []
+        deletes: List[Tuple[ContextEntity, Set[str]]] = []
+        for new_entity, old_entity in zip(entities, old_entities):
+            new_key = (new_entity.id, new_entity.type)
+            if old_entity is not None:
+                old_key = (old_entity.id, old_entity.type)
+                if old_key not in current:
+                    # the old_entity does not exist anymore, discard it
+                    old_entity = None
+                elif old_key != new_key:
+                    # if type or id was changed, the old_entity needs to be
+                    # deleted. In this case we lose the current state of it
+                    deletes.append((ContextEntity(id=old_entity.id,
+                                                  type=old_entity.type),
+                                    set()))
+                    if new_key not in current:
+                        upserts.append((new_entity, set()))
+                        continue
+            if old_entity is None:
+                # If no old entity was provided we use the current state to
+                # compare the entity to
+                old_entity = current.get(new_key)
+                if old_entity is None:
+                    # the entity is new and will be created
+                    upserts.append((new_entity, set()))
+                    continue
+
+            upsert, delete = self.__diff_entity(entity=new_entity,
+                                                old_entity=old_entity)
+            existing = set(old_entity.get_attribute_names())
+            if upsert is not None:
+                upserts.append((upsert, existing))
+            if delete is not None:
+                deletes.append((delete, existing))
+
+        if deletes:
+            self.__apply_patch(deletes,
+                               action_type=ActionType.DELETE,
+                               max_workers=max_workers)
+        if upserts:
+            self.__apply_patch(upserts,
+                               action_type=ActionType.APPEND,
+                               override_metadata=override_attr_metadata,
+                               max_workers=max_workers)
+
+    def save_changes(self,
+                     entity: ContextEntity,
+                     override_attr_metadata: bool = True) -> None:
+        """
+        Sends only the tracked changes of an entity to the context broker.
+        Added and modified attributes are sent with one 'append' batch
+        operation and deleted attributes with one 'delete' batch operation.
+        Afterwards, the current state becomes the new reference for the
+        change tracking.
+
+        Example::
+
+            >>> entity = client.get_entity(entity_id='MyId',
+                                           track_changes=True)
+            >>> entity.temperature.value = 25
+            >>> client.save_changes(entity)
+
+        Args:
+            entity: Entity whose changes are tracked, see
+                :meth:`filip.models.ngsi_v2.context.ContextEntity.track_changes`
+            override_attr_metadata:
+                Whether to override or append the attributes metadata.
+                `True` for overwrite or `False` for update/append
+
+        Raises:
+            ValueError, if changes are not tracked for the entity
+
+        Returns:
+            None
+        """
+        changes = entity.get_changes()
+        if changes.deleted:
+            delete = ContextEntity(id=entity.id, type=entity.type)
+            delete.add_attributes({name: ContextAttribute()
+                                   for name in changes.deleted})
+            self.update(entities=[delete],
+                        action_type=ActionType.DELETE)
+        if changes.added or changes.modified:
+            upsert = ContextEntity(id=entity.id, type=entity.type)
+            upsert.add_attributes({**changes.added, **changes.modified})
+            self.update(entities=[upsert],
+                        action_type=ActionType.APPEND,
+                        override_metadata=override_attr_metadata)
+        entity.track_changes()
+
+    @staticmethod
+    def __diff_entity(entity: ContextEntity,
+                      old_entity: ContextEntity) \
+            -> Tuple[Optional[ContextEntity], Optional[ContextEntity]]:
+        """
+        Computes the change set between the attributes of two entities.
+
+        Args:
+            entity: Entity with the target state
+            old_entity: Entity with the state to compare to
+
+        Returns:
+            Tuple of an entity with all new or changed attributes and an
+            entity with all removed attributes. Each of them is `None` if
+            there is nothing to do.
+        """
+        old_attributes = old_entity.get_attributes(
+            blacklisted_attribute_types=[DataType.COMMAND],
+            response_format=PropertyFormat.DICT)
+        new_attributes = entity.get_attributes(
+            blacklisted_attribute_types=[DataType.COMMAND],
+            response_format=PropertyFormat.DICT)
+
+        changed = {name: attr for name, attr in new_attributes.items()
+                   if old_attributes.get(name) != attr}
+        removed = {name: attr for name, attr in old_attributes.items()
+                   if name not in new_attributes}
+
+        upsert = delete = None
+        if changed:
+            upsert = ContextEntity(id=entity.id, type=entity.type)
+            upsert.add_attributes(changed)
+        if removed:
+            delete = ContextEntity(id=entity.id, type=entity.type)
+            delete.add_attributes(removed)
+        return upsert, delete
+
+    def __apply_patch(self,
+                      patches: List[Tuple[ContextEntity, Set[str]]],
+                      *,
+                      action_type: ActionType,
+                      override_metadata: bool = True,
+                      max_workers: PositiveInt = None) -> None:
+        """
+        Applies the changes of :meth:`patch_entities` with a batch operation.
+        Attributes that are provided by registrations cannot be modified and
+        let the batch operation fail with 404. Entities of such chunks are
+        therefore patched attribute by attribute, where a 404 is only ignored
+        for attributes that already existed.
+
+        Args:
+            patches: Entities with changed attributes and the names of their
+                existing attributes
+            action_type: 'append' or 'delete'
+            override_metadata: Whether to override the attribute metadata
+            max_workers: Number of threads used for the batch operation
+        """
+        report = self.update(entities=[entity for entity, _ in patches],
+                             action_type=action_type,
+                             override_metadata=override_metadata,
+                             max_workers=max_workers,
+                             raise_on_error=False)
+        for chunk in report.failed_chunks:
+            if chunk.status_code != 404:
+                raise requests.HTTPError(f"Patch operation "
+                                         f"'{report.action_type}' failed: "
+                                         f"{chunk.error}")
+            for index in chunk.indices:
+                entity, existing = patches[index]
+                attrs = entity.get_attributes()
+                if not attrs:
+                    # deletion of the whole entity
+                    self.delete_entity(entity_id=entity.id,
+                                       entity_type=entity.type)
+                    continue
+                for attr in attrs:
                     try:
-                        self.update_entity_attribute(
-                            entity_id=new_entity.id,
-                            entity_type=new_entity.type,
-                            attr=corresponding_new_attr,
-                            override_metadata=override_attr_metadata
-                        )
+                        if action_type == ActionType.DELETE:
+                            self.delete_entity_attribute(
+                                entity_id=entity.id,
+                                entity_type=entity.type,
+                                attr_name=attr.name)
+                        elif attr.name in existing:
+                            self.update_entity_attribute(
+                                entity_id=entity.id,
+                                entity_type=entity.type,
+                                attr=attr,
+                                override_metadata=override_metadata)
+                        else:
+                            self.update_or_append_entity_attributes(
+                                entity_id=entity.id,
+                                entity_type=entity.type,
+                                attrs=[attr])
                     except requests.RequestException as err:
                         # if the attribute is provided by a registration the
-                        # update will fail
-                        if not err.response.status_code == 404:
+                        # operation will fail
+                        if attr.name not in existing or \
+                                err.response is None or \
+                                err.response.status_code != 404:
                             raise
-
-        # Create new attributes
-        update_entity = ContextEntity(id=entity.id, type=entity.type)
-        update_needed = False
-        for new_attr in new_attributes:
-            # commands do not exist in the ContextEntity and are only
-            # registrations to the corresponding device. Operations as
-            # delete will fail as it does not technically exists
-            attr_existed = False
-            for old_attr in old_attributes:
-                if new_attr.name == old_attr.name:
-                    attr_existed = True
-
-            if not attr_existed:
-                update_needed = True
-                update_entity.add_attributes([new_attr])
-
-        if update_needed:
-            self.update_entity(update_entity)
-
-#
-#
-#    def check_duplicate_subscription(self, subscription_body, limit: int = 20):
-#        """
-#        Function compares the subject of the subscription body, on whether a subscription
-#        already exists for a device / entity.
-#        :param subscription_body: the body of the new subscripton
-#        :param limit: pagination parameter, to set the number of
-#        subscriptions bodies the get request should grab
-#        :return: exists, boolean -> True, if such a subscription allready
-#        exists
-#        """
-#        exists = False
-#        subscription_subject = json.loads(subscription_body)["subject"]
-#        # Exact keys depend on subscription body
-#        try:
-#            subscription_url = json.loads(subscription_body)[
-#            "notification"]["httpCustom"]["url"]
-#        except KeyError:
-#            subscription_url = json.loads(subscription_body)[
-#            "notification"]["http"]["url"]
-#
-#        # If the number of subscriptions is larger then the limit,
-#        paginations methods have to be used
-#        url = self.url + '/v2/subscriptions?limit=' + str(limit) +
-#        '&options=count'
-#        response = self.session.get(url, headers=self.get_header())
-#
-#        sub_count = float(response.headers["Fiware-Total-Count"])
-#        response = json.loads(response.text)
-#        if sub_count >= limit:
-#            response = self.get_pagination(url=url, headers=self.get_header(),
-#                                           limit=limit, count=sub_count)
-#            response = json.loads(response)
-#
-#        for existing_subscription in response:
-#            # check whether the exact same subscriptions already exists
-#            if existing_subscription["subject"] == subscription_subject:
-#                exists = True
-#                break
-#            try:
-#                existing_url = existing_subscription["notification"][
-#                "http"]["url"]
-#            except KeyError:
-#                existing_url = existing_subscription["notification"][
-#                "httpCustom"]["url"]
-#            # check whether both subscriptions notify to the same path
-#            if existing_url != subscription_url:
-#                continue
-#            else:
-#                # iterate over all entities included in the subscription object
-#                for entity in subscription_subject["entities"]:
-#                    if 'type' in entity.keys():
-#                        subscription_type = entity['type']
-#                    else:
-#                        subscription_type = entity['typePattern']
-#                    if 'id' in entity.keys():
-#                        subscription_id = entity['id']
-#                    else:
-#                        subscription_id = entity["idPattern"]
-#                    # iterate over all entities included in the exisiting
-#                    subscriptions
-#                    for existing_entity in existing_subscription["subject"][
-#                    "entities"]:
-#                        if "type" in entity.keys():
-#                            type_existing = entity["type"]
-#                        else:
-#                            type_existing = entity["typePattern"]
-#                        if "id" in entity.keys():
-#                            id_existing = entity["id"]
-#                        else:
-#                            id_existing = entity["idPattern"]
-#                        # as the ID field is non optional, it has to match
-#                        # check whether the type match
-#                        # if the type field is empty, they match all types
-#                        if (type_existing == subscription_type) or\
-#                                ('*' in subscription_type) or \
-#                                ('*' in type_existing)\
-#                                or (type_existing == "") or (
-#                                subscription_type == ""):
-#                            # check if on of the subscriptions is a pattern,
-#                            or if they both refer to the same id
-#                            # Get the attrs first, to avoid code duplication
-#                            # last thing to compare is the attributes
-#                            # Assumption -> position is the same as the
-#                            entities _list
-#                            # i == j
-#                            i = subscription_subject["entities"].index(entity)
-#                            j = existing_subscription["subject"][
-#                            "entities"].index(existing_entity)
-#                            try:
-#                                subscription_attrs = subscription_subject[
-#                                "condition"]["attrs"][i]
-#                            except (KeyError, IndexError):
-#                                subscription_attrs = []
-#                            try:
-#                                existing_attrs = existing_subscription[
-#                                "subject"]["condition"]["attrs"][j]
-#                            except (KeyError, IndexError):
-#                                existing_attrs = []
-#
-#                            if (".*" in subscription_id) or ('.*' in
-#                            id_existing) or (subscription_id == id_existing):
-#                                # Attributes have to match, or the have to
-#                                be an empty array
-#                                if (subscription_attrs == existing_attrs) or
-#                                (subscription_attrs == []) or (existing_attrs == []):
-#                                        exists = True
-#                            # if they do not match completely or subscribe
-#                            to all ids they have to match up to a certain position
-#                            elif ("*" in subscription_id) or ('*' in
-#                            id_existing):
-#                                    regex_existing = id_existing.find('*')
-#                                    regex_subscription =
-#                                    subscription_id.find('*')
-#                                    # slice the strings to compare
-#                                    if (id_existing[:regex_existing] in
-#                                    subscription_id) or (subscription_id[:regex_subscription] in id_existing) or \
-#                                            (id_existing[regex_existing:] in
-#                                            subscription_id) or (subscription_id[regex_subscription:] in id_existing):
-#                                            if (subscription_attrs ==
-#                                            existing_attrs) or (subscription_attrs == []) or (existing_attrs == []):
-#                                                exists = True
-#                                            else:
-#                                                continue
-#                                    else:
-#                                        continue
-#                            else:
-#                                continue
-#                        else:
-#                            continue
-#                    else:
-#                        continue
-#        return exists
-#
@@ -9,7 +9,9 @@ from pathlib import Path
 from pydantic import BaseModel, AnyHttpUrl
 from requests.auth import HTTPBasicAuth, HTTPDigestAuth
 from requests import Session
-from filip.clients.base_http_client import BaseHttpClient
+from filip.clients.base_http_client import \
+    BaseHttpClient, \
+    ConnectionPoolConfig
 from filip.config import settings
 from filip.models.base import FiwareHeader
 from filip.clients.ngsi_v2 import \
@@ -41,6 +43,7 @@ class HttpClient(BaseHttpClient):
                  config: Union[str, Path, HttpClientConfig, Dict] = None,
                  session: Session = None,
                  fiware_header: FiwareHeader = None,
+                 pool_config: Union[ConnectionPoolConfig, Dict] = None,
                  **kwargs):
         """
         Constructor for master client
@@ -48,6 +51,9 @@ class HttpClient(BaseHttpClient):
             config (Union[str, Path, Dict]): Configuration object
             session (request.Session): Session object
             fiware_header (FiwareHeader): Fiware header
+            pool_config (ConnectionPoolConfig): Configuration of the
+                connection pool that is shared by all sub clients. Omitted if
+                a session is provided.
             **kwargs: Optional arguments that ``request`` takes.
         """
         if config:
@@ -57,6 +63,7 @@ class HttpClient(BaseHttpClient):
 
         super().__init__(session=session,
                          fiware_header=fiware_header,
+                         pool_config=pool_config,
                          **kwargs)
 
         # initialize sub clients
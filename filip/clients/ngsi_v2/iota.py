@@ -676,9 +676,10 @@ class IoTAClient(BaseHttpClient):
 
         """
         url = urljoin(self.base_url, 'admin/log')
-        headers = self.headers.copy()
-        del headers['fiware-service']
-        del headers['fiware-servicepath']
+        # the log api is not tenant specific, hence, remove the fiware
+        # headers that are otherwise merged from the session
+        headers = {'fiware-service': None,
+                   'fiware-servicepath': None}
         try:
             res = self.get(url=url, headers=headers)
             if res.ok:
@@ -703,9 +704,10 @@ class IoTAClient(BaseHttpClient):
             raise KeyError("Given log level is not supported")
 
         url = urljoin(self.base_url, 'admin/log')
-        headers = self.headers.copy()
-        del headers['fiware-service']
-        del headers['fiware-servicepath']
+        # the log api is not tenant specific, hence, remove the fiware
+        # headers that are otherwise merged from the session
+        headers = {'fiware-service': None,
+                   'fiware-servicepath': None}
         try:
             res = self.put(url=url, headers=headers, params=level)
             if res.ok:
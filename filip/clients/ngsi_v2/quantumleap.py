@@ -5,11 +5,15 @@ import logging
 import time
 from math import inf
 from collections import deque
-from itertools import count
-from typing import Dict, List, Union, Deque, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import chain, count, islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Union, Deque, Optional, \
+    Tuple
 from urllib.parse import urljoin
 import requests
-from pydantic import parse_obj_as, AnyHttpUrl
+from pydantic import parse_obj_as, AnyHttpUrl, PositiveInt
 from filip import settings
 from filip.clients.base_http_client import BaseHttpClient
 from filip.models.base import FiwareHeader
@@ -19,13 +23,66 @@ from filip.models.ngsi_v2.timeseries import \
     AggrMethod, \
     AggrScope, \
     AttributeValues, \
+    ColumnarTimeSeries, \
     TimeSeries, \
     TimeSeriesHeader
+from filip.utils.datetime import \
+    convert_datetime_to_iso_8601_with_z_suffix, \
+    split_time_range, \
+    split_time_range_by_counts, \
+    transform_to_utc_datetime
 from filip.utils.validators import validate_http_url
+from filip.clients.ngsi_v2.timeseries_cache import \
+    CacheFormat, \
+    TimeSeriesCache
 
 logger = logging.getLogger(__name__)
 
 
+def _window_params(params: Dict,
+                   window: Tuple[datetime, datetime]) -> Dict:
+    """
+    Query parameters restricted to a time window
+    """
+    window_params = params.copy()
+    window_params['fromDate'] = \
+        convert_datetime_to_iso_8601_with_z_suffix(window[0])
+    window_params['toDate'] = \
+        convert_datetime_to_iso_8601_with_z_suffix(window[1])
+    return window_params
+
+
+def _parse_time_series(data: Dict,
+                       *,
+                       entity_id: str = None,
+                       entity_type: str = None,
+                       attr_name: str = None) -> TimeSeries:
+    """
+    Parses (a chunk of) the time series of a single entity, see
+    :meth:`ColumnarTimeSeries.from_json`
+    """
+    if 'attributes' in data:
+        attributes = data['attributes']
+    else:
+        attributes = [AttributeValues(attrName=data.get('attrName', attr_name),
+                                      values=data.get('values'))]
+    return TimeSeries(
+        entityId=data.get('entityId', data.get('id', entity_id)),
+        entityType=data.get('entityType', data.get('type', entity_type)),
+        index=data.get('index'),
+        attributes=attributes)
+
+
+def _to_utc(dt: datetime) -> datetime:
+    """
+    Converts a datetime to UTC. Naive datetimes are interpreted as UTC, as
+    QuantumLeap does.
+    """
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return transform_to_utc_datetime(dt)
+
+
 class QuantumLeapClient(BaseHttpClient):
     """
     Implements functions to use the FIWARE's QuantumLeap, which subscribes to an
@@ -298,7 +355,74 @@ class QuantumLeapClient(BaseHttpClient):
             self.log_error(err=err, msg=msg)
             raise
 
+    def history_cache(self,
+                      path: Union[str, Path],
+                      *,
+                      file_format: Union[str, CacheFormat] =
+                      CacheFormat.PARQUET,
+                      max_parts: PositiveInt = 32) -> TimeSeriesCache:
+        """
+        Creates an incremental on-disk cache for histories. Repeated reads
+        only request the records that are newer than the cached ones. See
+        :class:`filip.clients.ngsi_v2.timeseries_cache.TimeSeriesCache` for a
+        description of the arguments.
+
+        Returns:
+            TimeSeriesCache
+        """
+        return TimeSeriesCache(self,
+                               path,
+                               file_format=file_format,
+                               max_parts=max_parts)
+
     # QUERY API ENDPOINTS
+    @staticmethod
+    def __query_params(*,
+                       entity_id: str = None,
+                       options: str = None,
+                       entity_type: str = None,
+                       aggr_method: Union[str, AggrMethod] = None,
+                       aggr_period: Union[str, AggrPeriod] = None,
+                       from_date: str = None,
+                       to_date: str = None,
+                       georel: str = None,
+                       geometry: str = None,
+                       coords: str = None,
+                       attrs: str = None,
+                       aggr_scope: Union[str, AggrScope] = None) -> Dict:
+        """
+        Query parameters of the respective API endpoints without pagination
+        """
+        params = {}
+        if options:
+            params.update({'options': options})
+        if entity_type:
+            params.update({'type': entity_type})
+        if aggr_method:
+            aggr_method = AggrMethod(aggr_method)
+            params.update({'aggrMethod': aggr_method.value})
+        if aggr_period:
+            aggr_period = AggrPeriod(aggr_period)
+            params.update({'aggrPeriod': aggr_period.value})
+        if from_date:
+            params.update({'fromDate': from_date})
+        if to_date:
+            params.update({'toDate': to_date})
+        if georel:
+            params.update({'georel': georel})
+        if coords:
+            params.update({'coords': coords})
+        if geometry:
+            params.update({'geometry': geometry})
+        if attrs:
+            params.update({'attrs': attrs})
+        if aggr_scope:
+            aggr_scope = AggrScope(aggr_scope)
+            params.update({'aggr_scope': aggr_scope.value})
+        if entity_id:
+            params.update({'id': entity_id})
+        return params
+
     def __query_builder(self,
                         url,
                         *,
@@ -316,7 +440,10 @@ class QuantumLeapClient(BaseHttpClient):
                         geometry: str = None,
                         coords: str = None,
                         attrs: str = None,
-                        aggr_scope: Union[str, AggrScope] = None
+                        aggr_scope: Union[str, AggrScope] = None,
+                        max_workers: PositiveInt = None,
+                        time_window: Union[timedelta, str, AggrPeriod] = None,
+                        window_records: PositiveInt = None
                         ) -> Deque[Dict]:
         """
         Private Function to call respective API endpoints, chops large
@@ -345,89 +472,438 @@ class QuantumLeapClient(BaseHttpClient):
             coords:
             attrs:
             aggr_scope:
+            max_workers: If greater than one, up to `max_workers` chunks are
+                requested concurrently. The order of the chunks is kept.
+                If time windows are used, the number of
+                windows that are requested concurrently (default: 4).
+            time_window: Splits the range between `from_date` and `to_date`
+                into windows of this length, see
+                :func:`filip.utils.datetime.split_time_range`
+            window_records: Splits the range into windows of about this
+                number of records. The windows are planned with a count
+                query that is aggregated per `time_window` (default: day).
 
         Returns:
             Dict
         """
-        params = {}
+        params = self.__query_params(entity_id=entity_id,
+                                     options=options,
+                                     entity_type=entity_type,
+                                     aggr_method=aggr_method,
+                                     aggr_period=aggr_period,
+                                     from_date=from_date,
+                                     to_date=to_date,
+                                     georel=georel,
+                                     geometry=geometry,
+                                     coords=coords,
+                                     attrs=attrs,
+                                     aggr_scope=aggr_scope)
         headers = self.headers.copy()
-        max_records_per_request = 10000
-        # create a double ending queue
-        res_q: Deque[Dict] = deque([])
-
-        if options:
-            params.update({'options': options})
-        if entity_type:
-            params.update({'type': entity_type})
-        if aggr_method:
-            aggr_method = AggrMethod(aggr_method)
-            params.update({'aggrMethod': aggr_method.value})
-        if aggr_period:
-            aggr_period = AggrPeriod(aggr_period)
-            params.update({'aggrPeriod': aggr_period.value})
-        if from_date:
-            params.update({'fromDate': from_date})
-        if to_date:
-            params.update({'toDate': to_date})
         # These values are required for the integrated pagination mechanism
         # maximum items per request
         if limit is None:
             limit = inf
         if offset is None:
             offset = 0
-        if georel:
-            params.update({'georel': georel})
-        if coords:
-            params.update({'coords': coords})
-        if geometry:
-            params.update({'geometry': geometry})
-        if attrs:
-            params.update({'attrs': attrs})
-        if aggr_scope:
-            aggr_scope = AggrScope(aggr_scope)
-            params.update({'aggr_scope': aggr_scope.value})
-        if entity_id:
-            params.update({'id': entity_id})
+
+        if time_window or window_records:
+            if last_n or offset:
+                raise ValueError("Time windows cannot be combined with "
+                                 "'last_n' or 'offset'!")
+            windows = self.__plan_windows(url=url,
+                                          params=params,
+                                          headers=headers,
+                                          from_date=from_date,
+                                          to_date=to_date,
+                                          time_window=time_window,
+                                          window_records=window_records)
+
+            def fetch_window(window: Tuple[datetime, datetime]):
+                return self.__fetch_chunks(url=url,
+                                           params=_window_params(params,
+                                                                 window),
+                                           headers=headers,
+                                           limit=limit,
+                                           required=False)
+
+            # the windows do not overlap, hence their chunks are in order
+            with ThreadPoolExecutor(max_workers=max_workers or 4) as pool:
+                res_q = deque(chain.from_iterable(
+                    pool.map(fetch_window, windows)))
+            if not res_q:
+                # raises the error of the query without windows
+                res_q = self.__fetch_chunks(url=url,
+                                            params=params,
+                                            headers=headers,
+                                            limit=limit)
+        else:
+            res_q = self.__fetch_chunks(url=url,
+                                        params=params,
+                                        headers=headers,
+                                        limit=limit,
+                                        offset=offset,
+                                        last_n=last_n,
+                                        max_workers=max_workers)
+
+        self.logger.info("Successfully retrieved entity data")
+        return res_q
+
+    def __fetch_chunks(self,
+                       url: str,
+                       params: Dict,
+                       headers: Dict,
+                       *,
+                       limit: Union[int, float],
+                       offset: int = 0,
+                       last_n: int = None,
+                       max_workers: PositiveInt = None,
+                       required: bool = True) -> Deque[Dict]:
+        """
+        Collects all chunks of a query
+
+        Args:
+            url: Url of the endpoint
+            params: Query parameters without offset and limit
+            headers: Request headers
+            limit: Maximum number of records
+            offset: Offset of the first record
+            last_n: Request only the last N values
+            max_workers: If greater than one, up to `max_workers` chunks are
+                requested concurrently. The order of the chunks is kept.
+            required: If False, an empty result is not an error
+
+        Returns:
+            Decoded chunks in index order
+        """
+        # create a double ending queue
+        res_q: Deque[Dict] = deque([])
+        for chunk in self.__iter_chunks(
+                url=url,
+                params=params,
+                headers=headers,
+                limit=limit,
+                offset=offset,
+                last_n=last_n,
+                prefetch=max_workers if max_workers and max_workers > 1
+                else 0,
+                required=required):
+            # revert append direction when using last_n
+            if last_n:
+                res_q.appendleft(chunk)
+            else:
+                res_q.append(chunk)
+        return res_q
+
+    def __iter_chunks(self,
+                      url: str,
+                      params: Dict,
+                      headers: Dict,
+                      *,
+                      limit: Union[int, float],
+                      offset: int = 0,
+                      last_n: int = None,
+                      prefetch: int = 0,
+                      required: bool = True) -> Iterator[Dict]:
+        """
+        Chops a query into chunks of 10000 records and yields them one
+        after another. While the caller processes a chunk, up to `prefetch`
+        following chunks are already requested in background threads.
+
+        Args:
+            url: Url of the endpoint
+            params: Query parameters without offset and limit
+            headers: Request headers
+            limit: Maximum number of records
+            offset: Offset of the first record
+            last_n: Request only the last N values
+            prefetch: Number of chunks that are requested ahead
+            required: If False, an empty result is not an error
+
+        Yields:
+            Decoded chunks in the order of their offsets
+        """
+        max_records_per_request = 10000
+
+        def chunk_params():
+            """
+            Parameters of the consecutive requests
+            """
+            for i in count(0, max_records_per_request):
+                chunk = params.copy()
+                chunk['offset'] = offset + i
+                chunk['limit'] = min(limit - i, max_records_per_request)
+                if chunk['limit'] <= 0:
+                    return
+                if last_n:
+                    chunk['lastN'] = min(last_n - i, max_records_per_request)
+                    if chunk['lastN'] <= 0:
+                        return
+                yield chunk
 
         # This loop will chop large requests into smaller junks.
         # The individual functions will then merge the final response models
-        for i in count(0, max_records_per_request):
+        chunks = chunk_params()
+        if not prefetch:
+            for item in chunks:
+                chunk = self.__get_chunk(url=url,
+                                         params=item,
+                                         headers=headers,
+                                         first=required)
+                if chunk is None:
+                    return
+                required = False
+                yield chunk
+            return
+
+        with ThreadPoolExecutor(max_workers=prefetch) as pool:
+            futures = deque(
+                pool.submit(self.__get_chunk,
+                            url=url,
+                            params=item,
+                            headers=headers,
+                            first=required and i == 0)
+                for i, item in enumerate(islice(chunks, prefetch)))
             try:
-                params['offset'] = offset + i
+                while futures:
+                    chunk = futures.popleft().result()
+                    if chunk is None:
+                        return
+                    item = next(chunks, None)
+                    if item is not None:
+                        futures.append(pool.submit(self.__get_chunk,
+                                                   url=url,
+                                                   params=item,
+                                                   headers=headers,
+                                                   first=False))
+                    yield chunk
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def __iter_query(self,
+                     url: str,
+                     *,
+                     limit: int = None,
+                     offset: int = None,
+                     time_window: Union[timedelta, str, AggrPeriod] = None,
+                     window_records: PositiveInt = None,
+                     prefetch: int = 1,
+                     **query) -> Iterator[Dict]:
+        """
+        Generator version of :meth:`__query_builder`. The chunks are yielded
+        in index order as they arrive, and time windows are requested one
+        after another.
 
-                params['limit'] = min(limit - i, max_records_per_request)
-                if params['limit'] <= 0:
-                    break
+        Args:
+            url: Url of the endpoint
+            limit: Maximum number of records
+            offset: Offset of the first record
+            time_window: See :meth:`__query_builder`
+            window_records: See :meth:`__query_builder`
+            prefetch: Number of chunks that are requested ahead
+            **query: Query parameters, see :meth:`__query_params`
+
+        Yields:
+            Decoded chunks
+        """
+        params = self.__query_params(**query)
+        headers = self.headers.copy()
+        if limit is None:
+            limit = inf
+        if offset is None:
+            offset = 0
+        if not (time_window or window_records):
+            yield from self.__iter_chunks(url=url,
+                                          params=params,
+                                          headers=headers,
+                                          limit=limit,
+                                          offset=offset,
+                                          prefetch=prefetch)
+            return
+        if offset:
+            raise ValueError("Time windows cannot be combined with 'offset'!")
+        empty = True
+        for window in self.__plan_windows(url=url,
+                                          params=params,
+                                          headers=headers,
+                                          from_date=query.get('from_date'),
+                                          to_date=query.get('to_date'),
+                                          time_window=time_window,
+                                          window_records=window_records):
+            for chunk in self.__iter_chunks(url=url,
+                                            params=_window_params(params,
+                                                                  window),
+                                            headers=headers,
+                                            limit=limit,
+                                            prefetch=prefetch,
+                                            required=False):
+                empty = False
+                yield chunk
+        if empty:
+            # raises the error of the query without windows
+            yield from self.__iter_chunks(url=url,
+                                          params=params,
+                                          headers=headers,
+                                          limit=limit)
+
+    def __plan_windows(self,
+                       url: str,
+                       params: Dict,
+                       headers: Dict,
+                       from_date: Union[str, datetime],
+                       to_date: Union[str, datetime] = None,
+                       time_window: Union[timedelta, str, AggrPeriod] = None,
+                       window_records: PositiveInt = None
+                       ) -> List[Tuple[datetime, datetime]]:
+        """
+        Splits the time range of a query into windows
 
-                if last_n:
-                    params['lastN'] = min(last_n - i, max_records_per_request)
-                    if params['lastN'] <= 0:
-                        break
+        Args:
+            url: Url of the endpoint
+            params: Query parameters
+            headers: Request headers
+            from_date: Start of the range
+            to_date: End of the range. Default: now
+            time_window: Length of the windows or granularity of the count
+                query
+            window_records: Targeted number of records per window
 
-                res = self.get(url=url, params=params, headers=headers)
+        Returns:
+            List of (start, end) tuples
+        """
+        if not from_date:
+            raise ValueError("Time windows require 'from_date'!")
+        if 'aggrMethod' in params:
+            raise ValueError("Time windows cannot be combined with "
+                             "aggregations!")
+        start = _to_utc(parse_obj_as(datetime, from_date))
+        end = _to_utc(parse_obj_as(datetime, to_date)) if to_date \
+            else datetime.now(tz=timezone.utc)
+        if not window_records:
+            return split_time_range(start, end, time_window)
+
+        period = AggrPeriod(time_window or AggrPeriod.DAY)
+        count_params = params.copy()
+        count_params.update({'aggrMethod': AggrMethod.COUNT.value,
+                             'aggrPeriod': period.value})
+        counts: Dict[datetime, int] = {}
+        for chunk in self.__fetch_chunks(url=url,
+                                         params=count_params,
+                                         headers=headers,
+                                         limit=inf,
+                                         required=False):
+            items = [chunk] if 'index' in chunk else \
+                chunk.get('entities') or chunk.get('values') or []
+            for item in items:
+                if 'attributes' in item:
+                    series = [attr.get('values') or []
+                              for attr in item['attributes']]
+                else:
+                    series = [item.get('values') or []]
+                for position, bucket in enumerate(item.get('index') or []):
+                    # the attributes of a record are counted separately
+                    records = max((values[position] or 0
+                                   for values in series
+                                   if position < len(values)), default=0)
+                    bucket = _to_utc(parse_obj_as(datetime, bucket))
+                    counts[bucket] = counts.get(bucket, 0) + records
+        return split_time_range_by_counts(start,
+                                          end,
+                                          counts.items(),
+                                          window_records)
+
+    @staticmethod
+    def __merge_series(series: Iterable[TimeSeries]) -> List[TimeSeries]:
+        """
+        Merges the chunks of the time series of multiple entities by their
+        entity id
+        """
+        merged: Dict[str, TimeSeries] = {}
+        for item in series:
+            if item.entityId in merged:
+                merged[item.entityId].extend(item)
+            else:
+                merged[item.entityId] = item
+        return list(merged.values())
 
-                if res.ok:
-                    self.logger.debug('Received: %s', res.json())
+    @staticmethod
+    def __merge_columnar(series: Iterable[ColumnarTimeSeries]
+                         ) -> List[ColumnarTimeSeries]:
+        """
+        Merges the chunks of the columnar time series of multiple entities by
+        their entity id
+        """
+        chunks: Dict[str, List[ColumnarTimeSeries]] = {}
+        for item in series:
+            chunks.setdefault(item.entityId, []).append(item)
+        return [ColumnarTimeSeries.concat(items) for items in chunks.values()]
+
+    def __iter_series(self,
+                      chunks: Iterator[Dict],
+                      *,
+                      key: str = None,
+                      columnar: bool = False,
+                      entity_id: str = None,
+                      entity_type: str = None,
+                      attr_name: str = None
+                      ) -> Iterator[Union[TimeSeries, ColumnarTimeSeries]]:
+        """
+        Parses the chunks of a query into time series
 
-                    # revert append direction when using last_n
-                    if last_n:
-                        res_q.appendleft(res.json())
-                    else:
-                        res_q.append(res.json())
-                res.raise_for_status()
+        Args:
+            chunks: Decoded chunks
+            key: Key of the list of time series in a chunk of multiple
+                entities
+            columnar: If True, ColumnarTimeSeries are created
+            entity_id: Entity id, if not contained in the chunks
+            entity_type: Entity type, if not contained in the chunks
+            attr_name: Attribute name, if not contained in the chunks
+
+        Yields:
+            TimeSeries or ColumnarTimeSeries
+        """
+        parse = ColumnarTimeSeries.from_json if columnar \
+            else _parse_time_series
+        for chunk in chunks:
+            for item in chunk.get(key) if key else [chunk]:
+                yield parse(item,
+                            entity_id=entity_id,
+                            entity_type=entity_type,
+                            attr_name=chunk.get('attrName', attr_name))
+
+    def __get_chunk(self,
+                    url: str,
+                    params: Dict,
+                    headers: Dict,
+                    first: bool) -> Optional[Dict]:
+        """
+        Requests a single chunk of a query
 
-            except requests.exceptions.RequestException as err:
-                if err.response.status_code == 404 and \
-                        err.response.json().get('error') == 'Not Found' and \
-                        len(res_q) > 0:
-                    break
-                else:
-                    msg = "Could not load entity data"
-                    self.log_error(err=err, msg=msg)
-                    raise
+        Args:
+            url: Url of the endpoint
+            params: Query parameters including offset and limit
+            headers: Request headers
+            first: True for the first chunk of a query, which must not be
+                empty
 
-        self.logger.info("Successfully retrieved entity data")
-        return res_q
+        Returns:
+            Decoded response or None if there are no further records
+        """
+        try:
+            res = self.get(url=url, params=params, headers=headers)
+            if res.ok:
+                data = res.json()
+                self.logger.debug('Received: %s', data)
+                return data
+            res.raise_for_status()
+        except requests.exceptions.RequestException as err:
+            if not first and err.response is not None and \
+                    err.response.status_code == 404 and \
+                    err.response.json().get('error') == 'Not Found':
+                return None
+            msg = "Could not load entity data"
+            self.log_error(err=err, msg=msg)
+            raise
 
     # v2/entities
     def get_entities(self, *,
@@ -435,7 +911,8 @@ class QuantumLeapClient(BaseHttpClient):
                      from_date: str = None,
                      to_date: str = None,
                      limit: int = 10000,
-                     offset: int = None
+                     offset: int = None,
+                     max_workers: PositiveInt = None
                      ) -> List[TimeSeriesHeader]:
         """
         Get list of all available entities and their context information
@@ -456,6 +933,8 @@ class QuantumLeapClient(BaseHttpClient):
             limit (int): Maximum number of results to be retrieved.
                 Default value : 10000
             offset (int): Offset for the results.
+            max_workers: Number of concurrent requests for results that
+                exceed a single chunk of 10000 records
 
         Returns:
             List of TimeSeriesHeader
@@ -466,7 +945,8 @@ class QuantumLeapClient(BaseHttpClient):
                                    from_date=from_date,
                                    to_date=to_date,
                                    limit=limit,
-                                   offset=offset)
+                                   offset=offset,
+                                   max_workers=max_workers)
         return parse_obj_as(List[TimeSeriesHeader], res[0])
 
     # /entities/{entityId}
@@ -485,8 +965,12 @@ class QuantumLeapClient(BaseHttpClient):
                          georel: str = None,
                          geometry: str = None,
                          coords: str = None,
-                         options: str = None
-                         ) -> TimeSeries:
+                         options: str = None,
+                         max_workers: PositiveInt = None,
+                         time_window: Union[timedelta, str, AggrPeriod] = None,
+                         window_records: PositiveInt = None,
+                         columnar: bool = False
+                         ) -> Union[TimeSeries, ColumnarTimeSeries]:
 
         """
         History of N attributes of a given entity instance
@@ -562,6 +1046,18 @@ class QuantumLeapClient(BaseHttpClient):
                 Geographical Queries section of the specification:
                 https://fiware.github.io/specifications/ngsiv2/stable/.
             options (String): Key value pair options.
+            max_workers: Number of concurrent requests for results that
+                exceed a single chunk of 10000 records
+                or for time windows
+            time_window: Fetches the range between `from_date` and `to_date`
+                in concurrent windows of this length, e.g.,
+                `timedelta(days=7)` or 'month'. Avoids deep offsets for long
+                ranges. `limit` applies to every window.
+            window_records: Plans the windows by their estimated number of
+                records instead, using a count query per `time_window`
+                (default: 'day')
+            columnar: If True, the result is parsed with vectorized functions
+                into ColumnarTimeSeries with numpy arrays
 
         Returns:
             TimeSeries
@@ -580,7 +1076,14 @@ class QuantumLeapClient(BaseHttpClient):
                                      offset=offset,
                                      georel=georel,
                                      geometry=geometry,
-                                     coords=coords)
+                                     coords=coords,
+                                     max_workers=max_workers,
+                                     time_window=time_window,
+                                     window_records=window_records)
+        if columnar:
+            return ColumnarTimeSeries.concat(
+                ColumnarTimeSeries.from_json(item) for item in res_q)
+
         # merge response chunks
         res = TimeSeries.parse_obj(res_q.popleft())
         for item in res_q:
@@ -588,6 +1091,67 @@ class QuantumLeapClient(BaseHttpClient):
 
         return res
 
+    def iter_entity_by_id(self,
+                          entity_id: str,
+                          *,
+                          attrs: str = None,
+                          entity_type: str = None,
+                          aggr_method: Union[str, AggrMethod] = None,
+                          aggr_period: Union[str, AggrPeriod] = None,
+                          from_date: str = None,
+                          to_date: str = None,
+                          limit: int = None,
+                          offset: int = None,
+                          georel: str = None,
+                          geometry: str = None,
+                          coords: str = None,
+                          options: str = None,
+                          time_window: Union[
+                              timedelta, str, AggrPeriod] = None,
+                          window_records: PositiveInt = None,
+                          prefetch: int = 1,
+                          columnar: bool = False
+                          ) -> Iterator[Union[TimeSeries, ColumnarTimeSeries]]:
+        """
+        Generator version of :meth:`get_entity_by_id` for long histories.
+        Instead of merging all chunks of 10000 records, every chunk is yielded
+        as a separate time series as soon as it arrives, so that the history
+        can be processed in constant memory, e.g., via `to_pandas()`. While the
+        caller processes a chunk, the next ones are already requested.
+
+        Args:
+            See :meth:`get_entity_by_id`. `last_n` and `max_workers` are not
+            supported.
+            limit: Maximum number of records. Default: all records
+            prefetch: Number of chunks that are requested ahead
+            columnar: If True, ColumnarTimeSeries are yielded
+
+        Yields:
+            TimeSeries or ColumnarTimeSeries in index order
+        """
+        url = urljoin(self.base_url, f'/v2/entities/{entity_id}')
+        return self.__iter_series(
+            self.__iter_query(
+                url=url,
+                attrs=attrs,
+                options=options,
+                entity_type=entity_type,
+                aggr_method=aggr_method,
+                aggr_period=aggr_period,
+                from_date=from_date,
+                to_date=to_date,
+                limit=limit,
+                offset=offset,
+                georel=georel,
+                geometry=geometry,
+                coords=coords,
+                time_window=time_window,
+                window_records=window_records,
+                prefetch=prefetch),
+            key=None,
+            columnar=columnar,
+            entity_id=None)
+
     # /entities/{entityId}/value
     def get_entity_values_by_id(self,
                                 entity_id: str,
@@ -604,8 +1168,13 @@ class QuantumLeapClient(BaseHttpClient):
                                 georel: str = None,
                                 geometry: str = None,
                                 coords: str = None,
-                                options: str = None
-                                ) -> TimeSeries:
+                                options: str = None,
+                                max_workers: PositiveInt = None,
+                                time_window: Union[
+                                    timedelta, str, AggrPeriod] = None,
+                                window_records: PositiveInt = None,
+                                columnar: bool = False
+                                ) -> Union[TimeSeries, ColumnarTimeSeries]:
         """
         History of N attributes (values only) of a given entity instance
         For example, query the average pressure, temperature and humidity (
@@ -632,6 +1201,18 @@ class QuantumLeapClient(BaseHttpClient):
             coords (String): Required if georel is specified.
                 e.g. 40.714,-74.006
             options (String): Key value pair options.
+            max_workers: Number of concurrent requests for results that
+                exceed a single chunk of 10000 records
+                or for time windows
+            time_window: Fetches the range between `from_date` and `to_date`
+                in concurrent windows of this length, e.g.,
+                `timedelta(days=7)` or 'month'. Avoids deep offsets for long
+                ranges. `limit` applies to every window.
+            window_records: Plans the windows by their estimated number of
+                records instead, using a count query per `time_window`
+                (default: 'day')
+            columnar: If True, the result is parsed with vectorized functions
+                into ColumnarTimeSeries with numpy arrays
 
         Returns:
             Response Model
@@ -650,7 +1231,15 @@ class QuantumLeapClient(BaseHttpClient):
                                      offset=offset,
                                      georel=georel,
                                      geometry=geometry,
-                                     coords=coords)
+                                     coords=coords,
+                                     max_workers=max_workers,
+                                     time_window=time_window,
+                                     window_records=window_records)
+
+        if columnar:
+            return ColumnarTimeSeries.concat(
+                ColumnarTimeSeries.from_json(item, entity_id=entity_id)
+                for item in res_q)
 
         # merge response chunks
         res = TimeSeries(entityId=entity_id, **res_q.popleft())
@@ -659,6 +1248,69 @@ class QuantumLeapClient(BaseHttpClient):
 
         return res
 
+    def iter_entity_values_by_id(self,
+                                 entity_id: str,
+                                 *,
+                                 attrs: str = None,
+                                 entity_type: str = None,
+                                 aggr_method: Union[str, AggrMethod] = None,
+                                 aggr_period: Union[str, AggrPeriod] = None,
+                                 from_date: str = None,
+                                 to_date: str = None,
+                                 limit: int = None,
+                                 offset: int = None,
+                                 georel: str = None,
+                                 geometry: str = None,
+                                 coords: str = None,
+                                 options: str = None,
+                                 time_window: Union[
+                                     timedelta, str, AggrPeriod] = None,
+                                 window_records: PositiveInt = None,
+                                 prefetch: int = 1,
+                                 columnar: bool = False
+                                 ) -> Iterator[Union[TimeSeries,
+                                                         ColumnarTimeSeries]]:
+        """
+        Generator version of :meth:`get_entity_values_by_id` for long
+        histories. Instead of merging all chunks of 10000 records, every chunk
+        is yielded as a separate time series as soon as it arrives, so that the
+        history can be processed in constant memory, e.g., via `to_pandas()`.
+        While the caller processes a chunk, the next ones are already
+        requested.
+
+        Args:
+            See :meth:`get_entity_values_by_id`. `last_n` and `max_workers` are
+            not supported.
+            limit: Maximum number of records. Default: all records
+            prefetch: Number of chunks that are requested ahead
+            columnar: If True, ColumnarTimeSeries are yielded
+
+        Yields:
+            TimeSeries or ColumnarTimeSeries in index order
+        """
+        url = urljoin(self.base_url, f'/v2/entities/{entity_id}/value')
+        return self.__iter_series(
+            self.__iter_query(
+                url=url,
+                attrs=attrs,
+                options=options,
+                entity_type=entity_type,
+                aggr_method=aggr_method,
+                aggr_period=aggr_period,
+                from_date=from_date,
+                to_date=to_date,
+                limit=limit,
+                offset=offset,
+                georel=georel,
+                geometry=geometry,
+                coords=coords,
+                time_window=time_window,
+                window_records=window_records,
+                prefetch=prefetch),
+            key=None,
+            columnar=columnar,
+            entity_id=entity_id)
+
     # /entities/{entityId}/attrs/{attrName}
     def get_entity_attr_by_id(self,
                               entity_id: str,
@@ -675,8 +1327,13 @@ class QuantumLeapClient(BaseHttpClient):
                               georel: str = None,
                               geometry: str = None,
                               coords: str = None,
-                              options: str = None
-                              ) -> TimeSeries:
+                              options: str = None,
+                              max_workers: PositiveInt = None,
+                              time_window: Union[
+                                  timedelta, str, AggrPeriod] = None,
+                              window_records: PositiveInt = None,
+                              columnar: bool = False
+                              ) -> Union[TimeSeries, ColumnarTimeSeries]:
         """
         History of an attribute of a given entity instance
         For example, query max water level of the central tank throughout the
@@ -703,6 +1360,18 @@ class QuantumLeapClient(BaseHttpClient):
             coords (String): Required if georel is specified.
                 e.g. 40.714,-74.006
             options (String): Key value pair options.
+            max_workers: Number of concurrent requests for results that
+                exceed a single chunk of 10000 records
+                or for time windows
+            time_window: Fetches the range between `from_date` and `to_date`
+                in concurrent windows of this length, e.g.,
+                `timedelta(days=7)` or 'month'. Avoids deep offsets for long
+                ranges. `limit` applies to every window.
+            window_records: Plans the windows by their estimated number of
+                records instead, using a count query per `time_window`
+                (default: 'day')
+            columnar: If True, the result is parsed with vectorized functions
+                into ColumnarTimeSeries with numpy arrays
 
         Returns:
             Response Model
@@ -722,7 +1391,15 @@ class QuantumLeapClient(BaseHttpClient):
                                      offset=offset,
                                      georel=georel,
                                      geometry=geometry,
-                                     coords=coords)
+                                     coords=coords,
+                                     max_workers=max_workers,
+                                     time_window=time_window,
+                                     window_records=window_records)
+
+        if columnar:
+            return ColumnarTimeSeries.concat(
+                ColumnarTimeSeries.from_json(item, entity_id=entity_id)
+                for item in req_q)
 
         # merge response chunks
         first = req_q.popleft()
@@ -736,6 +1413,69 @@ class QuantumLeapClient(BaseHttpClient):
 
         return res
 
+    def iter_entity_attr_by_id(self,
+                               entity_id: str,
+                               attr_name: str,
+                               *,
+                               entity_type: str = None,
+                               aggr_method: Union[str, AggrMethod] = None,
+                               aggr_period: Union[str, AggrPeriod] = None,
+                               from_date: str = None,
+                               to_date: str = None,
+                               limit: int = None,
+                               offset: int = None,
+                               georel: str = None,
+                               geometry: str = None,
+                               coords: str = None,
+                               options: str = None,
+                               time_window: Union[
+                                   timedelta, str, AggrPeriod] = None,
+                               window_records: PositiveInt = None,
+                               prefetch: int = 1,
+                               columnar: bool = False
+                               ) -> Iterator[Union[TimeSeries,
+                                                       ColumnarTimeSeries]]:
+        """
+        Generator version of :meth:`get_entity_attr_by_id` for long histories.
+        Instead of merging all chunks of 10000 records, every chunk is yielded
+        as a separate time series as soon as it arrives, so that the history
+        can be processed in constant memory, e.g., via `to_pandas()`. While the
+        caller processes a chunk, the next ones are already requested.
+
+        Args:
+            See :meth:`get_entity_attr_by_id`. `last_n` and `max_workers` are
+            not supported.
+            limit: Maximum number of records. Default: all records
+            prefetch: Number of chunks that are requested ahead
+            columnar: If True, ColumnarTimeSeries are yielded
+
+        Yields:
+            TimeSeries or ColumnarTimeSeries in index order
+        """
+        url = urljoin(self.base_url, f'/v2/entities/{entity_id}/attrs'
+                                     f'/{attr_name}')
+        return self.__iter_series(
+            self.__iter_query(
+                url=url,
+                entity_id=entity_id,
+                options=options,
+                entity_type=entity_type,
+                aggr_method=aggr_method,
+                aggr_period=aggr_period,
+                from_date=from_date,
+                to_date=to_date,
+                limit=limit,
+                offset=offset,
+                georel=georel,
+                geometry=geometry,
+                coords=coords,
+                time_window=time_window,
+                window_records=window_records,
+                prefetch=prefetch),
+            key=None,
+            columnar=columnar,
+            entity_id=entity_id)
+
     # /entities/{entityId}/attrs/{attrName}/value
     def get_entity_attr_values_by_id(self,
                                      entity_id: str,
@@ -752,8 +1492,14 @@ class QuantumLeapClient(BaseHttpClient):
                                      georel: str = None,
                                      geometry: str = None,
                                      coords: str = None,
-                                     options: str = None
-                                     ) -> TimeSeries:
+                                     options: str = None,
+                                     max_workers: PositiveInt = None,
+                                     time_window: Union[
+                                         timedelta, str, AggrPeriod] = None,
+                                     window_records: PositiveInt = None,
+                                     columnar: bool = False
+                                     ) -> Union[TimeSeries,
+                                                ColumnarTimeSeries]:
         """
         History of an attribute (values only) of a given entity instance
         Similar to the previous, but focusing on the values regardless of the
@@ -779,6 +1525,18 @@ class QuantumLeapClient(BaseHttpClient):
             coords (String): Required if georel is specified.
                 e.g. 40.714,-74.006
             options (String): Key value pair options.
+            max_workers: Number of concurrent requests for results that
+                exceed a single chunk of 10000 records
+                or for time windows
+            time_window: Fetches the range between `from_date` and `to_date`
+                in concurrent windows of this length, e.g.,
+                `timedelta(days=7)` or 'month'. Avoids deep offsets for long
+                ranges. `limit` applies to every window.
+            window_records: Plans the windows by their estimated number of
+                records instead, using a count query per `time_window`
+                (default: 'day')
+            columnar: If True, the result is parsed with vectorized functions
+                into ColumnarTimeSeries with numpy arrays
 
         Returns:
             Response Model
@@ -797,7 +1555,17 @@ class QuantumLeapClient(BaseHttpClient):
                                      offset=offset,
                                      georel=georel,
                                      geometry=geometry,
-                                     coords=coords)
+                                     coords=coords,
+                                     max_workers=max_workers,
+                                     time_window=time_window,
+                                     window_records=window_records)
+        if columnar:
+            return ColumnarTimeSeries.concat(
+                ColumnarTimeSeries.from_json(item,
+                                             entity_id=entity_id,
+                                             attr_name=attr_name)
+                for item in res_q)
+
         # merge response chunks
         first = res_q.popleft()
         res = TimeSeries(
@@ -815,6 +1583,72 @@ class QuantumLeapClient(BaseHttpClient):
 
         return res
 
+    def iter_entity_attr_values_by_id(self,
+                                      entity_id: str,
+                                      attr_name: str,
+                                      *,
+                                      entity_type: str = None,
+                                      aggr_method: Union[
+                                          str, AggrMethod] = None,
+                                      aggr_period: Union[
+                                          str, AggrPeriod] = None,
+                                      from_date: str = None,
+                                      to_date: str = None,
+                                      limit: int = None,
+                                      offset: int = None,
+                                      georel: str = None,
+                                      geometry: str = None,
+                                      coords: str = None,
+                                      options: str = None,
+                                      time_window: Union[
+                                          timedelta, str, AggrPeriod] = None,
+                                      window_records: PositiveInt = None,
+                                      prefetch: int = 1,
+                                      columnar: bool = False
+                                      ) -> Iterator[Union[TimeSeries,
+                                          ColumnarTimeSeries]]:
+        """
+        Generator version of :meth:`get_entity_attr_values_by_id` for long
+        histories. Instead of merging all chunks of 10000 records, every chunk
+        is yielded as a separate time series as soon as it arrives, so that the
+        history can be processed in constant memory, e.g., via `to_pandas()`.
+        While the caller processes a chunk, the next ones are already
+        requested.
+
+        Args:
+            See :meth:`get_entity_attr_values_by_id`. `last_n` and
+            `max_workers` are not supported.
+            limit: Maximum number of records. Default: all records
+            prefetch: Number of chunks that are requested ahead
+            columnar: If True, ColumnarTimeSeries are yielded
+
+        Yields:
+            TimeSeries or ColumnarTimeSeries in index order
+        """
+        url = urljoin(self.base_url, f'v2/entities/{entity_id}/attrs'
+                                     f'/{attr_name}/value')
+        return self.__iter_series(
+            self.__iter_query(
+                url=url,
+                options=options,
+                entity_type=entity_type,
+                aggr_method=aggr_method,
+                aggr_period=aggr_period,
+                from_date=from_date,
+                to_date=to_date,
+                limit=limit,
+                offset=offset,
+                georel=georel,
+                geometry=geometry,
+                coords=coords,
+                time_window=time_window,
+                window_records=window_records,
+                prefetch=prefetch),
+            key=None,
+            columnar=columnar,
+            entity_id=entity_id,
+            attr_name=attr_name)
+
     # /types/{entityType}
     def get_entity_by_type(self,
                            entity_type: str,
@@ -832,8 +1666,14 @@ class QuantumLeapClient(BaseHttpClient):
                            geometry: str = None,
                            coords: str = None,
                            options: str = None,
-                           aggr_scope: Union[str, AggrScope] = None
-                           ) -> List[TimeSeries]:
+                           aggr_scope: Union[str, AggrScope] = None,
+                           max_workers: PositiveInt = None,
+                           time_window: Union[
+                               timedelta, str, AggrPeriod] = None,
+                           window_records: PositiveInt = None,
+                           columnar: bool = False
+                           ) -> Union[List[TimeSeries],
+                                      List[ColumnarTimeSeries]]:
         """
         History of N attributes of N entities of the same type.
         For example, query the average pressure, temperature and humidity of
@@ -854,19 +1694,85 @@ class QuantumLeapClient(BaseHttpClient):
                                      georel=georel,
                                      geometry=geometry,
                                      coords=coords,
-                                     aggr_scope=aggr_scope)
+                                     aggr_scope=aggr_scope,
+                                     max_workers=max_workers,
+                                     time_window=time_window,
+                                     window_records=window_records)
 
-        # merge chunks of response
-        res = [TimeSeries(entityType=entity_type, **item)
-               for item in res_q.popleft().get('entities')]
+        if columnar:
+            return self.__merge_columnar(
+                ColumnarTimeSeries.from_json(item, entity_type=entity_type)
+                for chunk in res_q for item in chunk.get('entities'))
 
-        for chunk in res_q:
-            chunk = [TimeSeries(entityType=entity_type, **item)
-                     for item in chunk.get('entities')]
-            for new, old in zip(chunk, res):
-                old.extend(new)
+        # merge chunks of response
+        return self.__merge_series(
+            TimeSeries(entityType=entity_type, **item)
+            for chunk in res_q for item in chunk.get('entities'))
+
+    def iter_entity_by_type(self,
+                            entity_type: str,
+                            *,
+                            attrs: str = None,
+                            entity_id: str = None,
+                            aggr_method: Union[str, AggrMethod] = None,
+                            aggr_period: Union[str, AggrPeriod] = None,
+                            from_date: str = None,
+                            to_date: str = None,
+                            limit: int = None,
+                            offset: int = None,
+                            georel: str = None,
+                            geometry: str = None,
+                            coords: str = None,
+                            options: str = None,
+                            aggr_scope: Union[str, AggrScope] = None,
+                            time_window: Union[
+                                timedelta, str, AggrPeriod] = None,
+                            window_records: PositiveInt = None,
+                            prefetch: int = 1,
+                            columnar: bool = False
+                            ) -> Iterator[Union[TimeSeries,
+                                                    ColumnarTimeSeries]]:
+        """
+        Generator version of :meth:`get_entity_by_type` for long histories.
+        Instead of merging all chunks of 10000 records, every chunk is yielded
+        as a separate time series as soon as it arrives, so that the history
+        can be processed in constant memory, e.g., via `to_pandas()`. While the
+        caller processes a chunk, the next ones are already requested. The time
+        series of the entities of a chunk are yielded one after another.
 
-        return res
+        Args:
+            See :meth:`get_entity_by_type`. `last_n` and `max_workers` are not
+            supported.
+            limit: Maximum number of records. Default: all records
+            prefetch: Number of chunks that are requested ahead
+            columnar: If True, ColumnarTimeSeries are yielded
+
+        Yields:
+            TimeSeries or ColumnarTimeSeries in index order
+        """
+        url = urljoin(self.base_url, f'/v2/types/{entity_type}')
+        return self.__iter_series(
+            self.__iter_query(
+                url=url,
+                entity_id=entity_id,
+                attrs=attrs,
+                options=options,
+                aggr_method=aggr_method,
+                aggr_period=aggr_period,
+                from_date=from_date,
+                to_date=to_date,
+                limit=limit,
+                offset=offset,
+                georel=georel,
+                geometry=geometry,
+                coords=coords,
+                aggr_scope=aggr_scope,
+                time_window=time_window,
+                window_records=window_records,
+                prefetch=prefetch),
+            key='entities',
+            columnar=columnar,
+            entity_type=entity_type)
 
     # /types/{entityType}/value
     def get_entity_values_by_type(self,
@@ -885,8 +1791,14 @@ class QuantumLeapClient(BaseHttpClient):
                                   geometry: str = None,
                                   coords: str = None,
                                   options: str = None,
-                                  aggr_scope: Union[str, AggrScope] = None
-                                  ) -> List[TimeSeries]:
+                                  aggr_scope: Union[str, AggrScope] = None,
+                                  max_workers: PositiveInt = None,
+                                  time_window: Union[
+                                      timedelta, str, AggrPeriod] = None,
+                                  window_records: PositiveInt = None,
+                                  columnar: bool = False
+                                  ) -> Union[List[TimeSeries],
+                                             List[ColumnarTimeSeries]]:
         """
         History of N attributes (values only) of N entities of the same type.
         For example, query the average pressure, temperature and humidity (
@@ -909,18 +1821,86 @@ class QuantumLeapClient(BaseHttpClient):
                                      georel=georel,
                                      geometry=geometry,
                                      coords=coords,
-                                     aggr_scope=aggr_scope)
-        # merge chunks of response
-        res = [TimeSeries(entityType=entity_type, **item)
-               for item in res_q.popleft().get('values')]
+                                     aggr_scope=aggr_scope,
+                                     max_workers=max_workers,
+                                     time_window=time_window,
+                                     window_records=window_records)
+        if columnar:
+            return self.__merge_columnar(
+                ColumnarTimeSeries.from_json(item, entity_type=entity_type)
+                for chunk in res_q for item in chunk.get('values'))
 
-        for chunk in res_q:
-            chunk = [TimeSeries(entityType=entity_type, **item)
-                     for item in chunk.get('values')]
-            for new, old in zip(chunk, res):
-                old.extend(new)
+        # merge chunks of response
+        return self.__merge_series(
+            TimeSeries(entityType=entity_type, **item)
+            for chunk in res_q for item in chunk.get('values'))
+
+    def iter_entity_values_by_type(self,
+                                   entity_type: str,
+                                   *,
+                                   attrs: str = None,
+                                   entity_id: str = None,
+                                   aggr_method: Union[str, AggrMethod] = None,
+                                   aggr_period: Union[str, AggrPeriod] = None,
+                                   from_date: str = None,
+                                   to_date: str = None,
+                                   limit: int = None,
+                                   offset: int = None,
+                                   georel: str = None,
+                                   geometry: str = None,
+                                   coords: str = None,
+                                   options: str = None,
+                                   aggr_scope: Union[str, AggrScope] = None,
+                                   time_window: Union[
+                                       timedelta, str, AggrPeriod] = None,
+                                   window_records: PositiveInt = None,
+                                   prefetch: int = 1,
+                                   columnar: bool = False
+                                   ) -> Iterator[Union[TimeSeries,
+                                       ColumnarTimeSeries]]:
+        """
+        Generator version of :meth:`get_entity_values_by_type` for long
+        histories. Instead of merging all chunks of 10000 records, every chunk
+        is yielded as a separate time series as soon as it arrives, so that the
+        history can be processed in constant memory, e.g., via `to_pandas()`.
+        While the caller processes a chunk, the next ones are already
+        requested. The time series of the entities of a chunk are yielded one
+        after another.
 
-        return res
+        Args:
+            See :meth:`get_entity_values_by_type`. `last_n` and `max_workers`
+            are not supported.
+            limit: Maximum number of records. Default: all records
+            prefetch: Number of chunks that are requested ahead
+            columnar: If True, ColumnarTimeSeries are yielded
+
+        Yields:
+            TimeSeries or ColumnarTimeSeries in index order
+        """
+        url = urljoin(self.base_url, f'/v2/types/{entity_type}/value')
+        return self.__iter_series(
+            self.__iter_query(
+                url=url,
+                entity_id=entity_id,
+                attrs=attrs,
+                options=options,
+                entity_type=entity_type,
+                aggr_method=aggr_method,
+                aggr_period=aggr_period,
+                from_date=from_date,
+                to_date=to_date,
+                limit=limit,
+                offset=offset,
+                georel=georel,
+                geometry=geometry,
+                coords=coords,
+                aggr_scope=aggr_scope,
+                time_window=time_window,
+                window_records=window_records,
+                prefetch=prefetch),
+            key='values',
+            columnar=columnar,
+            entity_type=entity_type)
 
     # /types/{entityType}/attrs/{attrName}
     def get_entity_attr_by_type(self,
@@ -939,8 +1919,14 @@ class QuantumLeapClient(BaseHttpClient):
                                 geometry: str = None,
                                 coords: str = None,
                                 options: str = None,
-                                aggr_scope: Union[str, AggrScope] = None
-                                ) -> List[TimeSeries]:
+                                aggr_scope: Union[str, AggrScope] = None,
+                                max_workers: PositiveInt = None,
+                                time_window: Union[
+                                    timedelta, str, AggrPeriod] = None,
+                                window_records: PositiveInt = None,
+                                columnar: bool = False
+                                ) -> Union[List[TimeSeries],
+                                           List[ColumnarTimeSeries]]:
         """
         History of an attribute of N entities of the same type.
         For example, query the pressure measurements of this month in all the
@@ -976,6 +1962,18 @@ class QuantumLeapClient(BaseHttpClient):
             coords (String): Required if georel is specified.
                 e.g. 40.714,-74.006
             options (String): Key value pair options.
+            max_workers: Number of concurrent requests for results that
+                exceed a single chunk of 10000 records
+                or for time windows
+            time_window: Fetches the range between `from_date` and `to_date`
+                in concurrent windows of this length, e.g.,
+                `timedelta(days=7)` or 'month'. Avoids deep offsets for long
+                ranges. `limit` applies to every window.
+            window_records: Plans the windows by their estimated number of
+                records instead, using a count query per `time_window`
+                (default: 'day')
+            columnar: If True, the result is parsed with vectorized functions
+                into ColumnarTimeSeries with numpy arrays
 
         Returns:
             Response Model
@@ -996,32 +1994,94 @@ class QuantumLeapClient(BaseHttpClient):
                                      georel=georel,
                                      geometry=geometry,
                                      coords=coords,
-                                     aggr_scope=aggr_scope)
+                                     aggr_scope=aggr_scope,
+                                     max_workers=max_workers,
+                                     time_window=time_window,
+                                     window_records=window_records)
+
+        if columnar:
+            return self.__merge_columnar(
+                ColumnarTimeSeries.from_json(item,
+                                             entity_type=entity_type,
+                                             attr_name=chunk.get('attrName'))
+                for chunk in res_q for item in chunk.get('entities'))
 
         # merge chunks of response
-        first = res_q.popleft()
-        res = [TimeSeries(index=item.get('index'),
-                          entityType=entity_type,
-                          entityId=item.get('entityId'),
-                          attributes=[
-                              AttributeValues(
-                                  attrName=first.get('attrName'),
-                                  values=item.get('values'))])
-               for item in first.get('entities')]
-
-        for chunk in res_q:
-            chunk = [TimeSeries(index=item.get('index'),
-                                entityType=entity_type,
-                                entityId=item.get('entityId'),
-                                attributes=[
-                                    AttributeValues(
-                                        attrName=chunk.get('attrName'),
-                                        values=item.get('values'))])
-                     for item in chunk.get('entities')]
-            for new, old in zip(chunk, res):
-                old.extend(new)
+        return self.__merge_series(
+            TimeSeries(index=item.get('index'),
+                       entityType=entity_type,
+                       entityId=item.get('entityId'),
+                       attributes=[
+                           AttributeValues(attrName=chunk.get('attrName'),
+                                           values=item.get('values'))])
+            for chunk in res_q for item in chunk.get('entities'))
+
+    def iter_entity_attr_by_type(self,
+                                 entity_type: str,
+                                 attr_name: str,
+                                 *,
+                                 entity_id: str = None,
+                                 aggr_method: Union[str, AggrMethod] = None,
+                                 aggr_period: Union[str, AggrPeriod] = None,
+                                 from_date: str = None,
+                                 to_date: str = None,
+                                 limit: int = None,
+                                 offset: int = None,
+                                 georel: str = None,
+                                 geometry: str = None,
+                                 coords: str = None,
+                                 options: str = None,
+                                 aggr_scope: Union[str, AggrScope] = None,
+                                 time_window: Union[
+                                     timedelta, str, AggrPeriod] = None,
+                                 window_records: PositiveInt = None,
+                                 prefetch: int = 1,
+                                 columnar: bool = False
+                                 ) -> Iterator[Union[TimeSeries,
+                                                         ColumnarTimeSeries]]:
+        """
+        Generator version of :meth:`get_entity_attr_by_type` for long
+        histories. Instead of merging all chunks of 10000 records, every chunk
+        is yielded as a separate time series as soon as it arrives, so that the
+        history can be processed in constant memory, e.g., via `to_pandas()`.
+        While the caller processes a chunk, the next ones are already
+        requested. The time series of the entities of a chunk are yielded one
+        after another.
 
-        return res
+        Args:
+            See :meth:`get_entity_attr_by_type`. `last_n` and `max_workers` are
+            not supported.
+            limit: Maximum number of records. Default: all records
+            prefetch: Number of chunks that are requested ahead
+            columnar: If True, ColumnarTimeSeries are yielded
+
+        Yields:
+            TimeSeries or ColumnarTimeSeries in index order
+        """
+        url = urljoin(self.base_url, f'/v2/types/{entity_type}/attrs'
+                                     f'/{attr_name}')
+        return self.__iter_series(
+            self.__iter_query(
+                url=url,
+                entity_id=entity_id,
+                options=options,
+                entity_type=entity_type,
+                aggr_method=aggr_method,
+                aggr_period=aggr_period,
+                from_date=from_date,
+                to_date=to_date,
+                limit=limit,
+                offset=offset,
+                georel=georel,
+                geometry=geometry,
+                coords=coords,
+                aggr_scope=aggr_scope,
+                time_window=time_window,
+                window_records=window_records,
+                prefetch=prefetch),
+            key='entities',
+            columnar=columnar,
+            entity_type=entity_type)
 
     # /types/{entityType}/attrs/{attrName}/value
     def get_entity_attr_values_by_type(self,
@@ -1042,8 +2102,14 @@ class QuantumLeapClient(BaseHttpClient):
                                        geometry: str = None,
                                        coords: str = None,
                                        options: str = None,
-                                       aggr_scope: Union[str, AggrScope] = None
-                                       ) -> List[TimeSeries]:
+                                       aggr_scope: Union[str, AggrScope] = None,
+                                       max_workers: PositiveInt = None,
+                                       time_window: Union[
+                                           timedelta, str, AggrPeriod] = None,
+                                       window_records: PositiveInt = None,
+                                       columnar: bool = False
+                                       ) -> Union[List[TimeSeries],
+                                                  List[ColumnarTimeSeries]]:
         """
         History of an attribute (values only) of N entities of the same type.
         For example, query the average pressure (values only, no metadata) of
@@ -1071,6 +2137,18 @@ class QuantumLeapClient(BaseHttpClient):
             coords (String): Required if georel is specified.
                 e.g. 40.714,-74.006
             options (String): Key value pair options.
+            max_workers: Number of concurrent requests for results that
+                exceed a single chunk of 10000 records
+                or for time windows
+            time_window: Fetches the range between `from_date` and `to_date`
+                in concurrent windows of this length, e.g.,
+                `timedelta(days=7)` or 'month'. Avoids deep offsets for long
+                ranges. `limit` applies to every window.
+            window_records: Plans the windows by their estimated number of
+                records instead, using a count query per `time_window`
+                (default: 'day')
+            columnar: If True, the result is parsed with vectorized functions
+                into ColumnarTimeSeries with numpy arrays
 
         Returns:
             Response Model
@@ -1091,27 +2169,95 @@ class QuantumLeapClient(BaseHttpClient):
                                      georel=georel,
                                      geometry=geometry,
                                      coords=coords,
-                                     aggr_scope=aggr_scope)
+                                     aggr_scope=aggr_scope,
+                                     max_workers=max_workers,
+                                     time_window=time_window,
+                                     window_records=window_records)
+
+        if columnar:
+            return self.__merge_columnar(
+                ColumnarTimeSeries.from_json(item,
+                                             entity_type=entity_type,
+                                             attr_name=attr_name)
+                for chunk in res_q for item in chunk.get('values'))
 
         # merge chunks of response
-        res = [TimeSeries(index=item.get('index'),
-                          entityType=entity_type,
-                          entityId=item.get('entityId'),
-                          attributes=[
-                              AttributeValues(attrName=attr_name,
-                                              values=item.get('values'))])
-               for item in res_q.popleft().get('values')]
-
-        for chunk in res_q:
-            chunk = [TimeSeries(index=item.get('index'),
-                                entityType=entity_type,
-                                entityId=item.get('entityId'),
-                                attributes=[
-                                    AttributeValues(attrName=attr_name,
-                                                    values=item.get('values'))])
-                     for item in chunk.get('values')]
-
-            for new, old in zip(chunk, res):
-                old.extend(new)
+        return self.__merge_series(
+            TimeSeries(index=item.get('index'),
+                       entityType=entity_type,
+                       entityId=item.get('entityId'),
+                       attributes=[
+                           AttributeValues(attrName=attr_name,
+                                           values=item.get('values'))])
+            for chunk in res_q for item in chunk.get('values'))
+
+    def iter_entity_attr_values_by_type(self,
+                                        entity_type: str,
+                                        attr_name: str,
+                                        *,
+                                        entity_id: str = None,
+                                        aggr_method: Union[
+                                            str, AggrMethod] = None,
+                                        aggr_period: Union[
+                                            str, AggrPeriod] = None,
+                                        from_date: str = None,
+                                        to_date: str = None,
+                                        limit: int = None,
+                                        offset: int = None,
+                                        georel: str = None,
+                                        geometry: str = None,
+                                        coords: str = None,
+                                        options: str = None,
+                                        aggr_scope: Union[
+                                            str, AggrScope] = None,
+                                        time_window: Union[
+                                            timedelta, str, AggrPeriod] = None,
+                                        window_records: PositiveInt = None,
+                                        prefetch: int = 1,
+                                        columnar: bool = False
+                                        ) -> Iterator[Union[TimeSeries,
+                                            ColumnarTimeSeries]]:
+        """
+        Generator version of :meth:`get_entity_attr_values_by_type` for long
+        histories. Instead of merging all chunks of 10000 records, every chunk
+        is yielded as a separate time series as soon as it arrives, so that the
+        history can be processed in constant memory, e.g., via `to_pandas()`.
+        While the caller processes a chunk, the next ones are already
+        requested. The time series of the entities of a chunk are yielded one
+        after another.
 
-        return res
+        Args:
+            See :meth:`get_entity_attr_values_by_type`. `last_n` and
+            `max_workers` are not supported.
+            limit: Maximum number of records. Default: all records
+            prefetch: Number of chunks that are requested ahead
+            columnar: If True, ColumnarTimeSeries are yielded
+
+        Yields:
+            TimeSeries or ColumnarTimeSeries in index order
+        """
+        url = urljoin(self.base_url, f'/v2/types/{entity_type}/attrs/'
+                                     f'{attr_name}/value')
+        return self.__iter_series(
+            self.__iter_query(
+                url=url,
+                entity_id=entity_id,
+                options=options,
+                entity_type=entity_type,
+                aggr_method=aggr_method,
+                aggr_period=aggr_period,
+                from_date=from_date,
+                to_date=to_date,
+                limit=limit,
+                offset=offset,
+                georel=georel,
+                geometry=geometry,
+                coords=coords,
+                aggr_scope=aggr_scope,
+                time_window=time_window,
+                window_records=window_records,
+                prefetch=prefetch),
+            key='values',
+            columnar=columnar,
+            entity_type=entity_type,
+            attr_name=attr_name)
@@ -0,0 +1,442 @@
+"""
+Asynchronous HTTP receiver for notifications of context broker subscriptions
+"""
+import asyncio
+import inspect
+import json
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, \
+    Union
+
+from pydantic import BaseModel, Field, PositiveInt, PositiveFloat
+from filip.models.ngsi_v2.base import AttrsFormat, ValidationMode
+from filip.models.ngsi_v2.context import ContextEntity, ContextEntityKeyValues
+from filip.models.ngsi_v2.subscriptions import Message
+
+
+logger = logging.getLogger(__name__)
+
+NotificationHandler = Callable[[List[Message]], Union[None, Awaitable[None]]]
+
+
+def parse_message(body: Union[bytes, str],
+                  attrs_format: Optional[str] = None,
+                  validate: ValidationMode = ValidationMode.STRICT) -> Message:
+    """
+    Builds the message model of a notification body. KeyValues
+    notifications and, unless validation is strict, normalized notifications
+    are built without validation.
+
+    Args:
+        body: Raw body of the notification
+        attrs_format: Attribute format of the notification. If `None`, the
+            normalized format is assumed.
+        validate: Validation mode for normalized entities
+
+    Returns:
+        Message
+    """
+    if attrs_format == AttrsFormat.KEY_VALUES:
+        data = json.loads(body)
+        return Message.construct(
+            subscriptionId=data.get('subscriptionId'),
+            data=[ContextEntityKeyValues.construct(**entity)
+                  for entity in data.get('data', [])])
+    if attrs_format in (None, AttrsFormat.NORMALIZED) and \
+            validate != ValidationMode.STRICT:
+        data = json.loads(body)
+        return Message.construct(
+            subscriptionId=data.get('subscriptionId'),
+            data=[ContextEntity.construct_trusted(entity)
+                  for entity in data.get('data', [])])
+    return Message.parse_raw(body)
+
+
+class ReceiverStatistics(BaseModel):
+    """
+    Throughput and latency counters of a notification receiver
+    """
+    received: int = Field(
+        default=0,
+        description="Number of received notifications"
+    )
+    dispatched: int = Field(
+        default=0,
+        description="Number of notifications passed to all matching handlers"
+    )
+    rejected: int = Field(
+        default=0,
+        description="Number of requests that could not be parsed"
+    )
+    failed: int = Field(
+        default=0,
+        description="Number of failed handler calls"
+    )
+    batches: int = Field(
+        default=0,
+        description="Number of batches that were dispatched"
+    )
+    uptime: float = Field(
+        default=0,
+        description="Time in seconds since the receiver was started"
+    )
+    mean_latency: float = Field(
+        default=0,
+        description="Mean time in seconds between receiving a notification "
+                    "and the completion of its handlers"
+    )
+    max_latency: float = Field(
+        default=0,
+        description="Maximum latency in seconds"
+    )
+
+    @property
+    def throughput(self) -> float:
+        """
+        Dispatched notifications per second since the start
+        """
+        return self.dispatched / self.uptime if self.uptime else 0.0
+
+
+class NotificationReceiver:
+    """
+    Lightweight asyncio HTTP server that receives the notifications of
+    context broker subscriptions. Incoming messages are queued and
+    dispatched in batches to registered handlers by a bounded number of
+    workers. If the queue is full, requests are not answered until there is
+    capacity again, which slows down the sender (backpressure).
+
+    Notifications in 'keyValues' format are not validated at all, while
+    normalized notifications are built according to `validate`.
+
+    Example::
+
+        >>> receiver = NotificationReceiver(port=8080)
+        >>> @receiver.handler(entity_type='Room')
+        >>> async def on_rooms(messages: List[Message]):
+        >>>     for message in messages:
+        >>>         print(message.data)
+        >>> async with receiver:
+        >>>     await asyncio.sleep(3600)
+
+    Subscriptions need to point to the url of the receiver, e.g.
+    `http://<host>:8080/notify`. The path is ignored.
+
+    Args:
+        host: Interface the server binds to
+        port: Port of the server. `0` selects a free port.
+        workers: Number of concurrent workers that call the handlers
+        max_queue_size: Maximum number of queued notifications
+        batch_size: Maximum number of notifications per handler call
+        batch_interval: Maximum time in seconds a worker waits to fill a
+            batch
+        validate: How normalized entities are built, see
+            :class:`filip.models.ngsi_v2.base.ValidationMode`. The lazy mode
+            is treated as construct mode.
+    """
+    def __init__(self,
+                 *,
+                 host: str = '0.0.0.0',
+                 port: int = 0,
+                 workers: PositiveInt = 4,
+                 max_queue_size: PositiveInt = 10000,
+                 batch_size: PositiveInt = 100,
+                 batch_interval: PositiveFloat = 0.01,
+                 validate: Union[bool, ValidationMode, str] = True):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        if isinstance(validate, bool):
+            validate = ValidationMode.STRICT if validate \
+                else ValidationMode.CONSTRUCT
+        self.validate = ValidationMode(validate)
+
+        self._handlers: List[Tuple[NotificationHandler,
+                                   Optional[str],
+                                   Optional[str]]] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+        self._latency_sum = 0.0
+        self._statistics = ReceiverStatistics()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    @property
+    def statistics(self) -> ReceiverStatistics:
+        """
+        Current throughput and latency counters
+        """
+        statistics = self._statistics.copy()
+        if self._started:
+            statistics.uptime = time.monotonic() - self._started
+        return statistics
+
+    def add_handler(self,
+                    handler: NotificationHandler,
+                    *,
+                    subscription_id: str = None,
+                    entity_type: str = None) -> None:
+        """
+        Registers a handler. It is called with a list of messages, either as
+        coroutine function or as regular function, which is executed in a
+        thread.
+
+        Args:
+            handler: Callable that takes a list of messages
+            subscription_id: If given, only messages of this subscription are
+                passed to the handler
+            entity_type: If given, only entities of this type are passed to
+                the handler. Messages without matching entities are skipped.
+        """
+        self._handlers.append((handler, subscription_id, entity_type))
+
+    def handler(self,
+                *,
+                subscription_id: str = None,
+                entity_type: str = None) \
+            -> Callable[[NotificationHandler], NotificationHandler]:
+        """
+        Decorator version of :meth:`add_handler`
+        """
+        def decorator(func: NotificationHandler) -> NotificationHandler:
+            self.add_handler(func,
+                             subscription_id=subscription_id,
+                             entity_type=entity_type)
+            return func
+        return decorator
+
+    def remove_handler(self, handler: NotificationHandler) -> None:
+        """
+        Removes all registrations of a handler
+
+        Args:
+            handler: Previously registered handler
+        """
+        self._handlers = [entry for entry in self._handlers
+                          if entry[0] is not handler]
+
+    async def start(self) -> None:
+        """
+        Starts the server and the workers
+        """
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._server = await asyncio.start_server(self.__handle_connection,
+                                                  host=self.host,
+                                                  port=self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._tasks = [asyncio.ensure_future(self.__worker())
+                       for _ in range(self.workers)]
+        self._started = time.monotonic()
+        logger.info("Notification receiver listening on %s:%s",
+                    self.host, self.port)
+
+    async def stop(self) -> None:
+        """
+        Stops accepting notifications, dispatches all queued ones and stops
+        the workers
+        """
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def start_in_thread(self) -> None:
+        """
+        Runs the receiver in a background thread with its own event loop,
+        e.g., for synchronous applications. Returns as soon as the server
+        is listening.
+        """
+        started = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.start())
+            except Exception as err:
+                errors.append(err)
+                started.set()
+                return
+            started.set()
+            self._loop.run_forever()
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run,
+                                        name=self.__class__.__name__,
+                                        daemon=True)
+        self._thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+
+    def stop_thread(self) -> None:
+        """
+        Stops a receiver that was started with :meth:`start_in_thread`
+        """
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    async def __handle_connection(self,
+                                  reader: asyncio.StreamReader,
+                                  writer: asyncio.StreamWriter) -> None:
+        """
+        Minimal HTTP/1.1 server supporting persistent connections
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(
+                    int(headers.get('content-length', 0)))
+                status = await self.__handle_request(
+                    method=request_line.split(b' ', 1)[0],
+                    headers=headers,
+                    body=body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(f"HTTP/1.1 {status}\r\n"
+                             f"Content-Length: 0\r\n"
+                             f"Connection: "
+                             f"{'keep-alive' if keep_alive else 'close'}"
+                             f"\r\n\r\n".encode())
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) \
+                as err:
+            logger.debug("Connection closed: %s", err)
+        finally:
+            writer.close()
+
+    async def __handle_request(self,
+                               method: bytes,
+                               headers: Dict[str, str],
+                               body: bytes) -> str:
+        """
+        Parses a notification and puts it into the queue
+
+        Returns:
+            HTTP status line
+        """
+        if method != b'POST':
+            return "405 Method Not Allowed"
+        received = time.monotonic()
+        try:
+            message = parse_message(
+                body=body,
+                attrs_format=headers.get('ngsiv2-attrsformat'),
+                validate=self.validate)
+        except Exception as err:
+            logger.error("Invalid notification: %s", err)
+            self._statistics.rejected += 1
+            return "400 Bad Request"
+        self._statistics.received += 1
+        await self._queue.put((received, message))
+        return "204 No Content"
+
+    async def __worker(self) -> None:
+        """
+        Collects batches from the queue and dispatches them
+        """
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.batch_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(),
+                                                        timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self.__dispatch([message for _, message in batch])
+            finally:
+                done = time.monotonic()
+                for received, _ in batch:
+                    latency = done - received
+                    self._latency_sum += latency
+                    self._statistics.max_latency = max(
+                        self._statistics.max_latency, latency)
+                self._statistics.dispatched += len(batch)
+                self._statistics.batches += 1
+                self._statistics.mean_latency = \
+                    self._latency_sum / self._statistics.dispatched
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def __dispatch(self, messages: List[Message]) -> None:
+        """
+        Calls all matching handlers with the batch of messages
+        """
+        calls = []
+        for handler, subscription_id, entity_type in self._handlers:
+            selected = self.__select(messages,
+                                     subscription_id=subscription_id,
+                                     entity_type=entity_type)
+            if not selected:
+                continue
+            if inspect.iscoroutinefunction(handler):
+                calls.append(handler(selected))
+            else:
+                calls.append(asyncio.get_event_loop().run_in_executor(
+                    None, handler, selected))
+        for result in await asyncio.gather(*calls, return_exceptions=True):
+            if isinstance(result, Exception):
+                self._statistics.failed += 1
+                logger.error("Notification handler failed: %s", result)
+
+    @staticmethod
+    def __select(messages: List[Message],
+                 subscription_id: Optional[str],
+                 entity_type: Optional[str]) -> List[Message]:
+        """
+        Filters the messages for a handler
+        """
+        if subscription_id is not None:
+            messages = [message for message in messages
+                        if message.subscriptionId == subscription_id]
+        if entity_type is None:
+            return messages
+        selected = []
+        for message in messages:
+            data = [entity for entity in message.data
+                    if entity.type == entity_type]
+            if len(data) == len(message.data):
+                selected.append(message)
+            elif data:
+                selected.append(Message.construct(
+                    subscriptionId=message.subscriptionId, data=data))
+        return selected
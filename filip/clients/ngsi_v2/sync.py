@@ -0,0 +1,268 @@
+"""
+Incremental synchronization of the entities of two context brokers
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple, \
+    TYPE_CHECKING, Union
+
+from pydantic import BaseModel, Field, PositiveInt
+from filip.models.ngsi_v2.base import AttrsFormat
+from filip.models.ngsi_v2.context import ActionType, ContextEntity
+
+if TYPE_CHECKING:
+    from filip.clients.ngsi_v2.cb import ContextBrokerClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class SyncCheckpoint(BaseModel):
+    """
+    Persisted state of a synchronization
+    """
+    initialized: bool = Field(
+        default=False,
+        description="True if the initial copy was completed"
+    )
+    watermark: Optional[str] = Field(
+        default=None,
+        description="Latest 'dateModified' of the source that was applied "
+                    "to the target"
+    )
+    last_deletion_check: Optional[datetime] = Field(
+        default=None,
+        description="Time of the last deletion detection"
+    )
+
+
+class SyncResult(BaseModel):
+    """
+    Result of a single synchronization cycle
+    """
+    copied: int = Field(
+        default=0,
+        description="Number of entities written to the target"
+    )
+    deleted: int = Field(
+        default=0,
+        description="Number of entities deleted from the target"
+    )
+    watermark: Optional[str] = Field(
+        default=None,
+        description="Watermark after the cycle"
+    )
+
+
+class ContextBrokerSync:
+    """
+    Keeps the entities of a target context broker in sync with a source,
+    e.g., for federation or blue/green migrations. The first cycle streams
+    a full copy. Every further cycle only fetches the entities whose
+    'dateModified' is not older than the watermark and applies them as
+    'append' batch operations. Deleted entities are detected by comparing
+    the id sets of both brokers every `deletion_interval` seconds.
+
+    Instances are usually created via
+    :meth:`filip.clients.ngsi_v2.cb.ContextBrokerClient.sync_to`.
+
+    Example::
+
+        >>> sync = source.sync_to(target, checkpoint='sync.json')
+        >>> sync.run(interval=10)
+
+    Note:
+        Attributes that are removed from an entity of the source are not
+        removed in the target. The entities at the watermark are applied
+        again in the next cycle, which is idempotent.
+
+    Args:
+        source: Client of the primary context broker
+        target: Client of the context broker that is kept in sync
+        entity_types: Synchronized entity types. If `None`, all entities
+            are synchronized. Deletion detection only considers these types.
+        id_pattern: Pattern for the ids of the synchronized entities
+        checkpoint: JSON file the checkpoint is persisted to after every
+            cycle. If it exists, the synchronization resumes from it.
+        deletion_interval: Time in seconds between two deletion detections.
+            If `None`, deletions are not detected.
+        page_size: Number of entities per request and per batch
+        chunk_size: Number of entities per batch request to the target
+        max_workers: Number of threads sending batches concurrently
+    """
+    def __init__(self,
+                 source: ContextBrokerClient,
+                 target: ContextBrokerClient,
+                 *,
+                 entity_types: List[str] = None,
+                 id_pattern: str = None,
+                 checkpoint: Union[str, Path] = None,
+                 deletion_interval: Optional[float] = 3600,
+                 page_size: PositiveInt = 1000,
+                 chunk_size: PositiveInt = None,
+                 max_workers: PositiveInt = None):
+        self.source = source
+        self.target = target
+        self.entity_types = entity_types
+        self.id_pattern = id_pattern
+        self.deletion_interval = deletion_interval
+        self.page_size = page_size
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.checkpoint_path = Path(checkpoint) if checkpoint else None
+        if self.checkpoint_path and self.checkpoint_path.exists():
+            self.checkpoint = SyncCheckpoint.parse_file(self.checkpoint_path)
+        else:
+            self.checkpoint = SyncCheckpoint()
+
+    def save_checkpoint(self) -> None:
+        """
+        Writes the checkpoint to its file. The file is replaced atomically,
+        so that an interrupted write does not corrupt it.
+        """
+        if self.checkpoint_path is None:
+            return
+        tmp = self.checkpoint_path.with_suffix('.tmp')
+        tmp.write_text(self.checkpoint.json(indent=2))
+        tmp.replace(self.checkpoint_path)
+
+    def sync(self) -> SyncResult:
+        """
+        Runs a single synchronization cycle. The initial copy is done in the
+        first cycle, all further cycles are incremental.
+
+        Returns:
+            SyncResult
+        """
+        result = SyncResult()
+        if not self.checkpoint.initialized:
+            result.copied = self.__initial_copy()
+        else:
+            result.copied = self.__apply_changes()
+        if self.deletion_interval is not None:
+            last = self.checkpoint.last_deletion_check
+            if last is None or (datetime.now().astimezone() - last)\
+                    .total_seconds() >= self.deletion_interval:
+                result.deleted = self.detect_deletions()
+        result.watermark = self.checkpoint.watermark
+        self.save_checkpoint()
+        logger.info("Synchronized %s and deleted %s entities, watermark: %s",
+                    result.copied, result.deleted, result.watermark)
+        return result
+
+    def run(self,
+            interval: float = 10,
+            stop_event: threading.Event = None) -> None:
+        """
+        Runs synchronization cycles until the stop event is set
+
+        Args:
+            interval: Time in seconds between the start of two cycles
+            stop_event: Event that ends the loop. If `None`, the loop runs
+                forever.
+        """
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            started = time.monotonic()
+            self.sync()
+            stop_event.wait(max(0.0, interval - (time.monotonic() - started)))
+
+    def detect_deletions(self) -> int:
+        """
+        Deletes the entities from the target that do not exist in the source
+        anymore
+
+        Returns:
+            Number of deleted entities
+        """
+        deleted = self.__ids(self.target) - self.__ids(self.source)
+        if deleted:
+            self.target.update(entities=[ContextEntity(id=entity_id,
+                                                       type=entity_type)
+                                         for entity_id, entity_type in deleted],
+                               action_type=ActionType.DELETE,
+                               chunk_size=self.chunk_size,
+                               max_workers=self.max_workers)
+        self.checkpoint.last_deletion_check = datetime.now().astimezone()
+        return len(deleted)
+
+    def __ids(self, client: ContextBrokerClient) -> Set[Tuple[str, str]]:
+        """
+        Ids and types of all synchronized entities of a broker
+        """
+        return {(item['id'], item['type']) for item in client.iter_entities(
+            entity_types=self.entity_types,
+            id_pattern=self.id_pattern,
+            attrs=['dateCreated'],
+            response_format=AttrsFormat.KEY_VALUES,
+            page_size=self.page_size,
+            parse=False,
+            pagination='keyset')}
+
+    def __initial_copy(self) -> int:
+        """
+        Copies all entities. The watermark is taken before the copy, so that
+        entities changed during the copy are applied again afterwards.
+        """
+        latest = next(self.source.iter_entities(
+            entity_types=self.entity_types,
+            id_pattern=self.id_pattern,
+            attrs=['dateModified'],
+            order_by='!dateModified',
+            limit=1,
+            response_format=AttrsFormat.KEY_VALUES,
+            parse=False), None)
+        watermark = latest['dateModified'] if latest else None
+        entities = self.source.iter_entities(entity_types=self.entity_types,
+                                             id_pattern=self.id_pattern,
+                                             page_size=self.page_size,
+                                             parse=False,
+                                             pagination='keyset')
+        copied = 0
+        while True:
+            page = list(islice(entities, self.page_size))
+            if not page:
+                break
+            copied += self.__apply(page)
+        self.checkpoint.initialized = True
+        self.checkpoint.watermark = watermark
+        return copied
+
+    def __apply_changes(self) -> int:
+        """
+        Applies all entities modified since the watermark. The checkpoint
+        advances after every page, so an interrupted cycle resumes there.
+        Pages continue at the date of their last entity without an offset,
+        hence no entity before the watermark can have been skipped.
+        """
+        copied = 0
+        for page in self.source.iter_entity_changes(
+                since=self.checkpoint.watermark,
+                entity_types=self.entity_types,
+                id_pattern=self.id_pattern,
+                page_size=self.page_size):
+            watermark = page[-1]['dateModified']['value']
+            for item in page:
+                item.pop('dateModified', None)
+            copied += self.__apply(page)
+            self.checkpoint.watermark = watermark
+            self.save_checkpoint()
+        return copied
+
+    def __apply(self, items: List[Dict]) -> int:
+        """
+        Writes raw entities to the target
+        """
+        self.target.update(entities=[ContextEntity.construct_trusted(item)
+                                     for item in items],
+                           action_type=ActionType.APPEND,
+                           override_metadata=True,
+                           chunk_size=self.chunk_size,
+                           max_workers=self.max_workers)
+        return len(items)
@@ -0,0 +1,463 @@
+"""
+Incremental on-disk cache for histories of QuantumLeap
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import shutil
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TYPE_CHECKING, Union
+
+import numpy as np
+import pandas as pd
+import requests
+from aenum import Enum
+from pydantic import BaseModel, Field, PositiveInt, parse_obj_as
+
+from filip.models.ngsi_v2.timeseries import \
+    AggrMethod, \
+    AggrPeriod, \
+    ColumnarTimeSeries, \
+    TimeSeries
+from filip.utils.datetime import \
+    convert_datetime_to_iso_8601_with_z_suffix, \
+    transform_to_utc_datetime
+
+if TYPE_CHECKING:
+    from filip.clients.ngsi_v2.quantumleap import QuantumLeapClient
+
+
+logger = logging.getLogger(__name__)
+
+_INDEX = '__index__'
+_JSON = {b'encoding': b'json'}
+
+
+class CacheFormat(str, Enum):
+    """
+    File formats of the time series cache
+    """
+    _init_ = 'value __doc__'
+
+    PARQUET = "parquet", "Compressed Parquet files. Requires 'pyarrow'."
+    ARROW = "arrow", "Arrow IPC files that are memory-mapped when read. " \
+                     "Requires 'pyarrow'."
+
+
+class CacheEntry(BaseModel):
+    """
+    Metadata of the cached history of a single key
+    """
+    key: Dict[str, Any] = Field(
+        description="Service, service path, entity, attributes and "
+                    "aggregation of the cached history"
+    )
+    entity_type: Optional[str] = Field(
+        default=None,
+        description="Type of the entity as returned by QuantumLeap"
+    )
+    start: Optional[datetime] = Field(
+        default=None,
+        description="Start of the cached range. If None, the history is "
+                    "cached from its beginning."
+    )
+    watermark: Optional[datetime] = Field(
+        default=None,
+        description="Latest index that is cached"
+    )
+    parts: List[str] = Field(
+        default=[],
+        description="Files of the entry in the order they were written"
+    )
+
+
+def _from_json(values: np.ndarray) -> np.ndarray:
+    """
+    Decodes an array of JSON strings into a one-dimensional object array
+    """
+    decoded = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        decoded[i] = None if value is None else json.loads(value)
+    return decoded
+
+
+def _to_utc(dt: Union[str, datetime]) -> datetime:
+    """
+    Parses a datetime and converts it to UTC. Naive datetimes are
+    interpreted as UTC, as QuantumLeap does.
+    """
+    dt = parse_obj_as(datetime, dt)
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=transform_to_utc_datetime(dt).tzinfo)
+    return transform_to_utc_datetime(dt)
+
+
+def _to_datetime64(dt: datetime) -> np.datetime64:
+    """
+    Converts a datetime to a naive datetime64 in UTC like the index of
+    ColumnarTimeSeries
+    """
+    return np.datetime64(_to_utc(dt).replace(tzinfo=None), 'us')
+
+
+class TimeSeriesCache:
+    """
+    Incremental on-disk cache for histories of QuantumLeap, e.g., for
+    notebooks and batch jobs that analyse the same histories again and
+    again. Every history is stored under a key of service, service path,
+    entity, attributes and aggregation. The first read downloads the
+    history. Every further read only requests the records after the latest
+    cached index (the watermark), appends them as a new file and serves the
+    combined result from disk.
+
+    Instances are usually created via
+    :meth:`filip.clients.ngsi_v2.quantumleap.QuantumLeapClient.history_cache`.
+
+    Example::
+
+        >>> cache = client.history_cache('~/.cache/filip')
+        >>> cache.get_entity_by_id('Room1', attrs='temperature',
+        >>>                        from_date='2023-01-01', columnar=True)
+
+    Note:
+        The cache always covers the range from the earliest requested
+        `from_date` up to the latest refresh. Records that are inserted into
+        QuantumLeap before the watermark afterwards are not picked up. The
+        cache is safe for threads, but not for multiple processes.
+
+    Args:
+        client: Client that requests the histories
+        path: Directory of the cache
+        file_format: File format of the cached histories
+        max_parts: Number of files per key after which they are compacted
+            into a single file
+    """
+    def __init__(self,
+                 client: QuantumLeapClient,
+                 path: Union[str, Path],
+                 *,
+                 file_format: Union[str, CacheFormat] = CacheFormat.PARQUET,
+                 max_parts: PositiveInt = 32):
+        try:
+            import pyarrow
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError as err:
+            raise ImportError("The time series cache requires 'pyarrow'. "
+                              "Install it via 'pip install filip[cache]'.") \
+                from err
+        self._pa = pyarrow
+        self.client = client
+        self.path = Path(path).expanduser()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.file_format = CacheFormat(file_format)
+        self.max_parts = max_parts
+        self._lock = threading.Lock()
+
+    def get_entity_by_id(self,
+                         entity_id: str,
+                         *,
+                         attrs: str = None,
+                         entity_type: str = None,
+                         aggr_method: Union[str, AggrMethod] = None,
+                         aggr_period: Union[str, AggrPeriod] = None,
+                         from_date: Union[str, datetime] = None,
+                         to_date: Union[str, datetime] = None,
+                         refresh: bool = True,
+                         columnar: bool = False
+                         ) -> Union[TimeSeries, ColumnarTimeSeries]:
+        """
+        History of N attributes of a given entity instance, see
+        :meth:`QuantumLeapClient.get_entity_by_id`. The history is served
+        from the cache, which is refreshed before.
+
+        Args:
+            entity_id: Entity id
+            attrs: Comma-separated list of attribute names. If None, all
+                attributes are cached.
+            entity_type: Entity type to resolve ambiguity of the id
+            aggr_method: Aggregation method, requires `aggr_period`
+            aggr_period: Aggregation period
+            from_date: Starting date and time inclusive. If it is earlier than
+                the cached range, the missing records are requested.
+            to_date: Final date and time inclusive. Does not limit the
+                refresh.
+            refresh: If False, newer records are not requested, unless the
+                history is not cached yet.
+            columnar: If True, the result is returned as ColumnarTimeSeries
+
+        Returns:
+            TimeSeries or ColumnarTimeSeries
+        """
+        if aggr_method and not aggr_period:
+            raise ValueError("Only aggregations with 'aggr_period' can be "
+                             "cached!")
+        aggr_method = AggrMethod(aggr_method).value if aggr_method else None
+        aggr_period = AggrPeriod(aggr_period).value if aggr_period else None
+        if attrs:
+            attrs = ','.join(sorted(attr.strip()
+                                    for attr in attrs.split(',')))
+        fiware_header = self.client.fiware_headers
+        key = {'service': fiware_header.service,
+               'service_path': fiware_header.service_path,
+               'entity_id': entity_id,
+               'entity_type': entity_type,
+               'attrs': attrs,
+               'aggr_method': aggr_method,
+               'aggr_period': aggr_period}
+        query = {'attrs': attrs,
+                 'entity_type': entity_type,
+                 'aggr_method': aggr_method,
+                 'aggr_period': aggr_period}
+        start = _to_utc(from_date) if from_date else None
+
+        with self._lock:
+            directory = self.path / hashlib.sha1(
+                json.dumps(key, sort_keys=True).encode()).hexdigest()
+            entry = self.__load_entry(directory, key)
+            if not entry.parts:
+                entry.start = start
+                self.__fetch(directory, entry, entity_id, query,
+                             from_date=start)
+            else:
+                if entry.start is not None and \
+                        (start is None or start < entry.start):
+                    # request the records before the cached range
+                    self.__fetch(directory, entry, entity_id, query,
+                                 from_date=start,
+                                 to_date=entry.start -
+                                 timedelta(milliseconds=1))
+                    entry.start = start
+                if refresh:
+                    self.__refresh(directory, entry, entity_id, query)
+            series = self.__read(directory, entry, entity_id)
+            if len(entry.parts) > self.max_parts:
+                self.__compact(directory, entry, series)
+            self.__save_entry(directory, entry)
+
+        lower = 0 if start is None else \
+            np.searchsorted(series.index, _to_datetime64(start), 'left')
+        upper = len(series) if to_date is None else \
+            np.searchsorted(series.index, _to_datetime64(to_date), 'right')
+        if lower > 0 or upper < len(series):
+            series = ColumnarTimeSeries.construct(
+                entityId=series.entityId,
+                entityType=series.entityType,
+                index=series.index[lower:upper],
+                attributes={name: values[lower:upper]
+                            for name, values in series.attributes.items()})
+        return series if columnar else series.to_time_series()
+
+    def get_entity_attr_by_id(self,
+                              entity_id: str,
+                              attr_name: str,
+                              **kwargs
+                              ) -> Union[TimeSeries, ColumnarTimeSeries]:
+        """
+        History of an attribute of a given entity instance. See
+        :meth:`get_entity_by_id` for the further arguments.
+
+        Args:
+            entity_id: Entity id
+            attr_name: Attribute name
+            **kwargs: See :meth:`get_entity_by_id`
+
+        Returns:
+            TimeSeries or ColumnarTimeSeries
+        """
+        return self.get_entity_by_id(entity_id, attrs=attr_name, **kwargs)
+
+    def clear(self) -> None:
+        """
+        Removes all cached histories
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for directory in self.path.iterdir():
+                if (directory / 'meta.json').exists():
+                    shutil.rmtree(directory)
+
+    def __refresh(self,
+                  directory: Path,
+                  entry: CacheEntry,
+                  entity_id: str,
+                  query: Dict) -> None:
+        """
+        Requests the records after the watermark. The last bucket of an
+        aggregation may be incomplete, hence it is requested again and
+        replaces the cached one when reading.
+        """
+        if entry.watermark is None:
+            from_date = entry.start
+        elif query['aggr_period']:
+            from_date = entry.watermark
+        else:
+            from_date = entry.watermark + timedelta(milliseconds=1)
+        self.__fetch(directory, entry, entity_id, query, from_date=from_date)
+
+    def __fetch(self,
+                directory: Path,
+                entry: CacheEntry,
+                entity_id: str,
+                query: Dict,
+                from_date: datetime = None,
+                to_date: datetime = None) -> None:
+        """
+        Requests a range of the history and writes it as a new file
+        """
+        try:
+            chunks = list(self.client.iter_entity_by_id(
+                entity_id,
+                from_date=convert_datetime_to_iso_8601_with_z_suffix(
+                    from_date) if from_date else None,
+                to_date=convert_datetime_to_iso_8601_with_z_suffix(
+                    to_date) if to_date else None,
+                columnar=True,
+                **query))
+        except requests.HTTPError as err:
+            if err.response is not None and err.response.status_code == 404:
+                logger.debug("No records for %s", entry.key)
+                return
+            raise
+        series = ColumnarTimeSeries.concat(chunks)
+        if not len(series):
+            return
+        entry.entity_type = series.entityType
+        part = self.__next_part(entry)
+        self.__write(directory / part, series)
+        entry.parts.append(part)
+        watermark = pd.Timestamp(series.index.max()).tz_localize('UTC')\
+            .to_pydatetime()
+        if entry.watermark is None or watermark > entry.watermark:
+            entry.watermark = watermark
+        logger.debug("Cached %s records for %s", len(series), entry.key)
+
+    def __write(self, path: Path, series: ColumnarTimeSeries) -> None:
+        """
+        Writes a time series to a file. Columns with values that are not
+        only numbers, booleans or strings are stored as JSON strings, which
+        is marked in the metadata of the column in every file.
+        """
+        fields = [self._pa.field(_INDEX, self._pa.timestamp('us'))]
+        arrays = [self._pa.array(series.index.astype('datetime64[us]'))]
+        for name, values in series.attributes.items():
+            metadata = None
+            if values.dtype == object and not all(
+                    value is None or isinstance(value, str)
+                    for value in values):
+                metadata = _JSON
+                values = [json.dumps(value) for value in values]
+            array = self._pa.array(values)
+            fields.append(self._pa.field(name, array.type, metadata=metadata))
+            arrays.append(array)
+        table = self._pa.Table.from_arrays(arrays,
+                                           schema=self._pa.schema(fields))
+        tmp = path.with_suffix('.tmp')
+        if self.file_format == CacheFormat.PARQUET:
+            self._pa.parquet.write_table(table, str(tmp))
+        else:
+            with self._pa.OSFile(str(tmp), 'wb') as sink, \
+                    self._pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        tmp.replace(path)
+
+    def __read(self,
+               directory: Path,
+               entry: CacheEntry,
+               entity_id: str) -> ColumnarTimeSeries:
+        """
+        Reads all files of an entry into one time series in index order.
+        For duplicated indices, the record of the latest file is kept.
+        """
+        tables = []
+        for part in entry.parts:
+            path = str(directory / part)
+            if part.endswith(CacheFormat.PARQUET.value):
+                tables.append(self._pa.parquet.read_table(path))
+            else:
+                tables.append(self._pa.ipc.open_file(
+                    self._pa.memory_map(path, 'r')).read_all())
+        index = np.concatenate(
+            [table.column(_INDEX).to_numpy() for table in tables]
+            or [np.array([], dtype='datetime64[us]')])
+        names = [name for table in tables for name in table.column_names
+                 if name != _INDEX]
+        names = list(dict.fromkeys(names))
+        attributes = {}
+        for name in names:
+            arrays = []
+            for table in tables:
+                if name not in table.column_names:
+                    arrays.append(np.full(table.num_rows, None, dtype=object))
+                    continue
+                values = table.column(name).to_numpy(zero_copy_only=False)
+                if table.schema.field(name).metadata == _JSON:
+                    values = _from_json(values)
+                arrays.append(values)
+            dtypes = {values.dtype for values in arrays}
+            if len(dtypes) > 1 and \
+                    not all(dtype.kind in 'iuf' for dtype in dtypes):
+                arrays = [values.astype(object) for values in arrays]
+            attributes[name] = np.concatenate(arrays)
+        if len(tables) > 1:
+            # stable sort, so that the latest duplicate comes last
+            order = np.argsort(index, kind='stable')
+            index = index[order]
+            keep = np.append(index[1:] != index[:-1], True)
+            index = index[keep]
+            attributes = {name: values[order][keep]
+                          for name, values in attributes.items()}
+        return ColumnarTimeSeries.construct(entityId=entity_id,
+                                            entityType=entry.entity_type,
+                                            index=index,
+                                            attributes=attributes)
+
+    def __compact(self,
+                  directory: Path,
+                  entry: CacheEntry,
+                  series: ColumnarTimeSeries) -> None:
+        """
+        Replaces all files of an entry by a single one
+        """
+        old_parts = entry.parts
+        part = self.__next_part(entry)
+        self.__write(directory / part, series)
+        entry.parts = [part]
+        self.__save_entry(directory, entry)
+        for old_part in old_parts:
+            (directory / old_part).unlink(missing_ok=True)
+
+    def __next_part(self, entry: CacheEntry) -> str:
+        """
+        Name of the next file of an entry, which never reuses a name
+        """
+        number = max((int(part.split('.')[0].split('-')[1])
+                      for part in entry.parts), default=-1) + 1
+        return f"part-{number:05d}.{self.file_format.value}"
+
+    @staticmethod
+    def __load_entry(directory: Path, key: Dict[str, Any]) -> CacheEntry:
+        """
+        Loads the metadata of an entry or creates a new one
+        """
+        meta = directory / 'meta.json'
+        if meta.exists():
+            return CacheEntry.parse_file(meta)
+        directory.mkdir(parents=True, exist_ok=True)
+        return CacheEntry(key=key)
+
+    @staticmethod
+    def __save_entry(directory: Path, entry: CacheEntry) -> None:
+        """
+        Writes the metadata of an entry. The file is replaced atomically.
+        """
+        meta = directory / 'meta.json'
+        tmp = meta.with_suffix('.tmp')
+        tmp.write_text(entry.json(indent=2))
+        tmp.replace(meta)
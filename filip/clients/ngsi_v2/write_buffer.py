@@ -0,0 +1,313 @@
+"""
+Write-behind buffer for high-rate attribute updates of the context broker
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING, Union
+
+from pydantic import PositiveInt, PositiveFloat
+from pydantic.json import pydantic_encoder
+from filip.models.base import DataType
+from filip.models.ngsi_v2.context import \
+    ActionType, \
+    BatchUpdateReport, \
+    ContextAttribute, \
+    ContextEntity, \
+    NamedContextAttribute
+
+if TYPE_CHECKING:
+    from filip.clients.ngsi_v2.cb import ContextBrokerClient
+
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer:
+    """
+    Collects attribute updates in memory and writes them to the context
+    broker as 'append' batch operations. Repeated writes to the same
+    attribute of an entity are merged, hence, only the last value is sent.
+    The buffer is flushed by a background thread if either ``max_size``
+    attributes are pending or ``flush_interval`` seconds have passed.
+    If ``max_pending`` attributes are waiting for the flush, further writes
+    block until the buffer was flushed (backpressure).
+
+    Entities that could not be written are put back into the buffer, unless
+    newer values were buffered in the meantime, and are retried with the
+    next flush. Errors of the background thread are raised by the next call
+    of :meth:`flush` or :meth:`close`, and :meth:`close` raises if updates
+    are still pending after the final flush.
+
+    Instances are usually created via
+    :meth:`filip.clients.ngsi_v2.cb.ContextBrokerClient.write_buffer`.
+
+    Example::
+
+        >>> with client.write_buffer(max_size=500, flush_interval=1) as buf:
+        >>>     for reading in readings:
+        >>>         buf.update_attribute_value(entity_id=reading.sensor,
+        >>>                                    entity_type='Sensor',
+        >>>                                    attr_name='temperature',
+        >>>                                    value=reading.value)
+
+    Args:
+        client: Context broker client that is used for the batch operations
+        max_size: Number of pending attributes that triggers a flush
+        flush_interval: Maximum time in seconds between two flushes. If
+            `None`, the buffer is only flushed on size or explicitly.
+        max_pending: Number of pending attributes at which writes block
+        chunk_size: Maximum number of entities per batch request
+        max_workers: Number of threads sending the chunks of a flush
+    """
+    def __init__(self,
+                 client: ContextBrokerClient,
+                 *,
+                 max_size: PositiveInt = 1000,
+                 flush_interval: Optional[PositiveFloat] = 1.0,
+                 max_pending: PositiveInt = 10000,
+                 chunk_size: PositiveInt = None,
+                 max_workers: PositiveInt = None):
+        if max_pending < max_size:
+            raise ValueError("'max_pending' must not be smaller than "
+                             "'max_size'")
+        self.client = client
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.last_report: Optional[BatchUpdateReport] = None
+
+        self._pending: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        self._size = 0
+        self._closed = False
+        self._error: Optional[Exception] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._flush_required = threading.Condition(self._lock)
+        self._thread = threading.Thread(target=self.__run,
+                                        name=f"{self.__class__.__name__}",
+                                        daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self) -> int:
+        """
+        Number of pending attributes
+        """
+        return self._size
+
+    def update_attribute_value(self,
+                               *,
+                               entity_id: str,
+                               attr_name: str,
+                               value: Any,
+                               entity_type: str,
+                               attr_type: Union[DataType, str] = None,
+                               timeout: float = None) -> None:
+        """
+        Buffers the new value of an attribute. Like the unbuffered
+        `update_attribute_value` of the client, the type of an existing
+        attribute is kept if no type is given.
+
+        Args:
+            entity_id: Id of the entity
+            attr_name: Name of the attribute
+            value: New value of the attribute
+            entity_type: Type of the entity, required for the batch operation
+            attr_type: Type of the attribute. If None, no type is sent.
+            timeout: Maximum time in seconds to wait for free capacity
+
+        Raises:
+            TimeoutError, if the buffer is still full after timeout
+        """
+        attr = {'value': value}
+        if attr_type:
+            attr['type'] = attr_type
+        self.__put(entity_id=entity_id,
+                   entity_type=entity_type,
+                   attrs={attr_name: attr},
+                   timeout=timeout)
+
+    def update_or_append_entity_attributes(
+            self,
+            entity_id: str,
+            entity_type: str,
+            attrs: List[Union[NamedContextAttribute,
+                              Dict[str, ContextAttribute]]],
+            timeout: float = None) -> None:
+        """
+        Buffers updates of several attributes of an entity.
+
+        Args:
+            entity_id: Id of the entity
+            entity_type: Type of the entity
+            attrs: List of attributes to update or to append
+            timeout: Maximum time in seconds to wait for free capacity
+
+        Raises:
+            TimeoutError, if the buffer is still full after timeout
+        """
+        entity = ContextEntity(id=entity_id, type=entity_type)
+        entity.add_attributes(attrs)
+        self.__put(entity_id=entity_id,
+                   entity_type=entity_type,
+                   attrs={attr.name: attr.dict(by_alias=True,
+                                               exclude={'name'})
+                          for attr in entity.get_attributes(
+                              strict_data_type=False)},
+                   timeout=timeout)
+
+    def __put(self,
+              *,
+              entity_id: str,
+              entity_type: str,
+              attrs: Dict[str, Dict[str, Any]],
+              timeout: float = None) -> None:
+        """
+        Merges attributes into the pending updates. Blocks while the buffer
+        is full.
+        """
+        key = (entity_id, entity_type)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write buffer is already closed")
+            for name, attr in attrs.items():
+                entity_attrs = self._pending.get(key, {})
+                if name not in entity_attrs:
+                    # only new attributes consume capacity
+                    while self._size >= self.max_pending:
+                        self._flush_required.notify()
+                        remaining = None if deadline is None \
+                            else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            raise TimeoutError("Write buffer is full")
+                        self._not_full.wait(timeout=remaining)
+                    self._size += 1
+                    entity_attrs = self._pending.setdefault(key, {})
+                # fields that are not given, e.g., the type, are kept
+                entity_attrs[name] = {**entity_attrs.get(name, {}), **attr}
+            if self._size >= self.max_size:
+                self._flush_required.notify()
+
+    def flush(self) -> Optional[BatchUpdateReport]:
+        """
+        Sends all pending updates to the context broker. Entities that could
+        not be written are put back into the buffer.
+
+        Returns:
+            Report of the batch operation or `None` if nothing was pending
+
+        Raises:
+            The error of a previous flush of the background thread
+        """
+        try:
+            return self.__flush()
+        finally:
+            with self._lock:
+                error, self._error = self._error, None
+            if error is not None:
+                raise error
+
+    def __flush(self) -> Optional[BatchUpdateReport]:
+        """
+        Sends all pending updates and puts failed entities back
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {}
+                self._size = 0
+                self._not_full.notify_all()
+            if not pending:
+                return None
+            keys = list(pending)
+            serialized = [json.dumps({'id': entity_id,
+                                      'type': entity_type,
+                                      **pending[(entity_id, entity_type)]},
+                                     default=pydantic_encoder)
+                          for entity_id, entity_type in keys]
+            try:
+                self.last_report = self.client._dispatch_batches(
+                    serialized=serialized,
+                    action_type=ActionType.APPEND,
+                    chunk_size=self.chunk_size,
+                    max_workers=self.max_workers,
+                    raise_on_error=False)
+            except Exception:
+                self.__restore(pending, keys)
+                raise
+            if not self.last_report.success:
+                self.__restore(pending, [keys[i] for i in
+                                         self.last_report.failed_indices])
+                logger.error("Could not write %s of %s buffered entities",
+                             len(self.last_report.failed_indices),
+                             len(keys))
+            return self.last_report
+
+    def __restore(self,
+                  pending: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]],
+                  keys: List[Tuple[str, str]]) -> None:
+        """
+        Puts updates that could not be written back into the buffer without
+        overwriting values that were buffered in the meantime
+        """
+        with self._lock:
+            for key in keys:
+                entity_attrs = self._pending.setdefault(key, {})
+                for name, attr in pending[key].items():
+                    if name not in entity_attrs:
+                        self._size += 1
+                    entity_attrs[name] = {**attr, **entity_attrs.get(name, {})}
+
+    def __run(self) -> None:
+        """
+        Flushes the buffer whenever the size threshold is reached or the
+        flush interval has passed.
+        """
+        while True:
+            with self._lock:
+                if not self._closed and self._size < self.max_size:
+                    self._flush_required.wait(timeout=self.flush_interval)
+                closed = self._closed
+            try:
+                self.__flush()
+            except Exception as err:
+                logger.error("Flushing the write buffer failed: %s", err)
+                with self._lock:
+                    self._error = err
+            if closed:
+                break
+
+    def close(self) -> None:
+        """
+        Flushes all pending updates and stops the background thread
+
+        Raises:
+            The error of the last flush of the background thread or
+            RuntimeError, if updates could not be written
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._flush_required.notify()
+        self._thread.join()
+        with self._lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+        if self._size:
+            raise RuntimeError(f"Could not write {self._size} buffered "
+                               f"attributes, see 'last_report'")
@@ -64,6 +64,19 @@ class PaginationMethod(str, Enum):
     POST = "POST"
 
 
+class PaginationStrategy(str, Enum):
+    """
+    Options for how the internal pagination continues after the first page
+    """
+    _init_ = 'value __doc__'
+
+    OFFSET = "offset", "Pages are requested by their offset. Deep offsets " \
+                       "get slower and concurrent inserts may shift pages."
+    KEYSET = "keyset", "Entities are ordered by their creation date and " \
+                       "each page continues after the last seen entity. " \
+                       "The cost per page stays nearly constant."
+
+
 class FiwareHeader(BaseModel):
     """
     Define entity service paths which are supported by the NGSI
@@ -152,6 +152,20 @@ class AttrsFormat(str, Enum):
                        "[ 'Ford', 'black', 78.3 ]"
 
 
+class ValidationMode(str, Enum):
+    """
+    Options for building models from data received from the context broker
+    """
+    _init_ = 'value __doc__'
+
+    STRICT = "strict", "All validators of the models are executed."
+    CONSTRUCT = "construct", "Models are constructed without running any " \
+                             "validators. The data is trusted as it is, " \
+                             "e.g. for read-only analytics."
+    LAZY = "lazy", "Plain dictionaries are returned that are validated " \
+                   "only on request, one entity at a time."
+
+
 # NGSIv2 entity models
 class Metadata(BaseModel):
     """
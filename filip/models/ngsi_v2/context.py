@@ -2,11 +2,12 @@
 NGSIv2 models for context broker interaction
 """
 import json
-from typing import Any, List, Dict, Union, Optional, Set, Tuple
+from typing import Any, List, Dict, Union, Optional, Set, Tuple, Type
 from aenum import Enum
 from pydantic import \
     BaseModel, \
     Field, \
+    PrivateAttr, \
     validator
 
 from filip.models.ngsi_v2.base import \
@@ -14,7 +15,8 @@ from filip.models.ngsi_v2.base import \
     Expression, \
     BaseAttribute, \
     BaseValueAttribute, \
-    BaseNameAttribute
+    BaseNameAttribute, \
+    Metadata
 from filip.models.base import DataType, FiwareRegex
 
 
@@ -148,6 +150,32 @@ class PropertyFormat(str, Enum):
     DICT = 'dict'
 
 
+class EntityChanges(BaseModel):
+    """
+    Changes of the attributes of a tracked ContextEntity since it was loaded
+    or since its changes were saved the last time.
+    """
+    added: Dict[str, ContextAttribute] = Field(
+        default={},
+        description="Attributes that were added to the entity"
+    )
+    modified: Dict[str, ContextAttribute] = Field(
+        default={},
+        description="Attributes whose type, value or metadata changed"
+    )
+    deleted: List[str] = Field(
+        default=[],
+        description="Names of the attributes that were deleted"
+    )
+
+    @property
+    def has_changes(self) -> bool:
+        """
+        Whether there are any changes
+        """
+        return bool(self.added or self.modified or self.deleted)
+
+
 class ContextEntity(ContextEntityKeyValues):
     """
     Context entities, or simply entities, are the center of gravity in the
@@ -180,7 +208,16 @@ class ContextEntity(ContextEntityKeyValues):
 
         >>> entity = ContextEntity(**data)
 
+    Changes of the attributes can optionally be tracked, e.g., in order to
+    send only the changed attributes to the context broker::
+
+        >>> entity.track_changes()
+        >>> entity.my_attr.value = 21
+        >>> entity.get_changes()
+
     """
+    _snapshot: Optional[Dict[str, Dict]] = PrivateAttr(default=None)
+
     def __init__(self, id: str, type: str, **data):
 
         # There is currently no validation for extra fields
@@ -201,6 +238,31 @@ class ContextEntity(ContextEntityKeyValues):
                  data.items() if key not in ContextEntity.__fields__}
         return attrs
 
+    @classmethod
+    def construct_trusted(cls, data: Dict[str, Any]) -> 'ContextEntity':
+        """
+        Builds an entity from trusted data, e.g. a response of the context
+        broker, without running any validators. Attributes and metadata are
+        constructed as models as well, hence the entity behaves like a
+        validated one. However, values are not converted to their types.
+
+        Args:
+            data: Entity in normalized format
+
+        Returns:
+            ContextEntity
+        """
+        attrs = {}
+        for key, attr in data.items():
+            if key in ContextEntity.__fields__:
+                continue
+            attr = dict(attr)
+            if isinstance(attr.get('metadata'), dict):
+                attr['metadata'] = {name: Metadata.construct(**meta)
+                                    for name, meta in attr['metadata'].items()}
+            attrs[key] = ContextAttribute.construct(**attr)
+        return cls.construct(id=data['id'], type=data['type'], **attrs)
+
     def add_attributes(self, attrs: Union[Dict[str, ContextAttribute],
                                           List[NamedContextAttribute]]) -> None:
         """
@@ -310,6 +372,54 @@ class ContextEntity(ContextEntityKeyValues):
                 raise NameError
             self.__setattr__(name=key, value=attr)
 
+    def track_changes(self) -> None:
+        """
+        Starts tracking the changes of the entity's attributes. The current
+        state is taken as reference for :meth:`get_changes`. Calling it again
+        resets the reference, e.g., after the changes were saved.
+
+        Returns:
+            None
+        """
+        self._snapshot = self.__dump_attributes()
+
+    @property
+    def is_tracking_changes(self) -> bool:
+        """
+        Whether changes of the entity's attributes are tracked
+        """
+        return self._snapshot is not None
+
+    def get_changes(self) -> EntityChanges:
+        """
+        Get the attributes that were added, modified or deleted since
+        :meth:`track_changes` was called.
+
+        Raises:
+            ValueError, if changes are not tracked for this entity
+
+        Returns:
+            EntityChanges
+        """
+        if self._snapshot is None:
+            raise ValueError("Change tracking is not enabled for entity "
+                             f"'{self.id}'. Call 'track_changes' first.")
+        current = self.__dump_attributes()
+        return EntityChanges(
+            added={name: attr for name, attr in current.items()
+                   if name not in self._snapshot},
+            modified={name: attr for name, attr in current.items()
+                      if name in self._snapshot
+                      and self._snapshot[name] != attr},
+            deleted=[name for name in self._snapshot if name not in current])
+
+    def __dump_attributes(self) -> Dict[str, Dict]:
+        """
+        Returns a deep copy of all attributes as plain dictionaries
+        """
+        return {key: value for key, value in self.dict().items()
+                if key not in ContextEntity.__fields__}
+
     def get_attribute_names(self) -> Set[str]:
         """
         Returns a set with all attribute names of this entity
@@ -504,6 +614,42 @@ class ContextEntity(ContextEntityKeyValues):
         return command, command_status, command_info
 
 
+class LazyContextEntity(dict):
+    """
+    Plain dictionary of an entity as received from the context broker. The
+    entity is only validated if :meth:`validate` is called. The validated
+    model is cached, hence the validation runs at most once per entity.
+
+    Example::
+
+        >>> entities = client.get_entity_list(validate='lazy')
+        >>> entities[0]['id']
+        >>> entities[0].validate().get_attributes()
+    """
+    __slots__ = ('_model', '_validated')
+
+    def __init__(self,
+                 data: Dict[str, Any],
+                 model: Type[ContextEntityKeyValues] = ContextEntity):
+        super().__init__(data)
+        self._model = model
+        self._validated = None
+
+    def validate(self) -> Union[ContextEntity, ContextEntityKeyValues]:
+        """
+        Validates the entity
+
+        Raises:
+            ValidationError, if the data does not match the model
+
+        Returns:
+            ContextEntity or ContextEntityKeyValues
+        """
+        if self._validated is None:
+            self._validated = self._model(**self)
+        return self._validated
+
+
 class Query(BaseModel):
     """
     Model for queries
@@ -576,6 +722,73 @@ class Update(BaseModel):
         return ActionType(action)
 
 
+class BatchChunkResult(BaseModel):
+    """
+    Result of a single chunk of a batch update operation
+    """
+    chunk: int = Field(
+        description="Position of the chunk within the batch operation"
+    )
+    indices: List[int] = Field(
+        description="Positions of the chunk's entities in the list of entities "
+                    "that was passed to the batch operation"
+    )
+    payload_size: int = Field(
+        description="Size of the serialized request body in bytes"
+    )
+    status_code: Optional[int] = Field(
+        default=None,
+        description="HTTP status code of the response, if any was received"
+    )
+    error: Optional[str] = Field(
+        default=None,
+        description="Error message of a failed chunk"
+    )
+
+    @property
+    def success(self) -> bool:
+        """
+        Whether the chunk was applied successfully
+        """
+        return self.error is None
+
+
+class BatchUpdateReport(BaseModel):
+    """
+    Report of a (chunked) batch update operation. Failed chunks can be
+    retried by resending the entities at ``failed_indices``.
+    """
+    action_type: ActionType = Field(
+        description="actionType of the batch operation"
+    )
+    chunks: List[BatchChunkResult] = Field(
+        default=[],
+        description="Results of all chunks in the order they were built"
+    )
+
+    @property
+    def success(self) -> bool:
+        """
+        Whether all chunks were applied successfully
+        """
+        return all(chunk.success for chunk in self.chunks)
+
+    @property
+    def failed_chunks(self) -> List[BatchChunkResult]:
+        """
+        All chunks that could not be applied
+        """
+        return [chunk for chunk in self.chunks if not chunk.success]
+
+    @property
+    def failed_indices(self) -> List[int]:
+        """
+        Positions of all entities that belong to failed chunks
+        """
+        return [index for chunk in self.failed_chunks
+                for index in chunk.indices]
+
+
 class Command(BaseModel):
     """
     Class for sending commands to IoT Devices.
@@ -3,7 +3,7 @@ Data models for interacting with FIWARE's time series-api (aka QuantumLeap)
 """
 from __future__ import annotations
 import logging
-from typing import Any, List, Union
+from typing import Any, Dict, Iterable, List, Union
 from datetime import datetime
 import numpy as np
 import pandas as pd
@@ -110,6 +110,15 @@ class TimeSeries(TimeSeriesHeader):
             attr.values.extend(other_attr.values)
         self.index.extend(other.index)
 
+    def to_columnar(self) -> ColumnarTimeSeries:
+        """
+        Converts the data to the columnar representation
+
+        Returns:
+            ColumnarTimeSeries
+        """
+        return ColumnarTimeSeries.from_time_series(self)
+
     def to_pandas(self) -> pd.DataFrame:
         """
         Converts time series data to pandas dataframe
@@ -132,6 +141,219 @@ class TimeSeries(TimeSeriesHeader):
         allow_population_by_field_name = True
 
 
+def _to_datetime64(index: List[Union[str, int, float]]) -> np.ndarray:
+    """
+    Parses timestamps in ISO8601 format or in milliseconds since epoch to an
+    array of UTC datetime64 values
+    """
+    if len(index) and isinstance(index[0], (int, float)):
+        index = pd.to_datetime(index, unit='ms', utc=True)
+    else:
+        index = pd.to_datetime(index, utc=True)
+    return index.tz_convert(None).to_numpy()
+
+
+def _to_array(values: List[Any]) -> np.ndarray:
+    """
+    Converts values to an array. Numbers become a typed array, where missing
+    values become NaN, and booleans become a boolean array. All other values
+    remain objects in a one-dimensional array, e.g., strings, lists and
+    mixed values.
+    """
+    values = values if values is not None else []
+    if not len(values):
+        return np.array([], dtype=float)
+    if all(isinstance(value, bool) for value in values):
+        return np.array(values, dtype=bool)
+    numbers = [value is None or (isinstance(value, (int, float)) and
+                                 not isinstance(value, bool))
+               for value in values]
+    if all(numbers) and any(value is not None for value in values):
+        if any(value is None for value in values):
+            return np.array([np.nan if value is None else value
+                             for value in values], dtype=float)
+        return np.array(values)
+    array = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        array[i] = value
+    return array
+
+
+def _concatenate(arrays: List[np.ndarray]) -> np.ndarray:
+    """
+    Concatenates arrays of values. Numeric arrays are promoted as usual,
+    while arrays of differing kinds fall back to objects.
+    """
+    dtypes = {array.dtype for array in arrays if len(array)}
+    if len(dtypes) > 1 and not all(dtype.kind in 'iuf' for dtype in dtypes):
+        return np.concatenate([array.astype(object) for array in arrays])
+    return np.concatenate(arrays)
+
+
+class ColumnarTimeSeries(BaseModel):
+    """
+    Columnar representation of time series data. The index is a datetime64
+    array in UTC and every attribute is a typed numpy array, which avoids
+    parsing every single value into python objects. Use it for large query
+    results, e.g., via the `columnar` option of the QuantumLeapClient.
+    """
+    entityId: str = Field(default=None,
+                          description="The entity id")
+    entityType: str = Field(default=None,
+                            description="The type of an entity")
+    index: np.ndarray = Field(
+        default_factory=lambda: np.array([], dtype='datetime64[ns]'),
+        description="Timestamps of the samples as datetime64 in UTC"
+    )
+    attributes: Dict[str, np.ndarray] = Field(
+        default_factory=dict,
+        description="Array of values for every attribute name, parallel to "
+                    "the index"
+    )
+
+    class Config:
+        """
+        Pydantic configuration
+        """
+        arbitrary_types_allowed = True
+
+    @classmethod
+    def from_json(cls,
+                  data: Dict[str, Any],
+                  *,
+                  entity_id: str = None,
+                  entity_type: str = None,
+                  attr_name: str = None) -> ColumnarTimeSeries:
+        """
+        Creates the time series directly from (a chunk of) a decoded
+        response of the time series api with vectorized parsing
+
+        Args:
+            data: Time series of a single entity, with either a list of
+                'attributes' or the 'values' of a single attribute
+            entity_id: Entity id, if not contained in the data
+            entity_type: Entity type, if not contained in the data
+            attr_name: Attribute name, if not contained in the data
+
+        Returns:
+            ColumnarTimeSeries
+        """
+        if 'attributes' in data:
+            attributes = {attr['attrName']: _to_array(attr.get('values'))
+                          for attr in data['attributes'] or []}
+        else:
+            attributes = {data.get('attrName', attr_name):
+                          _to_array(data.get('values'))}
+        return cls.construct(
+            entityId=data.get('entityId', data.get('id', entity_id)),
+            entityType=data.get('entityType', data.get('type', entity_type)),
+            index=_to_datetime64(data.get('index') or []),
+            attributes=attributes)
+
+    @classmethod
+    def concat(cls,
+               series: Iterable[ColumnarTimeSeries]) -> ColumnarTimeSeries:
+        """
+        Concatenates consecutive chunks of the time series of an entity with
+        a single copy of every array
+
+        Args:
+            series: Chunks with rising index
+
+        Returns:
+            ColumnarTimeSeries
+
+        Raises:
+            Assertion Error: if header fields do not fit or if index is not
+                rising
+        """
+        series = list(series)
+        first = series[0]
+        for previous, other in zip(series, series[1:]):
+            assert first.entityId == other.entityId
+            assert first.entityType == other.entityType
+            assert first.attributes.keys() == other.attributes.keys()
+            assert not len(previous.index) or not len(other.index) or \
+                previous.index[-1] < other.index[0]
+        if len(series) == 1:
+            return first
+        return cls.construct(
+            entityId=first.entityId,
+            entityType=first.entityType,
+            index=np.concatenate([item.index for item in series]),
+            attributes={name: _concatenate([item.attributes[name]
+                                             for item in series])
+                        for name in first.attributes})
+
+    @classmethod
+    def from_time_series(cls, time_series: TimeSeries) -> ColumnarTimeSeries:
+        """
+        Converts a TimeSeries object
+
+        Args:
+            time_series: TimeSeries
+
+        Returns:
+            ColumnarTimeSeries
+        """
+        return cls.construct(
+            entityId=time_series.entityId,
+            entityType=time_series.entityType,
+            index=_to_datetime64(time_series.index or []),
+            attributes={attr.attrName: _to_array(attr.values)
+                        for attr in time_series.attributes or []})
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def extend(self, other: ColumnarTimeSeries) -> None:
+        """
+        Extends the time series by concatenating the arrays of another one.
+        Prefer :meth:`concat` to merge many chunks.
+
+        Args:
+            other: ColumnarTimeSeries with the same format
+
+        Returns:
+            None
+        """
+        merged = self.concat([self, other])
+        self.index = merged.index
+        self.attributes = merged.attributes
+
+    def to_time_series(self) -> TimeSeries:
+        """
+        Converts the data to a TimeSeries object
+
+        Returns:
+            TimeSeries
+        """
+        return TimeSeries(
+            entityId=self.entityId,
+            entityType=self.entityType,
+            index=pd.DatetimeIndex(self.index).tz_localize('UTC').tolist(),
+            attributes=[AttributeValues(attrName=name, values=values.tolist())
+                        for name, values in self.attributes.items()])
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        Converts time series data to a pandas dataframe with the same layout
+        as :meth:`TimeSeries.to_pandas`. The attribute arrays are not copied.
+
+        Returns:
+            pandas.DataFrame
+        """
+        index = pd.DatetimeIndex(self.index, name='datetime')\
+            .tz_localize('UTC')
+        data = pd.DataFrame(dict(enumerate(self.attributes.values())),
+                            index=index,
+                            copy=False)
+        data.columns = pd.MultiIndex.from_product(
+            [[self.entityId], [self.entityType], list(self.attributes)],
+            names=['entityId', 'entityType', 'attribute'])
+        return data
+
+
 class AggrMethod(str, Enum):
     """
     Aggregation Methods
@@ -585,6 +585,39 @@ class SemanticsManager(BaseModel):
             return client.does_entity_exist(entity_id=identifier.id,
                                             entity_type=identifier.type)
 
+    def do_instances_exist(self, identifiers: List[InstanceIdentifier]) \
+            -> Dict[InstanceIdentifier, bool]:
+        """
+        Bulk version of :meth:`does_instance_exists`. Identifiers that are
+        not known locally are checked with one request per Fiware header.
+
+        Args:
+            identifiers (List[InstanceIdentifier]): Identifiers to check
+
+        Returns:
+            Dict[InstanceIdentifier, bool], true if exists
+        """
+        result = {}
+        remote: Dict[InstanceHeader, List[InstanceIdentifier]] = {}
+        for identifier in identifiers:
+            if self.instance_registry.contains(identifier=identifier):
+                result[identifier] = True
+            elif self.was_instance_deleted(identifier):
+                result[identifier] = False
+            else:
+                remote.setdefault(identifier.header, []).append(identifier)
+
+        for header, header_identifiers in remote.items():
+            client = self.get_client(header)
+            exists = client.entities_exist(
+                entity_ids=[identifier.id for identifier in header_identifiers],
+                entity_types=[identifier.type
+                              for identifier in header_identifiers])
+            client.close()
+            for identifier in header_identifiers:
+                result[identifier] = exists[(identifier.id, identifier.type)]
+        return result
+
     def was_instance_deleted(self, identifier: InstanceIdentifier) -> bool:
         """
         Check if the instance with the given identifier was deleted.
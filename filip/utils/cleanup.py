@@ -1,20 +1,40 @@
 """
 Functions to clean up a tenant within a fiware based platform.
 """
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from requests import RequestException
-from typing import Callable, List, Union
+from typing import Callable, Dict, List, Union
 from filip.models import FiwareHeader
+from filip.models.ngsi_v2.base import AttrsFormat
+from filip.models.ngsi_v2.context import ActionType, ContextEntity
 from filip.clients.ngsi_v2 import \
     ContextBrokerClient, \
     IoTAClient, \
     QuantumLeapClient
 
 
-def clear_context_broker(url: str, fiware_header: FiwareHeader):
+def _run_parallel(func: Callable, items: List, max_workers: int) -> None:
+    """
+    Calls a function for all items with a bounded number of threads and
+    raises the first error
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(func, items))
+
+
+def clear_context_broker(url: str,
+                         fiware_header: FiwareHeader,
+                         *,
+                         dry_run: bool = False,
+                         chunk_size: int = 1000,
+                         max_workers: int = 4) -> Dict[str, int]:
     """
     Function deletes all entities, registrations and subscriptions for a
-    given fiware header
+    given fiware header. Entities are deleted in rounds: the ids of up to
+    `chunk_size * max_workers` entities are loaded and deleted with
+    concurrent batch operations, until no entity is left. Hence, the memory
+    consumption does not depend on the number of entities.
 
     Note:
         Always clear the devices first because the IoT-Agent will otherwise
@@ -23,62 +43,125 @@ def clear_context_broker(url: str, fiware_header: FiwareHeader):
     Args:
         url: Url of the context broker service
         fiware_header: header of the tenant
+        dry_run: If `True`, the resources are only counted
+        chunk_size: Number of entities per batch operation
+        max_workers: Number of concurrent requests
 
     Returns:
-        None
+        Number of (to be) deleted resources
     """
     # create client
     client = ContextBrokerClient(url=url, fiware_header=fiware_header)
+    counts = {'entities': 0}
+
     # clean entities
-    client.delete_entities(entities=client.get_entity_list())
+    if dry_run:
+        counts['entities'] = sum(1 for _ in client.iter_entities(
+            attrs=['__NONE'],
+            response_format=AttrsFormat.KEY_VALUES,
+            parse=False))
+    else:
+        while True:
+            ids = client.get_entity_list(attrs=['__NONE'],
+                                         limit=chunk_size * max_workers,
+                                         response_format=AttrsFormat.KEY_VALUES,
+                                         validate=False)
+            if not ids:
+                break
+            # batch deletion of entities without attributes removes them
+            # completely
+            client.update(entities=[ContextEntity(id=entity.id,
+                                                  type=entity.type)
+                                    for entity in ids],
+                          action_type=ActionType.DELETE,
+                          chunk_size=chunk_size,
+                          max_workers=max_workers)
+            counts['entities'] += len(ids)
 
     # clear subscriptions
-    for sub in client.get_subscription_list():
-        client.delete_subscription(subscription_id=sub.id)
-    assert len(client.get_subscription_list()) == 0
+    subscriptions = client.get_subscription_list()
+    counts['subscriptions'] = len(subscriptions)
+    if not dry_run:
+        _run_parallel(lambda sub: client.delete_subscription(
+            subscription_id=sub.id), subscriptions, max_workers)
+        assert len(client.get_subscription_list()) == 0
 
     # clear registrations
-    for reg in client.get_registration_list():
-        client.delete_registration(registration_id=reg.id)
-    assert len(client.get_registration_list()) == 0
+    registrations = client.get_registration_list()
+    counts['registrations'] = len(registrations)
+    if not dry_run:
+        _run_parallel(lambda reg: client.delete_registration(
+            registration_id=reg.id), registrations, max_workers)
+        assert len(client.get_registration_list()) == 0
+    return counts
 
 
-def clear_iot_agent(url: str, fiware_header: FiwareHeader):
+def clear_iot_agent(url: str,
+                    fiware_header: FiwareHeader,
+                    *,
+                    dry_run: bool = False,
+                    page_size: int = 500,
+                    max_workers: int = 4) -> Dict[str, int]:
     """
     Function deletes all device groups and devices for a
-    given fiware header
+    given fiware header. Devices are loaded page by page and deleted
+    concurrently.
 
     Args:
         url: Url of the context broker service
         fiware_header: header of the tenant
+        dry_run: If `True`, the resources are only counted
+        page_size: Number of devices that are loaded at once. The
+            IoT-Agent accepts less than 1000.
+        max_workers: Number of concurrent requests
 
     Returns:
-        None
+        Number of (to be) deleted resources
     """
     # create client
     client = IoTAClient(url=url, fiware_header=fiware_header)
+    counts = {'devices': 0}
 
-    # clear registrations
-    for device in client.get_device_list():
-        client.delete_device(device_id=device.device_id)
-    assert len(client.get_device_list()) == 0
+    # clear devices
+    offset = 0
+    while True:
+        # deleted devices do not shift the pages, so only a dry run needs to
+        # advance the offset
+        devices = client.get_device_list(limit=page_size, offset=offset)
+        counts['devices'] += len(devices)
+        if dry_run:
+            offset += len(devices)
+        else:
+            _run_parallel(lambda device: client.delete_device(
+                device_id=device.device_id), devices, max_workers)
+        if len(devices) < page_size:
+            break
 
     # clear groups
-    for group in client.get_group_list():
-        client.delete_group(resource=group.resource,
-                            apikey=group.apikey)
-    assert len(client.get_group_list()) == 0
+    groups = client.get_group_list()
+    counts['groups'] = len(groups)
+    if not dry_run:
+        _run_parallel(lambda group: client.delete_group(
+            resource=group.resource, apikey=group.apikey), groups, max_workers)
+        assert len(client.get_group_list()) == 0
+    return counts
 
 
-def clear_quantumleap(url: str, fiware_header: FiwareHeader):
+def clear_quantumleap(url: str,
+                      fiware_header: FiwareHeader,
+                      *,
+                      dry_run: bool = False,
+                      max_workers: int = 4) -> Dict[str, int]:
     """
     Function deletes all data for a given fiware header
     Args:
         url: Url of the quantumleap service
         fiware_header: header of the tenant
+        dry_run: If `True`, the entities with history are only counted
+        max_workers: Number of concurrent requests
 
     Returns:
-        None
+        Number of (to be) deleted entities
     """
     def handle_emtpy_db_exception(err: RequestException) -> None:
         """
@@ -105,16 +188,20 @@ def clear_quantumleap(url: str, fiware_header: FiwareHeader):
         handle_emtpy_db_exception(err)
 
     # will be executed for all found entities
-    for entity in entities:
-        client.delete_entity(entity_id=entity.entityId,
-                             entity_type=entity.entityType)
+    if not dry_run:
+        _run_parallel(lambda entity: client.delete_entity(
+            entity_id=entity.entityId,
+            entity_type=entity.entityType), entities, max_workers)
+    return {'history': len(entities)}
 
 
 def clear_all(*,
               fiware_header: FiwareHeader,
               cb_url: str = None,
               iota_url: Union[str, List[str]] = None,
-              ql_url: str = None):
+              ql_url: str = None,
+              dry_run: bool = False,
+              max_workers: int = 4) -> Dict[str, int]:
     """
     Clears all services that a url is provided for
 
@@ -123,19 +210,34 @@ def clear_all(*,
         cb_url: url of the context broker service
         iota_url: url of the IoT-Agent service
         ql_url: url of the QuantumLeap service
+        dry_run: If `True`, the resources are only counted
+        max_workers: Number of concurrent requests per service
 
     Returns:
-        None
+        Number of (to be) deleted resources
     """
+    counts = {}
     if iota_url is not None:
         if isinstance(iota_url, str):
             iota_url = [iota_url]
         for url in iota_url:
-            clear_iot_agent(url=url, fiware_header=fiware_header)
+            for key, count in clear_iot_agent(
+                    url=url,
+                    fiware_header=fiware_header,
+                    dry_run=dry_run,
+                    max_workers=max_workers).items():
+                counts[key] = counts.get(key, 0) + count
     if cb_url is not None:
-        clear_context_broker(url=cb_url, fiware_header=fiware_header)
+        counts.update(clear_context_broker(url=cb_url,
+                                           fiware_header=fiware_header,
+                                           dry_run=dry_run,
+                                           max_workers=max_workers))
     if ql_url is not None:
-        clear_quantumleap(url=ql_url, fiware_header=fiware_header)
+        counts.update(clear_quantumleap(url=ql_url,
+                                        fiware_header=fiware_header,
+                                        dry_run=dry_run,
+                                        max_workers=max_workers))
+    return counts
 
 def clean_test(*,
                fiware_service: str,
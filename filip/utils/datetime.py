@@ -1,4 +1,5 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Tuple, Union
 
 
 def transform_to_utc_datetime(dt: datetime) -> datetime:
@@ -28,3 +29,91 @@ def convert_datetime_to_iso_8601_with_z_suffix(dt: datetime) -> str:
     return dt.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]+'Z'
 
 
+def _add_period(dt: datetime, period: Union[timedelta, str]) -> datetime:
+    """
+    Adds a period to a datetime. Months and years are added in calendar
+    steps.
+    """
+    if isinstance(period, timedelta):
+        return dt + period
+    if period == 'year':
+        return dt.replace(year=dt.year + 1, month=1, day=1, hour=0, minute=0,
+                          second=0, microsecond=0)
+    if period == 'month':
+        year, month = divmod(dt.month, 12)
+        return dt.replace(year=dt.year + year, month=month + 1, day=1, hour=0,
+                          minute=0, second=0, microsecond=0)
+    return dt + timedelta(**{f'{period}s': 1})
+
+
+def split_time_range(start: datetime,
+                     end: datetime,
+                     period: Union[timedelta, str]
+                     ) -> List[Tuple[datetime, datetime]]:
+    """
+    Splits the inclusive range [start, end] into consecutive, inclusive
+    windows that do not overlap. Every window ends one millisecond before
+    the next one starts, which is the resolution of timestamps in
+    QuantumLeap, so that no sample is part of two windows.
+
+    Args:
+        start: Start of the range
+        end: End of the range
+        period: Length of the windows as timedelta or as one of 'year',
+            'month', 'day', 'hour', 'minute' or 'second'. Calendar periods
+            are aligned to the start of the month or year.
+
+    Returns:
+        List of (start, end) tuples
+    """
+    if isinstance(period, str):
+        period = str(getattr(period, 'value', period))
+        if period not in ('year', 'month', 'day', 'hour', 'minute', 'second'):
+            raise ValueError(f"Unknown period '{period}'!")
+    elif period <= timedelta(0):
+        raise ValueError("The period must be positive!")
+    windows = []
+    while start <= end:
+        following = _add_period(start, period)
+        windows.append((start,
+                        min(end, following - timedelta(milliseconds=1))))
+        start = following
+    return windows
+
+
+def split_time_range_by_counts(start: datetime,
+                               end: datetime,
+                               counts: Iterable[Tuple[datetime, int]],
+                               max_records: int
+                               ) -> List[Tuple[datetime, datetime]]:
+    """
+    Splits the inclusive range [start, end] into windows that contain about
+    `max_records` records each, based on the number of records per bucket,
+    e.g., as returned by an aggregated count query. The windows follow the
+    same rules as in :func:`split_time_range`.
+
+    Args:
+        start: Start of the range
+        end: End of the range
+        counts: Start of every bucket and the number of records in it
+        max_records: Targeted number of records per window. A bucket with
+            more records gets a window of its own.
+
+    Returns:
+        List of (start, end) tuples
+    """
+    if max_records <= 0:
+        raise ValueError("max_records must be positive!")
+    windows = []
+    total = 0
+    for bucket, records in sorted(counts):
+        if not records:
+            continue
+        if total and total + records > max_records and start < bucket <= end:
+            windows.append((start, bucket - timedelta(milliseconds=1)))
+            start = bucket
+            total = 0
+        total += records
+    if start <= end:
+        windows.append((start, end))
+    return windows
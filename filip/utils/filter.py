@@ -6,6 +6,7 @@ from filip.clients.ngsi_v2 import ContextBrokerClient
 from filip.models import FiwareHeader
 from filip.models.ngsi_v2.iot import Device, ServiceGroup
 from filip.models.ngsi_v2.subscriptions import Subscription
+from filip.utils.subscription_index import SubscriptionIndex
 from requests.exceptions import RequestException
 
 
@@ -56,7 +57,9 @@ def filter_subscriptions_by_entity(entity_id: str,
                                    entity_type: str,
                                    url: str = None,
                                    fiware_header: FiwareHeader = None,
-                                   subscriptions: List[Subscription] = None,
+                                   subscriptions: Union[
+                                       List[Subscription],
+                                       SubscriptionIndex] = None,
                                    ) -> List[Subscription]:
     """
     Function that filters subscriptions based on the entity id or id pattern
@@ -69,24 +72,18 @@ def filter_subscriptions_by_entity(entity_id: str,
         entity_type: Type of the entity to be matched
         url: Url of the context broker service
         fiware_header: Fiware header of the tenant
-        subscriptions: List of subscriptions to filter
+        subscriptions: List of subscriptions to filter. Pass a
+            SubscriptionIndex to match many entities against the same
+            subscriptions.
     Returns:
         list of subscriptions by entity
     """
-    if not subscriptions:
+    if subscriptions is None:
         client = ContextBrokerClient(url=url, fiware_header=fiware_header)
         subscriptions = client.get_subscription_list()
-    filtered_subscriptions = []
-    for subscription in subscriptions:
-        for entity in subscription.subject.entities:
-            if entity.id == entity_id or (
-                    entity.idPattern is not None
-                    and entity.idPattern.match(entity_id)):
-                if entity.type == entity_type or \
-                        (entity.typePattern is not None and
-                         entity.typePattern.match(entity_type)):
-                    filtered_subscriptions.append(subscription)
-    return filtered_subscriptions
+    if not isinstance(subscriptions, SubscriptionIndex):
+        subscriptions = SubscriptionIndex(subscriptions)
+    return subscriptions.match(entity_id=entity_id, entity_type=entity_type)
 
 
 def filter_group_list(group_list: List[ServiceGroup],
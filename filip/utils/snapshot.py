@@ -0,0 +1,428 @@
+"""
+Functions to export a tenant of a fiware based platform into a snapshot
+and to import it again, e.g., for backups or for cloning a tenant.
+
+A snapshot is a directory with one file per resource (entities,
+subscriptions, registrations, service groups, devices and history) that
+holds one JSON document per record and a manifest. The files are written
+and read in pages, hence the memory consumption does not depend on the size
+of the tenant.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+from aenum import Enum
+from requests import RequestException
+from filip.models import FiwareHeader
+from filip.models.ngsi_v2.context import ActionType, ContextEntity
+from filip.models.ngsi_v2.iot import Device, ServiceGroup
+from filip.models.ngsi_v2.registrations import Registration
+from filip.models.ngsi_v2.subscriptions import Message, Subscription
+from filip.clients.ngsi_v2 import \
+    ContextBrokerClient, \
+    IoTAClient, \
+    QuantumLeapClient
+from filip.utils.subscription_index import SubscriptionIndex
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+
+
+class SnapshotFormat(str, Enum):
+    """
+    File formats of a snapshot
+    """
+    _init_ = 'value __doc__'
+
+    NDJSON = "ndjson", "Newline delimited JSON documents"
+    PARQUET = "parquet", "Parquet files with one JSON document per row. " \
+                         "Requires 'pyarrow'."
+
+
+class _NdjsonFile:
+    """
+    Page-wise access to a newline delimited JSON file
+    """
+    def __init__(self, path: Path):
+        self.path = path.with_suffix('.ndjson')
+        self._file = None
+
+    def write(self, records: List[Dict]) -> None:
+        if self._file is None:
+            self._file = self.path.open('w', encoding='utf-8')
+        self._file.writelines(json.dumps(record) + '\n' for record in records)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+    def read(self, page_size: int) -> Iterator[List[Dict]]:
+        if not self.path.exists():
+            return
+        with self.path.open('r', encoding='utf-8') as file:
+            lines = (line for line in file if line.strip())
+            while True:
+                page = [json.loads(line) for line in islice(lines, page_size)]
+                if not page:
+                    break
+                yield page
+
+
+class _ParquetFile:
+    """
+    Page-wise access to a parquet file with one JSON document per row
+    """
+    def __init__(self, path: Path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as err:
+            raise ImportError("Parquet snapshots require 'pyarrow'. Install "
+                              "it via 'pip install pyarrow'.") from err
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path.with_suffix('.parquet')
+        self._writer = None
+
+    def write(self, records: List[Dict]) -> None:
+        table = self._pa.table(
+            {'data': [json.dumps(record) for record in records]})
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(str(self.path), table.schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+    def read(self, page_size: int) -> Iterator[List[Dict]]:
+        if not self.path.exists():
+            return
+        file = self._pq.ParquetFile(str(self.path))
+        for batch in file.iter_batches(batch_size=page_size,
+                                       columns=['data']):
+            yield [json.loads(data) for data in batch.column(0).to_pylist()]
+
+
+def _open(path: Path,
+          name: str,
+          file_format: SnapshotFormat) -> Union[_NdjsonFile, _ParquetFile]:
+    if file_format == SnapshotFormat.PARQUET:
+        return _ParquetFile(path.joinpath(name))
+    return _NdjsonFile(path.joinpath(name))
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def _write(path: Path,
+           name: str,
+           file_format: SnapshotFormat,
+           pages: Iterable[List[Dict]]) -> int:
+    """
+    Writes all pages of records into a snapshot file
+
+    Returns:
+        Number of written records
+    """
+    file = _open(path, name, file_format)
+    count = 0
+    try:
+        for page in pages:
+            if page:
+                file.write(page)
+                count += len(page)
+    finally:
+        file.close()
+    logger.info("Exported %s %s", count, name)
+    return count
+
+
+def _iter_devices(client: IoTAClient,
+                  page_size: int) -> Iterator[List[Dict]]:
+    # the IoT-Agent only accepts limits below 1000
+    page_size = min(page_size, 999)
+    offset = 0
+    while True:
+        devices = client.get_device_list(limit=page_size, offset=offset)
+        yield [json.loads(device.json(exclude_none=True))
+               for device in devices]
+        if len(devices) < page_size:
+            break
+        offset += len(devices)
+
+
+def _iter_history(client: QuantumLeapClient,
+                  page_size: int) -> Iterator[List[Dict]]:
+    """
+    Yields the history of all entities in windows of `page_size` rows
+    """
+    offset = 0
+    while True:
+        try:
+            headers = client.get_entities(limit=page_size, offset=offset)
+        except RequestException as err:
+            # QuantumLeap answers with 404 if there is no data
+            if err.response is not None and err.response.status_code == 404:
+                break
+            raise
+        for header in headers:
+            row = 0
+            while True:
+                series = client.get_entity_by_id(entity_id=header.entityId,
+                                                 entity_type=header.entityType,
+                                                 limit=page_size,
+                                                 offset=row)
+                yield [json.loads(series.json())]
+                if len(series.index) < page_size:
+                    break
+                row += len(series.index)
+        if len(headers) < page_size:
+            break
+        offset += len(headers)
+
+
+def export_tenant(path: Union[str, Path],
+                  *,
+                  fiware_header: FiwareHeader,
+                  cb_url: str = None,
+                  iota_url: str = None,
+                  ql_url: str = None,
+                  file_format: Union[SnapshotFormat, str] =
+                  SnapshotFormat.NDJSON,
+                  page_size: int = 1000) -> Dict[str, int]:
+    """
+    Exports all resources of a tenant from the services that a url is
+    provided for. Entities are scanned with keyset pagination, so that
+    concurrent changes do not lead to duplicated or missing entities.
+
+    Example::
+
+        >>> export_tenant('backup', fiware_header=header,
+        >>>               cb_url=cb_url, iota_url=iota_url, ql_url=ql_url)
+
+    Args:
+        path: Directory of the snapshot. It is created if necessary.
+        fiware_header: Header of the tenant
+        cb_url: Url of the context broker service
+        iota_url: Url of the IoT-Agent service
+        ql_url: Url of the QuantumLeap service. If given, the history of
+            all entities is exported as well.
+        file_format: Format of the snapshot files
+        page_size: Number of records that are requested and written at once
+
+    Returns:
+        Number of exported records per resource
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    file_format = SnapshotFormat(file_format)
+    counts = {}
+
+    if cb_url is not None:
+        with ContextBrokerClient(url=cb_url,
+                                 fiware_header=fiware_header) as client:
+            entities = client.iter_entities(parse=False,
+                                            page_size=page_size,
+                                            pagination='keyset')
+            counts['entities'] = _write(path, 'entities', file_format,
+                                        _chunks(entities, page_size))
+            counts['subscriptions'] = _write(
+                path, 'subscriptions', file_format,
+                [[json.loads(sub.json(exclude_none=True))
+                  for sub in client.get_subscription_list()]])
+            counts['registrations'] = _write(
+                path, 'registrations', file_format,
+                [[json.loads(reg.json(exclude_none=True))
+                  for reg in client.get_registration_list()]])
+
+    if iota_url is not None:
+        with IoTAClient(url=iota_url, fiware_header=fiware_header) as client:
+            counts['groups'] = _write(
+                path, 'groups', file_format,
+                [[json.loads(group.json(exclude_none=True))
+                  for group in client.get_group_list()]])
+            counts['devices'] = _write(path, 'devices', file_format,
+                                       _iter_devices(client, page_size))
+
+    if ql_url is not None:
+        with QuantumLeapClient(url=ql_url,
+                               fiware_header=fiware_header) as client:
+            counts['history'] = _write(path, 'history', file_format,
+                                       _iter_history(client, page_size))
+
+    manifest = {'format': file_format.value,
+                'service': fiware_header.service,
+                'service_path': fiware_header.service_path,
+                'created': datetime.now().astimezone().isoformat(),
+                'counts': counts}
+    path.joinpath(MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return counts
+
+
+def _writable(item: Dict) -> Dict:
+    """
+    Removes the fields of an exported subscription or registration that the
+    context broker only returns but does not accept, i.e., the statistics
+    of the notifications or forwardings and a failed or expired status
+    """
+    item = dict(item)
+    item.pop('forwardingInformation', None)
+    if item.get('status') not in (None, 'active', 'inactive'):
+        del item['status']
+    if 'notification' in item:
+        item['notification'] = {
+            key: value for key, value in item['notification'].items()
+            if key not in ('timesSent', 'lastNotification', 'lastSuccess',
+                           'lastSuccessCode', 'lastFailure',
+                           'lastFailureReason')}
+    return item
+
+
+def _history_message(record: Dict) -> Message:
+    """
+    Converts a window of a time series into a notification with one entity
+    per time index, as QuantumLeap takes the index from 'TimeInstant'
+    """
+    def attr_type(values: List[Any]) -> str:
+        value = next((value for value in values if value is not None), None)
+        if isinstance(value, bool):
+            return 'Boolean'
+        if isinstance(value, (int, float)):
+            return 'Number'
+        if isinstance(value, (dict, list)):
+            return 'StructuredValue'
+        return 'Text'
+
+    types = {attr['attrName']: attr_type(attr['values'])
+             for attr in record.get('attributes', [])}
+    data = []
+    for row, index in enumerate(record['index']):
+        entity = {'id': record['entityId'],
+                  'type': record['entityType'],
+                  'TimeInstant': {'type': 'DateTime', 'value': index}}
+        for attr in record.get('attributes', []):
+            entity[attr['attrName']] = {'type': types[attr['attrName']],
+                                        'value': attr['values'][row]}
+        data.append(ContextEntity.construct_trusted(entity))
+    return Message.construct(subscriptionId='filip-snapshot', data=data)
+
+
+def import_tenant(path: Union[str, Path],
+                  *,
+                  fiware_header: FiwareHeader,
+                  cb_url: str = None,
+                  iota_url: str = None,
+                  ql_url: str = None,
+                  chunk_size: int = 1000,
+                  max_workers: int = 4) -> Dict[str, int]:
+    """
+    Imports a snapshot of :func:`export_tenant` into the tenant of the given
+    header, which may differ from the exported one. Only the resources of the
+    services that a url is provided for are imported. Service groups and
+    devices are created first, then the entities are appended in parallel
+    chunked batches, followed by registrations and subscriptions.
+
+    Note:
+        The IoT-Agent creates registrations for the commands and lazy
+        attributes of devices on its own. Do not import registrations that
+        were created by the IoT-Agent if devices are imported as well.
+
+    Args:
+        path: Directory of the snapshot
+        fiware_header: Header of the target tenant
+        cb_url: Url of the context broker service
+        iota_url: Url of the IoT-Agent service
+        ql_url: Url of the QuantumLeap service
+        chunk_size: Number of records per request
+        max_workers: Number of threads sending requests concurrently
+
+    Returns:
+        Number of imported records per resource
+    """
+    path = Path(path)
+    manifest = json.loads(path.joinpath(MANIFEST).read_text())
+    file_format = SnapshotFormat(manifest['format'])
+    counts = {}
+
+    def read(name: str, page_size: int = chunk_size) -> Iterator[List[Dict]]:
+        return _open(path, name, file_format).read(page_size)
+
+    if iota_url is not None:
+        with IoTAClient(url=iota_url, fiware_header=fiware_header) as client:
+            counts['groups'] = counts['devices'] = 0
+            for page in read('groups'):
+                client.post_groups(
+                    [ServiceGroup.parse_obj(group) for group in page],
+                    update=True)
+                counts['groups'] += len(page)
+            for page in read('devices'):
+                client.post_devices(
+                    devices=[Device.parse_obj(device) for device in page],
+                    update=True)
+                counts['devices'] += len(page)
+
+    if cb_url is not None:
+        with ContextBrokerClient(url=cb_url,
+                                 fiware_header=fiware_header) as client:
+            counts['entities'] = 0
+            # a block keeps every worker busy with one chunk
+            for page in read('entities', chunk_size * max_workers):
+                client.update(entities=[ContextEntity.construct_trusted(item)
+                                        for item in page],
+                              action_type=ActionType.APPEND,
+                              chunk_size=chunk_size,
+                              max_workers=max_workers)
+                counts['entities'] += len(page)
+            counts['registrations'] = counts['subscriptions'] = 0
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                for page in read('registrations'):
+                    registrations = [Registration.parse_obj(_writable(item))
+                                     for item in page]
+                    list(pool.map(client.post_registration, registrations))
+                    counts['registrations'] += len(page)
+                # the duplicate detection uses a single download of the
+                # existing subscriptions
+                index = SubscriptionIndex(client.get_subscription_list())
+                for page in read('subscriptions'):
+                    subscriptions = []
+                    keys = set()
+                    for item in page:
+                        subscription = Subscription.parse_obj(
+                            _writable(item))
+                        key = index.key(subscription)
+                        if key not in keys:
+                            keys.add(key)
+                            subscriptions.append(subscription)
+                    list(pool.map(lambda subscription:
+                                  client.post_subscription(subscription,
+                                                           index=index),
+                                  subscriptions))
+                    counts['subscriptions'] += len(page)
+
+    if ql_url is not None:
+        with QuantumLeapClient(url=ql_url,
+                               fiware_header=fiware_header) as client, \
+                ThreadPoolExecutor(max_workers=max_workers) as pool:
+            counts['history'] = 0
+            for page in read('history', max_workers):
+                list(pool.map(client.post_notification,
+                              [_history_message(record) for record in page]))
+                counts['history'] += len(page)
+
+    for name, count in counts.items():
+        logger.info("Imported %s %s", count, name)
+    return counts
@@ -0,0 +1,287 @@
+"""
+In-memory index of subscriptions for fast entity matching and duplicate
+detection
+"""
+import re
+from itertools import chain, count
+from typing import Dict, Iterable, List, Optional, Pattern, Set, Tuple
+
+from filip.models.ngsi_v2.base import EntityPattern
+from filip.models.ngsi_v2.subscriptions import Subscription
+
+
+class _TypeIndex:
+    """
+    Subscriptions of a single id or id pattern, indexed by their entity type
+    """
+    __slots__ = ('types', 'patterns', 'any_type')
+
+    def __init__(self):
+        self.types: Dict[str, Set[str]] = {}
+        self.patterns: Dict[str, Tuple[Pattern, Set[str]]] = {}
+        self.any_type: Set[str] = set()
+
+    def add(self, entity: EntityPattern, subscription_id: str) -> None:
+        if entity.type:
+            self.types.setdefault(entity.type, set()).add(subscription_id)
+        elif entity.typePattern:
+            self.patterns.setdefault(
+                entity.typePattern.pattern,
+                (_compile(entity.typePattern), set()))[1].add(subscription_id)
+        else:
+            self.any_type.add(subscription_id)
+
+    def remove(self, entity: EntityPattern, subscription_id: str) -> None:
+        if entity.type:
+            _discard(self.types, entity.type, subscription_id)
+        elif entity.typePattern:
+            ids = self.patterns.get(entity.typePattern.pattern)
+            if ids is not None:
+                ids[1].discard(subscription_id)
+                if not ids[1]:
+                    del self.patterns[entity.typePattern.pattern]
+        else:
+            self.any_type.discard(subscription_id)
+
+    def match(self, entity_type: str) -> Iterable[str]:
+        matches = [self.any_type, self.types.get(entity_type, ())]
+        matches.extend(ids for pattern, ids in self.patterns.values()
+                       if pattern.search(entity_type))
+        return chain.from_iterable(matches)
+
+    def __bool__(self):
+        return bool(self.types or self.patterns or self.any_type)
+
+
+def _compile(pattern) -> Pattern:
+    """
+    Compiles a pattern unless it already is compiled
+    """
+    return pattern if isinstance(pattern, re.Pattern) else re.compile(pattern)
+
+
+def _discard(index: Dict[str, Set[str]], key: str, value: str) -> None:
+    """
+    Removes a value from an index and drops its key once it is empty
+    """
+    values = index.get(key)
+    if values is not None:
+        values.discard(value)
+        if not values:
+            del index[key]
+
+
+def _notification_url(subscription: Subscription) -> Optional[str]:
+    """
+    Endpoint that receives the notifications of a subscription
+    """
+    notification = subscription.notification
+    for endpoint in (notification.http, notification.httpCustom,
+                     notification.mqtt, notification.mqttCustom):
+        if endpoint is not None:
+            return str(endpoint.url)
+    return None
+
+
+class SubscriptionIndex:
+    """
+    Index of subscriptions that answers which subscriptions are triggered by
+    an entity and whether an equivalent subscription already exists without
+    scanning all subscriptions.
+
+    Exact entity ids and types are looked up in dictionaries, while id and
+    type patterns are compiled once and every distinct pattern is evaluated
+    only once per lookup. Like the context broker, patterns match if they
+    are found anywhere in the id or type. Two subscriptions are deemed
+    equivalent if their subject and notification are identical, which is
+    the same criterion that
+    :meth:`~filip.clients.ngsi_v2.cb.ContextBrokerClient.post_subscription`
+    uses.
+
+    Example::
+
+        >>> index = SubscriptionIndex(client.get_subscription_list())
+        >>> index.match(entity_id='urn:ngsi-ld:Room:001', entity_type='Room')
+
+    Args:
+        subscriptions: Subscriptions to index. Every subscription must have
+            an id.
+    """
+    def __init__(self, subscriptions: Iterable[Subscription] = None):
+        self._subscriptions: Dict[str, Subscription] = {}
+        self._ids: Dict[str, _TypeIndex] = {}
+        self._id_patterns: Dict[str, Tuple[Pattern, _TypeIndex]] = {}
+        self._urls: Dict[str, Set[str]] = {}
+        self._keys: Dict[str, str] = {}
+        self._order: Dict[str, int] = {}
+        self._counter = count()
+        for subscription in subscriptions or []:
+            self.add(subscription)
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def __contains__(self, subscription_id: str) -> bool:
+        return subscription_id in self._subscriptions
+
+    def __iter__(self):
+        return iter(self._subscriptions.values())
+
+    @staticmethod
+    def key(subscription: Subscription) -> str:
+        """
+        Key that is equal for equivalent subscriptions
+
+        Args:
+            subscription: Subscription
+
+        Returns:
+            str
+        """
+        return subscription.json(include={'subject', 'notification'})
+
+    def add(self, subscription: Subscription) -> None:
+        """
+        Adds a subscription to the index. A subscription with the same id is
+        replaced.
+
+        Args:
+            subscription: Subscription with id
+
+        Returns:
+            None
+        """
+        if not subscription.id:
+            raise ValueError("Only subscriptions with an id can be indexed!")
+        if subscription.id in self._subscriptions:
+            self.remove(subscription.id)
+        self._subscriptions[subscription.id] = subscription
+        self._order[subscription.id] = next(self._counter)
+        for entity in subscription.subject.entities:
+            self.__type_index(entity, create=True).add(entity, subscription.id)
+        url = _notification_url(subscription)
+        if url is not None:
+            self._urls.setdefault(url, set()).add(subscription.id)
+        self._keys.setdefault(self.key(subscription), subscription.id)
+
+    def remove(self, subscription_id: str) -> Optional[Subscription]:
+        """
+        Removes a subscription from the index
+
+        Args:
+            subscription_id: Id of the subscription
+
+        Returns:
+            The removed subscription or None if it was not indexed
+        """
+        subscription = self._subscriptions.pop(subscription_id, None)
+        if subscription is None:
+            return None
+        del self._order[subscription_id]
+        for entity in subscription.subject.entities:
+            type_index = self.__type_index(entity)
+            if type_index is None:
+                continue
+            type_index.remove(entity, subscription_id)
+            if not type_index:
+                if entity.id:
+                    del self._ids[entity.id]
+                else:
+                    del self._id_patterns[entity.idPattern.pattern]
+        url = _notification_url(subscription)
+        if url is not None:
+            _discard(self._urls, url, subscription_id)
+        key = self.key(subscription)
+        if self._keys.get(key) == subscription_id:
+            del self._keys[key]
+            # another equivalent subscription may still be indexed
+            for other in self._subscriptions.values():
+                if self.key(other) == key:
+                    self._keys[key] = other.id
+                    break
+        return subscription
+
+    def get(self, subscription_id: str) -> Optional[Subscription]:
+        """
+        Returns an indexed subscription
+
+        Args:
+            subscription_id: Id of the subscription
+
+        Returns:
+            Subscription or None
+        """
+        return self._subscriptions.get(subscription_id)
+
+    def match(self, entity_id: str, entity_type: str) -> List[Subscription]:
+        """
+        Returns the subscriptions whose subject matches an entity
+
+        Args:
+            entity_id: Id of the entity
+            entity_type: Type of the entity
+
+        Returns:
+            List of matching subscriptions in the order they were added
+        """
+        type_indices = [self._ids.get(entity_id)]
+        type_indices.extend(type_index for pattern, type_index
+                            in self._id_patterns.values()
+                            if pattern.search(entity_id))
+        ids = set(chain.from_iterable(type_index.match(entity_type)
+                                      for type_index in type_indices
+                                      if type_index is not None))
+        return self.__sorted(ids)
+
+    def find_duplicate(self,
+                       subscription: Subscription) -> Optional[Subscription]:
+        """
+        Returns an indexed subscription that is equivalent to the given one,
+        i.e., that has the same subject and notification
+
+        Args:
+            subscription: Subscription, does not need an id
+
+        Returns:
+            The equivalent subscription or None
+        """
+        subscription_id = self._keys.get(self.key(subscription))
+        if subscription_id is None:
+            return None
+        return self._subscriptions[subscription_id]
+
+    def by_notification_url(self, url: str) -> List[Subscription]:
+        """
+        Returns the subscriptions that notify a given endpoint
+
+        Args:
+            url: Url of the http or mqtt endpoint
+
+        Returns:
+            List of subscriptions
+        """
+        return self.__sorted(self._urls.get(str(url), ()))
+
+    def __sorted(self, ids: Iterable[str]) -> List[Subscription]:
+        """
+        Subscriptions of the given ids in the order they were added
+        """
+        return [self._subscriptions[subscription_id] for subscription_id
+                in sorted(ids, key=self._order.__getitem__)]
+
+    def __type_index(self,
+                     entity: EntityPattern,
+                     create: bool = False) -> Optional[_TypeIndex]:
+        """
+        Type index for the id or id pattern of an entity pattern
+        """
+        if entity.id:
+            if create:
+                return self._ids.setdefault(entity.id, _TypeIndex())
+            return self._ids.get(entity.id)
+        pattern = entity.idPattern.pattern
+        if create and pattern not in self._id_patterns:
+            self._id_patterns[pattern] = (_compile(entity.idPattern),
+                                          _TypeIndex())
+        item = self._id_patterns.get(pattern)
+        return item[1] if item else None
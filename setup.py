@@ -20,10 +20,13 @@ INSTALL_REQUIRES = ['aenum',
                     'regex',
                     'requests',
                     'rapidfuzz',
-                    'wget']
+                    'wget',
+                    'httpx>=0.23.0']
 
 SETUP_REQUIRES = INSTALL_REQUIRES.copy()
 
+EXTRAS_REQUIRE = {'cache': ['pyarrow>=7.0.0']}
+
 VERSION = '0.2.5'
 
 setuptools.setup(
@@ -62,6 +65,7 @@ setuptools.setup(
     package_data={'filip': ['data/unece-units/*.csv']},
     setup_requires=SETUP_REQUIRES,
     install_requires=INSTALL_REQUIRES,
+    extras_require=EXTRAS_REQUIRE,
     python_requires=">=3.7",
 
 )
@@ -0,0 +1,137 @@
+"""
+Tests for filip.clients.ngsi_v2.async_cb
+"""
+import asyncio
+import unittest
+import logging
+
+from filip.models.base import FiwareHeader
+from filip.clients.ngsi_v2 import \
+    AsyncContextBrokerClient, \
+    AsyncHttpClient, \
+    ContextBrokerClient
+from filip.clients.ngsi_v2 import HttpClientConfig
+from filip.models.ngsi_v2.context import \
+    ContextEntity, \
+    NamedContextAttribute, \
+    ActionType
+from filip.utils.cleanup import clear_all
+from tests.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class TestAsyncContextBroker(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for AsyncContextBrokerClient
+    """
+
+    def setUp(self) -> None:
+        """
+        Setup test data
+        Returns:
+            None
+        """
+        self.fiware_header = FiwareHeader(
+            service=settings.FIWARE_SERVICE,
+            service_path=settings.FIWARE_SERVICEPATH)
+        clear_all(fiware_header=self.fiware_header,
+                  cb_url=settings.CB_URL)
+        self.attr = {'temperature': {'value': 20.0,
+                                     'type': 'Number'}}
+        self.entity = ContextEntity(id='MyId', type='MyType', **self.attr)
+
+    async def asyncSetUp(self) -> None:
+        self.client = AsyncContextBrokerClient(
+            url=settings.CB_URL,
+            fiware_header=self.fiware_header)
+
+    async def test_management_endpoints(self):
+        """
+        Test management functions of context broker client
+        """
+        self.assertIsNotNone(await self.client.get_version())
+        self.assertEqual(await self.client.get_resources(),
+                         ContextBrokerClient(
+                             url=settings.CB_URL,
+                             fiware_header=self.fiware_header).get_resources())
+
+    async def test_entity_operations(self):
+        """
+        Test entity operations of context broker client
+        """
+        await self.client.post_entity(entity=self.entity, update=True)
+        res_entity = await self.client.get_entity(entity_id=self.entity.id)
+        self.assertEqual(res_entity, self.entity)
+        self.assertTrue(await self.client.does_entity_exist(
+            entity_id=self.entity.id, entity_type=self.entity.type))
+
+        attr = NamedContextAttribute(name='temperature',
+                                     value=25.0,
+                                     type='Number')
+        await self.client.update_entity_attribute(entity_id=self.entity.id,
+                                                  entity_type=self.entity.type,
+                                                  attr=attr)
+        self.assertEqual(await self.client.get_attribute_value(
+            entity_id=self.entity.id, attr_name='temperature'), 25.0)
+
+        await self.client.delete_entity(entity_id=self.entity.id,
+                                        entity_type=self.entity.type)
+        self.assertFalse(await self.client.does_entity_exist(
+            entity_id=self.entity.id, entity_type=self.entity.type))
+
+    async def test_pagination(self):
+        """
+        Test concurrent pagination of the entity list
+        """
+        entities = [ContextEntity(id=str(i), type='MyType')
+                    for i in range(2500)]
+        await self.client.update(action_type=ActionType.APPEND,
+                                 entities=entities)
+        res = await self.client.get_entity_list(limit=2500)
+        self.assertEqual(len(res), 2500)
+        self.assertEqual(len({entity.id for entity in res}), 2500)
+        res = await self.client.get_entity_list(limit=1500)
+        self.assertEqual(len(res), 1500)
+        # the number of concurrent page requests is bounded
+        sequential = await self.client.get_entity_list(limit=2500,
+                                                       max_workers=1)
+        self.assertEqual(sequential, await self.client.get_entity_list(
+            limit=2500, max_workers=2))
+
+    async def test_concurrent_requests(self):
+        """
+        Test many concurrent requests on a shared connection pool
+        """
+        entities = [ContextEntity(id=f'entity_{i}', type='MyType',
+                                  **self.attr) for i in range(50)]
+        await asyncio.gather(*[self.client.post_entity(entity=entity)
+                               for entity in entities])
+        res = await asyncio.gather(*[self.client.get_entity(entity_id=e.id)
+                                     for e in entities])
+        self.assertEqual(res, entities)
+
+    async def test_master_client(self):
+        """
+        Test the asynchronous master client
+        """
+        async with AsyncHttpClient(
+                config=HttpClientConfig(cb_url=settings.CB_URL,
+                                        iota_url=settings.IOTA_JSON_URL,
+                                        ql_url=settings.QL_URL),
+                fiware_header=self.fiware_header) as client:
+            self.assertIs(client.cb.session, client.session)
+            self.assertIs(client.iota.session, client.session)
+            self.assertIs(client.timeseries.session, client.session)
+            self.assertIsNotNone(await client.cb.get_version())
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+
+    def tearDown(self) -> None:
+        """
+        Cleanup test server
+        """
+        clear_all(fiware_header=self.fiware_header,
+                  cb_url=settings.CB_URL)
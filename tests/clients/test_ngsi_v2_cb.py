@@ -2,21 +2,26 @@
 Tests for filip.cb.client
 """
 import copy
+import io
 import unittest
 import logging
 import time
 import random
 import json
+import tempfile
 import uuid
 
+import pandas as pd
 import paho.mqtt.client as mqtt
 from datetime import datetime, timedelta
 from urllib.parse import urlparse
+import requests
 from requests import RequestException
 from filip.models.base import FiwareHeader
 from filip.utils.simple_ql import QueryString
 from filip.clients.ngsi_v2 import ContextBrokerClient, IoTAClient
 from filip.clients.ngsi_v2 import HttpClient, HttpClientConfig
+from filip.clients.mqtt import NotificationStream
 from filip.config import settings
 from filip.models.ngsi_v2.context import \
     ContextEntity, \
@@ -27,7 +32,7 @@ from filip.models.ngsi_v2.context import \
     ActionType
 
 from filip.models.ngsi_v2.base import AttrsFormat, EntityPattern, Status, \
-    NamedMetadata
+    NamedMetadata, ValidationMode
 from filip.models.ngsi_v2.subscriptions import Mqtt, Message, Subscription
 from filip.models.ngsi_v2.iot import \
     Device, \
@@ -42,6 +47,132 @@ from tests.config import settings
 logger = logging.getLogger(__name__)
 
 
+class FakeOrionSession(requests.Session):
+    """
+    Session that answers entity listings and batch updates from an
+    in-memory store, e.g., to change entities between two pages of a scan.
+    `on_page` is called with the number of the listing before it is served.
+    """
+    def __init__(self, entities, on_page=None):
+        super().__init__()
+        self.entities = {entity['id']: entity for entity in entities}
+        self.on_page = on_page
+        self.pages = 0
+        self.updates = []
+
+    def request(self, method, url, params=None, data=None, **kwargs):
+        res = requests.Response()
+        res.status_code = 200
+        if url.endswith('v2/op/update'):
+            self.updates.extend(json.loads(data)['entities'])
+            res.status_code = 204
+            res._content = b''
+            return res
+        if self.on_page:
+            self.on_page(self.pages)
+        self.pages += 1
+        key = params['orderBy'].split(',')[0]
+        items = sorted(self.entities.values(),
+                       key=lambda item: (item[key], item['id']))
+        for condition in filter(None, params.get('q', '').split(';')):
+            attr, value = condition.split('>=')
+            items = [item for item in items if item[attr] >= value]
+        attrs = params.get('attrs', '').split(',')
+        page = [{'id': item['id'], 'type': item['type'],
+                 **{attr: {'type': 'DateTime', 'value': item[attr]}
+                    for attr in ('dateCreated', 'dateModified')
+                    if attr in attrs}}
+                for item in items]
+        offset = params.get('offset', 0)
+        res._content = json.dumps(
+            page[offset:offset + params['limit']]).encode()
+        res.headers['Fiware-Total-Count'] = str(len(page))
+        return res
+
+
+class TestKeysetPagination(unittest.TestCase):
+    """
+    Test keyset pagination against changes between two pages
+    """
+    def setUp(self) -> None:
+        self.entities = [{'id': f'E{i}',
+                          'type': 'Room',
+                          'dateCreated': f'2023-01-01T00:00:0{i // 2}.000Z',
+                          'dateModified': f'2023-01-01T00:00:0{i}.000Z'}
+                         for i in range(6)]
+
+    def scan(self, session: FakeOrionSession, **kwargs):
+        with ContextBrokerClient(url='http://localhost:1026',
+                                 session=session) as client:
+            return [item['id'] for item in client.iter_entities(
+                pagination='keyset', parse=False, page_size=2, **kwargs)]
+
+    def test_deleted_during_scan(self):
+        """
+        Deleting the last entity of a page does not skip the next one
+        """
+        def delete(page: int):
+            if page == 1:
+                session.entities.pop('E1')
+
+        session = FakeOrionSession(self.entities, on_page=delete)
+        self.assertEqual(self.scan(session), ['E0', 'E1', 'E2', 'E3', 'E4',
+                                              'E5'])
+
+    def test_large_groups(self):
+        """
+        Entities that share a date are neither skipped nor repeated
+        """
+        for entity in self.entities:
+            entity['dateCreated'] = '2023-01-01T00:00:00.000Z'
+        session = FakeOrionSession(self.entities)
+        self.assertEqual(self.scan(session), [f'E{i}' for i in range(6)])
+        session = FakeOrionSession(self.entities)
+        self.assertEqual(self.scan(session, limit=3), ['E0', 'E1', 'E2'])
+
+    def test_modified_during_change_scan(self):
+        """
+        Modifying the last entity of a page moves it to the end of the scan
+        of changes without skipping the next one
+        """
+        def modify(page: int):
+            if page == 1:
+                session.entities['E1']['dateModified'] = \
+                    '2023-01-01T00:00:09.000Z'
+
+        session = FakeOrionSession(self.entities, on_page=modify)
+        with ContextBrokerClient(url='http://localhost:1026',
+                                 session=session) as client:
+            ids = [item['id'] for page in client.iter_entity_changes(
+                page_size=2) for item in page]
+        self.assertEqual(ids, ['E0', 'E1', 'E2', 'E3', 'E4', 'E5', 'E1'])
+
+    def test_sync_modified_during_change_scan(self):
+        """
+        An entity that is modified while the sync scans the changes does
+        not cause the next entity to be missed or the watermark to pass it
+        """
+        def modify(page: int):
+            if page == 1:
+                source.entities['E1']['dateModified'] = \
+                    '2023-01-01T00:00:09.000Z'
+
+        source = FakeOrionSession(self.entities, on_page=modify)
+        target = FakeOrionSession([])
+        with ContextBrokerClient(url='http://localhost:1026',
+                                 session=source) as source_client, \
+                ContextBrokerClient(url='http://localhost:1027',
+                                    session=target) as target_client:
+            sync = source_client.sync_to(target_client,
+                                         deletion_interval=None,
+                                         page_size=2)
+            sync.checkpoint.initialized = True
+            result = sync.sync()
+        self.assertEqual({item['id'] for item in target.updates},
+                         {f'E{i}' for i in range(6)})
+        self.assertEqual(result.watermark, '2023-01-01T00:00:09.000Z')
+
+
 class TestContextBroker(unittest.TestCase):
     """
     Test class for ContextBrokerClient
@@ -151,6 +282,161 @@ class TestContextBroker(unittest.TestCase):
             self.assertLessEqual(len(client.get_entity_list(limit=1001)), 1001)
             self.assertLessEqual(len(client.get_entity_list(limit=2001)), 2001)
 
+            # concurrent pagination must return the same ordered result
+            self.assertEqual(
+                client.get_entity_list(order_by='id'),
+                client.get_entity_list(order_by='id', max_workers=4))
+            self.assertEqual(
+                len(client.get_entity_list(limit=1500, max_workers=4)), 1500)
+            query = Query.parse_obj(
+                {"entities": [{"idPattern": ".*",
+                               "type": "filip:object:TypeB"}]})
+            self.assertEqual(len(client.query(query=query, max_workers=4)),
+                             1001)
+
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_keyset_pagination(self):
+        """
+        Test keyset pagination of context broker client
+        """
+        with ContextBrokerClient(
+                url=settings.CB_URL,
+                fiware_header=self.fiware_header) as client:
+            # entities of one batch share the same creation date
+            entities = [ContextEntity(id=str(i), type='filip:object:TypeA')
+                        for i in range(0, 2500)]
+            client.update(action_type=ActionType.APPEND, entities=entities)
+            entities = client.get_entity_list(pagination='keyset')
+            self.assertEqual(len(entities), 2500)
+            self.assertEqual(len({entity.id for entity in entities}), 2500)
+            self.assertFalse(hasattr(entities[0], 'dateCreated'))
+
+            iterated = list(client.iter_entities(pagination='keyset',
+                                                 page_size=300))
+            self.assertEqual(iterated, entities)
+            self.assertEqual(
+                len(client.get_entity_list(pagination='keyset', limit=1200)),
+                1200)
+
+            # entities created during a scan are neither skipped nor repeated
+            scan = client.iter_entities(pagination='keyset',
+                                        page_size=1000,
+                                        response_format=AttrsFormat.KEY_VALUES)
+            first = next(scan)
+            client.post_entity(ContextEntity(id='new',
+                                             type='filip:object:TypeA'))
+            ids = [first.id] + [entity.id for entity in scan]
+            self.assertEqual(len(ids), 2501)
+            self.assertEqual(ids[-1], 'new')
+
+            query = Query.parse_obj(
+                {"entities": [{"idPattern": ".*",
+                               "type": "filip:object:TypeA"}]})
+            self.assertEqual(len(client.query(query=query,
+                                              pagination='keyset')),
+                             2501)
+            with self.assertRaises(ValueError):
+                client.get_entity_list(pagination='keyset', order_by='id')
+
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_entity_iteration(self):
+        """
+        Test streaming generators of context broker client
+        """
+        with ContextBrokerClient(
+                url=settings.CB_URL,
+                fiware_header=self.fiware_header) as client:
+            entities = [ContextEntity(id=str(i), type='filip:object:TypeA')
+                        for i in range(0, 2500)]
+            client.update(action_type=ActionType.APPEND, entities=entities)
+            self.assertEqual(
+                list(client.iter_entities(order_by='id', page_size=700)),
+                client.get_entity_list(order_by='id'))
+            self.assertEqual(len(list(client.iter_entities(limit=1200))), 1200)
+            raw = next(client.iter_entities(parse=False))
+            self.assertIsInstance(raw, dict)
+            query = Query.parse_obj(
+                {"entities": [{"idPattern": ".*",
+                               "type": "filip:object:TypeA"}]})
+            self.assertEqual(
+                len(list(client.iter_query(
+                    query=query, response_format=AttrsFormat.KEY_VALUES))),
+                2500)
+
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_entity_frames(self):
+        """
+        Test DataFrame export of context broker client
+        """
+        with ContextBrokerClient(
+                url=settings.CB_URL,
+                fiware_header=self.fiware_header) as client:
+            entities = [ContextEntity(id=str(i), type='filip:object:TypeA',
+                                      **self.attr) for i in range(0, 1500)]
+            for entity in entities[:10]:
+                entity.temperature.metadata = {
+                    'accuracy': {'type': 'Number', 'value': 0.5}}
+            client.update(action_type=ActionType.APPEND, entities=entities)
+
+            df = client.get_entity_frame(entity_types=['filip:object:TypeA'],
+                                         order_by='id')
+            self.assertEqual(df.shape, (1500, 3))
+            self.assertEqual(list(df['id']),
+                             [entity.id for entity in
+                              client.get_entity_list(order_by='id')])
+            self.assertTrue((df['temperature'] == 20).all())
+
+            df = client.get_entity_frame(metadata_columns=True, limit=1200)
+            self.assertEqual(len(df), 1200)
+            self.assertIn('temperature.accuracy', df.columns)
+
+            query = Query.parse_obj(
+                {"entities": [{"idPattern": ".*",
+                               "type": "filip:object:TypeA"}]})
+            self.assertEqual(len(client.query_frame(query=query)), 1500)
+            query = Query.parse_obj(
+                {"entities": [{"idPattern": ".*",
+                               "type": "filip:object:TypeB"}]})
+            df = client.query_frame(query=query)
+            self.assertTrue(df.empty)
+            self.assertEqual(list(df.columns), ['id', 'type'])
+            df = client.get_entity_frame(entity_types=['filip:object:TypeB'])
+            self.assertEqual(list(df.columns), ['id', 'type'])
+            self.assertTrue(df.set_index('id').empty)
+
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_validation_modes(self):
+        """
+        Test retrieving entities with and without validation
+        """
+        with ContextBrokerClient(
+                url=settings.CB_URL,
+                fiware_header=self.fiware_header) as client:
+            entities = [ContextEntity(id=str(i), type='filip:object:TypeA',
+                                      **self.attr) for i in range(0, 100)]
+            client.update(action_type=ActionType.APPEND, entities=entities)
+            strict = client.get_entity_list(order_by='id')
+            self.assertEqual(client.get_entity_list(order_by='id',
+                                                    validate=False), strict)
+            lazy = client.get_entity_list(order_by='id',
+                                          validate=ValidationMode.LAZY)
+            self.assertIsInstance(lazy[0], dict)
+            self.assertEqual([entity.validate() for entity in lazy], strict)
+            query = Query.parse_obj(
+                {"entities": [{"idPattern": ".*",
+                               "type": "filip:object:TypeA"}]})
+            self.assertEqual(
+                len(list(client.iter_query(query=query,
+                                           validate='construct'))), 100)
+
     @clean_test(fiware_service=settings.FIWARE_SERVICE,
                 fiware_servicepath=settings.FIWARE_SERVICEPATH,
                 cb_url=settings.CB_URL)
@@ -495,6 +781,56 @@ class TestContextBroker(unittest.TestCase):
         mqtt_client.disconnect()
         time.sleep(1)
 
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_mqtt_notification_stream(self):
+        """
+        Test batched consumption of mqtt notifications
+        """
+        mqtt_topic = ''.join([settings.FIWARE_SERVICE,
+                              settings.FIWARE_SERVICEPATH, '/stream'])
+        notification = self.subscription.notification.copy(
+            update={'http': None,
+                    'mqtt': Mqtt(url=settings.MQTT_BROKER_URL,
+                                 topic=mqtt_topic),
+                    'attrsFormat': AttrsFormat.KEY_VALUES})
+        subscription = self.subscription.copy(
+            update={'notification': notification,
+                    'description': 'MQTT stream test subscription',
+                    'expires': None})
+        entities = [ContextEntity(id=f'Room{i}', type='Room', **self.attr)
+                    for i in range(10)]
+        self.client.update(entities=entities, action_type=ActionType.APPEND)
+
+        batches, late_batches = [], []
+        stream = NotificationStream(subscription,
+                                    max_batch_size=5,
+                                    max_delay=0.5)
+        stream.add_callback(batches.append)
+        with stream:
+            sub_id = self.client.post_subscription(
+                subscription, skip_initial_notification=True)
+            time.sleep(1)
+            # callbacks added to a running stream receive messages as well
+            stream.add_callback(late_batches.append)
+            for entity in entities:
+                self.client.update_attribute_value(entity_id=entity.id,
+                                                   attr_name='temperature',
+                                                   value=50,
+                                                   entity_type=entity.type)
+            time.sleep(3)
+
+        messages = [message for batch in batches for message in batch]
+        self.assertEqual(len(messages), len(entities))
+        self.assertTrue(all(len(batch) <= 5 for batch in batches))
+        self.assertTrue(all(message.subscriptionId == sub_id
+                            for message in messages))
+        self.assertEqual({message.data[0].temperature
+                          for message in messages}, {50})
+        self.assertEqual([message for batch in late_batches
+                          for message in batch], messages)
+
     @clean_test(fiware_service=settings.FIWARE_SERVICE,
                 fiware_servicepath=settings.FIWARE_SERVICEPATH,
                 cb_url=settings.CB_URL)
@@ -520,6 +856,361 @@ class TestContextBroker(unittest.TestCase):
                              len(client.query(query=query,
                                               response_format='keyValues')))
 
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_bulk_entity_lookup(self):
+        """
+        Test bulk fetch and existence check of context broker client
+        """
+        with ContextBrokerClient(
+                url=settings.CB_URL,
+                fiware_header=self.fiware_header) as client:
+            entities = [ContextEntity(id=str(i), type='filip:object:TypeA',
+                                      **self.attr) for i in range(300)]
+            client.update(action_type=ActionType.APPEND, entities=entities)
+            ids = [str(i) for i in range(0, 400, 2)]
+
+            res = client.get_entities_by_ids(entity_ids=ids,
+                                             entity_types='filip:object:TypeA')
+            self.assertEqual(len(res), 150)
+            self.assertEqual(res[('0', 'filip:object:TypeA')], entities[0])
+
+            exist = client.entities_exist(entity_ids=ids)
+            self.assertEqual(len(exist), 200)
+            self.assertTrue(exist[('298', None)])
+            self.assertFalse(exist[('300', None)])
+
+            exist = client.entities_exist(
+                entity_ids=['0', '0'],
+                entity_types=['filip:object:TypeA', 'filip:object:TypeB'])
+            self.assertEqual(exist, {('0', 'filip:object:TypeA'): True,
+                                     ('0', 'filip:object:TypeB'): False})
+
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_batch_chunking(self):
+        """
+        Test chunked and concurrent batch operations of context broker client
+        """
+        with ContextBrokerClient(
+                url=settings.CB_URL,
+                fiware_header=self.fiware_header) as client:
+            entities = [ContextEntity(id=str(i),
+                                      type='filip:object:TypeC',
+                                      **self.attr) for i in range(0, 2500)]
+            report = client.update(entities=entities,
+                                   action_type=ActionType.APPEND,
+                                   chunk_size=300,
+                                   max_workers=4)
+            self.assertTrue(report.success)
+            self.assertEqual(len(report.chunks), 9)
+            self.assertEqual(sorted(i for chunk in report.chunks
+                                    for i in chunk.indices),
+                             list(range(2500)))
+            self.assertEqual(len(client.get_entity_list(
+                entity_types=['filip:object:TypeC'])), 2500)
+
+            report = client.update(entities=entities[:100],
+                                   action_type=ActionType.APPEND,
+                                   max_payload_size=2000)
+            self.assertGreater(len(report.chunks), 1)
+            self.assertTrue(all(chunk.payload_size <= 2000
+                                for chunk in report.chunks))
+
+            # updating missing entities fails only for the affected chunk
+            missing = [ContextEntity(id='missing', type='filip:object:TypeC',
+                                     **self.attr)]
+            report = client.update(entities=entities[:10] + missing,
+                                   action_type=ActionType.UPDATE,
+                                   chunk_size=10,
+                                   raise_on_error=False)
+            self.assertFalse(report.success)
+            self.assertEqual(report.failed_indices, [10])
+            with self.assertRaises(RequestException):
+                client.update(entities=missing,
+                              action_type=ActionType.UPDATE)
+
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_upsert_frame(self):
+        """
+        Test bulk upsert of DataFrames and CSV files
+        """
+        with ContextBrokerClient(
+                url=settings.CB_URL,
+                fiware_header=self.fiware_header) as client:
+            df = pd.DataFrame({'id': [f'Room{i}' for i in range(1000)],
+                               'type': 'Room',
+                               'temperature': [20.0 + i % 5
+                                               for i in range(1000)],
+                               'occupied': [i % 2 == 0 for i in range(1000)],
+                               'name': [f'Room {i}' for i in range(1000)]})
+            df.loc[0, 'temperature'] = None
+            report = client.upsert_frame(df, chunk_size=300, max_workers=4)
+            self.assertTrue(report.success)
+            self.assertEqual(len(report.chunks), 4)
+
+            frame = client.get_entity_frame(entity_types=['Room'],
+                                            order_by='id')
+            self.assertEqual(len(frame), 1000)
+            room = client.get_entity(entity_id='Room1', entity_type='Room')
+            self.assertEqual(room.temperature.value, 21.0)
+            self.assertEqual(room.occupied.type, 'Boolean')
+            self.assertEqual(room.name.type, 'Text')
+            # missing values are skipped
+            self.assertNotIn('temperature',
+                             client.get_entity(entity_id='Room0',
+                                               entity_type='Room').dict())
+
+            report = client.upsert_csv(
+                io.StringIO(df.to_csv(index=False)),
+                attr_types={'temperature': 'Float'},
+                rows_per_read=400)
+            self.assertTrue(report.success)
+            self.assertEqual(sorted(i for chunk in report.chunks
+                                    for i in chunk.indices),
+                             list(range(1000)))
+            self.assertEqual(client.get_entity(entity_id='Room1',
+                                               entity_type='Room')
+                             .temperature.type, 'Float')
+
+            # ids are read as strings, options are passed to read_csv
+            report = client.upsert_csv(
+                io.StringIO("id;type;count\n007;Room;1\n008;Room;\n"),
+                read_csv_kwargs={'sep': ';', 'dtype': {'count': 'Int64'}},
+                rows_per_read=1)
+            self.assertTrue(report.success)
+            self.assertEqual(client.get_entity(entity_id='007',
+                                               entity_type='Room')
+                             .get_attribute('count').value, 1)
+            self.assertTrue(client.does_entity_exist(entity_id='008',
+                                                     entity_type='Room'))
+
+            # datetimes are sent with milliseconds like the other writers
+            report = client.upsert_frame(pd.DataFrame({
+                'id': ['Room1'],
+                'type': 'Room',
+                'observedAt': pd.to_datetime(['2023-01-01T12:00:00.123456Z'])
+            }))
+            self.assertTrue(report.success)
+            self.assertEqual(client.get_entity(entity_id='Room1',
+                                               entity_type='Room')
+                             .get_attribute('observedAt').value,
+                             '2023-01-01T12:00:00.123Z')
+
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_entity_cache(self):
+        """
+        Test read-through entity cache of context broker client
+        """
+        with ContextBrokerClient(
+                url=settings.CB_URL,
+                fiware_header=self.fiware_header) as client:
+            client.post_entity(entity=self.entity)
+            with client.entity_cache(max_size=1,
+                                     ttl=60,
+                                     entity_types=[self.entity.type]) \
+                    as cache:
+                self.assertEqual(len(client.get_subscription_list()), 1)
+                self.assertEqual(cache.get_entity(entity_id=self.entity.id),
+                                 self.entity)
+                self.assertEqual(cache.get_attribute_value(
+                    entity_id=self.entity.id,
+                    entity_type=self.entity.type,
+                    attr_name='temperature'), 20.0)
+                self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+                # notifications are merged into the cached entities
+                cache.handle_notification(Message(
+                    subscriptionId=cache.subscription_id,
+                    data=[ContextEntity(id=self.entity.id,
+                                        type=self.entity.type,
+                                        temperature={'value': 25,
+                                                     'type': 'Number'})]))
+                self.assertEqual(cache.get_attribute_value(
+                    entity_id=self.entity.id,
+                    attr_name='temperature'), 25.0)
+
+                cache.invalidate(entity_id=self.entity.id)
+                self.assertEqual(len(cache), 0)
+                self.assertEqual(cache.get_attribute_value(
+                    entity_id=self.entity.id,
+                    attr_name='temperature'), 20.0)
+
+                # notifications during loading are not lost
+                load = client.get_entity
+
+                def get_entity(**kwargs):
+                    entity = load(**kwargs)
+                    cache.handle_notification(Message(
+                        subscriptionId=cache.subscription_id,
+                        data=[ContextEntity(id=self.entity.id,
+                                            type=self.entity.type,
+                                            temperature={'value': 30,
+                                                         'type': 'Number'})]))
+                    return entity
+
+                client.get_entity = get_entity
+                cache.invalidate(entity_id=self.entity.id)
+                self.assertEqual(cache.get_attribute_value(
+                    entity_id=self.entity.id,
+                    entity_type=self.entity.type,
+                    attr_name='temperature'), 30.0)
+                client.get_entity = load
+            self.assertEqual(len(client.get_subscription_list()), 0)
+
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_sync_to(self):
+        """
+        Test incremental synchronization between two tenants
+        """
+        target_header = FiwareHeader(
+            service=settings.FIWARE_SERVICE,
+            service_path=f"{settings.FIWARE_SERVICEPATH}Sync")
+        clear_all(fiware_header=target_header, cb_url=settings.CB_URL)
+        target = ContextBrokerClient(url=settings.CB_URL,
+                                     fiware_header=target_header)
+        entities = [ContextEntity(id=f'Room{i}', type='Room', **self.attr)
+                    for i in range(1500)]
+        self.client.update(entities=entities, action_type=ActionType.APPEND)
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = f"{directory}/sync.json"
+            sync = self.client.sync_to(target,
+                                       entity_types=['Room'],
+                                       checkpoint=checkpoint,
+                                       deletion_interval=0)
+            result = sync.sync()
+            self.assertEqual(result.copied, 1500)
+            self.assertEqual(target.get_entity_list(order_by='id'),
+                             self.client.get_entity_list(order_by='id'))
+
+            # resume from the checkpoint with changes and deletions
+            time.sleep(1)
+            self.client.update_attribute_value(entity_id='Room1',
+                                               entity_type='Room',
+                                               attr_name='temperature',
+                                               value=50)
+            self.client.delete_entity(entity_id='Room2', entity_type='Room')
+            sync = self.client.sync_to(target,
+                                       entity_types=['Room'],
+                                       checkpoint=checkpoint,
+                                       deletion_interval=0)
+            self.assertTrue(sync.checkpoint.initialized)
+            result = sync.sync()
+            self.assertLess(result.copied, 1500)
+            self.assertEqual(result.deleted, 1)
+            self.assertEqual(target.get_entity_list(order_by='id'),
+                             self.client.get_entity_list(order_by='id'))
+        clear_all(fiware_header=target_header, cb_url=settings.CB_URL)
+
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_write_buffer(self):
+        """
+        Test write-behind buffer of context broker client
+        """
+        with ContextBrokerClient(
+                url=settings.CB_URL,
+                fiware_header=self.fiware_header) as client:
+            with client.write_buffer(max_size=50,
+                                     flush_interval=None,
+                                     max_pending=100) as buffer:
+                for value in range(10):
+                    for i in range(20):
+                        buffer.update_attribute_value(
+                            entity_id=str(i),
+                            entity_type='filip:object:TypeD',
+                            attr_name='temperature',
+                            value=value)
+                # repeated writes are merged
+                self.assertEqual(len(buffer), 20)
+                buffer.update_or_append_entity_attributes(
+                    entity_id='0',
+                    entity_type='filip:object:TypeD',
+                    attrs=self.attr)
+                report = buffer.flush()
+                self.assertTrue(report.success)
+                self.assertEqual(len(buffer), 0)
+                self.assertIsNone(buffer.flush())
+
+                # reaching the size threshold flushes in the background
+                for i in range(60):
+                    buffer.update_attribute_value(
+                        entity_id=f'new_{i}',
+                        entity_type='filip:object:TypeD',
+                        attr_name='humidity',
+                        value=0.5)
+            self.assertEqual(len(client.get_entity_list(
+                entity_types=['filip:object:TypeD'])), 80)
+            self.assertEqual(client.get_attribute_value(
+                entity_id='1',
+                entity_type='filip:object:TypeD',
+                attr_name='temperature'), 9)
+            self.assertEqual(client.get_attribute_value(
+                entity_id='0',
+                entity_type='filip:object:TypeD',
+                attr_name='temperature'),
+                self.attr['temperature']['value'])
+
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_write_buffer_errors(self):
+        """
+        Test that the write buffer keeps attribute types and does not lose
+        updates if the context broker fails
+        """
+        entity = ContextEntity(id='0', type='filip:object:TypeD')
+        entity.add_attributes({'temperature': {'type': 'Float',
+                                               'value': 20.5}})
+        self.client.post_entity(entity=entity)
+
+        # the broker is not reachable, hence the updates remain pending
+        broken = ContextBrokerClient(url='http://localhost:1',
+                                     fiware_header=self.fiware_header)
+        buffer = broken.write_buffer(flush_interval=None)
+        buffer.update_attribute_value(entity_id='0',
+                                      entity_type='filip:object:TypeD',
+                                      attr_name='temperature',
+                                      value=21)
+        report = buffer.flush()
+        self.assertFalse(report.success)
+        self.assertEqual(len(buffer), 1)
+        # newer values are not overwritten by the failed ones
+        buffer.update_attribute_value(entity_id='0',
+                                      entity_type='filip:object:TypeD',
+                                      attr_name='temperature',
+                                      value=22)
+        self.assertFalse(buffer.flush().success)
+        self.assertEqual(len(buffer), 1)
+
+        # the pending updates are written once the broker is reachable
+        buffer.client = self.client
+        self.assertTrue(buffer.flush().success)
+        attr = self.client.get_attribute(entity_id='0',
+                                         entity_type='filip:object:TypeD',
+                                         attr_name='temperature')
+        self.assertEqual(attr.value, 22)
+        self.assertEqual(attr.type, 'Float')
+
+        buffer.client = broken
+        buffer.update_attribute_value(entity_id='0',
+                                      entity_type='filip:object:TypeD',
+                                      attr_name='temperature',
+                                      value=23)
+        with self.assertRaises(RuntimeError):
+            buffer.close()
+        self.assertEqual(len(buffer), 1)
+
     @clean_test(fiware_service=settings.FIWARE_SERVICE,
                 fiware_servicepath=settings.FIWARE_SERVICEPATH,
                 cb_url=settings.CB_URL,
@@ -781,6 +1472,99 @@ class TestContextBroker(unittest.TestCase):
                          self.client.get_entity(entity_id=entity.id))
         self.tearDown()
 
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_patch_entities(self) -> None:
+        """
+        Test the methode: patch_entities
+
+        Returns:
+           None
+        """
+        entities = [ContextEntity(id=f"test_id{i}", type="test_type1",
+                                  **self.attr) for i in range(10)]
+        self.client.update(entities=entities[:5],
+                           action_type=ActionType.APPEND)
+
+        targets = copy.deepcopy(entities)
+        for i, target in enumerate(targets):
+            target.delete_attributes(['temperature'])
+            target.add_attributes([NamedContextAttribute(name="humidity",
+                                                         value=i,
+                                                         type="Number")])
+        # id of the first entity changed, old entity must be deleted
+        renamed = ContextEntity(id="renamed", type="test_type1", **self.attr)
+        targets[0] = renamed
+        old_entities = [entities[0]] + [None] * 9
+        self.client.patch_entities(entities=targets,
+                                   old_entities=old_entities)
+
+        result = self.client.get_entity_list(entity_types=["test_type1"],
+                                             order_by="id")
+        self.assertEqual(len(result), 10)
+        self.assertFalse(self.client.does_entity_exist(
+            entity_id=entities[0].id, entity_type=entities[0].type))
+        for target in targets:
+            self.assertEqual(target,
+                             self.client.get_entity(entity_id=target.id,
+                                                    entity_type=target.type))
+
+        with self.assertRaises(ValueError):
+            self.client.patch_entities(entities=targets,
+                                       old_entities=old_entities[:1])
+
+        # a 404 of an attribute that does not exist in the context broker,
+        # e.g., because a registration provides it, does not hide the
+        # changes of the other entities in the same chunk
+        stale = copy.deepcopy(targets[1])
+        stale.add_attributes([NamedContextAttribute(name="provided",
+                                                    value=0,
+                                                    type="Number")])
+        changed = copy.deepcopy(targets[1:3])
+        for target in changed:
+            target.humidity.value = 100
+        self.client.patch_entities(entities=changed,
+                                   old_entities=[stale, None])
+        for target in changed:
+            self.assertEqual(target,
+                             self.client.get_entity(entity_id=target.id,
+                                                    entity_type=target.type))
+
+    @clean_test(fiware_service=settings.FIWARE_SERVICE,
+                fiware_servicepath=settings.FIWARE_SERVICEPATH,
+                cb_url=settings.CB_URL)
+    def test_save_changes(self) -> None:
+        """
+        Test sending the tracked changes of an entity
+
+        Returns:
+           None
+        """
+        entity = copy.deepcopy(self.entity)
+        entity.add_attributes([NamedContextAttribute(name="humidity",
+                                                     value=50,
+                                                     type="Number")])
+        self.client.post_entity(entity=entity)
+
+        tracked = self.client.get_entity(entity_id=entity.id,
+                                         entity_type=entity.type,
+                                         track_changes=True)
+        self.assertTrue(tracked.is_tracking_changes)
+        tracked.temperature.value = 25
+        tracked.delete_attributes(["humidity"])
+        tracked.add_attributes([NamedContextAttribute(name="pressure",
+                                                      value=1013,
+                                                      type="Number")])
+        self.client.save_changes(tracked)
+        self.assertFalse(tracked.get_changes().has_changes)
+        self.assertEqual(tracked,
+                         self.client.get_entity(entity_id=entity.id,
+                                                entity_type=entity.type))
+
+        with self.assertRaises(ValueError):
+            self.client.save_changes(self.entity)
+
     def test_delete_entity_devices(self):
         # create devices
         base_device_id = "device:"
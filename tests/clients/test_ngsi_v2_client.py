@@ -8,6 +8,7 @@ import requests
 from pathlib import Path
 
 from filip.models.base import FiwareHeader
+from filip.clients.base_http_client import ConnectionPoolConfig
 from filip.clients.ngsi_v2.client import HttpClient
 
 from tests.config import settings, generate_servicepath
@@ -188,6 +189,29 @@ class TestClient(unittest.TestCase):
                 self._test_connections(client=client)
                 self._test_change_of_headers(client=client)
 
+    def test_connection_pool(self):
+        """
+        Test that clients without session own a configurable connection pool
+        that is shared by all sub clients
+
+        Returns:
+            None
+        """
+        pool_config = ConnectionPoolConfig(pool_maxsize=20, keep_alive=False)
+        client = HttpClient(config=self.config,
+                            fiware_header=self.fh,
+                            pool_config=pool_config)
+        self.assertIsNotNone(client.session)
+        self.assertIs(client.cb.session, client.session)
+        self.assertIs(client.timeseries.session, client.session)
+        adapter = client.session.get_adapter(str(settings.CB_URL))
+        self.assertEqual(adapter._pool_maxsize, 20)
+        self.assertEqual(client.headers['Connection'], 'close')
+        self.assertNotIn('pool_config', client.kwargs)
+        self._test_connections(client=client)
+        self._test_connections(client=client)
+        client.close()
+
     def tearDown(self) -> None:
         """
         Clean up artifacts
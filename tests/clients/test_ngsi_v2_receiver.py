@@ -0,0 +1,156 @@
+"""
+Tests for the asyncio notification receiver
+"""
+import asyncio
+import json
+import unittest
+from typing import Dict, List
+
+from filip.clients.ngsi_v2.receiver import NotificationReceiver
+from filip.models.ngsi_v2.context import ContextEntity, ContextEntityKeyValues
+from filip.models.ngsi_v2.subscriptions import Message
+
+
+class TestNotificationReceiver(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for the notification receiver. Notifications are sent the
+    same way Orion does, hence no running context broker is required.
+    """
+    async def asyncSetUp(self) -> None:
+        """
+        Setup test data and start the receiver
+        Returns:
+            None
+        """
+        self.receiver = NotificationReceiver(host='127.0.0.1',
+                                             workers=2,
+                                             batch_size=10)
+        self.rooms = [{'id': f'Room{i}',
+                       'type': 'Room',
+                       'temperature': {'type': 'Number', 'value': 20 + i,
+                                       'metadata': {}}}
+                      for i in range(5)]
+        self.sensor = {'id': 'Sensor1',
+                       'type': 'Sensor',
+                       'co2': {'type': 'Number', 'value': 400, 'metadata': {}}}
+        await self.receiver.start()
+
+    async def asyncTearDown(self) -> None:
+        """
+        Stop the receiver
+        """
+        await self.receiver.stop()
+
+    async def notify(self,
+                     messages: List[Dict],
+                     attrs_format: str = 'normalized') -> List[bytes]:
+        """
+        Sends notifications via a single persistent connection like Orion
+
+        Returns:
+            Status lines of the responses
+        """
+        reader, writer = await asyncio.open_connection('127.0.0.1',
+                                                       self.receiver.port)
+        status = []
+        for message in messages:
+            body = json.dumps(message).encode()
+            writer.write(b"POST /notify HTTP/1.1\r\n"
+                         b"Content-Type: application/json\r\n"
+                         b"Ngsiv2-AttrsFormat: " + attrs_format.encode() +
+                         b"\r\nContent-Length: " + str(len(body)).encode() +
+                         b"\r\n\r\n" + body)
+            await writer.drain()
+            status.append(await reader.readline())
+            while await reader.readline() != b'\r\n':
+                pass
+        writer.close()
+        return status
+
+    async def test_dispatch(self):
+        """
+        Test dispatching by subscription id and entity type
+        """
+        received = {'all': [], 'sub': [], 'rooms': []}
+
+        async def on_all(messages: List[Message]):
+            received['all'].extend(messages)
+
+        def on_sub(messages: List[Message]):
+            received['sub'].extend(messages)
+
+        self.receiver.add_handler(on_all)
+        self.receiver.add_handler(on_sub, subscription_id='sub1')
+
+        @self.receiver.handler(entity_type='Room')
+        async def on_rooms(messages: List[Message]):
+            received['rooms'].extend(messages)
+
+        status = await self.notify(
+            [{'subscriptionId': 'sub1', 'data': self.rooms},
+             {'subscriptionId': 'sub2', 'data': [self.sensor]},
+             {'subscriptionId': 'sub2', 'data': [self.sensor, self.rooms[0]]}])
+        self.assertTrue(all(line.startswith(b'HTTP/1.1 204')
+                            for line in status))
+        await self.receiver._queue.join()
+
+        self.assertEqual(len(received['all']), 3)
+        self.assertEqual(len(received['sub']), 1)
+        self.assertEqual(len(received['sub'][0].data), 5)
+        self.assertEqual(len(received['rooms']), 2)
+        self.assertEqual([entity.id for entity in received['rooms'][1].data],
+                         ['Room0'])
+        for message in received['all']:
+            for entity in message.data:
+                self.assertIsInstance(entity, ContextEntity)
+
+        statistics = self.receiver.statistics
+        self.assertEqual(statistics.received, 3)
+        self.assertEqual(statistics.dispatched, 3)
+        self.assertEqual(statistics.failed, 0)
+        self.assertGreater(statistics.max_latency, 0)
+        self.assertGreater(statistics.throughput, 0)
+
+    async def test_key_values(self):
+        """
+        Test the fast path for notifications in keyValues format
+        """
+        received = []
+        self.receiver.add_handler(received.extend)
+        await self.notify([{'subscriptionId': 'sub1',
+                            'data': [{'id': 'Room1',
+                                      'type': 'Room',
+                                      'temperature': 20}]}],
+                          attrs_format='keyValues')
+        await self.receiver._queue.join()
+        entity = received[0].data[0]
+        self.assertIsInstance(entity, ContextEntityKeyValues)
+        self.assertEqual(entity.temperature, 20)
+
+    async def test_errors(self):
+        """
+        Test invalid notifications and failing handlers
+        """
+        def fail(messages: List[Message]):
+            raise RuntimeError("handler failed")
+
+        self.receiver.add_handler(fail)
+        status = await self.notify([{'subscriptionId': 'sub1',
+                                     'data': [{'type': 'Room'}]},
+                                    {'subscriptionId': 'sub1',
+                                     'data': self.rooms}])
+        self.assertTrue(status[0].startswith(b'HTTP/1.1 400'))
+        self.assertTrue(status[1].startswith(b'HTTP/1.1 204'))
+        await self.receiver._queue.join()
+        statistics = self.receiver.statistics
+        self.assertEqual(statistics.rejected, 1)
+        self.assertEqual(statistics.failed, 1)
+
+        self.receiver.remove_handler(fail)
+        await self.notify([{'subscriptionId': 'sub1', 'data': self.rooms}])
+        await self.receiver._queue.join()
+        self.assertEqual(self.receiver.statistics.failed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
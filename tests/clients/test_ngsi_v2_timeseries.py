@@ -1,11 +1,14 @@
 """
 Tests for time series api client aka QuantumLeap
 """
+import importlib.util
 import logging
 import unittest
 from random import random
+from tempfile import TemporaryDirectory
 import requests
 import time
+from datetime import timedelta
 from typing import List
 from filip.clients.ngsi_v2 import \
     ContextBrokerClient, \
@@ -297,6 +300,185 @@ class TestTimeSeries(unittest.TestCase):
                                            records.index[0])
                     old_records = records
 
+    def test_concurrent_chunks(self) -> None:
+        """
+        Test that concurrently requested chunks are merged in order
+
+        Returns:
+            None
+        """
+        with QuantumLeapClient(
+                url=settings.QL_URL,
+                fiware_header=self.fiware_header.copy(
+                    update={'service_path': '/static'})) \
+                as client:
+            for entity in create_entities():
+                for kwargs in ({'limit': 35000},
+                               {'limit': 35000, 'last_n': 25000},
+                               {'limit': None, 'offset': 5000}):
+                    records = client.get_entity_by_id(
+                        entity_id=entity.id,
+                        attrs='temperature,co2',
+                        **kwargs)
+                    concurrent_records = client.get_entity_by_id(
+                        entity_id=entity.id,
+                        attrs='temperature,co2',
+                        max_workers=4,
+                        **kwargs)
+                    self.assertEqual(records, concurrent_records)
+
+    def test_time_windows(self) -> None:
+        """
+        Test that time windows are stitched to the same time series
+
+        Returns:
+            None
+        """
+        with QuantumLeapClient(
+                url=settings.QL_URL,
+                fiware_header=self.fiware_header.copy(
+                    update={'service_path': '/static'})) \
+                as client:
+            entity = create_entities()[0]
+            first = client.get_entity_by_id(entity_id=entity.id, limit=1)
+            last = client.get_entity_by_id(entity_id=entity.id, last_n=1)
+            kwargs = {'from_date': first.index[0].isoformat(),
+                      'to_date': last.index[-1].isoformat(),
+                      'limit': None}
+            records = client.get_entity_by_id(entity_id=entity.id, **kwargs)
+            for windows in ({'time_window': timedelta(seconds=30)},
+                            {'time_window': 'minute',
+                             'window_records': 5000}):
+                self.assertEqual(
+                    client.get_entity_by_id(entity_id=entity.id,
+                                            **kwargs,
+                                            **windows),
+                    records)
+            records = client.get_entity_attr_values_by_type(
+                entity_type=entity.type, attr_name='temperature', **kwargs)
+            self.assertEqual(
+                client.get_entity_attr_values_by_type(
+                    entity_type=entity.type,
+                    attr_name='temperature',
+                    time_window='minute',
+                    **kwargs),
+                records)
+            with self.assertRaises(ValueError):
+                client.get_entity_by_id(entity_id=entity.id,
+                                        time_window='minute',
+                                        last_n=10)
+
+    def test_columnar(self) -> None:
+        """
+        Test that columnar results equal the pydantic results
+
+        Returns:
+            None
+        """
+        with QuantumLeapClient(
+                url=settings.QL_URL,
+                fiware_header=self.fiware_header.copy(
+                    update={'service_path': '/static'})) \
+                as client:
+            entity = create_entities()[0]
+            records = client.get_entity_by_id(entity_id=entity.id,
+                                              limit=25000)
+            columnar = client.get_entity_by_id(entity_id=entity.id,
+                                               limit=25000,
+                                               columnar=True)
+            self.assertEqual(len(columnar), 25000)
+            self.assertEqual(columnar.to_time_series().attributes,
+                             records.attributes)
+
+            records = client.get_entity_attr_values_by_type(
+                entity_type=entity.type, attr_name='temperature')
+            columnar = client.get_entity_attr_values_by_type(
+                entity_type=entity.type, attr_name='temperature',
+                columnar=True)
+            self.assertEqual([item.entityId for item in columnar],
+                             [item.entityId for item in records])
+            self.assertEqual(sum(len(item) for item in columnar),
+                             sum(len(item.index) for item in records))
+
+    def test_iter_endpoints(self) -> None:
+        """
+        Test that streamed chunks add up to the merged time series
+
+        Returns:
+            None
+        """
+        with QuantumLeapClient(
+                url=settings.QL_URL,
+                fiware_header=self.fiware_header.copy(
+                    update={'service_path': '/static'})) \
+                as client:
+            entity = create_entities()[0]
+            records = client.get_entity_by_id(entity_id=entity.id,
+                                              limit=25000)
+            chunks = list(client.iter_entity_by_id(entity_id=entity.id,
+                                                   limit=25000,
+                                                   prefetch=2))
+            self.assertEqual([len(chunk.index) for chunk in chunks],
+                             [10000, 10000, 5000])
+            merged = chunks[0]
+            for chunk in chunks[1:]:
+                merged.extend(chunk)
+            self.assertEqual(merged, records)
+
+            records = client.get_entity_attr_by_type(
+                entity_type=entity.type, attr_name='temperature', limit=25000)
+            counts = {}
+            for chunk in client.iter_entity_attr_by_type(
+                    entity_type=entity.type,
+                    attr_name='temperature',
+                    limit=25000,
+                    columnar=True):
+                counts[chunk.entityId] = \
+                    counts.get(chunk.entityId, 0) + len(chunk)
+            self.assertEqual(counts, {item.entityId: len(item.index)
+                                      for item in records})
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'),
+                         "The time series cache requires 'pyarrow'")
+    def test_history_cache(self) -> None:
+        """
+        Test that the cache only requests new records and serves the same
+        history as the client
+
+        Returns:
+            None
+        """
+        with QuantumLeapClient(
+                url=settings.QL_URL,
+                fiware_header=self.fiware_header) \
+                as client, TemporaryDirectory() as path:
+            entity = create_entities()[0]
+            for i in range(3):
+                client.post_notification(
+                    Message(data=[entity], subscriptionId="test"))
+            time.sleep(1)
+            cache = client.history_cache(path)
+            history = cache.get_entity_by_id(entity_id=entity.id,
+                                             attrs='temperature')
+            self.assertEqual(len(history.index), 3)
+
+            for i in range(2):
+                client.post_notification(
+                    Message(data=[entity], subscriptionId="test"))
+            time.sleep(1)
+            history = cache.get_entity_by_id(entity_id=entity.id,
+                                             attrs='temperature',
+                                             columnar=True)
+            records = client.get_entity_by_id(entity_id=entity.id,
+                                              attrs='temperature')
+            self.assertEqual(history.to_time_series(), records)
+
+            history = cache.get_entity_by_id(entity_id=entity.id,
+                                             attrs='temperature',
+                                             from_date=records.index[3],
+                                             refresh=False)
+            self.assertEqual(history.index, records.index[3:])
+
     def tearDown(self) -> None:
         """
         Clean up server
@@ -0,0 +1,135 @@
+"""
+Tests for the on-disk history cache of the QuantumLeap client
+"""
+import importlib.util
+import unittest
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+from typing import Dict, List
+
+import numpy as np
+from filip.clients.ngsi_v2.timeseries_cache import TimeSeriesCache
+from filip.models.base import FiwareHeader
+from filip.models.ngsi_v2.timeseries import ColumnarTimeSeries
+
+
+class StubQuantumLeapClient:
+    """
+    Serves the records of a single entity like
+    :meth:`QuantumLeapClient.iter_entity_by_id` and counts the requests
+    """
+    def __init__(self):
+        self.fiware_headers = FiwareHeader()
+        self.records: Dict[int, Dict] = {}
+        self.requests = 0
+
+    def add(self, second: int, **values) -> None:
+        self.records[second] = values
+
+    def iter_entity_by_id(self, entity_id: str, *, from_date: str = None,
+                          to_date: str = None, columnar: bool = True,
+                          **kwargs) -> List[ColumnarTimeSeries]:
+        self.requests += 1
+        start = np.datetime64(from_date.rstrip('Z')) if from_date else None
+        end = np.datetime64(to_date.rstrip('Z')) if to_date else None
+        index = [np.datetime64(datetime.fromtimestamp(
+            second, timezone.utc).replace(tzinfo=None), 'ms')
+            for second in sorted(self.records)]
+        seconds = [second for second, dt in zip(sorted(self.records), index)
+                   if (start is None or dt >= start) and
+                   (end is None or dt <= end)]
+        if not seconds:
+            return []
+        names = dict.fromkeys(name for second in seconds
+                              for name in self.records[second])
+        return [ColumnarTimeSeries.from_json({
+            'entityId': entity_id,
+            'entityType': 'Room',
+            'index': [second * 1000 for second in seconds],
+            'attributes': [{'attrName': name,
+                            'values': [self.records[second].get(name)
+                                       for second in seconds]}
+                           for name in names]})]
+
+
+@unittest.skipUnless(importlib.util.find_spec('pyarrow'),
+                     "The time series cache requires 'pyarrow'")
+class TestTimeSeriesCache(unittest.TestCase):
+    """
+    Test writing, reading and compacting the files of the cache
+    """
+    def setUp(self) -> None:
+        self.client = StubQuantumLeapClient()
+        self.directory = TemporaryDirectory()
+
+    def test_json_columns(self):
+        """
+        Columns that change from strings to structured values are decoded
+        per file
+        """
+        for file_format in ('parquet', 'arrow'):
+            self.client.records = {}
+            cache = TimeSeriesCache(self.client,
+                                    f"{self.directory.name}/{file_format}",
+                                    file_format=file_format)
+            self.client.add(0, state='on', temperature=20.0)
+            self.client.add(1, state='off', temperature=21.0)
+            cache.get_entity_by_id('Room1')
+            self.client.add(2, state={'mode': 'eco'}, temperature=None)
+            self.client.add(3, state=[1, 2], temperature=22.5)
+            series = cache.get_entity_by_id('Room1', columnar=True)
+            self.assertEqual(list(series.attributes['state']),
+                             ['on', 'off', {'mode': 'eco'}, [1, 2]])
+            self.assertEqual(series.attributes['temperature'].dtype.kind,
+                             'f')
+            self.assertEqual(len(series), 4)
+
+    def test_latest_part_wins(self):
+        """
+        Records that are requested again replace the cached ones, e.g., the
+        last bucket of an aggregation
+        """
+        cache = TimeSeriesCache(self.client, self.directory.name)
+        self.client.add(0, count=1)
+        self.client.add(3600, count=2)
+        cache.get_entity_by_id('Room1', aggr_method='count',
+                               aggr_period='hour')
+        self.client.add(3600, count=5)
+        self.client.add(7200, count=1)
+        history = cache.get_entity_by_id('Room1', aggr_method='count',
+                                         aggr_period='hour')
+        self.assertEqual(history.attributes[0].values, [1, 5, 1])
+
+        # without refresh the cached records are served
+        requests = self.client.requests
+        history = cache.get_entity_by_id('Room1', aggr_method='count',
+                                         aggr_period='hour', refresh=False)
+        self.assertEqual(history.attributes[0].values, [1, 5, 1])
+        self.assertEqual(self.client.requests, requests)
+
+    def test_compaction(self):
+        """
+        The files of an entry are compacted into one without losing records
+        """
+        cache = TimeSeriesCache(self.client, self.directory.name,
+                                max_parts=2)
+        for second in range(4):
+            self.client.add(second, value=second,
+                            info='text' if second < 2 else {'n': second})
+            series = cache.get_entity_by_id('Room1', columnar=True)
+        directory = next(path for path in cache.path.iterdir()
+                         if path.is_dir())
+        parts = sorted(path.name for path in directory.glob('part-*'))
+        self.assertEqual(len(parts), 2)
+        self.assertEqual(list(series.attributes['value']), [0, 1, 2, 3])
+        self.client.add(4, value=4, info='text')
+        series = cache.get_entity_by_id('Room1', columnar=True)
+        self.assertEqual(list(series.attributes['value']), [0, 1, 2, 3, 4])
+        self.assertEqual(list(series.attributes['info']),
+                         ['text', 'text', {'n': 2}, {'n': 3}, 'text'])
+        compacted = [path.name for path in directory.glob('part-*')]
+        self.assertEqual(len(compacted), 1)
+        self.assertNotIn(compacted[0], parts)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
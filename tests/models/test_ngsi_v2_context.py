@@ -22,7 +22,8 @@ from filip.models.ngsi_v2.context import \
     NamedContextAttribute, \
     ContextEntityKeyValues, \
     NamedCommand, \
-    PropertyFormat
+    PropertyFormat, \
+    LazyContextEntity
 from filip.utils.model_generation import create_context_entity_model
 
 
@@ -222,6 +223,58 @@ class TestContextModels(unittest.TestCase):
         entity.delete_attributes(["test3"])
         self.assertEqual(entity.get_attribute_names(), set())
 
+    def test_entity_change_tracking(self):
+        """
+        Test the change tracking of context entities
+        """
+        entity = ContextEntity(**self.entity_data)
+        self.assertFalse(entity.is_tracking_changes)
+        with self.assertRaises(ValueError):
+            entity.get_changes()
+
+        entity.track_changes()
+        self.assertTrue(entity.is_tracking_changes)
+        self.assertFalse(entity.get_changes().has_changes)
+
+        entity.temperature.value = 21
+        entity.delete_attributes(['relation'])
+        entity.add_attributes([NamedContextAttribute(name='humidity',
+                                                     value=50,
+                                                     type='Number')])
+        changes = entity.get_changes()
+        self.assertTrue(changes.has_changes)
+        self.assertEqual(set(changes.added.keys()), {'humidity'})
+        self.assertEqual(changes.modified['temperature'].value, 21)
+        self.assertEqual(changes.deleted, ['relation'])
+
+        # tracking does not influence serialization or equality
+        self.assertNotIn('_snapshot', entity.dict())
+        self.assertEqual(entity, ContextEntity(**entity.dict()))
+
+        entity.track_changes()
+        self.assertFalse(entity.get_changes().has_changes)
+
+    def test_entity_without_validation(self):
+        """
+        Test building entities without validation
+        """
+        entity = ContextEntity.construct_trusted(self.entity_data)
+        self.assertEqual(entity, ContextEntity(**self.entity_data))
+        self.assertEqual(entity.temperature.value, 20)
+        self.assertEqual(len(entity.get_attributes()), 2)
+
+        lazy = LazyContextEntity(self.entity_data)
+        self.assertIsInstance(lazy, dict)
+        self.assertEqual(lazy['id'], 'MyId')
+        self.assertEqual(lazy.validate(), ContextEntity(**self.entity_data))
+        self.assertIs(lazy.validate(), lazy.validate())
+
+        lazy = LazyContextEntity({'id': 'MyId', 'type': 'MyType',
+                                  'temperature': {'type': 'Number',
+                                                  'value': 'invalid'}})
+        with self.assertRaises(ValidationError):
+            lazy.validate()
+
     def test_entity_get_command_methods(self):
         """
         Tests the two methods:
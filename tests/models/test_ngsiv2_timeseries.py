@@ -3,7 +3,12 @@ Tests for time series model
 """
 import logging
 import unittest
-from filip.models.ngsi_v2.timeseries import TimeSeries, TimeSeriesHeader
+
+import numpy as np
+from filip.models.ngsi_v2.timeseries import \
+    ColumnarTimeSeries, \
+    TimeSeries, \
+    TimeSeriesHeader
 
 
 logger = logging.getLogger(__name__)
@@ -98,6 +103,75 @@ class TestTimeSeriesModel(unittest.TestCase):
         with self.assertRaises(AssertionError):
             ts1.extend(ts2)
 
+    def test_columnar(self):
+        """
+        Test the columnar representation of time series
+        """
+        ts1 = ColumnarTimeSeries.from_json(self.data1, entity_type='Room')
+        self.assertEqual(ts1.index.dtype.kind, 'M')
+        self.assertEqual(ts1.attributes['temperature'].dtype, np.float64)
+        ts2 = ColumnarTimeSeries.from_json(self.data2, entity_type='Room')
+        merged = ColumnarTimeSeries.concat([ts1, ts2])
+        self.assertEqual(len(merged), 6)
+        ts1.extend(ts2)
+        np.testing.assert_array_equal(ts1.index, merged.index)
+        with self.assertRaises(AssertionError):
+            ts1.extend(ts2)
+
+        # same frame as the pydantic model without copying the values
+        ts = TimeSeries.parse_obj(self.data1)
+        ts.entityType = 'Room'
+        frame = ts.to_columnar().to_pandas()
+        self.assertTrue(np.array_equal(frame.to_numpy(),
+                                       ts.to_pandas().to_numpy()))
+        self.assertEqual(list(frame.columns), list(ts.to_pandas().columns))
+        columnar = ts.to_columnar()
+        self.assertTrue(np.shares_memory(
+            columnar.to_pandas().iloc[:, 0].to_numpy(),
+            columnar.attributes['temperature']))
+        self.assertEqual(columnar.to_time_series().attributes, ts.attributes)
+
+        # missing numbers become NaN, other values remain objects
+        ts = ColumnarTimeSeries.from_json({
+            'index': [1515167074000, 1515253499000],
+            'attributes': [{'attrName': 'a', 'values': [1, None]},
+                           {'attrName': 'b', 'values': ['on', None]}]})
+        self.assertTrue(np.isnan(ts.attributes['a'][1]))
+        self.assertEqual(ts.attributes['b'].dtype, object)
+        self.assertEqual(str(ts.index[0]), '2018-01-05T15:44:34.000')
+
+    def test_columnar_objects(self):
+        """
+        Test that values which are not only numbers or booleans are kept as
+        they are
+        """
+        index = [1515167074000, 1515253499000]
+        ts = ColumnarTimeSeries.from_json({
+            'index': index,
+            'attributes': [{'attrName': 'mixed', 'values': ['a', 1]},
+                           {'attrName': 'coords',
+                            'values': [[1, 2], [3, 4]]}]})
+        self.assertEqual(ts.attributes['mixed'].dtype, object)
+        self.assertEqual(ts.to_time_series().attributes[0].values, ['a', 1])
+        self.assertEqual(ts.attributes['coords'].shape, (2,))
+        self.assertEqual(ts.attributes['coords'][1], [3, 4])
+        self.assertEqual(ts.to_pandas().shape, (2, 2))
+
+        # chunks with differing types are concatenated as objects
+        chunks = [
+            {'index': index,
+             'attributes': [{'attrName': 'text', 'values': ['on', 'off']},
+                            {'attrName': 'flag', 'values': [True, False]}]},
+            {'index': [1515339924000],
+             'attributes': [{'attrName': 'text', 'values': [None]},
+                            {'attrName': 'flag', 'values': [None]}]}]
+        merged = ColumnarTimeSeries.concat(
+            ColumnarTimeSeries.from_json(chunk) for chunk in chunks)
+        values = {attr.attrName: attr.values
+                  for attr in merged.to_time_series().attributes}
+        self.assertEqual(values, {'text': ['on', 'off', None],
+                                  'flag': [True, False, None]})
+
     def test_timeseries_header(self):
         header = TimeSeriesHeader(**self.timeseries_header)
         header_by_alias = TimeSeriesHeader(**self.timeseries_header_alias)
@@ -0,0 +1,92 @@
+"""
+Tests clean up functions in filip.utils.cleanup
+"""
+import unittest
+
+from filip.clients.ngsi_v2 import ContextBrokerClient, IoTAClient
+from filip.models.base import FiwareHeader
+from filip.models.ngsi_v2.context import ActionType, ContextEntity
+from filip.models.ngsi_v2.iot import Device, ServiceGroup
+from filip.models.ngsi_v2.subscriptions import Subscription
+from filip.utils.cleanup import clear_all
+from tests.config import settings
+
+
+class TestCleanup(unittest.TestCase):
+    """
+    Test class for clean up functions
+    """
+    def setUp(self) -> None:
+        """
+        Setup test data
+
+        Returns:
+            None
+        """
+        self.fiware_header = FiwareHeader(
+            service=settings.FIWARE_SERVICE,
+            service_path=settings.FIWARE_SERVICEPATH)
+        clear_all(fiware_header=self.fiware_header,
+                  cb_url=settings.CB_URL,
+                  iota_url=settings.IOTA_JSON_URL)
+        self.cb_client = ContextBrokerClient(url=settings.CB_URL,
+                                             fiware_header=self.fiware_header)
+        self.iota_client = IoTAClient(url=settings.IOTA_JSON_URL,
+                                      fiware_header=self.fiware_header)
+
+    def test_clear_all(self):
+        """
+        Test dry run and parallel clean up of context broker and IoT-Agent
+        """
+        self.cb_client.update(
+            entities=[ContextEntity(id=f'Room{i}',
+                                    type='Room',
+                                    temperature={'type': 'Number',
+                                                 'value': i})
+                      for i in range(5000)],
+            action_type=ActionType.APPEND)
+        self.cb_client.post_subscription(Subscription.parse_obj({
+            "subject": {"entities": [{"idPattern": ".*", "type": "Room"}]},
+            "notification": {"http": {"url": "http://localhost:1234"}}
+        }))
+        self.iota_client.post_group(ServiceGroup(apikey='cleanup',
+                                                 resource='/iot/json'))
+        self.iota_client.post_devices(devices=[
+            Device(device_id=f'device_{i}',
+                   entity_name=f'Device:{i}',
+                   entity_type='Device',
+                   apikey='cleanup',
+                   transport='MQTT')
+            for i in range(25)])
+
+        expected = {'devices': 25,
+                    'groups': 1,
+                    'subscriptions': 1,
+                    'registrations': 0}
+        counts = clear_all(fiware_header=self.fiware_header,
+                           cb_url=settings.CB_URL,
+                           iota_url=settings.IOTA_JSON_URL,
+                           dry_run=True)
+        # the IoT-Agent may have created entities for the devices
+        self.assertGreaterEqual(counts.pop('entities'), 5000)
+        self.assertEqual(counts, expected)
+        self.assertEqual(len(self.iota_client.get_device_list()), 25)
+
+        counts = clear_all(fiware_header=self.fiware_header,
+                           cb_url=settings.CB_URL,
+                           iota_url=settings.IOTA_JSON_URL,
+                           max_workers=8)
+        self.assertGreaterEqual(counts.pop('entities'), 5000)
+        self.assertEqual(counts, expected)
+        self.assertEqual(self.cb_client.get_entity_list(), [])
+        self.assertEqual(self.iota_client.get_device_list(), [])
+
+    def tearDown(self) -> None:
+        """
+        Cleanup test server
+        """
+        clear_all(fiware_header=self.fiware_header,
+                  cb_url=settings.CB_URL,
+                  iota_url=settings.IOTA_JSON_URL)
+        self.cb_client.close()
+        self.iota_client.close()
@@ -0,0 +1,69 @@
+"""
+Tests datetime functions in filip.utils.datetime
+"""
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from filip.models.ngsi_v2.timeseries import AggrPeriod
+from filip.utils.datetime import split_time_range, split_time_range_by_counts
+
+
+class TestDatetime(unittest.TestCase):
+    """
+    Test class for datetime functions
+    """
+    def setUp(self) -> None:
+        """
+        Setup test data
+
+        Returns:
+            None
+        """
+        self.start = datetime(2020, 1, 15, 10, tzinfo=timezone.utc)
+        self.end = datetime(2020, 4, 2, tzinfo=timezone.utc)
+
+    def assertContiguous(self, windows):
+        """
+        Checks that the windows cover the range without overlapping
+        """
+        self.assertEqual(windows[0][0], self.start)
+        self.assertEqual(windows[-1][1], self.end)
+        for (_, end), (start, _) in zip(windows, windows[1:]):
+            self.assertEqual(start - end, timedelta(milliseconds=1))
+
+    def test_split_time_range(self):
+        """
+        Test splitting by fixed and calendar periods
+        """
+        windows = split_time_range(self.start, self.end, timedelta(days=7))
+        self.assertEqual(len(windows), 12)
+        self.assertContiguous(windows)
+
+        windows = split_time_range(self.start, self.end, AggrPeriod.MONTH)
+        self.assertEqual([window[0].month for window in windows],
+                         [1, 2, 3, 4])
+        self.assertEqual(windows[1][0], datetime(2020, 2, 1,
+                                                 tzinfo=timezone.utc))
+        self.assertContiguous(windows)
+
+        with self.assertRaises(ValueError):
+            split_time_range(self.start, self.end, 'week')
+        with self.assertRaises(ValueError):
+            split_time_range(self.start, self.end, timedelta(0))
+
+    def test_split_time_range_by_counts(self):
+        """
+        Test splitting by the number of records per bucket
+        """
+        counts = [(self.start + timedelta(days=i), 100) for i in range(78)]
+        windows = split_time_range_by_counts(self.start, self.end, counts, 500)
+        self.assertEqual(len(windows), 16)
+        self.assertEqual(windows[1][0], self.start + timedelta(days=5))
+        self.assertContiguous(windows)
+
+        # a large bucket gets a window of its own
+        counts[10] = (counts[10][0], 10000)
+        windows = split_time_range_by_counts(self.start, self.end, counts, 500)
+        self.assertIn((counts[10][0],
+                       counts[11][0] - timedelta(milliseconds=1)), windows)
+        self.assertContiguous(windows)
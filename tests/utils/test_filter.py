@@ -11,6 +11,7 @@ from filip.models.ngsi_v2.iot import Device
 from filip.models.ngsi_v2.subscriptions import Subscription
 from filip.utils import filter
 from filip.utils.cleanup import clear_all
+from filip.utils.subscription_index import SubscriptionIndex
 from tests.config import settings
 
 
@@ -79,6 +80,60 @@ class TestFilterFunctions(unittest.TestCase):
                                                              self.fiware_header)
         self.assertGreater(len(filtered_sub), 0)
 
+    def test_subscription_index(self):
+        """
+        Test matching and duplicate detection of the SubscriptionIndex
+        """
+        subscriptions = [
+            Subscription.parse_obj({
+                "id": str(i),
+                "subject": {"entities": [entity]},
+                "notification": {"http": {"url": f"http://localhost:{i}"}}})
+            for i, entity in enumerate([
+                {"idPattern": ".*", "type": "Room"},
+                {"id": "Room1"},
+                {"idPattern": "^Building", "typePattern": "Build.*"},
+                {"id": "Room1", "type": "Office"}])]
+        index = SubscriptionIndex(subscriptions)
+
+        def ids(entity_id, entity_type):
+            return [sub.id for sub in index.match(entity_id=entity_id,
+                                                  entity_type=entity_type)]
+
+        self.assertEqual(ids("Room1", "Room"), ["0", "1"])
+        self.assertEqual(ids("Room1", "Office"), ["1", "3"])
+        self.assertEqual(ids("Building:1", "Building"), ["2"])
+        self.assertEqual(ids("Room:Building", "Building"), [])
+        self.assertEqual(
+            [sub.id for sub in filter.filter_subscriptions_by_entity(
+                "Room2", "Room", subscriptions=subscriptions)], ["0"])
+        # an empty index is used as is instead of downloading subscriptions
+        self.assertEqual(filter.filter_subscriptions_by_entity(
+            "Room2", "Room", url="http://localhost:1",
+            subscriptions=SubscriptionIndex()), [])
+
+        duplicate = Subscription.parse_obj(subscriptions[2].dict(
+            exclude={'id'}))
+        self.assertEqual(index.find_duplicate(duplicate).id, "2")
+        duplicate.notification.http.url = "http://localhost:1234"
+        self.assertIsNone(index.find_duplicate(duplicate))
+        self.assertEqual(
+            index.by_notification_url("http://localhost:3")[0].id, "3")
+
+        index.remove("1")
+        self.assertEqual(ids("Room1", "Office"), ["3"])
+        self.assertEqual(len(index), 3)
+        with self.assertRaises(ValueError):
+            index.add(duplicate)
+
+        # post_subscription uses and updates the index
+        sub_id = self.client.post_subscription(self.subscription, index=index)
+        self.assertIn(sub_id, index)
+        with self.assertWarns(UserWarning):
+            self.assertEqual(self.client.post_subscription(self.subscription,
+                                                           index=index),
+                             sub_id)
+
     def test_filter_device_list(self) -> None:
         """
         Test the function filter_device_list
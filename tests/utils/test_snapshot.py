@@ -0,0 +1,121 @@
+"""
+Tests export and import of tenants in filip.utils.snapshot
+"""
+import shutil
+import tempfile
+import unittest
+
+from filip.clients.ngsi_v2 import ContextBrokerClient, IoTAClient
+from filip.models.base import FiwareHeader
+from filip.models.ngsi_v2.context import ActionType, ContextEntity
+from filip.models.ngsi_v2.iot import Device, DeviceAttribute, ServiceGroup
+from filip.models.ngsi_v2.subscriptions import Subscription
+from filip.utils.cleanup import clear_all
+from filip.utils.snapshot import export_tenant, import_tenant
+from tests.config import settings
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    Test class for tenant snapshots
+    """
+    def setUp(self) -> None:
+        """
+        Setup test data and clients
+
+        Returns:
+            None
+        """
+        self.fiware_header = FiwareHeader(
+            service=settings.FIWARE_SERVICE,
+            service_path=settings.FIWARE_SERVICEPATH)
+        self.clone_header = FiwareHeader(
+            service=settings.FIWARE_SERVICE,
+            service_path=f"{settings.FIWARE_SERVICEPATH}Clone")
+        for header in (self.fiware_header, self.clone_header):
+            clear_all(fiware_header=header,
+                      cb_url=settings.CB_URL,
+                      iota_url=settings.IOTA_JSON_URL)
+        self.path = tempfile.mkdtemp()
+
+        with ContextBrokerClient(url=settings.CB_URL,
+                                 fiware_header=self.fiware_header) as client:
+            client.update(entities=[ContextEntity(id=f'Room{i}',
+                                                  type='Room',
+                                                  temperature={
+                                                      'type': 'Number',
+                                                      'value': i})
+                                    for i in range(2500)],
+                          action_type=ActionType.APPEND)
+            client.post_subscription(Subscription.parse_obj({
+                "description": "Snapshot test subscription",
+                "subject": {"entities": [{"idPattern": ".*",
+                                          "type": "Room"}]},
+                "notification": {"http": {"url": "http://localhost:1234"}}
+            }))
+        with IoTAClient(url=settings.IOTA_JSON_URL,
+                        fiware_header=self.fiware_header) as client:
+            client.post_group(ServiceGroup(apikey='snapshot',
+                                           resource='/iot/json'))
+            client.post_device(device=Device(
+                device_id='snapshot_device',
+                entity_name='Sensor:snapshot',
+                entity_type='Sensor',
+                apikey='snapshot',
+                transport='MQTT',
+                attributes=[DeviceAttribute(name='temperature',
+                                            object_id='t',
+                                            type='Number')]))
+
+    def test_export_import(self):
+        """
+        Test cloning a tenant via a snapshot
+        """
+        exported = export_tenant(self.path,
+                                 fiware_header=self.fiware_header,
+                                 cb_url=settings.CB_URL,
+                                 iota_url=settings.IOTA_JSON_URL,
+                                 page_size=700)
+        self.assertEqual(exported['subscriptions'], 1)
+        self.assertEqual(exported['groups'], 1)
+        self.assertEqual(exported['devices'], 1)
+        # the IoT-Agent may have created an entity for the device
+        self.assertGreaterEqual(exported['entities'], 2500)
+
+        imported = import_tenant(self.path,
+                                 fiware_header=self.clone_header,
+                                 cb_url=settings.CB_URL,
+                                 iota_url=settings.IOTA_JSON_URL,
+                                 chunk_size=500)
+        self.assertEqual(imported, exported)
+
+        with ContextBrokerClient(url=settings.CB_URL,
+                                 fiware_header=self.clone_header) as client:
+            original = ContextBrokerClient(url=settings.CB_URL,
+                                           fiware_header=self.fiware_header)
+            self.assertEqual(
+                client.get_entity_list(entity_types=['Room'], order_by='id'),
+                original.get_entity_list(entity_types=['Room'],
+                                         order_by='id'))
+            self.assertEqual(len(client.get_subscription_list()), 1)
+
+            # existing subscriptions are detected as duplicates
+            import_tenant(self.path,
+                          fiware_header=self.clone_header,
+                          cb_url=settings.CB_URL,
+                          chunk_size=500)
+            self.assertEqual(len(client.get_subscription_list()), 1)
+        with IoTAClient(url=settings.IOTA_JSON_URL,
+                        fiware_header=self.clone_header) as client:
+            self.assertEqual(client.get_device(device_id='snapshot_device')
+                             .entity_name, 'Sensor:snapshot')
+
+    def tearDown(self) -> None:
+        """
+        Cleanup test server and snapshot
+        """
+        for header in (self.fiware_header, self.clone_header):
+            clear_all(fiware_header=header,
+                      cb_url=settings.CB_URL,
+                      iota_url=settings.IOTA_JSON_URL)
+        shutil.rmtree(self.path)